@@ -55,7 +55,6 @@ from app.utils.sanitizer_util import clean_backtick_sequences
 from app.utils.context_enhancer import enhance_context_with_ast, get_ast_indexing_status
 from app.utils.print_tree_util import print_file_tree
 from app.utils.file_utils import is_binary_file, is_processable_file
-from app.utils.file_utils import read_file_content
 from app.utils.prompt_cache import get_prompt_cache
 from app.utils.file_state_manager import FileStateManager
 from app.utils.error_handlers import format_error_response, detect_error_type
@@ -1470,7 +1469,6 @@ def get_combined_docs_from_files(files, conversation_id: str = "default") -> str
     logger.debug("=== get_combined_docs_from_files called ===")
     logger.debug(f"🔍 FILES_DEBUG: Called with {len(files)} files: {files[:5]}..." if len(files) > 5 else f"🔍 FILES_DEBUG: Called with files: {files}")
     logger.debug(f"Called with files: {files}")
-    combined_contents: str = ""
     logger.debug("Processing files:")
     print_file_tree(files if isinstance(files, list) else files.get("config", {}).get("files", []))
     
@@ -1498,12 +1496,15 @@ def get_combined_docs_from_files(files, conversation_id: str = "default") -> str
         user_codebase_dir: str = get_project_root()
     except ImportError:
         user_codebase_dir = ziya_env("ZIYA_USER_CODEBASE_DIR") or os.getcwd()
+    from app.utils import context_assembly
+    from app.utils.file_utils import resolve_external_path, EXTERNAL_PREFIX
+    full_paths = {file_path: resolve_external_path(file_path, user_codebase_dir) for file_path in files}
+    # Only files changed since the last turn are read, in parallel
+    disk_contents = context_assembly.read_files(full_paths.values())
+
+    segments: List[str] = []
     for file_path in files:
-        from app.utils.file_utils import resolve_external_path, EXTERNAL_PREFIX
-        full_path = resolve_external_path(file_path, user_codebase_dir)
-        
-        # For external paths, use the resolved absolute path as the display key
-        display_path = file_path
+        full_path = full_paths[file_path]
 
         # Check if this is an MCP server file that shouldn't be in the codebase
         if 'mcp_servers' in file_path:
@@ -1514,51 +1515,27 @@ def get_combined_docs_from_files(files, conversation_id: str = "default") -> str
             logger.debug(f"Skipping directory: {full_path}")
             continue
         try:
-            # Get annotated content with change tracking
-            # CRITICAL: Refresh file from disk before getting annotated content
+            content = disk_contents.get(full_path)
+            # CRITICAL: Refresh file state from disk before rendering it
             refresh_base = '' if str(file_path).startswith(EXTERNAL_PREFIX) else user_codebase_dir
-            file_state_manager.refresh_file_from_disk(conversation_id, file_path, refresh_base)
-            logger.debug(f"Getting annotated content for {file_path}")
-            annotated_lines, success = file_state_manager.get_annotated_content(conversation_id, file_path)
-            logger.debug(f"First few annotated lines: {annotated_lines[:3] if annotated_lines else []}")
-            logger.debug(f"Got {len(annotated_lines) if annotated_lines else 0} lines for {file_path}, success={success}")
-            if success:
-                # Log a preview of the content
-                preview = "\n".join(annotated_lines[:5]) if annotated_lines else "NO CONTENT"
-                logger.debug(f"Content preview for {file_path}:\n{preview}\n...")
-                escaped_lines = [escape_backticks_for_llm(line) for line in annotated_lines]
-                combined_contents += f"File: {file_path}\n" + "\n".join(escaped_lines) + "\n\n"
-            else:
+            file_state_manager.refresh_file_from_disk(conversation_id, file_path, refresh_base, content)
+            state = file_state_manager.get_file_state(conversation_id, file_path)
+            if state is None:
                 # Add file directly to FileStateManager when not found
                 logger.debug(f"File {file_path} not in FileStateManager, adding it directly")
-                content = read_file_content(full_path)
-                if content:
-                    # Ensure conversation exists
-                    if conversation_id not in file_state_manager.conversation_states:
-                        file_state_manager.conversation_states[conversation_id] = {}
-                    
-                    # Add file directly to state
-                    from app.utils.file_state_manager import FileState
-                    lines = content.splitlines()
-                    file_state_manager.conversation_states[conversation_id][file_path] = FileState(
-                        path=file_path,
-                        content_hash=file_state_manager._compute_hash(lines),
-                        line_states={},
-                        original_content=lines.copy(),
-                        current_content=lines.copy(),
-                        last_seen_content=lines.copy(),
-                        last_context_submission_content=lines.copy()
-                    )
-                    
-                    # Get annotated content
-                    annotated_lines, success = file_state_manager.get_annotated_content(conversation_id, file_path)
-                    escaped_lines = [escape_backticks_for_llm(line) for line in annotated_lines]
-                    combined_contents += f"File: {file_path}\n" + "\n".join(escaped_lines) + "\n\n"
+                if not content:
+                    continue
+                state = file_state_manager.track_file(conversation_id, file_path, content)
+
+            # Annotated, backtick-escaped segment; re-rendered only when the
+            # file's state changed since it was last rendered.
+            segments.append(context_assembly.segment_for(conversation_id, file_path, state))
         except (OSError, UnicodeDecodeError, PermissionError) as e:
             logger.error(f"Error processing {file_path}: {str(e)}")
     
-    file_count = len([l for l in combined_contents.split('\n') if l.startswith('File: ')])
-    logger.debug(f"Combined {file_count} files, {len(combined_contents)} chars")
+    context_assembly.retain_segments(conversation_id, files)
+    combined_contents = "".join(segments)
+    logger.debug(f"Combined {len(segments)} files, {len(combined_contents)} chars")
     
     return combined_contents
 
@@ -1676,15 +1653,16 @@ def extract_codebase(x):
 
     # Initialize conversation state FIRST, before any file processing
     # This ensures the context cache system can find the conversation state
-    file_contents = {}
+    try:
+        from app.context import get_project_root
+        _root = get_project_root()
+    except ImportError:
+        _root = ziya_env("ZIYA_USER_CODEBASE_DIR") or os.getcwd()
+    from app.utils import context_assembly
+    from app.utils.file_utils import resolve_external_path
+    full_paths = {}
     for file_path in files:
         try:
-            try:
-                from app.context import get_project_root
-                _root = get_project_root()
-            except ImportError:
-                _root = ziya_env("ZIYA_USER_CODEBASE_DIR") or os.getcwd()
-            from app.utils.file_utils import resolve_external_path
             full_path = resolve_external_path(file_path, _root)
             if os.path.isdir(full_path):
                 logger.debug(f"Skipping directory: {file_path}")
@@ -1692,18 +1670,20 @@ def extract_codebase(x):
             if not is_processable_file(full_path):
                 logger.debug(f"Skipping binary file: {file_path}")
                 continue
-            
-            # Use the new read_file_content function
-            content = read_file_content(full_path)
-            if content:
-                file_contents[file_path] = content
-                lines = len(content.splitlines()) if isinstance(content, str) else 0
-                logger.debug(f"Successfully loaded {file_path} with {lines} lines")
-            else:
-                logger.warning(f"Failed to read content from {file_path}")
+            full_paths[file_path] = full_path
         except (OSError, UnicodeDecodeError, PermissionError) as e:
             logger.error(f"Error reading file {file_path}: {str(e)}")
-            continue
+
+    # Unchanged files come from the stat-validated cache; the rest are read in parallel
+    disk_contents = context_assembly.read_files(full_paths.values())
+    file_contents = {}
+    for file_path, full_path in full_paths.items():
+        content = disk_contents.get(full_path)
+        if content:
+            file_contents[file_path] = content
+            logger.debug(f"Successfully loaded {file_path} ({len(content)} chars)")
+        else:
+            logger.warning(f"Failed to read content from {file_path}")
     
     # CRITICAL: Check if this is a new conversation or an existing one
     is_new_conversation = conversation_id not in file_state_manager.conversation_states
@@ -1724,7 +1704,17 @@ def extract_codebase(x):
             base_dir = get_project_root()
         except (ImportError, LookupError):
             base_dir = ziya_env("ZIYA_USER_CODEBASE_DIR") or os.getcwd()
-        refresh_results = file_state_manager.refresh_all_files_from_disk(conversation_id, base_dir)
+        # Files tracked from earlier turns but no longer selected are read
+        # through the same cache.
+        others = {
+            p: resolve_external_path(p, base_dir)
+            for p in file_state_manager.conversation_states[conversation_id]
+            if p not in file_contents
+        }
+        other_contents = context_assembly.read_files(others.values())
+        known_contents = dict(file_contents)
+        known_contents.update({p: other_contents[f] for p, f in others.items() if other_contents[f] is not None})
+        refresh_results = file_state_manager.refresh_all_files_from_disk(conversation_id, base_dir, known_contents)
         changed_count = sum(1 for changed in refresh_results.values() if changed)
         logger.debug(f"Refreshed conversation {conversation_id}: {changed_count} files changed on disk")
     
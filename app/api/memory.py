@@ -287,7 +287,7 @@ async def embedding_status():
     cache = get_embedding_cache()
     total = len(memories)
     cached = cache.count
-    return {"enabled": True, "provider": "bedrock_titan", "total": total,
+    return {"enabled": True, "provider": getattr(provider, "name", "unknown"), "total": total,
             "embedded": cached, "missing": total - cached}
 
 
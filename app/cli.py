@@ -1672,6 +1672,8 @@ class CLI:
         if stream:
             from app.utils.terminal_markdown import StreamingMarkdownRenderer
             md_renderer = StreamingMarkdownRenderer()
+        # Tools whose output was already shown live via tool_progress
+        streamed_tool_ids = set()
         
         try:
             _debug_chunks = ziya_env('ZIYA_DEBUG_CHUNKS')
@@ -1741,6 +1743,17 @@ class CLI:
                     if md_renderer:
                         md_renderer.flush()
                     print(f"\n\033[36m⚙ Executing {display_header}...\033[0m", flush=True)
+
+                elif chunk_type == 'tool_progress':
+                    # Live output of a still-running tool, dimmed; the boxed
+                    # result follows once the tool finishes.
+                    if chunk.get('is_internal'):
+                        continue
+                    if md_renderer:
+                        md_renderer.flush()
+                    streamed_tool_ids.add(chunk.get('tool_id'))
+                    color = '\033[2;31m' if chunk.get('stream') == 'stderr' else '\033[2m'
+                    print(f"{color}{chunk.get('output', '')}\033[0m", end='', flush=True)
             
                 elif chunk_type == 'tool_display':
                     try:
@@ -1843,7 +1856,13 @@ class CLI:
                                         flush=True,
                                     )
                                     print("\033[90m│\033[0m", flush=True)
-                                    if body:
+                                    if body and chunk.get('tool_id') in streamed_tool_ids:
+                                        # Already printed live; keep only the exit status
+                                        print(f"\033[90m│ ({body.count(chr(10)) + 1} lines of output shown above)\033[0m", flush=True)
+                                        exit_lines = [l for l in body.splitlines() if l.startswith('[Exit code:')]
+                                        if exit_lines:
+                                            render_prefixed_markdown(exit_lines[-1])
+                                    elif body:
                                         render_prefixed_markdown(body)
                                 else:
                                     render_prefixed_markdown(stripped_result)
@@ -158,6 +158,13 @@ _VARS: List[EnvVar] = [
            "credential-bearing vars (AWS_*, MIDWAY_*, and any name containing "
            "TOKEN/SECRET/PASSWORD/CREDENTIAL/ACCESS_KEY/API_KEY) are stripped "
            "before launching MCP servers, which are treated as untrusted."),
+    EnvVar("ZIYA_MCP_WARM_POOL_SIZE", int, 2, EnvCategory.MCP,
+           "Pre-spawned, initialized instances kept per workspace-scoped "
+           "server that supports workspace binding (the built-in shell "
+           "server). 0 disables the pool."),
+    EnvVar("ZIYA_MCP_WARM_POOL_TTL", int, 300, EnvCategory.MCP,
+           "Seconds an unused pre-spawned MCP instance is kept before it is "
+           "reaped."),
 
     # ── Features ──────────────────────────────────────────────────────────
     EnvVar("ZIYA_ENABLE_AST", bool, False, EnvCategory.FEATURES,
@@ -169,6 +176,14 @@ _VARS: List[EnvVar] = [
            "Timeout in seconds for full AST indexing pass."),
     EnvVar("ZIYA_AST_FILE_CAP", int, 50000, EnvCategory.FEATURES,
            "Maximum number of files the AST indexer will process."),
+    EnvVar("ZIYA_AST_WORKERS", int, None, EnvCategory.FEATURES,
+           "Worker processes for cold AST parsing (default: CPU count, max 8; 1 disables)."),
+    EnvVar("ZIYA_TOKEN_WORKERS", int, None, EnvCategory.FEATURES,
+           "Worker processes for background exact token counting (default: a quarter of CPUs, max 4)."),
+    EnvVar("ZIYA_CHAT_LOG_FORMAT", bool, False, EnvCategory.FEATURES,
+           "Store chats as append-only message logs so a turn write is "
+           "proportional to the new message. Existing JSON chats migrate on "
+           "their next write."),
     EnvVar("ZIYA_EPHEMERAL_MODE", bool, False, EnvCategory.FEATURES,
            "Don't persist conversations or data beyond the current session.",
            cli_flag="--ephemeral"),
@@ -218,6 +233,8 @@ _VARS: List[EnvVar] = [
            "AWS region for the embedding service."),
     EnvVar("ZIYA_EMBEDDING_DIM", int, 1024, EnvCategory.GROUNDING,
            "Embedding vector dimension."),
+    EnvVar("ZIYA_EMBEDDING_CONCURRENCY", int, 4, EnvCategory.GROUNDING,
+           "Concurrent requests per embed_batch call to a remote embedding provider."),
     EnvVar("ZIYA_NODE_CROSS_LINK_SIMILARITY", float, 0.62, EnvCategory.GROUNDING,
            "Min mind-map node centroid cosine similarity to create a cross-link."),
     EnvVar("ZIYA_MEMORY_INTERFERENCE_STALE_DAYS", int, 21, EnvCategory.GROUNDING,
@@ -230,6 +247,10 @@ _VARS: List[EnvVar] = [
            "Local sentence-transformer model for PDF search."),
     EnvVar("ZIYA_PDF_RAG_TOKEN_THRESHOLD", int, None, EnvCategory.GROUNDING,
            "Token threshold above which PDF RAG activates."),
+    EnvVar("ZIYA_PDF_EXTRACT_WORKERS", int, None, EnvCategory.GROUNDING,
+           "Worker processes for PDF page extraction (default: CPU count, max 8; 1 disables)."),
+    EnvVar("ZIYA_PDF_RAG_BACKGROUND_BUILD", bool, True, EnvCategory.GROUNDING,
+           "Build the full PDF index in the background after serving a light stub."),
 
     # ── Security ──────────────────────────────────────────────────────────
     EnvVar("ZIYA_ENCRYPTION_KEY", str, None, EnvCategory.SECURITY,
@@ -281,6 +302,8 @@ _VARS: List[EnvVar] = [
            "Current project ID (set by middleware/context).", user_facing=False),
     EnvVar("ZIYA_SCAN_TIMEOUT", int, 45, EnvCategory.INTERNAL,
            "Maximum seconds for folder scanning.", user_facing=True),
+    EnvVar("ZIYA_SCAN_WORKERS", int, 8, EnvCategory.INTERNAL,
+           "Concurrent directory listings during folder scanning.", user_facing=False),
     EnvVar("ZIYA_MAX_DEPTH", int, 15, EnvCategory.INTERNAL,
            "Maximum depth for folder tree traversal.",
            cli_flag="--max-depth", user_facing=True),
@@ -290,8 +313,6 @@ _VARS: List[EnvVar] = [
            "Timeout (seconds) for .gitignore parsing.", user_facing=False),
     EnvVar("ZIYA_FILE_LIST_TIMEOUT", float, 120, EnvCategory.INTERNAL,
            "Timeout (seconds) for generating file listings.", user_facing=False),
-    EnvVar("ZIYA_ESTIMATE_TIMEOUT", float, 15, EnvCategory.INTERNAL,
-           "Timeout (seconds) for token estimate calculations.", user_facing=False),
     EnvVar("ZIYA_EXPLICIT_ROOT", str, None, EnvCategory.INTERNAL,
            "Flag: project root was explicitly set by --root, not auto-detected.",
            user_facing=False),
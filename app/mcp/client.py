@@ -18,6 +18,7 @@ import time
 
 from app.utils.logging_utils import logger
 from app.config.env_registry import ziya_env
+from app.mcp.tool_progress import tool_output_sink
 
 # Upper bound on the unmatched-response buffer so a misbehaving server
 # (late responses, unknown ids) cannot grow it without limit.
@@ -185,6 +186,8 @@ class MCPClient:
         self._write_lock = asyncio.Lock()
         self._pending: Dict[int, "asyncio.Future"] = {}
         self._reader_task: Optional["asyncio.Task"] = None
+        # progressToken -> sink for incremental tool output (see tool_progress)
+        self._progress_sinks: Dict[str, Any] = {}
 
         # External server health monitoring
         self._consecutive_failures = 0
@@ -626,7 +629,29 @@ class MCPClient:
                         pass  # loop may already be closing; nothing to recover
                 self.process = None
                 self.is_connected = False
-    
+
+    async def bind_workspace(self, workspace_path: str, name: Optional[str] = None) -> bool:
+        """
+        Point a pre-spawned server process at *workspace_path*.
+
+        Only servers that implement the ``ziya/bindWorkspace`` request
+        (the built-in shell server) support this.  The config is updated
+        too, so a later reconnect respawns into the same workspace.
+
+        Returns:
+            bool: True if the server accepted the binding
+        """
+        result = await self._send_request("ziya/bindWorkspace", {"path": workspace_path})
+        if not isinstance(result, dict) or result.get("error"):
+            logger.warning(f"Server {self.server_config.get('name', 'unknown')} refused workspace binding: {result}")
+            return False
+        env = dict(self.server_config.get("env") or {})
+        env["ZIYA_USER_CODEBASE_DIR"] = workspace_path
+        self.server_config = {**self.server_config, "env": env}
+        if name:
+            self.server_config["name"] = name
+        return True
+
     # ----------------------------------------------------------------
     # Remote (SSE / StreamableHTTP) connection support
     # ----------------------------------------------------------------
@@ -825,7 +850,9 @@ class MCPClient:
                     continue
                 resp_id = msg.get("id")
                 if resp_id is None:
-                    continue  # notification / log — nothing to route on
+                    if msg.get("method") == "notifications/progress":
+                        self._route_progress(msg.get("params") or {})
+                    continue  # other notifications / logs — nothing to route on
                 fut = self._pending.pop(resp_id, None)
                 if fut is not None and not fut.done():
                     fut.set_result(msg)
@@ -841,6 +868,17 @@ class MCPClient:
         finally:
             self._fail_all_pending(ConnectionError("MCP stdout closed"))
 
+    def _route_progress(self, params: Dict[str, Any]) -> None:
+        """Hand a progress notification's output chunk to its call's sink."""
+        sink = self._progress_sinks.get(params.get("progressToken"))
+        message = params.get("message")
+        if sink is None or not isinstance(message, str):
+            return
+        try:
+            sink(params.get("stream", "stdout"), message)
+        except Exception as e:
+            logger.debug(f"Tool output sink failed: {e}")
+
     async def _send_request(self, method: str, params: Optional[Dict[str, Any]] = None, _retry_count: int = 0) -> Optional[Dict[str, Any]]:
         """Send a JSON-RPC request to the MCP server with enhanced retry logic."""
         
@@ -1433,10 +1471,22 @@ class MCPClient:
             # DEBUG: Log what we're about to send
             logger.debug(f"MCP_CLIENT: Calling tool '{name}' with args={arguments}")
             
-            result = await self._send_request("tools/call", {
+            call_params: Dict[str, Any] = {
                 "name": name,
                 "arguments": arguments
-            })
+            }
+            # Ask for incremental output when the caller is listening for it
+            sink = tool_output_sink.get()
+            progress_token = None
+            if sink is not None:
+                progress_token = uuid.uuid4().hex
+                call_params["_meta"] = {"progressToken": progress_token}
+                self._progress_sinks[progress_token] = sink
+            try:
+                result = await self._send_request("tools/call", call_params)
+            finally:
+                if progress_token is not None:
+                    self._progress_sinks.pop(progress_token, None)
             
             # Don't retry on validation errors - fail fast
             if isinstance(result, dict) and result.get("error") and "validation" in str(result.get("message", "")).lower():
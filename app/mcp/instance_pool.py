@@ -0,0 +1,124 @@
+"""
+Warm pool of pre-spawned MCP server instances.
+
+Workspace-scoped servers get one subprocess per (workspace, session), and
+spawning one costs a process start plus the full MCP handshake and
+capability load — seconds of latency on the first tool call of every new
+conversation or delegate.  This module keeps a small number of instances
+per server already connected and initialized, so a first call only has to
+bind one to its workspace (see ``MCPClient.bind_workspace``).
+
+Each pooled instance records a fingerprint of the spawn environment it was
+started with.  A checkout skips instances whose fingerprint no longer
+matches (e.g. a session grant was applied since), so escalation state is
+never carried across a change.  Idle instances are reaped after a TTL, and
+the pool is only topped up again on demand.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.mcp.client import MCPClient
+from app.utils.logging_utils import logger
+
+
+class WarmInstancePool:
+    """Bounded pool of connected, not-yet-bound clients for one server."""
+
+    def __init__(self, server_name: str, size: int, idle_ttl: float,
+                 spawn: Callable[[], Awaitable[Optional[MCPClient]]],
+                 fingerprint: Callable[[Dict[str, Any]], str]):
+        """
+        Args:
+            server_name: Server the pooled instances belong to
+            size: Maximum number of idle instances to keep
+            idle_ttl: Seconds an idle instance is kept before it is reaped
+            spawn: Coroutine factory that starts and connects one instance
+            fingerprint: Maps a client's server config to its spawn fingerprint
+        """
+        self.server_name = server_name
+        self.size = size
+        self.idle_ttl = idle_ttl
+        self._spawn = spawn
+        self._fingerprint = fingerprint
+        # (client, fingerprint, spawned_at), oldest first
+        self._idle: List[Tuple[MCPClient, str, float]] = []
+        self._spawn_tasks: "set[asyncio.Task]" = set()
+        self.hits = 0
+        self.misses = 0
+        self.reaped = 0
+
+    def fill(self) -> None:
+        """Start spawning instances until the pool is back at full size."""
+        missing = self.size - len(self._idle) - len(self._spawn_tasks)
+        for _ in range(max(0, missing)):
+            task = asyncio.create_task(self._spawn_one())
+            self._spawn_tasks.add(task)
+            task.add_done_callback(self._spawn_tasks.discard)
+
+    async def _spawn_one(self) -> None:
+        try:
+            client = await self._spawn()
+        except (OSError, RuntimeError, asyncio.TimeoutError) as e:
+            logger.warning(f"Warm pool spawn failed for {self.server_name}: {e}")
+            return
+        if client is None:
+            return
+        self._idle.append((client, self._fingerprint(client.server_config), time.time()))
+        logger.debug(f"Warm pool for {self.server_name}: {len(self._idle)}/{self.size} ready")
+
+    async def checkout(self, fingerprint: str) -> Optional[MCPClient]:
+        """
+        Take a ready instance spawned with *fingerprint*, or None.
+
+        Instances with a stale fingerprint or a dead process are discarded
+        on the way.  Either way the pool starts refilling in the background.
+        """
+        client = None
+        while self._idle:
+            candidate, candidate_fingerprint, _ = self._idle.pop(0)
+            if (candidate_fingerprint == fingerprint and candidate.is_connected
+                    and candidate._is_process_healthy()):
+                client = candidate
+                break
+            await candidate.disconnect()
+        if client is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.fill()
+        return client
+
+    async def reap(self, now: Optional[float] = None) -> int:
+        """Disconnect idle instances older than the TTL; returns how many."""
+        now = time.time() if now is None else now
+        expired = [entry for entry in self._idle if now - entry[2] > self.idle_ttl]
+        if not expired:
+            return 0
+        self._idle = [entry for entry in self._idle if now - entry[2] <= self.idle_ttl]
+        await asyncio.gather(*(client.disconnect() for client, _, _ in expired),
+                             return_exceptions=True)
+        self.reaped += len(expired)
+        logger.info(f"Reaped {len(expired)} idle warm instance(s) of {self.server_name}")
+        return len(expired)
+
+    async def drain(self) -> None:
+        """Stop pending spawns and disconnect every idle instance."""
+        for task in list(self._spawn_tasks):
+            task.cancel()
+        if self._spawn_tasks:
+            await asyncio.gather(*self._spawn_tasks, return_exceptions=True)
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(client.disconnect() for client, _, _ in idle),
+                             return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "spawning": len(self._spawn_tasks),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reaped": self.reaped,
+        }
@@ -15,6 +15,7 @@ from app.mcp.client import MCPClient, MCPResource, MCPTool, MCPPrompt # Assuming
 from app.config.env_registry import ziya_env
 from app.utils.logging_utils import logger
 from app.mcp.dynamic_tools import get_dynamic_loader
+from app.mcp.instance_pool import WarmInstancePool
 from app.mcp.tool_guard import scan_tool_description, detect_shadowing, fingerprint_tools, check_fingerprint_change
 import time
 
@@ -106,6 +107,8 @@ class MCPManager:
         self._workspace_instance_last_used: Dict[str, Dict[str, float]] = {}
         self._workspace_instance_timeout = 300  # 5 minutes
         self._last_workspace_cleanup = 0.0
+        # Pre-spawned, unbound instances for servers that support binding
+        self._warm_pools: Dict[str, WarmInstancePool] = {}
         self.config_search_paths: List[str] = []
         self.builtin_server_definitions = self._get_builtin_server_definitions()
         self.is_initialized = False
@@ -185,6 +188,8 @@ class MCPManager:
                 "command": sys.executable,
                 "args": ["-u", str(package_dir / "shell_server.py")],
                 "workspace_scoped": True,
+                # Understands ziya/bindWorkspace, so it can be pre-spawned
+                "prewarm": True,
                 "enabled": True,
                 "description": "Provides shell command execution",
                 "builtin": True
@@ -611,6 +616,8 @@ class MCPManager:
             logger.info(f"MCP: {len(server_summary)} servers, {total_tools} tools active"
                         + (f" ({disabled_count} servers disabled)" if disabled_count else ""))
             logger.debug(f"MCP server details: {', '.join(server_summary)}")
+
+            await self._start_warm_pools()
             
             self.is_initialized = True
             return True
@@ -711,6 +718,7 @@ class MCPManager:
         
         if disconnect_tasks:
             await asyncio.gather(*disconnect_tasks, return_exceptions=True)
+        await self._drain_warm_pools()
         
         self.clients.clear()
         self.workspace_scoped_clients.clear()
@@ -790,6 +798,9 @@ class MCPManager:
                         f"{server_name}@{instance_key}: {e}"
                     )
             self._workspace_instance_last_used.pop(server_name, None)
+            pool = self._warm_pools.pop(server_name, None)
+            if pool is not None:
+                await pool.drain()
             
             # Load current config or use provided config
             if new_config:
@@ -1434,18 +1445,47 @@ class MCPManager:
                 del self.workspace_scoped_clients[server_name][instance_key]
                 del self._workspace_instance_last_used[server_name][instance_key]
         
-        # Create new instance
+        instance_name = f"{server_name}@{os.path.basename(workspace_path)}"
+        pool = self._warm_pools.get(server_name)
+        if pool is not None:
+            spawn_config = self._workspace_spawn_config(server_name)
+            client = await pool.checkout(self._spawn_fingerprint(spawn_config)) if spawn_config else None
+            if client is not None:
+                if await client.bind_workspace(workspace_path, instance_name):
+                    self.workspace_scoped_clients[server_name][instance_key] = client
+                    self._workspace_instance_last_used[server_name][instance_key] = time.time()
+                    logger.info(f"Bound warm workspace-scoped client: {server_name} @ {workspace_path}")
+                    self.invalidate_tools_cache()
+                    return client
+                await client.disconnect()
+
+        logger.info(f"Creating workspace-scoped MCP instance: {server_name} @ {workspace_path}")
+        client = await self._spawn_workspace_client(server_name, workspace_path)
+        if client is None:
+            return None
+        self.workspace_scoped_clients[server_name][instance_key] = client
+        self._workspace_instance_last_used[server_name][instance_key] = time.time()
+        logger.info(f"Created workspace-scoped client: {server_name} @ {workspace_path}")
+        self.invalidate_tools_cache()
+        return client
+
+    def _workspace_spawn_config(self, server_name: str, workspace_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Build the client config for a workspace-scoped instance.
+
+        With no *workspace_path* the instance is left unbound, for the warm
+        pool; it inherits the parent's codebase dir until it is bound.
+        """
         server_config = self.server_configs.get(server_name)
         if not server_config:
             logger.error(f"No config found for server: {server_name}")
             return None
-        
-        logger.info(f"Creating workspace-scoped MCP instance: {server_name} @ {workspace_path}")
-        
+
         # Clone config and set workspace-specific environment
         workspace_config = server_config.copy()
         workspace_env = workspace_config.get("env", {}).copy()
-        workspace_env["ZIYA_USER_CODEBASE_DIR"] = workspace_path
+        if workspace_path:
+            workspace_env["ZIYA_USER_CODEBASE_DIR"] = workspace_path
         # The shell server is workspace-scoped, so THIS is the spawn path that
         # actually runs commands — it must get the same escalation overlay as
         # initialize(), or task-scope sigs and ephemeral session grants never
@@ -1453,25 +1493,59 @@ class MCPManager:
         # the env copy above, but grants live in _session_grants, not config).
         self._apply_escalation_overlay(workspace_env, server_name)
         workspace_config["env"] = workspace_env
-        workspace_config["name"] = f"{server_name}@{os.path.basename(workspace_path)}"
-        
-        client = MCPClient(workspace_config)
-        
+        suffix = os.path.basename(workspace_path) if workspace_path else "pool"
+        workspace_config["name"] = f"{server_name}@{suffix}"
+        return workspace_config
+
+    @staticmethod
+    def _spawn_fingerprint(spawn_config: Dict[str, Any]) -> str:
+        """Identify the spawn env a pooled instance was started with."""
+        env = {k: v for k, v in spawn_config.get("env", {}).items() if k != "ZIYA_USER_CODEBASE_DIR"}
+        return json.dumps(env, sort_keys=True, default=str)
+
+    async def _spawn_workspace_client(self, server_name: str, workspace_path: Optional[str] = None) -> Optional[MCPClient]:
+        """Start and connect one workspace-scoped instance, or return None."""
+        spawn_config = self._workspace_spawn_config(server_name, workspace_path)
+        if spawn_config is None:
+            return None
+        client = MCPClient(spawn_config)
+        where = workspace_path or "warm pool"
         try:
-            success = await client.connect()
-            
-            if success:
-                self.workspace_scoped_clients[server_name][instance_key] = client
-                self._workspace_instance_last_used[server_name][instance_key] = time.time()
-                logger.info(f"Created workspace-scoped client: {server_name} @ {workspace_path}")
-                self.invalidate_tools_cache()
+            if await client.connect():
                 return client
-            else:
-                logger.error(f"❌ Failed to start workspace-scoped client: {server_name} @ {workspace_path}")
-                return None
+            logger.error(f"❌ Failed to start workspace-scoped client: {server_name} @ {where}")
+            return None
+        except asyncio.CancelledError:
+            await client.disconnect()
+            raise
         except (OSError, RuntimeError, asyncio.TimeoutError) as e:
             logger.error(f"❌ Error creating workspace-scoped client: {e}")
             return None
+
+    async def _start_warm_pools(self) -> None:
+        """(Re)create the warm pool of every enabled server that supports one."""
+        await self._drain_warm_pools()
+        size = ziya_env("ZIYA_MCP_WARM_POOL_SIZE")
+        if size <= 0:
+            return
+        idle_ttl = ziya_env("ZIYA_MCP_WARM_POOL_TTL")
+        for server_name, server_config in self.server_configs.items():
+            if not (server_config.get("prewarm") and server_config.get("enabled", True)
+                    and self._is_workspace_scoped(server_name)):
+                continue
+
+            def spawn(server_name=server_name):
+                return self._spawn_workspace_client(server_name)
+
+            pool = WarmInstancePool(server_name, size, idle_ttl, spawn, self._spawn_fingerprint)
+            self._warm_pools[server_name] = pool
+            pool.fill()
+            logger.debug(f"Pre-spawning {size} warm instance(s) of {server_name}")
+
+    async def _drain_warm_pools(self) -> None:
+        pools, self._warm_pools = self._warm_pools, {}
+        for pool in pools.values():
+            await pool.drain()
     
     async def _call_tool_with_timeout(
         self,
@@ -1537,6 +1611,8 @@ class MCPManager:
                     await client.disconnect()
                     del self.workspace_scoped_clients[server_name][instance_key]
                     del self._workspace_instance_last_used[server_name][instance_key]
+        for pool in list(self._warm_pools.values()):
+            await pool.reap(now)
 
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any], server_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
@@ -1912,6 +1988,9 @@ class MCPManager:
                     "capabilities": {},
                     "builtin": is_builtin
                 }
+            pool = self._warm_pools.get(server_name)
+            if pool is not None:
+                status[server_name]["warm_pool"] = pool.stats()
         return status
 
 # Global MCP manager instance
@@ -0,0 +1,72 @@
+"""
+Incremental tool output forwarded while an MCP tool call is still running.
+
+A tool call is one JSON-RPC request and one response, so a long build or
+test run shows nothing until it exits.  Servers that support it (the
+builtin shell server) send ``notifications/progress`` for the call's
+``progressToken`` carrying stdout/stderr chunks as they are produced.
+
+The consumer that wants those chunks sets ``tool_output_sink`` for the
+duration of the call; ``MCPClient.call_tool`` picks it up, attaches a
+progress token to the request and routes the matching notifications to
+the sink.  ``ToolOutputBuffer`` is the usual sink: it holds chunks until
+the consumer drains them, keeping only the most recent output when the
+consumer falls behind.
+"""
+
+from collections import deque
+from contextvars import ContextVar
+from typing import Callable, Deque, List, Optional, Tuple
+
+# Called as sink(stream, text) from the event loop for every chunk
+tool_output_sink: ContextVar[Optional[Callable[[str, str], None]]] = ContextVar(
+    "tool_output_sink", default=None
+)
+
+# Characters of undelivered output kept per tool call
+DEFAULT_MAX_BUFFERED_CHARS = 64 * 1024
+
+
+class ToolOutputBuffer:
+    """Bounded FIFO of (stream, text) chunks awaiting delivery."""
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_BUFFERED_CHARS):
+        self.max_chars = max_chars
+        self._chunks: Deque[Tuple[str, str]] = deque()
+        self._size = 0
+        self._dropped = 0
+
+    def feed(self, stream: str, text: str) -> None:
+        """Append a chunk, dropping the oldest output past the bound."""
+        if not text:
+            return
+        if len(text) > self.max_chars:
+            self._dropped += len(text) - self.max_chars
+            text = text[-self.max_chars:]
+        self._chunks.append((stream, text))
+        self._size += len(text)
+        while self._size > self.max_chars:
+            old_stream, old_text = self._chunks.popleft()
+            excess = self._size - self.max_chars
+            if excess < len(old_text):
+                self._chunks.appendleft((old_stream, old_text[excess:]))
+                self._size -= excess
+                self._dropped += excess
+            else:
+                self._size -= len(old_text)
+                self._dropped += len(old_text)
+
+    def drain(self) -> List[Tuple[str, str]]:
+        """Take everything buffered, merging adjacent chunks of one stream."""
+        merged: List[Tuple[str, str]] = []
+        if self._dropped:
+            merged.append(("stderr", f"[... {self._dropped} characters of output skipped ...]\n"))
+            self._dropped = 0
+        for stream, text in self._chunks:
+            if merged and merged[-1][0] == stream:
+                merged[-1] = (stream, merged[-1][1] + text)
+            else:
+                merged.append((stream, text))
+        self._chunks.clear()
+        self._size = 0
+        return merged
@@ -137,84 +137,85 @@ class ASTGetTreeTool(BaseMCPTool):
         if enhancer is None or not enhancer.ast_cache:
             return _not_ready_message()
 
-        lines: List[str] = []
-
-        if inp.path is None:
-            # --- Project overview ---
-            file_types: Dict[str, int] = {}
+        with enhancer.update_lock:
+            lines: List[str] = []
+
+            if inp.path is None:
+                # --- Project overview ---
+                file_types: Dict[str, int] = {}
+                for fp in enhancer.ast_cache:
+                    ext = os.path.splitext(fp)[1]
+                    file_types[ext] = file_types.get(ext, 0) + 1
+
+                lines.append("# AST Project Overview")
+                lines.append(f"**Indexed files**: {len(enhancer.ast_cache)}")
+                lines.append(f"**Total nodes**: {len(enhancer.project_ast.nodes)}")
+                lines.append(f"**Total edges**: {len(enhancer.project_ast.edges)}")
+                lines.append(f"\n## Files by type: {dict(sorted(file_types.items()))}")
+                lines.append("\n## Indexed files")
+                for fp in sorted(enhancer.ast_cache):
+                    ast = enhancer.ast_cache[fp]
+                    lines.append(f"- `{_rel(fp)}` ({len(ast.nodes)} nodes)")
+                return {"content": "\n".join(lines)}
+
+            # --- Specific path ---
+            # Resolve to absolute
+            from app.context import get_project_root
+            codebase = get_project_root()
+            target = os.path.normpath(os.path.join(codebase, inp.path))
+
+            # Directory mode
+            if os.path.isdir(target):
+                matching = sorted(
+                    fp for fp in enhancer.ast_cache if fp.startswith(target)
+                )
+                lines.append(f"# AST: files under `{_rel(target)}`")
+                lines.append(f"**Matched**: {len(matching)} indexed files")
+                for fp in matching:
+                    ast = enhancer.ast_cache[fp]
+                    syms = [_format_symbol(n) for n in ast.nodes.values() if n.node_type in ("class", "function", "method")][:5]
+                    sym_str = ", ".join(syms) if syms else "(none)"
+                    lines.append(f"- `{_rel(fp)}`: {sym_str}")
+                return {"content": "\n".join(lines)}
+
+            # File mode — try exact or fuzzy match
+            matched_path = None
             for fp in enhancer.ast_cache:
-                ext = os.path.splitext(fp)[1]
-                file_types[ext] = file_types.get(ext, 0) + 1
-
-            lines.append("# AST Project Overview")
-            lines.append(f"**Indexed files**: {len(enhancer.ast_cache)}")
-            lines.append(f"**Total nodes**: {len(enhancer.project_ast.nodes)}")
-            lines.append(f"**Total edges**: {len(enhancer.project_ast.edges)}")
-            lines.append(f"\n## Files by type: {dict(sorted(file_types.items()))}")
-            lines.append("\n## Indexed files")
-            for fp in sorted(enhancer.ast_cache):
-                ast = enhancer.ast_cache[fp]
-                lines.append(f"- `{_rel(fp)}` ({len(ast.nodes)} nodes)")
-            return {"content": "\n".join(lines)}
+                if fp == target or fp.endswith(inp.path):
+                    matched_path = fp
+                    break
+            if matched_path is None:
+                return {"error": True, "message": f"File not in AST index: {inp.path}"}
+
+            ast = enhancer.ast_cache[matched_path]
+            qe = enhancer.query_engines.get(matched_path)
+
+            lines.append(f"# AST: `{_rel(matched_path)}`")
+            lines.append(f"**Nodes**: {len(ast.nodes)}  |  **Edges**: {len(ast.edges)}")
+
+            # Symbols
+            symbols = [_format_symbol(n) for n in ast.nodes.values()
+                       if n.node_type in ("class", "function", "method", "interface", "variable")][:inp.max_symbols]
+            if symbols:
+                lines.append("\n## Defined symbols")
+                for s in symbols:
+                    lines.append(f"- {s}")
+
+            # Dependencies
+            deps = enhancer._extract_dependencies(ast)
+            if deps:
+                lines.append("\n## Dependencies")
+                for d in deps:
+                    lines.append(f"- {d}")
+
+            # Node-type breakdown
+            type_counts: Dict[str, int] = {}
+            for node in ast.nodes.values():
+                type_counts[node.node_type] = type_counts.get(node.node_type, 0) + 1
+            lines.append(f"\n## Node types: {dict(sorted(type_counts.items()))}")
 
-        # --- Specific path ---
-        # Resolve to absolute
-        from app.context import get_project_root
-        codebase = get_project_root()
-        target = os.path.normpath(os.path.join(codebase, inp.path))
-
-        # Directory mode
-        if os.path.isdir(target):
-            matching = sorted(
-                fp for fp in enhancer.ast_cache if fp.startswith(target)
-            )
-            lines.append(f"# AST: files under `{_rel(target)}`")
-            lines.append(f"**Matched**: {len(matching)} indexed files")
-            for fp in matching:
-                ast = enhancer.ast_cache[fp]
-                syms = [_format_symbol(n) for n in ast.nodes.values() if n.node_type in ("class", "function", "method")][:5]
-                sym_str = ", ".join(syms) if syms else "(none)"
-                lines.append(f"- `{_rel(fp)}`: {sym_str}")
             return {"content": "\n".join(lines)}
 
-        # File mode — try exact or fuzzy match
-        matched_path = None
-        for fp in enhancer.ast_cache:
-            if fp == target or fp.endswith(inp.path):
-                matched_path = fp
-                break
-        if matched_path is None:
-            return {"error": True, "message": f"File not in AST index: {inp.path}"}
-
-        ast = enhancer.ast_cache[matched_path]
-        qe = enhancer.query_engines.get(matched_path)
-
-        lines.append(f"# AST: `{_rel(matched_path)}`")
-        lines.append(f"**Nodes**: {len(ast.nodes)}  |  **Edges**: {len(ast.edges)}")
-
-        # Symbols
-        symbols = [_format_symbol(n) for n in ast.nodes.values()
-                   if n.node_type in ("class", "function", "method", "interface", "variable")][:inp.max_symbols]
-        if symbols:
-            lines.append("\n## Defined symbols")
-            for s in symbols:
-                lines.append(f"- {s}")
-
-        # Dependencies
-        deps = enhancer._extract_dependencies(ast)
-        if deps:
-            lines.append("\n## Dependencies")
-            for d in deps:
-                lines.append(f"- {d}")
-
-        # Node-type breakdown
-        type_counts: Dict[str, int] = {}
-        for node in ast.nodes.values():
-            type_counts[node.node_type] = type_counts.get(node.node_type, 0) + 1
-        lines.append(f"\n## Node types: {dict(sorted(type_counts.items()))}")
-
-        return {"content": "\n".join(lines)}
-
 
 # ============================================================================
 # TOOL 2 — ast_search
@@ -296,73 +297,74 @@ class ASTSearchTool(BaseMCPTool):
         if enhancer is None or not enhancer.project_ast:
             return _not_ready_message()
 
-        import re as re_module
-
-        use_regex = inp.regex
-        if use_regex:
-            try:
-                pattern = re_module.compile(inp.query, re_module.IGNORECASE)
-            except re_module.error as e:
-                return {"error": True, "message": f"Invalid regex: {e}"}
-        else:
-            query_lower = inp.query.lower()
-        results: List[Dict[str, Any]] = []
+        with enhancer.update_lock:
+            import re as re_module
 
-        for node in enhancer.project_ast.nodes.values():
-            # Name match
+            use_regex = inp.regex
             if use_regex:
-                if not pattern.search(node.name):
-                    continue
+                try:
+                    pattern = re_module.compile(inp.query, re_module.IGNORECASE)
+                except re_module.error as e:
+                    return {"error": True, "message": f"Invalid regex: {e}"}
             else:
-                if query_lower and query_lower not in node.name.lower():
+                query_lower = inp.query.lower()
+            results: List[Dict[str, Any]] = []
+
+            for node in enhancer.project_ast.nodes.values():
+                # Name match
+                if use_regex:
+                    if not pattern.search(node.name):
+                        continue
+                else:
+                    if query_lower and query_lower not in node.name.lower():
+                        continue
+                # Type filter
+                if inp.node_type and node.node_type != inp.node_type:
                     continue
-            # Type filter
-            if inp.node_type and node.node_type != inp.node_type:
-                continue
-            # File filter
-            if inp.file_path and inp.file_path not in node.source_location.file_path:
-                continue
-            # Decorator filter
-            if inp.has_decorator:
-                decorators = (node.attributes or {}).get("decorators", [])
-                if not any(inp.has_decorator in d for d in decorators):
+                # File filter
+                if inp.file_path and inp.file_path not in node.source_location.file_path:
                     continue
-            # Async filter
-            if inp.is_async is not None:
-                node_is_async = (node.attributes or {}).get("is_async", False)
-                if node_is_async != inp.is_async:
-                    continue
-            # Base class filter
-            if inp.base_class:
-                bases = (node.attributes or {}).get("bases", []) or (node.attributes or {}).get("extends", [])
-                if not any(inp.base_class in (b or '') for b in bases):
-                    continue
-
-            results.append({
-                "name": node.name,
-                "type": node.node_type,
-                "formatted": _format_symbol(node),
-                "file": _rel(node.source_location.file_path),
-                "line": node.source_location.start_line,
-                "end_line": node.source_location.end_line,
-                "attributes": node.attributes or {},
-            })
-
-            if len(results) >= inp.max_results:
-                break
-
-        lines = [f"# AST Search: `{inp.query}`"]
-        if inp.node_type:
-            lines[0] += f" (type={inp.node_type})"
-        lines.append(f"**Results**: {len(results)}")
-
-        for r in results:
-            lines.append(
-                f"- `{r['formatted']}` "
-                f"in `{r['file']}` L{r['line']}-{r['end_line']}"
-            )
+                # Decorator filter
+                if inp.has_decorator:
+                    decorators = (node.attributes or {}).get("decorators", [])
+                    if not any(inp.has_decorator in d for d in decorators):
+                        continue
+                # Async filter
+                if inp.is_async is not None:
+                    node_is_async = (node.attributes or {}).get("is_async", False)
+                    if node_is_async != inp.is_async:
+                        continue
+                # Base class filter
+                if inp.base_class:
+                    bases = (node.attributes or {}).get("bases", []) or (node.attributes or {}).get("extends", [])
+                    if not any(inp.base_class in (b or '') for b in bases):
+                        continue
+
+                results.append({
+                    "name": node.name,
+                    "type": node.node_type,
+                    "formatted": _format_symbol(node),
+                    "file": _rel(node.source_location.file_path),
+                    "line": node.source_location.start_line,
+                    "end_line": node.source_location.end_line,
+                    "attributes": node.attributes or {},
+                })
+
+                if len(results) >= inp.max_results:
+                    break
+
+            lines = [f"# AST Search: `{inp.query}`"]
+            if inp.node_type:
+                lines[0] += f" (type={inp.node_type})"
+            lines.append(f"**Results**: {len(results)}")
+
+            for r in results:
+                lines.append(
+                    f"- `{r['formatted']}` "
+                    f"in `{r['file']}` L{r['line']}-{r['end_line']}"
+                )
 
-        return {"content": "\n".join(lines)}
+            return {"content": "\n".join(lines)}
 
 
 # ============================================================================
@@ -425,113 +427,114 @@ class ASTReferencesTool(BaseMCPTool):
         if enhancer is None or not enhancer.project_ast:
             return _not_ready_message()
 
-        qe = enhancer.query_engines.get("project")
-        if qe is None:
-            return _not_ready_message()
-
-        lines: List[str] = []
-
-        if inp.action == "definitions":
-            nodes = qe.find_definitions(inp.name)
-            lines.append(f"# Definitions of `{inp.name}`")
-            lines.append(f"**Found**: {len(nodes)}")
-            for n in nodes:
-                lines.append(
-                    f"- **{n.node_type}** `{n.name}` in "
-                    f"`{_rel(n.source_location.file_path)}` "
-                    f"L{n.source_location.start_line}-{n.source_location.end_line}"
-                )
-
-        elif inp.action == "dependencies":
-            # Resolve file path
-            resolved = self._resolve_file(enhancer, inp.name)
-            if resolved is None:
-                return {"error": True, "message": f"File not in index: {inp.name}"}
-            deps = qe.get_dependencies(resolved)
-            lines.append(f"# Dependencies of `{_rel(resolved)}`")
-            lines.append(f"**Count**: {len(deps)}")
-            for d in deps:
-                lines.append(f"- `{_rel(d)}`")
-
-        elif inp.action == "importers":
-            resolved = self._resolve_file(enhancer, inp.name)
-            if resolved is None:
-                return {"error": True, "message": f"File not in index: {inp.name}"}
-            importers = qe.get_reverse_dependencies(resolved)
-            lines.append(f"# Importers of `{_rel(resolved)}`")
-            lines.append(f"**Count**: {len(importers)}")
-            for imp in importers:
-                lines.append(f"- `{_rel(imp)}`")
-
-        elif inp.action == "callers":
-            calls = qe.get_function_calls(inp.name)
-            lines.append(f"# Callers of `{inp.name}`")
-            lines.append(f"**Found**: {len(calls)}")
-            for c in calls:
-                lines.append(
-                    f"- `{_rel(c.source_location.file_path)}` "
-                    f"L{c.source_location.start_line}"
-                )
-
-        elif inp.action == "summary":
-            resolved = self._resolve_file(enhancer, inp.name)
-            if resolved is None:
-                return {"error": True, "message": f"File not in index: {inp.name}"}
-            summary = qe.generate_summary(resolved)
-            lines.append(f"# Summary: `{_rel(resolved)}`")
-            lines.append(f"**Types**: {summary.get('type_counts', {})}")
-            for defn in summary.get("top_level_definitions", []):
-                lines.append(f"- {defn['type']} `{defn['name']}`")
-            if summary.get("dependencies"):
-                lines.append("\n**Dependencies**:")
-                for d in summary["dependencies"]:
+        with enhancer.update_lock:
+            qe = enhancer.query_engines.get("project")
+            if qe is None:
+                return _not_ready_message()
+
+            lines: List[str] = []
+
+            if inp.action == "definitions":
+                nodes = qe.find_definitions(inp.name)
+                lines.append(f"# Definitions of `{inp.name}`")
+                lines.append(f"**Found**: {len(nodes)}")
+                for n in nodes:
+                    lines.append(
+                        f"- **{n.node_type}** `{n.name}` in "
+                        f"`{_rel(n.source_location.file_path)}` "
+                        f"L{n.source_location.start_line}-{n.source_location.end_line}"
+                    )
+
+            elif inp.action == "dependencies":
+                # Resolve file path
+                resolved = self._resolve_file(enhancer, inp.name)
+                if resolved is None:
+                    return {"error": True, "message": f"File not in index: {inp.name}"}
+                deps = qe.get_dependencies(resolved)
+                lines.append(f"# Dependencies of `{_rel(resolved)}`")
+                lines.append(f"**Count**: {len(deps)}")
+                for d in deps:
                     lines.append(f"- `{_rel(d)}`")
 
-        elif inp.action == "context":
-            # Parse "file:line" or "file:line:col" from inp.name
-            parts = inp.name.rsplit(":", 2)
-            if len(parts) < 2:
-                return {
-                    "error": True,
-                    "message": (
-                        "For the 'context' action, pass `name` as "
-                        "`file_path:line` or `file_path:line:col`."
-                    ),
-                }
-            # Reconstruct file path (may contain colons on Windows)
-            if len(parts) == 3 and parts[-1].isdigit() and parts[-2].isdigit():
-                file_part = parts[0]
-                line = int(parts[-2])
-                col = int(parts[-1])
-            elif len(parts) >= 2 and parts[-1].isdigit():
-                file_part = ":".join(parts[:-1])
-                line = int(parts[-1])
-                col = 1
-            else:
-                return {"error": True, "message": f"Cannot parse location from: {inp.name}"}
-
-            resolved = self._resolve_file(enhancer, file_part)
-            if resolved is None:
-                return {"error": True, "message": f"File not in index: {file_part}"}
+            elif inp.action == "importers":
+                resolved = self._resolve_file(enhancer, inp.name)
+                if resolved is None:
+                    return {"error": True, "message": f"File not in index: {inp.name}"}
+                importers = qe.get_reverse_dependencies(resolved)
+                lines.append(f"# Importers of `{_rel(resolved)}`")
+                lines.append(f"**Count**: {len(importers)}")
+                for imp in importers:
+                    lines.append(f"- `{_rel(imp)}`")
+
+            elif inp.action == "callers":
+                calls = qe.get_function_calls(inp.name)
+                lines.append(f"# Callers of `{inp.name}`")
+                lines.append(f"**Found**: {len(calls)}")
+                for c in calls:
+                    lines.append(
+                        f"- `{_rel(c.source_location.file_path)}` "
+                        f"L{c.source_location.start_line}"
+                    )
+
+            elif inp.action == "summary":
+                resolved = self._resolve_file(enhancer, inp.name)
+                if resolved is None:
+                    return {"error": True, "message": f"File not in index: {inp.name}"}
+                summary = qe.generate_summary(resolved)
+                lines.append(f"# Summary: `{_rel(resolved)}`")
+                lines.append(f"**Types**: {summary.get('type_counts', {})}")
+                for defn in summary.get("top_level_definitions", []):
+                    lines.append(f"- {defn['type']} `{defn['name']}`")
+                if summary.get("dependencies"):
+                    lines.append("\n**Dependencies**:")
+                    for d in summary["dependencies"]:
+                        lines.append(f"- `{_rel(d)}`")
+
+            elif inp.action == "context":
+                # Parse "file:line" or "file:line:col" from inp.name
+                parts = inp.name.rsplit(":", 2)
+                if len(parts) < 2:
+                    return {
+                        "error": True,
+                        "message": (
+                            "For the 'context' action, pass `name` as "
+                            "`file_path:line` or `file_path:line:col`."
+                        ),
+                    }
+                # Reconstruct file path (may contain colons on Windows)
+                if len(parts) == 3 and parts[-1].isdigit() and parts[-2].isdigit():
+                    file_part = parts[0]
+                    line = int(parts[-2])
+                    col = int(parts[-1])
+                elif len(parts) >= 2 and parts[-1].isdigit():
+                    file_part = ":".join(parts[:-1])
+                    line = int(parts[-1])
+                    col = 1
+                else:
+                    return {"error": True, "message": f"Cannot parse location from: {inp.name}"}
+
+                resolved = self._resolve_file(enhancer, file_part)
+                if resolved is None:
+                    return {"error": True, "message": f"File not in index: {file_part}"}
+
+                ctx = qe.get_context_for_location(resolved, line, col)
+                lines.append(f"# Context at `{_rel(resolved)}:{line}:{col}`")
+                if ctx.get("type") == "unknown":
+                    lines.append("No AST node found at this location.")
+                else:
+                    lines.append(f"**Symbol**: `{ctx.get('name')}` ({ctx.get('type')})")
+                    loc = ctx.get("location", {})
+                    lines.append(
+                        f"**Span**: L{loc.get('start_line')}-{loc.get('end_line')}"
+                    )
+                    if ctx.get("scopes"):
+                        lines.append("**Containing scopes**:")
+                        for scope in ctx["scopes"]:
+                            lines.append(f"- {scope['type']} `{scope['name']}`")
+                    if ctx.get("attributes"):
+                        lines.append(f"**Attributes**: {ctx['attributes']}")
 
-            ctx = qe.get_context_for_location(resolved, line, col)
-            lines.append(f"# Context at `{_rel(resolved)}:{line}:{col}`")
-            if ctx.get("type") == "unknown":
-                lines.append("No AST node found at this location.")
-            else:
-                lines.append(f"**Symbol**: `{ctx.get('name')}` ({ctx.get('type')})")
-                loc = ctx.get("location", {})
-                lines.append(
-                    f"**Span**: L{loc.get('start_line')}-{loc.get('end_line')}"
-                )
-                if ctx.get("scopes"):
-                    lines.append("**Containing scopes**:")
-                    for scope in ctx["scopes"]:
-                        lines.append(f"- {scope['type']} `{scope['name']}`")
-                if ctx.get("attributes"):
-                    lines.append(f"**Attributes**: {ctx['attributes']}")
-
-        return {"content": "\n".join(lines)}
+            return {"content": "\n".join(lines)}
 
     @staticmethod
     def _resolve_file(enhancer, name: str) -> Optional[str]:
@@ -58,6 +58,8 @@ class PCAPAnalysisTool(BaseMCPTool):
         pcap_path: str = Field(..., description="Path to the PCAP file to analyze")
         max_packets: Optional[int] = Field(None, description="Maximum number of packets to process (default: all packets)")
         operation: str = Field("summary", description="Analysis operation: 'summary', 'conversations', 'dns_queries', 'dns_responses', 'filter', 'search', 'tcp_health', 'flow_stats', 'connectivity_map', 'flow_health', 'search_advanced', 'http', 'packet_details', 'tunneling', 'ipv6_extensions', 'tls', 'icmp'")
+        packet_index: Optional[int] = Field(None, description="Packet index (0-based) for the 'packet_details' operation")
+        limit: Optional[int] = Field(None, description="Maximum number of results for list operations")
     
     async def execute(self, **kwargs) -> Dict[str, Any]:
         try:
@@ -78,11 +80,17 @@ class PCAPAnalysisTool(BaseMCPTool):
                     "message": f"PCAP file not found: {input_data.pcap_path}"
                 }
             
-            # Use the built-in pcap analyzer
+            # Use the built-in pcap analyzer.  Repeat calls on the same
+            # capture are served from its persisted index.
             logger.info(f"Analyzing PCAP file: {input_data.pcap_path}")
+            options = {
+                k: v for k, v in (("packet_index", input_data.packet_index), ("limit", input_data.limit))
+                if v is not None
+            }
             result = analyze_pcap_file(
                 input_data.pcap_path,
-                operation=input_data.operation
+                operation=input_data.operation,
+                **options
             )
             
             if "error" in result:
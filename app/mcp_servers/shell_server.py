@@ -4,6 +4,8 @@ MCP server that provides shell command execution functionality.
 """
 
 import asyncio
+import codecs
+import itertools
 import json
 import subprocess
 import sys
@@ -12,6 +14,7 @@ import re
 import glob
 import time
 import shlex
+import threading
 from typing import Dict, Any, Optional
 
 # Shell keywords that begin compound constructs requiring a shell interpreter
@@ -61,6 +64,140 @@ def _clean_child_env(extra: dict | None = None) -> dict:
     return env
 
 
+_READ_CHUNK = 64 * 1024
+
+
+class _CappedReader(threading.Thread):
+    """Drain one child pipe on a thread, keeping at most *limit* bytes.
+
+    Past the limit the reader keeps draining and discards, so the command
+    runs to completion and reports its real exit status (closing the pipe
+    would kill it with SIGPIPE and break ``&&`` chains); the pipeline
+    timeout still bounds unbounded producers.  Kept chunks are also passed
+    to *on_output* as ``(name, data)`` as soon as they are read.
+    """
+
+    def __init__(self, stream, limit: int, name: str = "stdout", on_output=None):
+        super().__init__(daemon=True)
+        self.stream = stream
+        self.limit = limit
+        self.name = name
+        self.on_output = on_output
+        self.chunks: list[bytes] = []
+        self.size = 0
+        self.truncated = False
+
+    def run(self):
+        fd = self.stream.fileno()
+        try:
+            while True:
+                chunk = os.read(fd, _READ_CHUNK)
+                if not chunk:
+                    break
+                room = self.limit - self.size
+                if room > 0:
+                    self.chunks.append(chunk[:room])
+                    self.size += min(len(chunk), room)
+                    if self.on_output is not None:
+                        self.on_output(self.name, chunk[:room])
+                if len(chunk) > room:
+                    self.truncated = True
+        except OSError:
+            pass  # Pipe torn down under us (e.g. the pipeline was killed)
+        finally:
+            self.stream.close()
+
+    def text(self) -> str:
+        data = b"".join(self.chunks).decode("utf-8", errors="replace")
+        # Match text=True's universal-newline translation
+        data = data.replace("\r\n", "\n").replace("\r", "\n")
+        if self.truncated:
+            data += f"\n[output truncated after {self.limit} bytes]\n"
+        return data
+
+
+def _run_stages(stages: list, timeout: float, cwd: str | None,
+                max_output: int, on_output=None) -> subprocess.CompletedProcess:
+    """Run one ``a | b | c`` pipeline with its stages wired by OS pipes.
+
+    Each stage is ``(argv, env, redirections)``, or an int for a stage
+    that runs no process (``cd`` or a bare assignment in a pipeline, which
+    bash would run in a subshell) and exits with that status.  All stages
+    run concurrently, so data streams through the kernel's pipe buffers
+    instead of being held in memory between stages; only the final stdout
+    and each stage's stderr are captured, up to *max_output* bytes each.
+    The first stage reads from /dev/null, never from the server's own
+    JSON-RPC stdin.  *on_output*, if given, sees the captured output as it
+    is read (see _CappedReader).
+    """
+    deadline = time.monotonic() + timeout
+    procs = []
+    stderr_readers = []
+    stdout_reader = None
+    returncode = 0
+    stdin = subprocess.DEVNULL
+    try:
+        for i, stage in enumerate(stages):
+            last = i == len(stages) - 1
+            if isinstance(stage, int):
+                if stdin is not subprocess.DEVNULL:
+                    stdin.close()
+                stdin = subprocess.DEVNULL
+                if last:
+                    returncode = stage
+                continue
+            args, env, redirections = stage
+            popen_kwargs = dict(
+                shell=False, stdin=stdin, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE, cwd=cwd, env=env,
+            )
+            popen_kwargs.update(redirections)
+            proc = subprocess.Popen(args, **popen_kwargs)
+            procs.append(proc)
+            if stdin is not subprocess.DEVNULL:
+                stdin.close()  # The child holds its own copy now
+            if proc.stderr is not None:
+                reader = _CappedReader(proc.stderr, max_output,
+                                       name="stderr", on_output=on_output)
+                reader.start()
+                stderr_readers.append(reader)
+            if last:
+                returncode = None
+                if proc.stdout is not None:
+                    stdout_reader = _CappedReader(proc.stdout, max_output,
+                                                  name="stdout", on_output=on_output)
+                    stdout_reader.start()
+            else:
+                stdin = proc.stdout if proc.stdout is not None else subprocess.DEVNULL
+
+        for proc in procs:
+            proc.wait(timeout=max(deadline - time.monotonic(), 0))
+        readers = stderr_readers + ([stdout_reader] if stdout_reader else [])
+        for reader in readers:
+            reader.join(max(deadline - time.monotonic(), 0))
+            if reader.is_alive():
+                # A background grandchild is still holding the pipe open
+                raise subprocess.TimeoutExpired(stages, timeout)
+    except BaseException:
+        if stdin is not subprocess.DEVNULL:
+            stdin.close()
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+        for proc in procs:
+            proc.wait()
+        raise
+
+    if returncode is None:
+        returncode = procs[-1].returncode
+    return subprocess.CompletedProcess(
+        args=[stage[0] for stage in stages if not isinstance(stage, int)],
+        returncode=returncode,
+        stdout=stdout_reader.text() if stdout_reader else "",
+        stderr="".join(reader.text() for reader in stderr_readers),
+    )
+
+
 def _consume_assignment_with_subst(segment: str) -> str | None:
     """Consume a full VAR=$(...) or VAR="$(...)" token from *segment*.
 
@@ -259,6 +396,8 @@ class ShellServer:
     
     def __init__(self):
         self.request_id = 0
+        # Set once the parent binds a pre-spawned instance to a workspace
+        self._workspace_bound = False
 
         # ── Escalation-config integrity gate (ASR F-004 / F-007) ──────────────
         # Every privilege-bearing value this server trusts (ALLOW_COMMANDS, the
@@ -299,6 +438,9 @@ class ShellServer:
         
         # Hard ceiling for model-requested timeouts (matches TOOL_EXEC_TIMEOUT in streaming_tool_executor)
         self.max_timeout = int(os.environ.get('MAX_COMMAND_TIMEOUT', '300'))
+
+        # Per-stream cap on captured command output (stdout, and each stage's stderr)
+        self.max_output_bytes = int(os.environ.get('MAX_COMMAND_OUTPUT', str(2 * 1024 * 1024)))
         
         # Default pattern for commands: command name followed by optional arguments
         self.default_command_pattern = r"^{cmd}(\s+.*)?$"
@@ -571,7 +713,7 @@ class ShellServer:
         """Extract shell-style redirections from tokenized args.
 
         Returns (cleaned_args, subprocess_kwargs) where subprocess_kwargs
-        contains stdout/stderr overrides for subprocess.run().
+        contains stdout/stderr overrides for subprocess.Popen().
 
         Supported redirections:
           2>&1           -> stderr=subprocess.STDOUT
@@ -684,11 +826,15 @@ class ShellServer:
             cmd_segment,
         )
 
-    def _execute_pipeline(self, command: str, timeout: float, cwd: str) -> subprocess.CompletedProcess:
+    def _execute_pipeline(self, command: str, timeout: float, cwd: str,
+                          on_output=None) -> subprocess.CompletedProcess:
         """Execute a command pipeline with shell=False for all subprocess calls.
 
         Handles pipes (|), conditional chaining (&&, ||), and sequential
-        execution (;) by orchestrating individual subprocess.run() calls.
+        execution (;).  Each run of ``|``-joined segments is one pipeline
+        whose stages run concurrently, connected by OS pipes (see
+        _run_stages); ``&&``/``||``/``;`` sequence whole pipelines, as in sh.
+        *on_output* receives each pipeline's output as it is produced.
         """
         effective_cwd = cwd if cwd and os.path.isdir(cwd) else None
         segments = self._split_by_shell_operators(command)
@@ -696,15 +842,8 @@ class ShellServer:
         # Compound shell constructs (for/while/if/case/select) require a
         # shell interpreter — they aren't standalone executables.
         if self._is_compound_command(command):
-            return subprocess.run(
-                ['sh', '-c', command],
-                shell=False,
-                env=_clean_child_env(),
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                cwd=effective_cwd,
-            )
+            return _run_stages([(['sh', '-c', command], _clean_child_env(), {})],
+                               timeout, effective_cwd, self.max_output_bytes, on_output)
 
         # Heredoc redirection (cmd <<EOF ... EOF) also requires a real
         # shell: the manual orchestrator below runs each segment with
@@ -715,15 +854,16 @@ class ShellServer:
         # is_command_allowed has already validated every command segment
         # (with bodies stripped) before we reach here.
         if _has_heredoc(command):
-            return subprocess.run(
-                ['sh', '-c', command],
-                shell=False,
-                env=_clean_child_env(),
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                cwd=effective_cwd,
-            )
+            return _run_stages([(['sh', '-c', command], _clean_child_env(), {})],
+                               timeout, effective_cwd, self.max_output_bytes, on_output)
+
+        # Group the segments into pipelines: (operator, [stage segments])
+        pipelines: list[tuple[str, list[str]]] = []
+        for operator, cmd_segment in segments:
+            if operator == "|" and pipelines:
+                pipelines[-1][1].append(cmd_segment)
+            else:
+                pipelines.append((operator, [cmd_segment]))
 
         last_result = None
         accumulated_stdout = ""
@@ -736,86 +876,80 @@ class ShellServer:
         # of non-exported variables.
         shell_vars: dict = {}
 
-        for idx, (operator, cmd_segment) in enumerate(segments):
-            # Resolve command substitutions first
-            resolved = self._resolve_substitutions(cmd_segment, timeout, cwd, shell_vars)
-            # Expand shell special parameters ($?, $$, $!) using the previous
-            # segment's exit status. Bash treats $? as 0 before any command has
-            # run, so default to 0 for the first segment. Must happen before
-            # tokenization (expandvars in _expand_and_tokenize leaves these literal).
-            _prev_rc = last_result.returncode if last_result is not None else 0
-            resolved = self._expand_special_params(resolved, _prev_rc)
-            # Peel ``VAR=value`` prefixes so they go to subprocess(env=)
-            # rather than being tokenized as argv[0].  Validation already
-            # rejected blocked names, so any reason returned here is a
-            # belt-and-suspenders no-op.
-            resolved, segment_env, _ = self._peel_env_prefix(resolved)
-            # Expand using pipeline-local vars plus this segment's own inline
-            # VAR=value cmd prefix (the latter wins for the segment).
-            args = self._expand_and_tokenize(resolved, {**shell_vars, **segment_env})
-            if not args:
-                # A bare assignment (no command): record it for later
-                # segments rather than discarding it, then move on.
-                if segment_env:
-                    shell_vars.update(segment_env)
-                continue
-            
-            # Handle `cd` in-process: update effective_cwd for subsequent
-            # segments instead of spawning a subprocess (which would change
-            # directory only in its own process and immediately exit).
-            if args[0] == 'cd':
-                target = args[1] if len(args) > 1 else os.path.expanduser('~')
-                # Resolve relative paths against the current effective cwd.
-                if not os.path.isabs(target):
-                    target = os.path.join(effective_cwd or os.getcwd(), target)
-                target = os.path.normpath(target)
-                if os.path.isdir(target):
-                    effective_cwd = target
-                    last_result = subprocess.CompletedProcess(args=args, returncode=0, stdout='', stderr='')
-                else:
-                    last_result = subprocess.CompletedProcess(args=args, returncode=1, stdout='', stderr=f'cd: {target}: No such file or directory\n')
-                accumulated_stderr += last_result.stderr
-                continue
-
-            # Extract redirections (2>&1, >/dev/null, etc.) from args
-            args, redir_kwargs = self._extract_redirections(args)
-
-            # Conditional chaining: skip based on previous result
+        for operator, stage_segments in pipelines:
+            # Conditional chaining: skip the whole pipeline based on the
+            # previous result
             if operator == "&&" and last_result and last_result.returncode != 0:
                 continue
             if operator == "||" and last_result and last_result.returncode == 0:
                 continue
 
-            stdin_data = None
-            if operator == "|" and last_result:
-                stdin_data = last_result.stdout
+            # Bash treats $? as 0 before any command has run, and every
+            # stage of a pipeline sees the status from before the pipeline.
+            prev_rc = last_result.returncode if last_result is not None else 0
+            in_pipeline = len(stage_segments) > 1
+            stages = []
+            for cmd_segment in stage_segments:
+                # Resolve command substitutions first
+                resolved = self._resolve_substitutions(cmd_segment, timeout, cwd, shell_vars)
+                # Expand shell special parameters ($?, $$, $!).  Must happen
+                # before tokenization (expandvars in _expand_and_tokenize
+                # leaves these literal).
+                resolved = self._expand_special_params(resolved, prev_rc)
+                # Peel ``VAR=value`` prefixes so they go to subprocess(env=)
+                # rather than being tokenized as argv[0].  Validation already
+                # rejected blocked names, so any reason returned here is a
+                # belt-and-suspenders no-op.
+                resolved, segment_env, _ = self._peel_env_prefix(resolved)
+                # Expand using pipeline-local vars plus this segment's own inline
+                # VAR=value cmd prefix (the latter wins for the segment).
+                args = self._expand_and_tokenize(resolved, {**shell_vars, **segment_env})
+                if not args:
+                    if not in_pipeline:
+                        # A bare assignment (no command): record it for
+                        # later segments rather than discarding it.
+                        shell_vars.update(segment_env)
+                        stages = None
+                        break
+                    # Inside a pipeline it would only affect a subshell
+                    stages.append(0)
+                    continue
 
-            # Build subprocess kwargs, letting explicit redirections override defaults
-            run_kwargs = dict(
-                shell=False, capture_output=False, text=True,
-                timeout=timeout, cwd=effective_cwd, input=stdin_data,
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                env=_clean_child_env(),
-            )
-            # Merge any peeled env assignments onto the parent env for
-            # this segment only.  Each segment in the pipeline gets its
-            # own merged copy — assignments do not leak across segments.
-            if segment_env:
-                run_kwargs['env'] = _clean_child_env(segment_env)
-            run_kwargs.update(redir_kwargs)
-
-            last_result = subprocess.run(
-                args, **run_kwargs,
-            )
+                # Handle `cd` in-process: update effective_cwd for subsequent
+                # segments instead of spawning a subprocess (which would change
+                # directory only in its own process and immediately exit).
+                if args[0] == 'cd':
+                    target = args[1] if len(args) > 1 else os.path.expanduser('~')
+                    # Resolve relative paths against the current effective cwd.
+                    if not os.path.isabs(target):
+                        target = os.path.join(effective_cwd or os.getcwd(), target)
+                    target = os.path.normpath(target)
+                    if not os.path.isdir(target):
+                        accumulated_stderr += f'cd: {target}: No such file or directory\n'
+                        stages.append(1)
+                        continue
+                    if not in_pipeline:
+                        effective_cwd = target
+                    stages.append(0)
+                    continue
 
-            # Check if the next segment will pipe from this one
-            next_is_pipe = (idx + 1 < len(segments) and segments[idx + 1][0] == "|")
-            if operator == "|" or next_is_pipe:
-                # In a pipe, only keep stderr; stdout feeds the next stage
-                accumulated_stderr += last_result.stderr or ""
-            else:
-                accumulated_stdout += last_result.stdout or ""
-                accumulated_stderr += last_result.stderr or ""
+                # Extract redirections (2>&1, >/dev/null, etc.) from args
+                args, redir_kwargs = self._extract_redirections(args)
+                # Merge any peeled env assignments onto the parent env for
+                # this stage only — assignments do not leak across stages.
+                stages.append((args, _clean_child_env(segment_env or None), redir_kwargs))
+
+            if stages is None:
+                continue
+            if all(isinstance(stage, int) for stage in stages):
+                last_result = subprocess.CompletedProcess(
+                    args=stage_segments, returncode=stages[-1], stdout='', stderr='')
+                continue
+
+            last_result = _run_stages(stages, timeout, effective_cwd, self.max_output_bytes,
+                                      on_output)
+            accumulated_stdout += last_result.stdout or ""
+            accumulated_stderr += last_result.stderr or ""
 
         if last_result is None:
             return subprocess.CompletedProcess(
@@ -823,10 +957,6 @@ class ShellServer:
                 stdout="", stderr="No executable segments",
             )
 
-        # For pipes, the final stage's stdout is the pipeline output
-        if any(op == "|" for op, _ in segments):
-            accumulated_stdout += last_result.stdout or ""
-
         return subprocess.CompletedProcess(
             args=command, returncode=last_result.returncode,
             stdout=accumulated_stdout, stderr=accumulated_stderr,
@@ -1549,7 +1679,16 @@ class ShellServer:
                     if cwd and os.path.isdir(cwd):
                         print(f"Working directory: {cwd}", file=sys.stderr)
 
-                    result = self._execute_pipeline(command, timeout, cwd)
+                    # Stream output as progress notifications if the caller
+                    # passed a progress token
+                    progress_token = (params.get("_meta") or {}).get("progressToken")
+                    on_output = None
+                    if progress_token is not None:
+                        on_output = self._progress_emitter(progress_token)
+
+                    # Off the event loop, so other requests keep being served
+                    result = await asyncio.to_thread(
+                        self._execute_pipeline, command, timeout, cwd, on_output=on_output)
 
                     # Format output to be more shell-like
                     output = f"$ {command}\n"
@@ -1595,6 +1734,29 @@ class ShellServer:
                         }
                     }
         
+        if method == "ziya/bindWorkspace":
+            # Warm-pool instances are spawned before their workspace is
+            # known; the parent binds each one exactly once on checkout.
+            path = params.get("path")
+            if self._workspace_bound or not path or not os.path.isdir(path):
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {
+                        "code": -32602,
+                        "message": f"Cannot bind workspace: {path!r}"
+                    }
+                }
+            os.environ["ZIYA_USER_CODEBASE_DIR"] = path
+            os.chdir(path)
+            self._workspace_bound = True
+            print(f"Bound to workspace: {path}", file=sys.stderr)
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": {"workspace": path}
+            }
+
         # Handle notifications (no response needed)
         if method == "notifications/initialized":
             return None
@@ -1609,11 +1771,73 @@ class ShellServer:
             }
         }
     
+    def _progress_emitter(self, progress_token):
+        """Build an ``on_output`` callback that reports output chunks as
+        ``notifications/progress`` for *progress_token*.
+
+        The callback runs on reader threads; it decodes incrementally (so a
+        multi-byte character split across reads is not mangled) and hands
+        the write to the event loop, which owns stdout.
+        """
+        loop = asyncio.get_running_loop()
+        decoders: dict = {}
+        counter = itertools.count(1)
+
+        def on_output(stream: str, data: bytes) -> None:
+            decoder = decoders.get(stream)
+            if decoder is None:
+                decoder = decoders[stream] = codecs.getincrementaldecoder("utf-8")("replace")
+            text = decoder.decode(data).replace("\r\n", "\n").replace("\r", "\n")
+            if not text:
+                return
+            notification = {
+                "jsonrpc": "2.0",
+                "method": "notifications/progress",
+                "params": {
+                    "progressToken": progress_token,
+                    "progress": next(counter),
+                    "message": text,
+                    "stream": stream,
+                },
+            }
+            loop.call_soon_threadsafe(self._write_message, notification)
+
+        return on_output
+
+    @staticmethod
+    def _write_message(message: Dict[str, Any]) -> None:
+        # Messages are written from the event loop thread only, one whole
+        # line per print, so concurrent requests never interleave.
+        print(json.dumps(message), flush=True)
+
+    async def _serve(self, request: Dict[str, Any]) -> None:
+        """Handle one request and write its response."""
+        try:
+            response = await self.handle_request(request)
+        except Exception as e:
+            response = {
+                "jsonrpc": "2.0",
+                "id": request.get("id"),
+                "error": {
+                    "code": -32603,
+                    "message": f"Internal error: {str(e)}"
+                }
+            }
+        if response:
+            self._write_message(response)
+
     async def run(self):
-        """Run the MCP server."""
+        """Run the MCP server.
+
+        Each request is handled on its own task, so a long-running command
+        doesn't hold up other calls; responses carry their request id and
+        may be written out of order.
+        """
+        pending: set = set()
         while True:
             try:
-                line = sys.stdin.readline()
+                # Read on a thread so the loop keeps running handlers
+                line = await asyncio.to_thread(sys.stdin.readline)
                 if not line:
                     print("EOF received, shutting down", file=sys.stderr)
                     break
@@ -1623,24 +1847,15 @@ class ShellServer:
                     continue
                     
                 request = json.loads(line.strip())
-                response = await self.handle_request(request)
-                
-                if response:
-                    print(json.dumps(response), flush=True)
+                task = asyncio.create_task(self._serve(request))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
                     
             except json.JSONDecodeError:
                 print("JSON decode error", file=sys.stderr)
                 continue
-            except Exception as e:
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": None,
-                    "error": {
-                        "code": -32603,
-                        "message": f"Internal error: {str(e)}"
-                    }
-                }
-                print(json.dumps(error_response), flush=True)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
 
 
 if __name__ == "__main__":
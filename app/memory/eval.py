@@ -114,7 +114,7 @@ def iter_random_conversations(
 ) -> List[ChatRecord]:
     """Return a stratified random sample of conversations.
 
-    Decrypts via the standard ALE pipeline.  Skips empty shells and
+    Decodes either chat format (message log or ALE/plain JSON).  Skips empty shells and
     files below ``min_size_bytes``.  Sampling is across all projects
     -- diversity comes for free because real usage is heavy-tailed by
     project anyway.
@@ -127,7 +127,7 @@ def iter_random_conversations(
     windowing logic matters most, even when they're rare in the
     population.
     """
-    from app.utils.encryption import is_encrypted, get_encryptor
+    from app.storage import chat_log
 
     projects_dir = Path.home() / ".ziya" / "projects"
     if not projects_dir.exists():
@@ -144,18 +144,14 @@ def iter_random_conversations(
     if not candidates:
         return []
 
-    # Decrypt all candidates so we can stratify on actual message count.
+    # Decode all candidates so we can stratify on actual message count.
     # This is the expensive step -- but it's bounded by the candidates list
-    # (already filtered to substantive sizes), and we cache decrypts in the
-    # records we yield so callers don't re-decrypt.
-    encryptor = get_encryptor()
+    # (already filtered to substantive sizes), and we cache decodes in the
+    # records we yield so callers don't re-decode.
     decoded: List[ChatRecord] = []
     for path in candidates:
         try:
-            raw = path.read_bytes()
-            if is_encrypted(raw):
-                raw = encryptor.decrypt(raw)
-            data = json.loads(raw)
+            data = chat_log.decode_chat_bytes(path.read_bytes())
         except Exception as e:
             logger.warning(f"Skipping {path.name}: {e}")
             continue
@@ -1560,6 +1560,9 @@ async def stream_chunks(body):
                         logger.debug(f"🔍 TOOL_DISPLAY: {chunk.get('tool_name')} completed")
                         # Stream tool result
                         yield f"data: {json.dumps({'tool_result': chunk})}\n\n"
+                    elif chunk.get('type') == 'tool_progress':
+                        # Partial output from a still-running tool
+                        yield f"data: {json.dumps(chunk)}\n\n"
                     elif chunk.get('type') == 'tool_execution':  # Legacy support
                         logger.debug(f"🔍 TOOL_EXECUTION (legacy): {chunk.get('tool_name')} completed")
                     elif chunk.get('type') == 'stream_end':
@@ -1697,6 +1700,8 @@ async def stream_chunks(body):
                                 yield f"data: {json.dumps({'tool_execution': retry_chunk})}\n\n"
                             elif retry_chunk.get('type') == 'tool_display':
                                 yield f"data: {json.dumps({'tool_result': retry_chunk})}\n\n"
+                            elif retry_chunk.get('type') == 'tool_progress':
+                                yield f"data: {json.dumps(retry_chunk)}\n\n"
                             elif retry_chunk.get('type') == 'throttling_error':
                                 yield f"data: {json.dumps(retry_chunk)}\n\n"
                             elif retry_chunk.get('type') == 'stream_end':
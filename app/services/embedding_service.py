@@ -3,19 +3,26 @@ Embedding service for the memory system.
 
 Provides vector embeddings for semantic search, deduplication, and
 clustering.  Pluggable provider architecture with Bedrock Titan as
-the primary backend and graceful degradation to keyword-only search
-when embeddings are unavailable.
-
-Storage: embeddings are kept in a separate numpy .npz file to avoid
-bloating the memories JSON.  Loaded lazily into memory on first search.
-At 10K memories × 256-dim × float32 = 10MB resident — acceptable up
-to ~100K before needing an index (HNSW/IVF).
+the primary backend, a deterministic local provider for offline use,
+and graceful degradation to keyword-only search when embeddings are
+unavailable.
+
+Storage: embeddings are kept in a separate memory-mapped float32 row
+file (see EmbeddingCache) to avoid bloating the memories JSON.  Loaded
+lazily on first search.  At 10K memories × 256-dim × float32 = 10MB —
+acceptable up to ~100K before needing an index (HNSW/IVF).
 """
 
+import hashlib
 import json
 import os
+import random
+import re
 import time
 import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from app.config.env_registry import ziya_env
@@ -32,12 +39,25 @@ DEFAULT_REGION = "us-east-1"
 
 # Batch size for backfill operations (avoid API throttling)
 BACKFILL_BATCH_SIZE = 20
-BACKFILL_BATCH_DELAY = 0.5  # seconds between batches
+BACKFILL_BATCH_DELAY = 0.5  # seconds between batches (remote providers only)
+
+# Retry policy for throttled / transient remote embedding calls
+EMBED_MAX_RETRIES = 4
+EMBED_RETRY_BASE_DELAY = 0.5  # seconds, doubled per attempt, plus jitter
+_RETRYABLE_ERRORS = ("ThrottlingException", "Too many requests", "rate limit",
+                     "ServiceUnavailable", "ModelNotReady", "timed out", "Timeout")
 
 
 class EmbeddingProvider:
     """Abstract base for embedding providers."""
 
+    # Reported by the status API
+    name = "unknown"
+    # Remote providers are paced between backfill batches
+    is_remote = False
+    # Cache file stem; vectors from different providers never share a cache
+    cache_name = "embeddings"
+
     def embed_text(self, text: str) -> Optional[np.ndarray]:
         """Embed a single text string.  Returns None on failure."""
         raise NotImplementedError
@@ -52,7 +72,14 @@ class EmbeddingProvider:
 
 
 class BedrockTitanProvider(EmbeddingProvider):
-    """Amazon Titan Embed V2 via Bedrock invoke_model."""
+    """Amazon Titan Embed V2 via Bedrock invoke_model.
+
+    ``embed_batch`` issues up to ZIYA_EMBEDDING_CONCURRENCY calls at once;
+    throttled or transient failures are retried with exponential backoff.
+    """
+
+    name = "bedrock_titan"
+    is_remote = True
 
     def __init__(self, region: str = None, model_id: str = None, dim: int = None,
                  aws_profile: str = None):
@@ -61,51 +88,131 @@ class BedrockTitanProvider(EmbeddingProvider):
         self._dim = dim or ziya_env("ZIYA_EMBEDDING_DIM", default=DEFAULT_DIM)
         self._profile = aws_profile or os.environ.get("AWS_PROFILE", "default")
         self._client = None
+        self._client_lock = threading.Lock()
         self._warned = False
 
     def _get_client(self):
-        if self._client is None:
-            import boto3
-            session = boto3.Session(profile_name=self._profile)
-            self._client = session.client("bedrock-runtime", region_name=self._region)
+        # Clients are thread-safe, sessions are not: build one client once
+        with self._client_lock:
+            if self._client is None:
+                import boto3
+                session = boto3.Session(profile_name=self._profile)
+                self._client = session.client("bedrock-runtime", region_name=self._region)
         return self._client
 
     @property
     def dim(self) -> int:
         return self._dim
 
+    def _invoke(self, text: str) -> np.ndarray:
+        client = self._get_client()
+        body = json.dumps({
+            "inputText": text[:8000],  # Titan V2 limit: 8192 tokens
+            "dimensions": self._dim,
+        })
+        response = client.invoke_model(
+            modelId=self._model_id,
+            body=body,
+            accept="application/json",
+            contentType="application/json",
+        )
+        result = json.loads(response["body"].read())
+        vec = np.array(result["embedding"], dtype=np.float32)
+        # Normalize for cosine similarity via dot product
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
+
     def embed_text(self, text: str) -> Optional[np.ndarray]:
         if not text or not text.strip():
             return None
-        try:
-            client = self._get_client()
-            body = json.dumps({
-                "inputText": text[:8000],  # Titan V2 limit: 8192 tokens
-                "dimensions": self._dim,
-            })
-            response = client.invoke_model(
-                modelId=self._model_id,
-                body=body,
-                accept="application/json",
-                contentType="application/json",
-            )
-            result = json.loads(response["body"].read())
-            vec = np.array(result["embedding"], dtype=np.float32)
-            # Normalize for cosine similarity via dot product
-            norm = np.linalg.norm(vec)
-            if norm > 0:
-                vec /= norm
-            return vec
-        except Exception as e:
-            if not self._warned:
-                logger.warning(f"Embedding API call failed (will use keyword fallback): {e}")
-                self._warned = True
+        for attempt in range(EMBED_MAX_RETRIES + 1):
+            try:
+                return self._invoke(text)
+            except Exception as e:
+                if attempt < EMBED_MAX_RETRIES and any(m in str(e) for m in _RETRYABLE_ERRORS):
+                    delay = EMBED_RETRY_BASE_DELAY * (2 ** attempt)
+                    time.sleep(delay + random.uniform(0, delay))
+                    continue
+                if not self._warned:
+                    logger.warning(f"Embedding API call failed (will use keyword fallback): {e}")
+                    self._warned = True
+                return None
+        return None
+
+    def embed_batch(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Embed *texts* concurrently; results keep the input order."""
+        workers = min(ziya_env("ZIYA_EMBEDDING_CONCURRENCY"), len(texts))
+        if workers <= 1:
+            return [self.embed_text(t) for t in texts]
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix="embed") as pool:
+            return list(pool.map(self.embed_text, texts))
+
+
+class LocalHashingProvider(EmbeddingProvider):
+    """Deterministic CPU embeddings that need no network or model files.
+
+    Each text is hashed into ``dim`` buckets by word unigrams plus
+    character trigrams within each word (the signed feature-hashing
+    trick), with log-scaled term frequencies, then L2-normalized.  That
+    captures lexical and sub-word overlap rather than deep semantics, but
+    it is identical on every machine and run, so recall, dedup and
+    clustering keep working in air-gapped deployments.
+    """
+
+    name = "local_hash"
+    cache_name = "embeddings-local"
+
+    _WORD_RE = re.compile(r"[a-z0-9_]+")
+    _TRIGRAM_WEIGHT = 0.5
+
+    def __init__(self, dim: int = None):
+        self._dim = dim or ziya_env("ZIYA_EMBEDDING_DIM", default=DEFAULT_DIM)
+        self._bucket = lru_cache(maxsize=65536)(self._bucket_uncached)
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    def _bucket_uncached(self, feature: str) -> Tuple[int, float]:
+        digest = int.from_bytes(
+            hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        return digest % self._dim, (1.0 if digest >> 63 else -1.0)
+
+    def _features(self, text: str) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for word in self._WORD_RE.findall(text.lower()):
+            counts["w:" + word] = counts.get("w:" + word, 0) + 1
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                gram = "t:" + padded[i:i + 3]
+                counts[gram] = counts.get(gram, 0) + 1
+        return counts
+
+    def embed_text(self, text: str) -> Optional[np.ndarray]:
+        if not text or not text.strip():
+            return None
+        counts = self._features(text)
+        if not counts:
+            return None
+        vec = np.zeros(self._dim, dtype=np.float32)
+        for feature, count in counts.items():
+            idx, sign = self._bucket(feature)
+            weight = 1.0 if feature.startswith("w:") else self._TRIGRAM_WEIGHT
+            vec[idx] += sign * weight * (1.0 + np.log(count))
+        norm = np.linalg.norm(vec)
+        if norm == 0:
             return None
+        return vec / norm
 
 
 class NoopProvider(EmbeddingProvider):
     """Fallback provider that returns None for all embeddings."""
 
+    name = "none"
+
     @property
     def dim(self) -> int:
         return DEFAULT_DIM
@@ -117,43 +224,172 @@ class NoopProvider(EmbeddingProvider):
 class EmbeddingCache:
     """In-memory cache of memory ID → embedding vector.
 
-    Backed by a numpy .npz file on disk.  Loaded lazily on first access.
-    Thread-safe for concurrent reads; writes are serialized via a lock.
+    Backed by a memory-mapped float32 row store plus an append-only id
+    log.  Loaded lazily on first access.  Thread-safe for concurrent
+    reads; writes are serialized via a lock.
 
     File format:
-        embeddings.npz contains:
-          - 'ids': 1-D array of memory ID strings
-          - 'vectors': 2-D float32 array (n_memories × dim)
+        embeddings.ids  JSON lines: a ``{"version", "dim", "rows"}`` header
+                        naming the row file, then ``[id, row]`` when an id
+                        gets a row and ``[id, null]`` (a tombstone) when it
+                        is removed
+        embeddings*.f32 rows of ``dim`` float32s; capacity doubles as
+                        rows are added, so appends are amortized O(dim)
+
+    Updates to an existing id overwrite its row in place.  ``flush``
+    appends the pending log lines and syncs the mapped rows.  Once more
+    than half the rows are tombstoned it writes a compacted row file and
+    log, and renaming the log over the old one switches to it atomically.
+    A legacy ``embeddings.npz`` is imported on first load.
     """
 
-    def __init__(self, memory_dir: Path, dim: int = DEFAULT_DIM):
-        self._file = memory_dir / "embeddings.npz"
+    LOG_VERSION = 1
+    MIN_CAPACITY = 64
+
+    def __init__(self, memory_dir: Path, dim: int = DEFAULT_DIM, name: str = "embeddings"):
+        self._dir = Path(memory_dir)
+        self._name = name
+        self._vec_file = self._dir / f"{name}.f32"  # Replaced by the log header
+        self._log_file = self._dir / f"{name}.ids"
+        self._legacy_file = self._dir / f"{name}.npz"
         self._dim = dim
         self._lock = threading.Lock()
         # Lazy-loaded state
-        self._ids: Optional[List[str]] = None
-        self._vectors: Optional[np.ndarray] = None  # (N, dim) float32, pre-normalized
+        self._ids: Optional[List[Optional[str]]] = None  # row → id, None if dead
+        self._vectors: Optional[np.ndarray] = None  # memmap (capacity, dim), pre-normalized
+        self._live: Optional[np.ndarray] = None  # (capacity,) bool
         self._id_to_idx: Optional[Dict[str, int]] = None
+        self._pending_log: List[list] = []
+        self._dead = 0
         self._dirty = False
+        self._needs_rewrite = False  # On-disk log unusable; next flush rewrites it
+
+    # -- Loading -------------------------------------------------------------
 
     def _ensure_loaded(self):
         """Load from disk if not yet in memory."""
         if self._ids is not None:
             return
-        if self._file.exists():
+        self._reset()
+        if self._log_file.exists():
             try:
-                data = np.load(self._file, allow_pickle=True)
-                self._ids = list(data["ids"])
-                self._vectors = data["vectors"].astype(np.float32)
-                self._id_to_idx = {mid: i for i, mid in enumerate(self._ids)}
-                logger.debug(f"Loaded {len(self._ids)} embeddings from cache")
+                self._load_log()
+                logger.debug(f"Loaded {len(self._id_to_idx)} embeddings from cache")
                 return
-            except Exception as e:
+            except (OSError, ValueError) as e:
                 logger.warning(f"Could not load embeddings cache: {e}")
-        # Initialize empty
+                self._reset()
+                self._needs_rewrite = True
+        if self._legacy_file.exists():
+            self._import_legacy()
+
+    def _reset(self):
         self._ids = []
-        self._vectors = np.zeros((0, self._dim), dtype=np.float32)
+        self._vectors = None
+        self._live = np.zeros(0, dtype=bool)
         self._id_to_idx = {}
+        self._pending_log = []
+        self._dead = 0
+
+    def _load_log(self):
+        with open(self._log_file, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "null")
+            if not isinstance(header, dict) or header.get("dim") != self._dim:
+                raise ValueError(f"embedding log header {header!r} does not match dim {self._dim}")
+            self._vec_file = self._dir / Path(header.get("rows", self._vec_file.name)).name
+            for line in f:
+                try:
+                    mid, row = json.loads(line)
+                except ValueError:
+                    # Torn final line from an interrupted append.  Appending
+                    # after it would merge the next record into it, so the
+                    # next flush rewrites the log instead.
+                    self._needs_rewrite = True
+                    break
+                if not line.endswith("\n"):
+                    self._needs_rewrite = True
+                if row is None:
+                    self._tombstone(mid)
+                    continue
+                if row != len(self._ids):
+                    raise ValueError(f"embedding log out of sequence at row {row}")
+                self._ids.append(mid)
+                self._id_to_idx[mid] = row
+        rows = len(self._ids)
+        capacity = self._vec_file.stat().st_size // (4 * self._dim) if self._vec_file.exists() else 0
+        if capacity < rows:
+            raise ValueError(f"embedding rows truncated ({capacity} < {rows})")
+        if capacity:
+            self._map(capacity)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._live[[row for row in self._id_to_idx.values()]] = True
+        self._dead = rows - len(self._id_to_idx)
+
+    def _import_legacy(self):
+        """Convert a pre-mmap embeddings.npz into the row store."""
+        try:
+            data = np.load(self._legacy_file, allow_pickle=True)
+            ids = list(data["ids"])
+            vectors = data["vectors"].astype(np.float32)
+        except Exception as e:
+            logger.warning(f"Could not load embeddings cache: {e}")
+            return
+        if vectors.ndim != 2 or (len(ids) and vectors.shape[1] != self._dim):
+            logger.warning(f"Ignoring legacy embeddings with shape {vectors.shape}")
+            return
+        for mid, vec in zip(ids, vectors):
+            self._put(str(mid), vec)
+        self._dirty = True
+        self._flush()
+        if not self._dirty:
+            self._legacy_file.unlink()
+            logger.info(f"Migrated {len(ids)} embeddings to the row store")
+
+    # -- Row storage ---------------------------------------------------------
+
+    def _map(self, capacity: int):
+        self._vectors = np.memmap(self._vec_file, dtype=np.float32, mode="r+",
+                                  shape=(capacity, self._dim))
+
+    def _ensure_capacity(self, rows: int):
+        capacity = len(self._live)
+        if rows <= capacity:
+            return
+        new_capacity = max(self.MIN_CAPACITY, capacity * 2)
+        while new_capacity < rows:
+            new_capacity *= 2
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._dir.mkdir(parents=True, exist_ok=True)
+        with open(self._vec_file, "ab") as f:
+            f.truncate(new_capacity * self._dim * 4)
+        self._map(new_capacity)
+        live = np.zeros(new_capacity, dtype=bool)
+        live[:capacity] = self._live
+        self._live = live
+
+    def _put(self, memory_id: str, vector: np.ndarray):
+        idx = self._id_to_idx.get(memory_id)
+        if idx is None:
+            idx = len(self._ids)
+            self._ensure_capacity(idx + 1)
+            self._ids.append(memory_id)
+            self._id_to_idx[memory_id] = idx
+            self._live[idx] = True
+            self._pending_log.append([memory_id, idx])
+        self._vectors[idx] = vector
+
+    def _tombstone(self, memory_id: str) -> bool:
+        idx = self._id_to_idx.pop(memory_id, None)
+        if idx is None:
+            return False
+        self._ids[idx] = None
+        if idx < len(self._live):
+            self._live[idx] = False
+        self._dead += 1
+        return True
+
+    # -- Public API ----------------------------------------------------------
 
     def get(self, memory_id: str) -> Optional[np.ndarray]:
         """Get the embedding for a memory ID, or None if not cached."""
@@ -162,39 +398,22 @@ class EmbeddingCache:
             idx = self._id_to_idx.get(memory_id)
             if idx is None:
                 return None
-            return self._vectors[idx]
+            return np.array(self._vectors[idx])
 
     def put(self, memory_id: str, vector: np.ndarray):
         """Store or update an embedding."""
         with self._lock:
             self._ensure_loaded()
-            idx = self._id_to_idx.get(memory_id)
-            if idx is not None:
-                self._vectors[idx] = vector
-            else:
-                self._ids.append(memory_id)
-                self._id_to_idx[memory_id] = len(self._ids) - 1
-                self._vectors = np.vstack([self._vectors, vector.reshape(1, -1)])
+            self._put(memory_id, vector)
             self._dirty = True
 
     def remove(self, memory_id: str):
         """Remove an embedding from the cache."""
         with self._lock:
             self._ensure_loaded()
-            idx = self._id_to_idx.get(memory_id)
-            if idx is None:
-                return
-            # Swap with last element for O(1) removal
-            last_idx = len(self._ids) - 1
-            if idx != last_idx:
-                last_id = self._ids[last_idx]
-                self._ids[idx] = last_id
-                self._vectors[idx] = self._vectors[last_idx]
-                self._id_to_idx[last_id] = idx
-            self._ids.pop()
-            self._vectors = self._vectors[:len(self._ids)]
-            del self._id_to_idx[memory_id]
-            self._dirty = True
+            if self._tombstone(memory_id):
+                self._pending_log.append([memory_id, None])
+                self._dirty = True
 
     def search(self, query_vec: np.ndarray, top_k: int = 10,
                exclude_ids: Optional[set] = None) -> List[Tuple[str, float]]:
@@ -204,16 +423,18 @@ class EmbeddingCache:
         """
         with self._lock:
             self._ensure_loaded()
-            if len(self._ids) == 0:
+            rows = len(self._ids)
+            if not self._id_to_idx:
                 return []
             # Dot product = cosine similarity (vectors are pre-normalized)
-            scores = self._vectors @ query_vec
+            scores = np.asarray(self._vectors[:rows] @ query_vec)
+            if self._dead:
+                scores[~self._live[:rows]] = -1.0
             if exclude_ids:
-                for mid, idx in self._id_to_idx.items():
-                    if mid in exclude_ids:
-                        scores[idx] = -1.0
+                excluded = [self._id_to_idx[mid] for mid in exclude_ids if mid in self._id_to_idx]
+                scores[excluded] = -1.0
             # argpartition is O(N) vs O(N log N) for full sort
-            k = min(top_k, len(self._ids))
+            k = min(top_k, rows)
             top_indices = np.argpartition(scores, -k)[-k:]
             # Sort just the top-K
             top_indices = top_indices[np.argsort(scores[top_indices])[::-1]]
@@ -221,27 +442,78 @@ class EmbeddingCache:
                     if scores[i] > 0]
 
     def flush(self):
-        """Write cache to disk if dirty."""
+        """Persist pending changes if dirty."""
         with self._lock:
-            if not self._dirty or self._ids is None:
-                return
-            try:
-                self._file.parent.mkdir(parents=True, exist_ok=True)
-                tmp = self._file.with_suffix(".tmp.npz")
-                np.savez(tmp,
-                         ids=np.array(self._ids, dtype=object),
-                         vectors=self._vectors)
-                tmp.rename(self._file)
-                self._dirty = False
-                logger.debug(f"Flushed {len(self._ids)} embeddings to disk")
-            except Exception as e:
-                logger.error(f"Failed to flush embeddings: {e}")
+            self._flush()
+
+    def _flush(self):
+        if not self._dirty or self._ids is None:
+            return
+        try:
+            if self._needs_rewrite or self._dead > max(self.MIN_CAPACITY, len(self._ids) // 2):
+                self._compact()
+            else:
+                if self._vectors is not None:
+                    self._vectors.flush()
+                self._append_log(self._pending_log)
+            self._pending_log = []
+            self._dirty = False
+            logger.debug(f"Flushed {len(self._id_to_idx)} embeddings to disk")
+        except Exception as e:
+            logger.error(f"Failed to flush embeddings: {e}")
+
+    def _log_header(self) -> str:
+        return json.dumps({"version": self.LOG_VERSION, "dim": self._dim,
+                           "rows": self._vec_file.name}) + "\n"
+
+    def _append_log(self, records: List[list]):
+        self._dir.mkdir(parents=True, exist_ok=True)
+        new_log = not self._log_file.exists()
+        with open(self._log_file, "a", encoding="utf-8") as f:
+            if new_log:
+                f.write(self._log_header())
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    def _compact(self):
+        """Rewrite the store with only live rows, in row order."""
+        live_ids = [mid for mid in self._ids if mid is not None]
+        rows = np.array([self._id_to_idx[mid] for mid in live_ids], dtype=np.int64)
+        vectors = np.array(self._vectors[rows]) if len(rows) else np.zeros((0, self._dim), np.float32)
+        capacity = max(self.MIN_CAPACITY, 1 << max(len(live_ids) - 1, 0).bit_length())
+
+        old_vec_file = self._vec_file
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._vec_file = self._dir / f"{self._name}.{uuid.uuid4().hex[:8]}.f32"
+        with open(self._vec_file, "wb") as f:
+            f.write(vectors.tobytes())
+            f.truncate(capacity * self._dim * 4)
+        tmp_log = self._log_file.with_suffix(".ids.tmp")
+        with open(tmp_log, "w", encoding="utf-8") as f:
+            f.write(self._log_header())
+            for row, mid in enumerate(live_ids):
+                f.write(json.dumps([mid, row]) + "\n")
+        # The log names its row file, so this rename is the switch-over
+        tmp_log.replace(self._log_file)
+
+        self._ids = live_ids
+        self._id_to_idx = {mid: row for row, mid in enumerate(live_ids)}
+        self._map(capacity)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._live[:len(live_ids)] = True
+        self._dead = 0
+        self._needs_rewrite = False
+        try:
+            old_vec_file.unlink()
+        except OSError:
+            pass  # Never created, or still mapped on platforms that forbid it
+        logger.debug(f"Compacted embeddings to {len(live_ids)} rows")
 
     @property
     def count(self) -> int:
         with self._lock:
             self._ensure_loaded()
-            return len(self._ids)
+            return len(self._id_to_idx)
 
     def missing_ids(self, all_ids: List[str]) -> List[str]:
         """Return memory IDs that are not in the cache."""
@@ -258,10 +530,20 @@ _init_lock = threading.Lock()
 
 
 def _resolve_provider() -> EmbeddingProvider:
-    """Create the appropriate embedding provider based on configuration."""
+    """Create the appropriate embedding provider based on configuration.
+
+    'auto' uses Bedrock when reachable and otherwise disables embeddings
+    (keyword search only).  The offline local provider is opt-in via
+    'local': its hashing vectors are not calibrated for the similarity
+    thresholds tuned on Titan embeddings.
+    """
     choice = ziya_env("ZIYA_EMBEDDING_PROVIDER", default="auto").lower()
     if choice == "none":
         return NoopProvider()
+    if choice == "local":
+        provider = LocalHashingProvider()
+        logger.info(f"Embedding provider: local hashing ({provider.dim}-dim)")
+        return provider
     if choice in ("bedrock", "titan", "auto"):
         try:
             provider = BedrockTitanProvider()
@@ -286,12 +568,15 @@ def get_embedding_provider() -> EmbeddingProvider:
 
 def get_embedding_cache() -> EmbeddingCache:
     global _cache
+    if _cache is None:
+        # Outside the lock: resolving the provider takes it too
+        name = getattr(get_embedding_provider(), "cache_name", "embeddings")
     with _init_lock:
         if _cache is None:
             from app.utils.paths import get_ziya_home
             memory_dir = get_ziya_home() / "memory"
             dim = ziya_env("ZIYA_EMBEDDING_DIM", default=DEFAULT_DIM)
-            _cache = EmbeddingCache(memory_dir, dim=dim)
+            _cache = EmbeddingCache(memory_dir, dim=dim, name=name)
     return _cache
 
 
@@ -330,7 +615,12 @@ def remove_embedding(memory_id: str):
 
 async def backfill_embeddings(memory_ids_and_content: List[Tuple[str, str]],
                               progress_callback=None) -> int:
-    """Embed all memories that lack vectors.  Returns count embedded."""
+    """Embed all memories that lack vectors.  Returns count embedded.
+
+    Each batch goes through ``provider.embed_batch`` on a worker thread,
+    so remote providers embed a batch concurrently and the event loop is
+    never blocked.
+    """
     import asyncio
     provider = get_embedding_provider()
     if isinstance(provider, NoopProvider):
@@ -340,15 +630,16 @@ async def backfill_embeddings(memory_ids_and_content: List[Tuple[str, str]],
     total = len(memory_ids_and_content)
     for i in range(0, total, BACKFILL_BATCH_SIZE):
         batch = memory_ids_and_content[i:i + BACKFILL_BATCH_SIZE]
-        for mid, content in batch:
-            vec = provider.embed_text(content)
+        vectors = await asyncio.to_thread(
+            provider.embed_batch, [content for _, content in batch])
+        for (mid, _), vec in zip(batch, vectors):
             if vec is not None:
                 cache.put(mid, vec)
                 embedded += 1
         cache.flush()
         if progress_callback:
             progress_callback(min(i + BACKFILL_BATCH_SIZE, total), total)
-        if i + BACKFILL_BATCH_SIZE < total:
+        if i + BACKFILL_BATCH_SIZE < total and getattr(provider, "is_remote", True):
             await asyncio.sleep(BACKFILL_BATCH_DELAY)
     logger.info(f"Backfill complete: {embedded}/{total} memories embedded")
     return embedded
@@ -19,6 +19,7 @@ from typing import Any, Dict, List, Optional, Set, Tuple
 
 from app.utils.logging_utils import logger
 from app.utils.directory_util import get_ignored_patterns, MAX_SYMLINK_HOPS
+from app.services import folder_snapshot
 
 
 # Folder structure cache, keyed by absolute directory path
@@ -178,7 +179,8 @@ def add_file_to_folder_cache(rel_path: str, base_dir: str = None) -> bool:
             current_level[filename] = {'token_count': token_count}
             logger.info(f"Added file to cache: {rel_path} ({token_count} tokens)")
             _schedule_broadcast('file_added', rel_path, token_count)
-            return True
+        folder_snapshot.note_file(project_root, rel_path, entry['data'])
+        return True
 
     except Exception as e:
         logger.error(f"Failed to add file to cache: {rel_path}, error: {e}")
@@ -212,11 +214,13 @@ def update_file_in_folder_cache(rel_path: str, base_dir: str = None) -> bool:
                     return False
                 current_level = node['children']
             filename = path_parts[-1]
-            if filename in current_level:
-                current_level[filename]['token_count'] = token_count
-                logger.debug(f"Updated file in cache: {rel_path} ({token_count} tokens)")
-                _schedule_broadcast('file_modified', rel_path, token_count)
-                return True
+            if filename not in current_level:
+                return False
+            current_level[filename]['token_count'] = token_count
+            logger.debug(f"Updated file in cache: {rel_path} ({token_count} tokens)")
+            _schedule_broadcast('file_modified', rel_path, token_count)
+        folder_snapshot.note_file(project_root, rel_path, entry['data'])
+        return True
     except Exception as e:
         logger.error(f"Failed to update file in cache: {rel_path}, error: {e}")
     return False
@@ -245,11 +249,13 @@ def remove_file_from_folder_cache(rel_path: str, base_dir: str = None) -> bool:
                     return False
                 current_level = node['children']
             filename = path_parts[-1]
-            if filename in current_level:
-                del current_level[filename]
-                logger.info(f"Removed file from cache: {rel_path}")
-                _schedule_broadcast('file_deleted', rel_path, 0)
-                return True
+            if filename not in current_level:
+                return False
+            del current_level[filename]
+            logger.info(f"Removed file from cache: {rel_path}")
+            _schedule_broadcast('file_deleted', rel_path, 0)
+        folder_snapshot.note_file(project_root, rel_path, entry['data'], removed=True)
+        return True
     except Exception as e:
         logger.error(f"Failed to remove file from cache: {rel_path}, error: {e}")
     return False
@@ -466,7 +472,8 @@ def add_directory_to_folder_cache(rel_path: str, full_path: str, is_inside_works
             current_level[dirname] = dir_structure
             logger.info(f"Added directory to cache: {rel_path} ({dir_structure.get('token_count', 0)} tokens)")
             _schedule_broadcast('file_added', rel_path, dir_structure.get('token_count', 0))
-            return True
+        folder_snapshot.mark_dirty(os.path.abspath(project_root))
+        return True
 
     except Exception as e:
         logger.error(f"Failed to add directory to cache: {rel_path}, error: {e}")
@@ -581,7 +588,8 @@ def get_cached_folder_structure(directory: str, ignored_patterns, max_depth: int
     if synchronous:
         logger.info(f"Synchronous folder scan for {directory}")
         try:
-            result = get_folder_structure(directory, ignored_patterns, max_depth)
+            stat_sink = folder_snapshot.new_stat_sink()
+            result = get_folder_structure(directory, ignored_patterns, max_depth, stat_sink=stat_sink)
             # Merge in any externals that were pre-populated
             if cache_entry['data'] and '[external]' in cache_entry['data']:
                 result.setdefault('[external]', cache_entry['data']['[external]'])
@@ -593,6 +601,7 @@ def get_cached_folder_structure(directory: str, ignored_patterns, max_depth: int
                 'data': result,
                 'directory_mtime': 0
             }
+            _store_snapshot(directory, ignored_patterns, max_depth, result, stat_sink)
             return result
         except Exception as e:
             logger.error(f"Synchronous scan failed: {e}")
@@ -600,6 +609,11 @@ def get_cached_folder_structure(directory: str, ignored_patterns, max_depth: int
 
     existing = _background_scan_threads.get(directory)
     if existing is None or not existing.is_alive():
+        # A snapshot persisted by an earlier run is served right away and
+        # revalidated against directory mtimes on the scan thread; a full
+        # scan runs only when there is no usable snapshot.
+        snapshot = folder_snapshot.load(directory, ignored_patterns, max_depth)
+
         def background_scan():
             # This scan's own per-directory slot. We also mirror 'active' to the
             # legacy global so the still-no-arg /folder-progress route keeps
@@ -614,8 +628,22 @@ def get_cached_folder_structure(directory: str, ignored_patterns, max_depth: int
             slot["last_update"] = scan_start
             slot["progress"] = {"directories": 0, "files": 0, "elapsed": 0}
             _scan_progress["active"] = True  # transitional mirror for no-arg route
+            stat_sink = None
             try:
-                result = get_folder_structure(directory, ignored_patterns, max_depth)
+                result = None
+                if snapshot is not None:
+                    try:
+                        if folder_snapshot.revalidate(snapshot, progress=slot):
+                            result = snapshot.tree
+                        else:
+                            logger.info(f"Snapshot revalidation for {directory} cancelled")
+                            return
+                    except Exception as e:
+                        logger.warning(f"Folder snapshot revalidation failed for {directory}, rescanning: {e}")
+                        folder_snapshot.drop(directory)
+                if result is None:
+                    stat_sink = folder_snapshot.new_stat_sink()
+                    result = get_folder_structure(directory, ignored_patterns, max_depth, stat_sink=stat_sink)
                 _scan_progress["last_update"] = time.time()
                 # A *cancelled* scan (the GUI switched to another project
                 # mid-scan) or an error dict is NOT a usable tree: committing it
@@ -647,22 +675,54 @@ def get_cached_folder_structure(directory: str, ignored_patterns, max_depth: int
                     'data': result,
                     'directory_mtime': 0
                 }
+                if stat_sink is not None:
+                    _store_snapshot(directory, ignored_patterns, max_depth, result, stat_sink)
+                else:
+                    folder_snapshot.mark_dirty(directory)
                 logger.info(f"Background folder scan completed in {time.time() - scan_start:.1f}s")
                 _schedule_broadcast("scan_complete", "")
+                # Exact per-file counts follow the tree; unchanged content is
+                # answered from the persistent token count store.
+                dir_util.ensure_background_token_calculation(directory, ignored_patterns, max_depth)
             except Exception as e:
                 logger.error(f"Background folder scan error: {e}", exc_info=True)
             finally:
                 slot["active"] = False
+                slot["partial_tree"] = None
                 _scan_progress["active"] = False  # transitional mirror
 
+        if snapshot is not None:
+            # Publish the snapshot before the thread starts so concurrent
+            # fetches serve it as a partial tree instead of starting a scan.
+            slot = dir_util._progress_slot(directory)
+            slot["cancelled"] = False
+            slot["partial_tree"] = snapshot.tree
+            slot["active"] = True
         t = threading.Thread(target=background_scan, daemon=True)
         _background_scan_threads[directory] = t
         t.start()
         logger.info("Started background folder scan")
 
+        if snapshot is not None:
+            result = {**snapshot.tree, "_stale_and_scanning": True}
+            if cache_entry['data'] and '[external]' in cache_entry['data']:
+                result.setdefault('[external]', cache_entry['data']['[external]'])
+            return result
+
     return {"_scanning": True, "children": {}}
 
 
+def _store_snapshot(directory: str, ignored_patterns, max_depth: int,
+                    result: Dict[str, Any], stat_sink: Dict[str, Any]) -> None:
+    """Persist a complete scan; timed-out partial trees are not snapshotted."""
+    if result.get('_partial') or result.get('_timeout'):
+        return
+    try:
+        folder_snapshot.store(directory, ignored_patterns, max_depth, result, stat_sink)
+    except Exception as e:
+        logger.warning(f"Failed to store folder snapshot for {directory}: {e}")
+
+
 def restore_external_paths_for_project(project_root: str) -> None:
     """Re-populate server-side external path caches from persisted project data."""
     global _explicit_external_paths
@@ -0,0 +1,445 @@
+"""
+Persistent folder-tree snapshots.
+
+A completed folder scan is written to ``~/.ziya/folder_tree/<project hash>.json``
+together with the mtime (and symlink-hop count) of every directory it listed
+and the size of every file it estimated:
+
+    {"version": 1, "root": ..., "key": <scan settings hash>,
+     "tree": {...}, "dirs": {rel: [mtime_ns, hops]}, "files": {rel: size}}
+
+After a restart the snapshot is served immediately and revalidated in the
+background.  A directory whose mtime is unchanged still has the same
+listing, so only directories whose mtime moved are re-listed, and only
+files whose size moved are re-estimated.  While the server runs, the
+folder_service add/update/remove hooks keep the tree current and mark the
+snapshot dirty; a write-behind timer persists it.
+"""
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.utils.logging_utils import logger
+
+SNAPSHOT_VERSION = 1
+_WRITE_BEHIND_DELAY_SECONDS = 5.0
+
+_snapshots: Dict[str, "FolderSnapshot"] = {}
+_lock = threading.Lock()
+_dirty: Set[str] = set()
+_flush_timer: Optional[threading.Timer] = None
+
+
+@dataclass
+class FolderSnapshot:
+    """The persisted scan of one project root."""
+    root: str
+    key: str
+    ignored_patterns: List[Tuple[str, str]]
+    max_depth: int
+    tree: Dict[str, Any]
+    dirs: Dict[str, List[int]] = field(default_factory=dict)
+    files: Dict[str, int] = field(default_factory=dict)
+
+
+def new_stat_sink() -> Dict[str, Any]:
+    """An empty stat_sink for get_folder_structure."""
+    return {'dirs': {}, 'files': {}, 'complete': True}
+
+
+def _snapshot_dir() -> str:
+    from app.utils.paths import get_ziya_home
+    return str(get_ziya_home() / 'folder_tree')
+
+
+def _snapshot_path(root: str) -> str:
+    name = hashlib.sha256(root.encode()).hexdigest()[:16]
+    return os.path.join(_snapshot_dir(), name + '.json')
+
+
+def _scan_key(ignored_patterns, max_depth: int) -> str:
+    """Hash of the settings a snapshot was scanned with; a mismatch discards it."""
+    from app.utils.directory_util import MAX_SYMLINK_HOPS
+    material = json.dumps([SNAPSHOT_VERSION, max_depth, MAX_SYMLINK_HOPS,
+                           [list(p) for p in ignored_patterns]])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _scan_customized() -> bool:
+    """Directory-scan providers reshape the tree in ways a snapshot can't replay."""
+    try:
+        from app.plugins import get_directory_scan_providers
+        return bool(get_directory_scan_providers())
+    except Exception:
+        return False
+
+
+def store(root: str, ignored_patterns, max_depth: int,
+          tree: Dict[str, Any], stat_sink: Dict[str, Any]) -> None:
+    """Adopt a freshly scanned tree as the project's snapshot and persist it.
+
+    `tree` is the live dict cached by folder_service, so later incremental
+    hook updates to it are picked up by the next write.
+    """
+    if '' not in stat_sink['dirs']:
+        return  # the scan never listed the root; nothing to revalidate
+    if not stat_sink.get('complete', True) or _scan_customized():
+        drop(root)
+        return
+    snapshot = FolderSnapshot(
+        root=root, key=_scan_key(ignored_patterns, max_depth),
+        ignored_patterns=list(ignored_patterns), max_depth=max_depth,
+        tree=tree, dirs=stat_sink['dirs'], files=stat_sink['files'],
+    )
+    with _lock:
+        _snapshots[root] = snapshot
+    mark_dirty(root)
+
+
+def load(root: str, ignored_patterns, max_depth: int) -> Optional[FolderSnapshot]:
+    """Return the project's snapshot if one matches the current scan settings."""
+    if _scan_customized():
+        return None
+    key = _scan_key(ignored_patterns, max_depth)
+    with _lock:
+        snapshot = _snapshots.get(root)
+    if snapshot is not None:
+        return snapshot if snapshot.key == key else None
+
+    path = _snapshot_path(root)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Discarding unreadable folder snapshot {path}: {e}")
+        return None
+    if (payload.get('version') != SNAPSHOT_VERSION or payload.get('root') != root
+            or payload.get('key') != key):
+        logger.debug(f"Folder snapshot for {root} was built with other settings; ignoring it")
+        return None
+
+    snapshot = FolderSnapshot(
+        root=root, key=key, ignored_patterns=list(ignored_patterns),
+        max_depth=max_depth, tree=payload.get('tree') or {},
+        dirs=payload.get('dirs') or {}, files=payload.get('files') or {},
+    )
+    with _lock:
+        _snapshots.setdefault(root, snapshot)
+        snapshot = _snapshots[root]
+    logger.info(f"📂 Loaded folder snapshot for {root} ({len(snapshot.dirs)} dirs, {len(snapshot.files)} files)")
+    return snapshot
+
+
+def drop(root: str) -> None:
+    """Forget the project's snapshot in memory and on disk."""
+    with _lock:
+        _snapshots.pop(root, None)
+        _dirty.discard(root)
+    try:
+        os.unlink(_snapshot_path(root))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.debug(f"Could not remove folder snapshot for {root}: {e}")
+
+
+def note_file(root: str, rel_path: str, tree: Dict[str, Any], removed: bool = False) -> None:
+    """Record an incremental update a folder_service hook made to `tree`.
+
+    Ignored unless `tree` is the snapshot's own tree; a cache repopulated
+    after invalidation is reconciled by the next revalidation instead.
+    """
+    with _lock:
+        snapshot = _snapshots.get(root)
+        if snapshot is None or snapshot.tree is not tree:
+            return
+        if removed:
+            snapshot.files.pop(rel_path, None)
+        else:
+            try:
+                snapshot.files[rel_path] = os.path.getsize(os.path.join(root, rel_path))
+            except OSError:
+                snapshot.files.pop(rel_path, None)
+    mark_dirty(root)
+
+
+def mark_dirty(root: str) -> None:
+    """Arm the write-behind flush for a project's snapshot."""
+    global _flush_timer
+    with _lock:
+        if root not in _snapshots:
+            return
+        _dirty.add(root)
+        if _flush_timer is None:
+            timer = threading.Timer(_WRITE_BEHIND_DELAY_SECONDS, flush)
+            timer.daemon = True
+            _flush_timer = timer
+            timer.start()
+
+
+@atexit.register
+def flush() -> None:
+    """Write every snapshot changed since the last flush."""
+    global _flush_timer
+    with _lock:
+        dirty = [_snapshots[r] for r in _dirty if r in _snapshots]
+        _dirty.clear()
+        timer, _flush_timer = _flush_timer, None
+    if timer is not None and timer is not threading.current_thread():
+        timer.cancel()
+    failed = set()
+    for snapshot in dirty:
+        try:
+            _write(snapshot)
+        except Exception as e:
+            logger.warning(f"Failed to save folder snapshot for {snapshot.root}: {e}")
+            failed.add(snapshot.root)
+    if failed:
+        # Retried with the next flush rather than in a tight loop
+        with _lock:
+            _dirty.update(failed)
+
+
+def _write(snapshot: FolderSnapshot) -> None:
+    # The hooks mutate the live tree under folder_service's cache lock.
+    from app.services.folder_service import _cache_lock
+    with _cache_lock:
+        tree = {k: v for k, v in snapshot.tree.items()
+                if k != '[external]' and not k.startswith('_')}
+        data = json.dumps({
+            'version': SNAPSHOT_VERSION,
+            'root': snapshot.root,
+            'key': snapshot.key,
+            'saved_at': time.time(),
+            'tree': tree,
+            'dirs': snapshot.dirs,
+            'files': snapshot.files,
+        }, separators=(',', ':'))
+
+    path = _snapshot_path(snapshot.root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_file = path + '.tmp'
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(temp_file, path)
+    except Exception:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+        raise
+    logger.debug(f"Saved folder snapshot for {snapshot.root} ({len(data)} bytes)")
+
+
+def _children_at(tree: Dict[str, Any], rel: str, create: bool) -> Optional[Dict[str, Any]]:
+    """The children dict of the directory node at `rel` ('' is the root)."""
+    children = tree
+    if not rel:
+        return children
+    for part in rel.split(os.sep):
+        node = children.get(part)
+        if node is None or 'children' not in node:
+            if not create:
+                return None
+            node = children[part] = {'token_count': 0, 'children': {}}
+        children = node['children']
+    return children
+
+
+def _forget_prefix(snapshot: FolderSnapshot, rel: str) -> None:
+    """Drop stat records for `rel` and everything below it."""
+    prefix = rel + os.sep
+    for d in [d for d in snapshot.dirs if d == rel or d.startswith(prefix)]:
+        del snapshot.dirs[d]
+    for f in [f for f in snapshot.files if f == rel or f.startswith(prefix)]:
+        del snapshot.files[f]
+
+
+def _settle(children: Dict[str, Any], top: bool = False) -> int:
+    """Recompute directory token totals and drop directories left empty."""
+    total = 0
+    for name, node in list(children.items()):
+        if top and (name == '[external]' or name.startswith('_')):
+            continue
+        sub = node.get('children')
+        if sub is None:
+            tokens = node.get('token_count', 0)
+            if tokens > 0:
+                total += tokens
+            continue
+        node['token_count'] = _settle(sub)
+        if node['token_count'] <= 0 and not sub:
+            del children[name]
+        else:
+            total += node['token_count']
+    return total
+
+
+def revalidate(snapshot: FolderSnapshot, progress: Optional[Dict[str, Any]] = None) -> bool:
+    """Bring a loaded snapshot in line with the disk.
+
+    Directories whose mtime changed are re-listed with the same entry rules
+    as the full scan; newly appeared subdirectories are scanned.  Files in
+    every known directory are re-estimated only if their size changed.
+    `progress` is a scan-progress slot whose 'cancelled' flag aborts the
+    pass (returning False) and whose 'progress' field is kept current.
+    """
+    from app.utils.directory_util import (
+        classify_scan_entry, estimate_tokens_fast,
+        SLOW_SCAN_DIR_NAMES, MAX_ENTRIES_PER_DIR,
+    )
+    from app.utils.gitignore_parser import parse_gitignore_patterns
+
+    root = snapshot.root
+    should_ignore_fn = parse_gitignore_patterns(snapshot.ignored_patterns)
+    start = time.time()
+    stats = {'directories': 0, 'files': 0, 'relisted': 0}
+
+    def cancelled() -> bool:
+        return bool(progress is not None and progress.get('cancelled'))
+
+    def report():
+        if progress is not None:
+            progress['progress'] = {"directories": stats['directories'],
+                                    "files": stats['files'],
+                                    "elapsed": int(time.time() - start)}
+            progress['last_update'] = time.time()
+
+    def depth_of(rel: str) -> int:
+        return 1 if not rel else rel.count(os.sep) + 2
+
+    def set_file(children, name, rel, size):
+        if snapshot.files.get(rel) == size and name in children:
+            return
+        children[name] = {'token_count': estimate_tokens_fast(os.path.join(root, rel))}
+        snapshot.files[rel] = size
+
+    def listing(abs_path: str, hops: int):
+        """Yield (name, is_dir, entry_hops, DirEntry) the full scan would keep."""
+        try:
+            scanner = os.scandir(abs_path)
+        except OSError:
+            return
+        with scanner:
+            for i, de in enumerate(scanner):
+                if i >= MAX_ENTRIES_PER_DIR:
+                    break
+                if de.name.startswith('.'):
+                    continue
+                kind = classify_scan_entry(de, hops)
+                if kind is None:
+                    continue
+                is_dir, entry_hops = kind
+                if should_ignore_fn(de.path + os.sep if is_dir else de.path):
+                    continue
+                yield de.name, is_dir, entry_hops, de
+
+    visited: Set[str] = set()
+
+    def scan_new(rel: str, hops: int) -> Dict[str, Any]:
+        """Scan a directory that wasn't in the snapshot, recording its stats."""
+        abs_path = os.path.join(root, rel)
+        node = {'token_count': 0, 'children': {}}
+        depth = depth_of(rel)
+        if os.path.basename(rel) in SLOW_SCAN_DIR_NAMES or depth > snapshot.max_depth:
+            return node
+        try:
+            real = os.path.realpath(abs_path)
+            mtime = os.stat(abs_path).st_mtime_ns
+        except (OSError, ValueError):
+            return node
+        if real in visited:
+            return node
+        visited.add(real)
+        snapshot.dirs[rel] = [mtime, hops]
+        stats['directories'] += 1
+        for name, is_dir, entry_hops, de in listing(abs_path, hops):
+            child_rel = os.path.join(rel, name)
+            if is_dir:
+                if depth < snapshot.max_depth:
+                    node['children'][name] = scan_new(child_rel, entry_hops)
+            else:
+                try:
+                    set_file(node['children'], name, child_rel, de.stat().st_size)
+                    stats['files'] += 1
+                except OSError:
+                    continue
+        return node
+
+    # Shallow first, so a directory removed from its parent's listing is
+    # forgotten before its own (now missing) record would be visited.
+    for rel in sorted(snapshot.dirs, key=lambda d: (d.count(os.sep), d) if d else (-1, d)):
+        if rel not in snapshot.dirs:
+            continue
+        if cancelled():
+            return False
+        mtime, hops = snapshot.dirs[rel]
+        abs_path = os.path.join(root, rel) if rel else root
+        try:
+            current = os.stat(abs_path).st_mtime_ns
+        except OSError:
+            _forget_prefix(snapshot, rel)
+            parent = _children_at(snapshot.tree, os.path.dirname(rel), create=False)
+            if parent is not None:
+                parent.pop(os.path.basename(rel), None)
+            continue
+        stats['directories'] += 1
+        if stats['directories'] % 500 == 0:
+            report()
+
+        if current == mtime:
+            children = _children_at(snapshot.tree, rel, create=False)
+            if not children:
+                continue
+            for name, node in list(children.items()):
+                if 'children' in node:
+                    continue
+                child_rel = os.path.join(rel, name) if rel else name
+                try:
+                    set_file(children, name, child_rel, os.stat(os.path.join(root, child_rel)).st_size)
+                    stats['files'] += 1
+                except OSError:
+                    children.pop(name, None)
+                    snapshot.files.pop(child_rel, None)
+            continue
+
+        # Listing changed: diff it against the snapshot.
+        stats['relisted'] += 1
+        snapshot.dirs[rel] = [current, hops]
+        children = _children_at(snapshot.tree, rel, create=True)
+        depth = depth_of(rel)
+        seen = set()
+        for name, is_dir, entry_hops, de in listing(abs_path, hops):
+            child_rel = os.path.join(rel, name) if rel else name
+            if is_dir:
+                if depth >= snapshot.max_depth or name in SLOW_SCAN_DIR_NAMES:
+                    continue
+                seen.add(name)
+                if child_rel not in snapshot.dirs:
+                    children[name] = scan_new(child_rel, entry_hops)
+            else:
+                seen.add(name)
+                if child_rel in snapshot.dirs:
+                    _forget_prefix(snapshot, child_rel)
+                try:
+                    set_file(children, name, child_rel, de.stat().st_size)
+                    stats['files'] += 1
+                except OSError:
+                    seen.discard(name)
+        for name in list(children):
+            if name in seen or (not rel and (name == '[external]' or name.startswith('_'))):
+                continue
+            del children[name]
+            _forget_prefix(snapshot, os.path.join(rel, name) if rel else name)
+
+    _settle(snapshot.tree, top=True)
+    report()
+    logger.info(f"📂 Revalidated folder snapshot for {root}: {stats['directories']} dirs, "
+                f"{stats['relisted']} re-listed, in {time.time() - start:.1f}s")
+    return True
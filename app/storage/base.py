@@ -78,8 +78,11 @@ class BaseStorage(ABC, Generic[T]):
             logger.error(f"Error reading/decrypting {filepath}: {e}")
             return None
     
-    def _write_json(self, filepath: Path, data: dict) -> None:
-        """Write JSON file with optional ALE encryption and atomic write."""
+    def _write_json(self, filepath: Path, data: dict) -> bool:
+        """Write JSON file with optional ALE encryption and atomic write.
+
+        Returns False when the write was refused by the KEK guard below.
+        """
         filepath.parent.mkdir(parents=True, exist_ok=True)
 
         # Guard: never overwrite an encrypted file we can't decrypt.
@@ -97,7 +100,7 @@ class BaseStorage(ABC, Generic[T]):
                 logger.error(f"🔐 REFUSING write to {filepath}: existing file is encrypted "
                              f"but cannot be decrypted ({e}). Fix your KEK or restore from "
                              f"~/.ziya/keyring_backups/ before this file can be updated.")
-                return  # Silently skip — protecting the encrypted file
+                return False  # Silently skip — protecting the encrypted file
         
         # Determine data category from filepath for encryption policy
         category = self._infer_category(filepath)
@@ -119,6 +122,7 @@ class BaseStorage(ABC, Generic[T]):
                 temp_path.write_bytes(plaintext)
 
             temp_path.rename(filepath)
+            return True
         except Exception as e:
             # Clean up temp file on error
             if temp_path.exists():
@@ -0,0 +1,322 @@
+"""
+Append-only message-log format for chat files.
+
+The default chat format is one JSON document per chat, rewritten in full by
+``BaseStorage._write_json`` on every save: the whole history is re-serialised
+with ``indent=2``, run through ``_sanitize_surrogates``, re-encrypted, and the
+existing file is first read and decrypted for the KEK guard.  On 100-turn
+conversations each turn costs megabytes of CPU and I/O.
+
+With ``ZIYA_CHAT_LOG_FORMAT`` enabled, ``ChatStorage`` instead keeps each
+chat as a log of records at the same path (``<chat_id>.json``)::
+
+    ZIYA-CHATLOG/1
+    {"i": 0, "m": {...message 0...}}
+    ...
+    {"i": 11, "m": {...message 11...}}
+    {"h": {...every chat field except messages...}, "n": 12}
+    {"i": 12, "m": {...new message...}}
+    {"h": {...updated lastActiveAt/_version...}, "n": 13}
+
+Replay applies records in order: a message record sets the message at index
+``i``; a header record replaces the top-level fields and truncates the
+message list to ``n``.  A save diffs the incoming dict against the
+fingerprints of what is already on disk and appends only the changed
+messages plus a header when needed, so a turn write is proportional to the
+new message.  When dead records outweigh live ones the log is compacted by
+an atomic full rewrite.
+
+Encryption: every record line is sealed individually under the same
+``get_encryptor()`` category policy as whole-file chats (``!`` + base64 of
+the ALE envelope), so records can be appended without re-encrypting the
+file.  A log we can't replay (KEK missing/changed) is never appended to —
+the same guarantee as the ``_write_json`` KEK guard.
+
+Compatibility: existing JSON chats stay readable and are migrated lazily on
+their next write.  ``decode_chat_bytes`` understands both formats and is
+what every raw chat-file reader goes through.  Disabling the flag migrates
+chats back to plain JSON on their next write.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.logging_utils import logger
+
+LOG_MAGIC = b"ZIYA-CHATLOG/1\n"
+_ENCRYPTED_PREFIX = b"!"
+
+# Compact once the log holds more than twice the records a fresh rewrite
+# would (one header + one record per message), plus this much slack so
+# short chats aren't rewritten every few turns.
+COMPACT_SLACK = 64
+
+
+def is_enabled() -> bool:
+    """Whether new chat writes should use the log format."""
+    from app.config.env_registry import ziya_env
+    return bool(ziya_env("ZIYA_CHAT_LOG_FORMAT"))
+
+
+def is_chat_log(raw: bytes) -> bool:
+    """Return True if *raw* is a chat log (as opposed to a JSON document)."""
+    return raw[:len(LOG_MAGIC)] == LOG_MAGIC
+
+
+def has_log_header(filepath: Path) -> bool:
+    """Check the first bytes of *filepath* without reading the whole file."""
+    try:
+        with open(filepath, "rb") as f:
+            return is_chat_log(f.read(len(LOG_MAGIC)))
+    except OSError:
+        return False
+
+
+def _fingerprint(obj) -> bytes:
+    """Stable digest of one record payload, used to diff saves."""
+    text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+@dataclass
+class _LogState:
+    """What a chat log on disk currently replays to, in fingerprint form."""
+    mtime_ns: int
+    size: int
+    header_fp: bytes
+    message_fps: List[bytes] = field(default_factory=list)
+    n_records: int = 0
+
+
+def _decode_record(line: bytes) -> dict:
+    if line.startswith(_ENCRYPTED_PREFIX):
+        from app.utils.encryption import get_encryptor
+        line = get_encryptor().decrypt(base64.b64decode(line[len(_ENCRYPTED_PREFIX):]))
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("chat log record is not an object")
+    return record
+
+
+def _encode_record(record: dict, category: str) -> bytes:
+    from app.storage.base import _sanitize_surrogates
+    from app.utils.encryption import get_encryptor
+    payload = json.dumps(
+        _sanitize_surrogates(record), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    encryptor = get_encryptor()
+    if encryptor.is_enabled(category):
+        payload = _ENCRYPTED_PREFIX + base64.b64encode(encryptor.encrypt(payload, category))
+    return payload + b"\n"
+
+
+def replay(raw: bytes) -> Tuple[dict, _LogState]:
+    """Rebuild the chat dict from a log, plus the fingerprints of its state.
+
+    A trailing line without a newline is a torn append from a crash and is
+    ignored; any other undecodable record raises.
+    """
+    body = raw[len(LOG_MAGIC):]
+    lines = body.split(b"\n")
+    if lines and lines[-1] != b"":
+        logger.warning("chat_log: ignoring torn trailing record")
+    lines = lines[:-1]
+
+    header: Optional[dict] = None
+    messages: List[dict] = []
+    n_records = 0
+    for line in lines:
+        if not line:
+            continue
+        record = _decode_record(line)
+        n_records += 1
+        if "h" in record:
+            header = record["h"]
+            del messages[int(record.get("n", len(messages))):]
+        elif "i" in record:
+            index = int(record["i"])
+            if index < len(messages):
+                messages[index] = record["m"]
+            elif index == len(messages):
+                messages.append(record["m"])
+            else:
+                raise ValueError(f"chat log record index {index} skips past {len(messages)}")
+    if header is None:
+        raise ValueError("chat log has no header record")
+
+    data = dict(header)
+    data["messages"] = messages
+    state = _LogState(
+        mtime_ns=0, size=0,
+        header_fp=_fingerprint(header),
+        message_fps=[_fingerprint(m) for m in messages],
+        n_records=n_records,
+    )
+    return data, state
+
+
+def decode_chat_bytes(raw: bytes) -> dict:
+    """Decode a chat file's bytes in either format (log or ALE/plain JSON)."""
+    if is_chat_log(raw):
+        return replay(raw)[0]
+    from app.utils.encryption import is_encrypted, get_encryptor
+    if is_encrypted(raw):
+        raw = get_encryptor().decrypt(raw)
+    return json.loads(raw)
+
+
+# Replayed state per chat path, validated by (mtime_ns, size) so writes by
+# other processes force a fresh replay.  Entries are a few dozen bytes per
+# message.
+_states: Dict[str, _LogState] = {}
+_path_locks: Dict[str, threading.Lock] = {}
+_path_locks_guard = threading.Lock()
+
+
+def _lock_for(path_str: str) -> threading.Lock:
+    with _path_locks_guard:
+        lock = _path_locks.get(path_str)
+        if lock is None:
+            lock = _path_locks[path_str] = threading.Lock()
+        return lock
+
+
+def _stamp(state: _LogState, filepath: Path) -> None:
+    st = filepath.stat()
+    state.mtime_ns = st.st_mtime_ns
+    state.size = st.st_size
+
+
+def read_chat_log(filepath: Path) -> dict:
+    """Replay a chat log file, caching its state for the next append."""
+    path_str = str(filepath)
+    with _lock_for(path_str):
+        raw = filepath.read_bytes()
+        data, state = replay(raw)
+        _stamp(state, filepath)
+        # Only trust the state for appends if it describes exactly these
+        # bytes and they don't end in a torn record.
+        if state.size == len(raw) and raw.endswith(b"\n"):
+            _states[path_str] = state
+        return data
+
+
+def _current_state(filepath: Path) -> Optional[_LogState]:
+    """Return the on-disk log state, or None when a full rewrite is needed.
+
+    Raises if the existing file can't be read back (undecryptable log or
+    ALE-encrypted JSON), so the caller refuses the write.
+    """
+    path_str = str(filepath)
+    try:
+        st = filepath.stat()
+    except FileNotFoundError:
+        return None
+    state = _states.get(path_str)
+    if state is not None and state.mtime_ns == st.st_mtime_ns and state.size == st.st_size:
+        return state
+
+    raw = filepath.read_bytes()
+    if not is_chat_log(raw):
+        # Legacy JSON document: same KEK guard as BaseStorage._write_json,
+        # then migrate by rewriting it as a log.
+        from app.utils.encryption import is_encrypted, get_encryptor
+        if is_encrypted(raw):
+            get_encryptor().decrypt(raw)
+        return None
+    _data, state = replay(raw)
+    if not raw.endswith(b"\n"):
+        # Torn trailing record — appending would splice onto it.
+        return None
+    state.mtime_ns, state.size = st.st_mtime_ns, st.st_size
+    return state
+
+
+def _rewrite(filepath: Path, header: dict, messages: list, category: str) -> _LogState:
+    """Atomically replace *filepath* with a compact log of the given state."""
+    n = len(messages)
+    chunks = [LOG_MAGIC]
+    chunks.extend(_encode_record({"i": i, "m": m}, category) for i, m in enumerate(messages))
+    chunks.append(_encode_record({"h": header, "n": n}, category))
+    temp_path = filepath.with_suffix(".tmp")
+    try:
+        temp_path.write_bytes(b"".join(chunks))
+        temp_path.rename(filepath)
+    except Exception:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+    state = _LogState(
+        mtime_ns=0, size=0,
+        header_fp=_fingerprint(header),
+        message_fps=[_fingerprint(m) for m in messages],
+        n_records=n + 1,
+    )
+    _stamp(state, filepath)
+    return state
+
+
+def write_chat_log(filepath: Path, data: dict, category: str) -> bool:
+    """Persist *data* as a chat log, appending only what changed.
+
+    Returns False (and writes nothing) when the existing file can't be
+    decrypted — mirroring the ``_write_json`` KEK guard.
+    """
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    path_str = str(filepath)
+    header = {k: v for k, v in data.items() if k != "messages"}
+    messages = data.get("messages") or []
+    if not isinstance(messages, list):
+        messages = []
+
+    with _lock_for(path_str):
+        try:
+            state = _current_state(filepath)
+        except Exception as e:
+            logger.error(f"🔐 REFUSING write to {filepath}: existing chat cannot be read back "
+                         f"({e}). Fix your KEK or restore from ~/.ziya/keyring_backups/ "
+                         f"before this file can be updated.")
+            _states.pop(path_str, None)
+            return False
+
+        if state is None:
+            _states[path_str] = _rewrite(filepath, header, messages, category)
+            return True
+
+        message_fps = [_fingerprint(m) for m in messages]
+        header_fp = _fingerprint(header)
+        old_fps = state.message_fps
+        records = [
+            {"i": i, "m": m}
+            for i, m in enumerate(messages)
+            if i >= len(old_fps) or message_fps[i] != old_fps[i]
+        ]
+        if header_fp != state.header_fp or len(messages) != len(old_fps):
+            records.append({"h": header, "n": len(messages)})
+        if not records:
+            return True
+        live_records = len(messages) + 1
+        if state.n_records + len(records) > 2 * live_records + COMPACT_SLACK:
+            _states[path_str] = _rewrite(filepath, header, messages, category)
+            return True
+
+        payload = b"".join(_encode_record(r, category) for r in records)
+        with open(filepath, "ab") as f:
+            f.write(payload)
+        state.message_fps = message_fps
+        state.header_fp = header_fp
+        state.n_records += len(records)
+        _stamp(state, filepath)
+        _states[path_str] = state
+        return True
+
+
+def forget(filepath: Path) -> None:
+    """Drop cached state for a deleted chat file."""
+    _states.pop(str(filepath), None)
@@ -2,11 +2,16 @@
 Server-side chat search.
 
 Chats are stored as per-project JSON files on disk (``<ziya_home>/projects/
-<pid>/chats/*.json``), optionally ALE-encrypted.  Search scans those files,
-but it does so **once on the server, one file at a time**, instead of shipping
-every message body of every conversation to the browser and scanning in JS.
-Peak memory is a single chat record: each file is read, matched, and released
-before the next is opened.
+<pid>/chats/*.json``), optionally ALE-encrypted.  Search runs **once on the
+server** instead of shipping every message body of every conversation to the
+browser and scanning in JS.
+
+Candidate chats come from the persistent per-project inverted index in
+``chat_search_index``; only chats whose postings cover every query term are
+opened, and only their candidate messages are scanned for snippets.  Queries
+the index can't serve (no word characters) and projects whose index fails to
+load fall back to scanning the files one at a time, so peak memory is still a
+single chat record.
 
 The response shape mirrors the frontend ``SearchResult[]`` contract
 (see frontend/src/utils/types.ts) so the client can swap its local IndexedDB
@@ -23,7 +28,7 @@ Read-only: this module never mutates or deletes files.  Inactive chats
 import json
 import time
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Set
 
 from app.utils.logging_utils import logger
 
@@ -100,10 +105,8 @@ def _read_chat_data(chat_file: Path) -> Optional[dict]:
         raw = chat_file.read_bytes()
         if not raw:
             return None
-        from app.utils.encryption import is_encrypted, get_encryptor
-        if is_encrypted(raw):
-            raw = get_encryptor().decrypt(raw)
-        data = json.loads(raw)
+        from app.storage.chat_log import decode_chat_bytes
+        data = decode_chat_bytes(raw)
         return data if isinstance(data, dict) else None
     except Exception as exc:
         logger.debug(f"chat_search: skipping {chat_file}: {exc}")
@@ -111,8 +114,13 @@ def _read_chat_data(chat_file: Path) -> Optional[dict]:
 
 
 def _search_one_chat(data: dict, project_id: str, search_term: str,
-                     case_sensitive: bool, max_snippet_length: int) -> Optional[dict]:
-    """Search a single chat dict; return a SearchResult dict or None."""
+                     case_sensitive: bool, max_snippet_length: int,
+                     message_indices: Optional[Set[int]] = None) -> Optional[dict]:
+    """Search a single chat dict; return a SearchResult dict or None.
+
+    ``message_indices`` restricts the scan to the index's candidate
+    messages; ``None`` scans every message.
+    """
     if data.get("isActive") is False:
         return None
 
@@ -125,6 +133,8 @@ def _search_one_chat(data: dict, project_id: str, search_term: str,
     messages = data.get("messages") or []
     if isinstance(messages, list):
         for index, msg in enumerate(messages):
+            if message_indices is not None and index not in message_indices:
+                continue
             if not isinstance(msg, dict):
                 continue
             content_str = _to_searchable_text(msg.get("content"))
@@ -166,14 +176,64 @@ def _iter_chat_files(chats_dir: Path):
         yield chat_file
 
 
+def _search_project_indexed(chats_dir: Path, project_id: str, search_term: str,
+                            query_terms: List[str], case_sensitive: bool,
+                            max_snippet_length: int, results: List[dict],
+                            seen_ids: set) -> int:
+    """Search one project through its inverted index, appending to *results*.
+
+    Title matches are answered from the index metadata; only chats with
+    candidate messages are opened.  Returns the number of chat files read
+    (revalidation plus snippet reads).
+    """
+    from app.storage.chat_search_index import get_index
+
+    index = get_index(chats_dir)
+    with index.lock:
+        n_read = index.refresh()
+        candidates = index.candidates(query_terms)
+        docs = {stem: dict(entry) for stem, entry in index.docs.items()}
+        try:
+            index.save()
+        except Exception as exc:
+            logger.warning(f"chat_search: failed to persist index for {project_id}: {exc}")
+
+    for stem, entry in docs.items():
+        chat_id = entry.get("id")
+        if not chat_id or chat_id in seen_ids or entry.get("isActive") is False:
+            continue
+        message_indices = candidates.get(stem)
+        if message_indices:
+            data = _read_chat_data(chats_dir / f"{stem}.json")
+            n_read += 1
+            if not data or data.get("id") != chat_id:
+                continue
+        else:
+            title = entry.get("title") or ""
+            if search_term not in (title if case_sensitive else title.lower()):
+                continue
+            # Title-only hit: the index metadata carries every field the
+            # result needs, so the chat body is never opened.
+            data = {**entry, "messages": []}
+        result = _search_one_chat(
+            data, project_id, search_term, case_sensitive, max_snippet_length,
+            message_indices=message_indices,
+        )
+        if result:
+            seen_ids.add(chat_id)
+            results.append(result)
+    return n_read
+
+
 def search_chats(ziya_home: Path, project_id: str, query: str,
                  all_projects: bool = False, case_sensitive: bool = False,
                  max_snippet_length: int = 150) -> List[dict]:
-    """Scan chat files for *query* and return SearchResult dicts.
+    """Search chats for *query* and return SearchResult dicts.
 
-    Streams one file at a time so peak memory is a single chat record
-    regardless of history size.  ``all_projects=False`` scans strictly the
-    requested project; ``True`` scans every project directory.
+    Each project is served from its inverted index when the query has word
+    terms, otherwise its files are streamed one at a time.
+    ``all_projects=False`` searches strictly the requested project; ``True``
+    searches every project directory.
     """
     if not query or not query.strip():
         return []
@@ -184,6 +244,9 @@ def search_chats(ziya_home: Path, project_id: str, query: str,
     if not projects_dir.exists():
         return []
 
+    from app.storage.chat_search_index import extract_terms
+    query_terms = extract_terms(query)
+
     results: List[dict] = []
     seen_ids = set()
     n_files = 0
@@ -194,7 +257,18 @@ def search_chats(ziya_home: Path, project_id: str, query: str,
         if not all_projects and proj_dir.name != project_id:
             continue
 
-        for chat_file in _iter_chat_files(proj_dir / "chats"):
+        chats_dir = proj_dir / "chats"
+        if query_terms:
+            try:
+                n_files += _search_project_indexed(
+                    chats_dir, proj_dir.name, search_term, query_terms,
+                    case_sensitive, max_snippet_length, results, seen_ids,
+                )
+                continue
+            except Exception as exc:
+                logger.warning(f"chat_search: index unavailable for {proj_dir.name}, scanning: {exc}")
+
+        for chat_file in _iter_chat_files(chats_dir):
             data = _read_chat_data(chat_file)
             if not data:
                 continue
@@ -213,7 +287,7 @@ def search_chats(ziya_home: Path, project_id: str, query: str,
     results.sort(key=lambda r: (r["totalMatches"], r["lastAccessedAt"]), reverse=True)
     logger.debug(
         f"search_chats[{project_id[:8]}] q={query!r} all={all_projects}: "
-        f"{len(results)} hits over {n_files} files in "
+        f"{len(results)} hits, {n_files} files read in "
         f"{(time.perf_counter()-t0)*1000:.0f}ms"
     )
     return results
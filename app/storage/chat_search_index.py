@@ -0,0 +1,342 @@
+"""
+Persistent per-project inverted index for server-side chat search.
+
+``chat_search.search_chats`` used to read, decrypt and JSON-parse every chat
+file of every project on each query.  This module keeps one inverted index per
+project (``<project>/chats/_search_index.json``) mapping lower-cased word
+terms to the chats and message indices that contain them, so a query only
+touches postings plus the handful of chats it needs for snippets.
+
+Layout on disk (compact JSON, ALE-encrypted under the same
+``conversation_data`` category policy as the chat files themselves)::
+
+    {
+      "version": 1,
+      "next_doc": 7,
+      "docs": {"<file stem>": {"doc": 3, "mtime_ns": ..., "size": ...,
+                             "title": ..., "isActive": ..., ...}},
+      "postings": {"outlook": {"3": [0, 4], "5": [2]}}
+    }
+
+Freshness:
+  * Every query revalidates the index against the chat files' (mtime_ns,
+    size) — a stat per chat, no reads — and re-indexes only what changed.
+    Files written by anything outside ``ChatStorage`` are therefore picked
+    up on the next search.
+  * ``ChatStorage`` calls :func:`on_chat_written` / :func:`on_chat_deleted`
+    after each write, which updates an already-loaded index in place from
+    the dict it just wrote (no re-read).  Projects nobody has searched yet
+    pay nothing on the write path.
+  * Dirty indexes are persisted at the end of the next query.
+
+Matching is a candidate filter, not the final word: query terms are matched
+as substrings of indexed terms, which is a superset of the chats whose text
+contains the query, and ``chat_search`` verifies every candidate against the
+real message text before building snippets.  Matching terms are found through
+a trigram side index (trigram -> vocabulary terms containing it, derived on
+load): a query term of three or more characters is checked only against the
+terms sharing its rarest trigram, and only shorter query terms scan the whole
+vocabulary.  Queries with no word characters can't be served by the index and
+fall back to the full scan.
+
+Thread-safety: one lock per project index; writers and queries both take it.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from app.utils.logging_utils import logger
+
+from .chat_search import _iter_chat_files, _read_chat_data, _to_searchable_text
+
+INDEX_FILENAME = "_search_index.json"
+INDEX_VERSION = 1
+_ENCRYPTION_CATEGORY = "conversation_data"
+
+_TERM_RE = re.compile(r"\w+")
+
+# Length of the n-grams in the side index used to find matching terms.
+_GRAM = 3
+
+# Per-doc metadata kept in the index so title-only hits never open the chat.
+_META_FIELDS = ("id", "title", "isActive", "folderId", "groupId", "projectId",
+                "lastAccessedAt", "lastActiveAt")
+
+
+def extract_terms(text: str) -> List[str]:
+    """Split *text* into lower-cased word terms (the index vocabulary)."""
+    if not text:
+        return []
+    return _TERM_RE.findall(text.lower())
+
+
+def _grams(term: str) -> Set[str]:
+    return {term[i:i + _GRAM] for i in range(len(term) - _GRAM + 1)}
+
+
+class ProjectSearchIndex:
+    """Inverted index over one project's ``chats`` directory."""
+
+    def __init__(self, chats_dir: Path):
+        self.chats_dir = chats_dir
+        self.path = chats_dir / INDEX_FILENAME
+        self.lock = threading.RLock()
+        # chat file stem -> {"doc": n, "mtime_ns", "size", <_META_FIELDS>}
+        self.docs: Dict[str, dict] = {}
+        # term -> doc number -> ascending message indices
+        self.postings: Dict[str, Dict[int, List[int]]] = {}
+        # doc number -> terms it contributes (derived, not persisted)
+        self._doc_terms: Dict[int, Set[str]] = {}
+        # trigram -> vocabulary terms containing it (derived, not persisted)
+        self._gram_terms: Dict[str, Set[str]] = {}
+        self.next_doc = 0
+        self.dirty = False
+
+    # ── persistence ────────────────────────────────────────────────
+
+    def load(self) -> None:
+        """Load the on-disk index, starting empty if it is missing or unreadable."""
+        if not self.path.exists():
+            return
+        try:
+            raw = self.path.read_bytes()
+            from app.utils.encryption import is_encrypted, get_encryptor
+            if is_encrypted(raw):
+                raw = get_encryptor().decrypt(raw)
+            data = json.loads(raw)
+            if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+                logger.info(f"chat_search_index: discarding incompatible index {self.path}")
+                self.dirty = True
+                return
+            self.next_doc = int(data.get("next_doc") or 0)
+            self.docs = data.get("docs") or {}
+            for term, plist in (data.get("postings") or {}).items():
+                converted = {int(d): idxs for d, idxs in plist.items()}
+                self.postings[term] = converted
+                self._add_term(term)
+                for doc in converted:
+                    self._doc_terms.setdefault(doc, set()).add(term)
+        except Exception as e:
+            logger.warning(f"chat_search_index: rebuilding unreadable index {self.path}: {e}")
+            self.docs = {}
+            self.postings = {}
+            self._doc_terms = {}
+            self._gram_terms = {}
+            self.next_doc = 0
+            self.dirty = True
+
+    def save(self) -> None:
+        """Atomically persist the index if it changed since the last save."""
+        if not self.dirty:
+            return
+        payload = {
+            "version": INDEX_VERSION,
+            "next_doc": self.next_doc,
+            "docs": self.docs,
+            "postings": {
+                term: {str(d): idxs for d, idxs in plist.items()}
+                for term, plist in self.postings.items()
+            },
+        }
+        plaintext = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        from app.utils.encryption import get_encryptor
+        encryptor = get_encryptor()
+        if encryptor.is_enabled(_ENCRYPTION_CATEGORY):
+            plaintext = encryptor.encrypt(plaintext, _ENCRYPTION_CATEGORY)
+        temp_path = self.path.with_suffix(".tmp")
+        try:
+            temp_path.write_bytes(plaintext)
+            os.replace(temp_path, self.path)
+        except Exception:
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
+        self.dirty = False
+
+    # ── maintenance ────────────────────────────────────────────────
+
+    def _add_term(self, term: str) -> None:
+        for gram in _grams(term):
+            self._gram_terms.setdefault(gram, set()).add(term)
+
+    def _drop_term(self, term: str) -> None:
+        for gram in _grams(term):
+            terms = self._gram_terms.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._gram_terms[gram]
+
+    def remove(self, chat_id: str) -> None:
+        """Drop a chat and all of its postings."""
+        entry = self.docs.pop(chat_id, None)
+        if entry is None:
+            return
+        doc = entry["doc"]
+        for term in self._doc_terms.pop(doc, ()):
+            plist = self.postings.get(term)
+            if plist is None:
+                continue
+            plist.pop(doc, None)
+            if not plist:
+                del self.postings[term]
+                self._drop_term(term)
+        self.dirty = True
+
+    def add(self, chat_id: str, data: dict, mtime_ns: int, size: int) -> None:
+        """(Re-)index *data* as the current content of *chat_id*."""
+        self.remove(chat_id)
+        doc = self.next_doc
+        self.next_doc += 1
+
+        per_term: Dict[str, List[int]] = {}
+        messages = data.get("messages") or []
+        if isinstance(messages, list):
+            for index, msg in enumerate(messages):
+                if not isinstance(msg, dict):
+                    continue
+                for term in set(extract_terms(_to_searchable_text(msg.get("content")))):
+                    per_term.setdefault(term, []).append(index)
+
+        for term, idxs in per_term.items():
+            plist = self.postings.get(term)
+            if plist is None:
+                plist = self.postings[term] = {}
+                self._add_term(term)
+            plist[doc] = idxs
+        self._doc_terms[doc] = set(per_term)
+
+        entry = {"doc": doc, "mtime_ns": mtime_ns, "size": size}
+        for field in _META_FIELDS:
+            value = data.get(field)
+            if value is not None:
+                entry[field] = value
+        if not isinstance(entry.get("title"), str):
+            entry["title"] = ""
+        self.docs[chat_id] = entry
+        self.dirty = True
+
+    def refresh(self) -> int:
+        """Revalidate against the chat files; re-index anything that changed.
+
+        Returns the number of chat files that had to be read.
+        """
+        n_read = 0
+        seen: Set[str] = set()
+        for chat_file in _iter_chat_files(self.chats_dir):
+            chat_id = chat_file.stem
+            try:
+                st = chat_file.stat()
+            except OSError:
+                continue
+            seen.add(chat_id)
+            entry = self.docs.get(chat_id)
+            if entry and entry.get("mtime_ns") == st.st_mtime_ns and entry.get("size") == st.st_size:
+                continue
+            n_read += 1
+            data = _read_chat_data(chat_file)
+            if not data or not data.get("id"):
+                self.remove(chat_id)
+                continue
+            self.add(chat_id, data, st.st_mtime_ns, st.st_size)
+        for chat_id in [c for c in self.docs if c not in seen]:
+            self.remove(chat_id)
+        return n_read
+
+    # ── queries ────────────────────────────────────────────────────
+
+    def matching_terms(self, query_term: str) -> List[str]:
+        """Indexed terms containing *query_term*."""
+        if len(query_term) < _GRAM:
+            return [term for term in self.postings if query_term in term]
+        rarest = min((self._gram_terms.get(g, ()) for g in _grams(query_term)), key=len)
+        return [term for term in rarest if query_term in term]
+
+    def candidates(self, query_terms: List[str]) -> Dict[str, Set[int]]:
+        """Return file stem -> message indices that may contain every query term.
+
+        Each query term matches any indexed term containing it, so partial
+        words at either end of the query still find their messages.
+        """
+        doc_to_chat = {entry["doc"]: chat_id for chat_id, entry in self.docs.items()}
+        result: Optional[Dict[int, Set[int]]] = None
+        for qt in dict.fromkeys(query_terms):
+            hits: Dict[int, Set[int]] = {}
+            for term in self.matching_terms(qt):
+                for doc, idxs in self.postings[term].items():
+                    hits.setdefault(doc, set()).update(idxs)
+            if result is None:
+                result = hits
+            else:
+                result = {
+                    doc: result[doc] & idxs
+                    for doc, idxs in hits.items()
+                    if doc in result and result[doc] & idxs
+                }
+            if not result:
+                return {}
+        return {doc_to_chat[doc]: idxs for doc, idxs in (result or {}).items()
+                if doc in doc_to_chat}
+
+
+# chats_dir (str) -> loaded index.  Only projects that have been searched
+# in this process are resident; the write hooks ignore the rest.
+_indexes: Dict[str, ProjectSearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(chats_dir: Path) -> ProjectSearchIndex:
+    """Return the loaded index for *chats_dir*, loading it on first use.
+
+    Callers must hold ``index.lock`` while refreshing or querying it.
+    """
+    key = str(chats_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = ProjectSearchIndex(chats_dir)
+            index.load()
+            _indexes[key] = index
+        return index
+
+
+def on_chat_written(chats_dir: Path, chat_file: Path, data: dict) -> None:
+    """Re-index a chat from the dict ``ChatStorage`` just wrote.
+
+    No-op unless the project's index is already resident; otherwise the
+    next query's mtime/size revalidation picks the change up.
+    """
+    index = _indexes.get(str(chats_dir))
+    if index is None:
+        return
+    chat_id = chat_file.stem
+    with index.lock:
+        try:
+            st = chat_file.stat()
+        except OSError:
+            index.remove(chat_id)
+            return
+        if not isinstance(data, dict) or not data.get("id"):
+            index.remove(chat_id)
+            return
+        index.add(chat_id, data, st.st_mtime_ns, st.st_size)
+
+
+def on_chat_deleted(chats_dir: Path, chat_id: str) -> None:
+    """Drop a deleted chat from a resident index."""
+    index = _indexes.get(str(chats_dir))
+    if index is None:
+        return
+    with index.lock:
+        index.remove(chat_id)
+
+
+def invalidate() -> None:
+    """Forget all resident indexes (the on-disk files are revalidated on reload)."""
+    with _indexes_lock:
+        _indexes.clear()
@@ -0,0 +1,293 @@
+"""
+Per-project chat-summary sidecar.
+
+``ChatStorage.list_summaries`` and the cross-project global scan only need a
+handful of fields per chat (title, group, timestamps, counts), but without a
+sidecar they have to read, decrypt and parse each multi-megabyte chat file the
+first time it is seen in a process, or after it changes.  A cold start over
+850+ chats therefore re-read the entire history just to draw the sidebar.
+
+This module keeps one compact manifest per project
+(``<project>/chats/_summaries.json``) holding a summary record per chat,
+stored column-wise so field names aren't repeated per row::
+
+    {"version": 1,
+     "columns": {"stem": [...], "mtime_ns": [...], "size": [...],
+                 "id": [...], "title": [...], "groupId": [...], ...}}
+
+Each record carries the chat file's (mtime_ns, size) at the time it was
+built; readers stat the chat file and only trust a record whose stat still
+matches, so files changed by another process or written outside
+``ChatStorage`` self-heal on the next listing.  ``ChatStorage._write_json``
+refreshes the record from the dict it just wrote and marks the manifest
+dirty; a write-behind flush rewrites it atomically (temp file + rename) a few
+seconds later, and at exit, so a busy conversation doesn't rewrite the whole
+manifest per message.  The list endpoints cost O(chats) bytes instead of
+O(total history bytes).
+
+The manifest is ALE-encrypted under the same ``conversation_data`` policy as
+the chats it summarises (titles are conversation content).
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from app.utils.logging_utils import logger
+
+from .beads import count_open_beads_for_conversation
+from ..models.chat import ChatSummary
+from ..models.work_item import count_open_work_items
+
+MANIFEST_FILENAME = "_summaries.json"
+MANIFEST_VERSION = 1
+_ENCRYPTION_CATEGORY = "conversation_data"
+_WRITE_BEHIND_DELAY_SECONDS = 5.0
+
+# Column order of the on-disk manifest.  The first three are bookkeeping;
+# the rest are the summary fields themselves.
+COLUMNS = (
+    "stem", "mtime_ns", "size",
+    "id", "title", "groupId", "contextIds", "skillIds", "additionalFiles",
+    "messageCount", "createdAt", "lastActiveAt", "delegateMeta",
+    "openBeadCount", "openWorkItemCount", "_version", "isGlobal", "projectId",
+)
+_SUMMARY_FIELDS = COLUMNS[3:]
+
+
+def summary_record(data: dict) -> dict:
+    """Build the summary fields for a raw chat dict (no file bookkeeping)."""
+    messages = data.get("messages") or []
+    return {
+        "id": data.get("id"),
+        "title": data.get("title") or "",
+        "groupId": data.get("groupId"),
+        "contextIds": data.get("contextIds") or [],
+        "skillIds": data.get("skillIds") or [],
+        "additionalFiles": data.get("additionalFiles") or [],
+        "messageCount": len(messages) if isinstance(messages, list) else 0,
+        "createdAt": data.get("createdAt") or 0,
+        "lastActiveAt": data.get("lastActiveAt") or 0,
+        "delegateMeta": data.get("delegateMeta"),
+        "openBeadCount": count_open_beads_for_conversation(data, data.get("id")),
+        "openWorkItemCount": count_open_work_items(data.get("_work_items")),
+        "_version": data.get("_version") or data.get("lastActiveAt"),
+        "isGlobal": bool(data.get("isGlobal")),
+        "projectId": data.get("projectId"),
+    }
+
+
+def record_to_summary(record: dict, **extra) -> ChatSummary:
+    """Materialise a ``ChatSummary`` from a manifest record.
+
+    *extra* is passed through as additional (``extra="allow"``) fields —
+    the global scan uses it to stamp ``projectId`` / ``isGlobal``.
+    """
+    version = record.get("_version")
+    return ChatSummary(
+        id=record["id"],
+        title=record.get("title") or "",
+        groupId=record.get("groupId"),
+        contextIds=record.get("contextIds") or [],
+        skillIds=record.get("skillIds") or [],
+        additionalFiles=record.get("additionalFiles") or [],
+        messageCount=record.get("messageCount") or 0,
+        createdAt=record.get("createdAt") or 0,
+        lastActiveAt=record.get("lastActiveAt") or 0,
+        delegateMeta=record.get("delegateMeta"),
+        openBeadCount=record.get("openBeadCount") or 0,
+        openWorkItemCount=record.get("openWorkItemCount") or 0,
+        **({"_version": version} if version else {}),
+        **extra,
+    )
+
+
+class SummaryManifest:
+    """The summary sidecar for one project's ``chats`` directory."""
+
+    def __init__(self, chats_dir: Path):
+        self.chats_dir = chats_dir
+        self.path = chats_dir / MANIFEST_FILENAME
+        self.lock = threading.RLock()
+        # chat file stem -> record (summary fields + mtime_ns/size)
+        self.records: Dict[str, dict] = {}
+        self.dirty = False
+        # (mtime_ns, size) of the manifest file as last loaded/saved, so a
+        # manifest rewritten by another process is picked up on next use.
+        self._file_sig: Optional[tuple] = None
+
+    def _current_sig(self) -> Optional[tuple]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def reload_if_changed(self) -> None:
+        """(Re)load from disk if the manifest file changed underneath us."""
+        sig = self._current_sig()
+        if sig == self._file_sig:
+            return
+        self._file_sig = sig
+        self.records = {}
+        if sig is None:
+            return
+        try:
+            raw = self.path.read_bytes()
+            from app.utils.encryption import is_encrypted, get_encryptor
+            if is_encrypted(raw):
+                raw = get_encryptor().decrypt(raw)
+            data = json.loads(raw)
+            if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+                logger.info(f"chat_summaries: discarding incompatible manifest {self.path}")
+                return
+            columns = data.get("columns") or {}
+            names = [c for c in COLUMNS if c in columns]
+            for row in zip(*(columns[c] for c in names)):
+                record = dict(zip(names, row))
+                self.records[record["stem"]] = record
+        except Exception as e:
+            logger.warning(f"chat_summaries: ignoring unreadable manifest {self.path}: {e}")
+            self.records = {}
+
+    def save(self) -> None:
+        """Atomically rewrite the manifest if any record changed."""
+        if not self.dirty:
+            return
+        rows = list(self.records.values())
+        payload = {
+            "version": MANIFEST_VERSION,
+            "columns": {c: [r.get(c) for r in rows] for c in COLUMNS},
+        }
+        plaintext = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        from app.utils.encryption import get_encryptor
+        encryptor = get_encryptor()
+        if encryptor.is_enabled(_ENCRYPTION_CATEGORY):
+            plaintext = encryptor.encrypt(plaintext, _ENCRYPTION_CATEGORY)
+        temp_path = self.path.with_suffix(".tmp")
+        try:
+            temp_path.write_bytes(plaintext)
+            os.replace(temp_path, self.path)
+        except Exception:
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
+        self.dirty = False
+        self._file_sig = self._current_sig()
+
+    def get_fresh(self, stem: str, st: os.stat_result) -> Optional[dict]:
+        """Return the record for *stem* if it matches the chat file's stat."""
+        record = self.records.get(stem)
+        if record is None:
+            return None
+        if record.get("mtime_ns") != st.st_mtime_ns or record.get("size") != st.st_size:
+            return None
+        return record
+
+    def put(self, stem: str, st: os.stat_result, fields: dict) -> dict:
+        """Store summary *fields* for *stem*, stamped with the file's stat."""
+        record = {"stem": stem, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+        record.update({k: fields.get(k) for k in _SUMMARY_FIELDS})
+        self.records[stem] = record
+        self.dirty = True
+        return record
+
+    def remove(self, stem: str) -> None:
+        if self.records.pop(stem, None) is not None:
+            self.dirty = True
+
+    def prune(self, live_stems) -> None:
+        """Drop records whose chat file no longer exists."""
+        for stem in [s for s in self.records if s not in live_stems]:
+            self.remove(stem)
+
+
+# chats_dir (str) -> manifest.  One small object per project.
+_manifests: Dict[str, SummaryManifest] = {}
+_manifests_lock = threading.Lock()
+# Keys of manifests with changes not yet written, and the pending flush.
+_dirty: Set[str] = set()
+_flush_timer: Optional[threading.Timer] = None
+
+
+def get_manifest(chats_dir: Path) -> SummaryManifest:
+    """Return the manifest for *chats_dir*, (re)loaded if it changed on disk.
+
+    Callers must hold ``manifest.lock`` while reading or mutating records.
+    """
+    key = str(chats_dir)
+    with _manifests_lock:
+        manifest = _manifests.get(key)
+        if manifest is None:
+            manifest = SummaryManifest(chats_dir)
+            _manifests[key] = manifest
+    with manifest.lock:
+        if not manifest.dirty:
+            manifest.reload_if_changed()
+    return manifest
+
+
+def on_chat_written(chats_dir: Path, chat_file: Path, data: dict) -> None:
+    """Refresh one chat's record after ``ChatStorage`` wrote it."""
+    manifest = get_manifest(chats_dir)
+    with manifest.lock:
+        try:
+            st = chat_file.stat()
+        except OSError:
+            manifest.remove(chat_file.stem)
+        else:
+            if isinstance(data, dict) and data.get("id"):
+                manifest.put(chat_file.stem, st, summary_record(data))
+            else:
+                manifest.remove(chat_file.stem)
+    mark_dirty(chats_dir)
+
+
+def on_chat_deleted(chats_dir: Path, stem: str) -> None:
+    """Drop a deleted chat's record."""
+    manifest = get_manifest(chats_dir)
+    with manifest.lock:
+        manifest.remove(stem)
+    mark_dirty(chats_dir)
+
+
+def mark_dirty(chats_dir: Path) -> None:
+    """Arm the write-behind flush for a project's manifest."""
+    global _flush_timer
+    with _manifests_lock:
+        _dirty.add(str(chats_dir))
+        if _flush_timer is None:
+            timer = threading.Timer(_WRITE_BEHIND_DELAY_SECONDS, flush)
+            timer.daemon = True
+            _flush_timer = timer
+            timer.start()
+
+
+@atexit.register
+def flush() -> None:
+    """Write every manifest changed since the last flush."""
+    global _flush_timer
+    with _manifests_lock:
+        dirty = [_manifests[key] for key in _dirty if key in _manifests]
+        _dirty.clear()
+        timer, _flush_timer = _flush_timer, None
+    if timer is not None and timer is not threading.current_thread():
+        timer.cancel()
+    for manifest in dirty:
+        with manifest.lock:
+            try:
+                manifest.save()
+            except Exception as e:
+                # Still dirty, so the next write or listing saves it
+                logger.warning(f"chat_summaries: failed to save {manifest.path}: {e}")
+
+
+def invalidate() -> None:
+    """Forget all resident manifests (they reload from disk on next use)."""
+    flush()
+    with _manifests_lock:
+        _manifests.clear()
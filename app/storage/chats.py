@@ -10,8 +10,6 @@ from app.utils.logging_utils import logger
 
 from .base import BaseStorage
 from ..models.chat import Chat, ChatCreate, ChatUpdate, ChatSummary, Message
-from .beads import count_open_beads_for_conversation
-from ..models.work_item import count_open_work_items
 
 # Per-file mtime cache for ChatStorage.list_summaries().
 # Keyed by absolute path string; value is
@@ -19,7 +17,9 @@ from ..models.work_item import count_open_work_items
 # Self-heals on any write because _write_json renames a temp file
 # (new inode, new mtime).  Process-local — ChatStorage is constructed
 # per-request so an instance attribute would be useless.  Summaries are
-# tiny (~hundreds of bytes) so the cache is unbounded.
+# tiny (~hundreds of bytes) so the cache is unbounded.  Misses fall back
+# to the persistent per-project sidecar (chat_summaries) before touching
+# the chat file itself, so a cold process doesn't re-read every chat.
 _summary_cache: dict = {}
 
 class ChatStorage(BaseStorage[Chat]):
@@ -45,6 +45,55 @@ class ChatStorage(BaseStorage[Chat]):
     
     def _chat_file(self, chat_id: str) -> Path:
         return self.chats_dir / f"{chat_id}.json"
+
+    def _read_json(self, filepath: Path) -> Optional[dict]:
+        """Read a chat file in either the JSON or the append-only log format."""
+        from app.storage import chat_log
+        if not chat_log.has_log_header(filepath):
+            return super()._read_json(filepath)
+        try:
+            return chat_log.read_chat_log(filepath)
+        except Exception as e:
+            logger.error(f"Error reading chat log {filepath}: {e}")
+            return None
+
+    def _write_json(self, filepath: Path, data: dict) -> bool:
+        """Write a chat file and keep the summary sidecar and search index in step.
+
+        Every chat write — including the ones callers make directly through
+        ``storage._write_json(storage._chat_file(...))`` — funnels through
+        here, so neither the summary sidecar nor the search index needs to
+        re-read what was just written.  With ``ZIYA_CHAT_LOG_FORMAT`` set the
+        chat is stored as an append-only message log (see ``chat_log``);
+        otherwise a log left by an earlier run is migrated back to JSON.
+        """
+        from app.storage import chat_log
+        if filepath.parent != self.chats_dir:
+            return super()._write_json(filepath, data)
+        if chat_log.is_enabled():
+            written = chat_log.write_chat_log(filepath, data, self._infer_category(filepath))
+        else:
+            if chat_log.has_log_header(filepath):
+                try:
+                    chat_log.read_chat_log(filepath)
+                except Exception as e:
+                    logger.error(f"🔐 REFUSING write to {filepath}: existing chat log cannot be "
+                                 f"read back ({e}).")
+                    return False
+                chat_log.forget(filepath)
+            written = super()._write_json(filepath, data)
+        if written:
+            try:
+                from app.storage import chat_summaries
+                chat_summaries.on_chat_written(self.chats_dir, filepath, data)
+            except Exception as e:
+                logger.debug("chat_summaries.on_chat_written failed: %s", e)
+            try:
+                from app.storage import chat_search_index
+                chat_search_index.on_chat_written(self.chats_dir, filepath, data)
+            except Exception as e:
+                logger.debug("chat_search_index.on_chat_written failed: %s", e)
+        return written
     
     @staticmethod
     def strip_empty_assistant_messages(messages):
@@ -129,19 +178,23 @@ class ChatStorage(BaseStorage[Chat]):
                 if self._is_chat_expired(chat):
                     logger.info(f"Purging expired chat {chat.id}")
                     chat_file.unlink()
+                    self._on_chat_file_removed(chat_file.stem)
                     purged += 1
         return purged
     
     def list_summaries(self, group_id: Optional[str] = None) -> List[ChatSummary]:
         """List chats without messages for performance.
 
-        Reads each chat file as a raw dict and pulls only the summary fields,
-        skipping Pydantic validation of the full ``messages`` array.  On a
-        project with several hundred chats the old path (``self.list()`` →
-        ``Chat(**data)`` for every file) was the dominant backend cost on
-        ``GET /api/v1/projects/{pid}/chats`` (~3 s for 850 chats).  Skipping
-        message validation drops it by an order of magnitude because the
-        ``Chat`` model validates every entry in ``messages: List[Message]``.
+        Served from the process-local ``_summary_cache`` and, on a miss, the
+        per-project summary sidecar; a chat file is only opened when neither
+        matches its current (mtime, size).  On a read it pulls just the
+        summary fields from the raw dict, skipping Pydantic validation of
+        the full ``messages`` array.  On a project with several hundred chats
+        the old path (``self.list()`` → ``Chat(**data)`` for every file) was
+        the dominant backend cost on ``GET /api/v1/projects/{pid}/chats``
+        (~3 s for 850 chats).  Skipping message validation drops it by an
+        order of magnitude because the ``Chat`` model validates every entry
+        in ``messages: List[Message]``.
         """
         t0 = time.perf_counter()
         summaries = []
@@ -159,6 +212,10 @@ class ChatStorage(BaseStorage[Chat]):
         built: List[tuple] = []
         files = list(self.chats_dir.glob("*.json"))
         t_glob = time.perf_counter() - t0
+        from app.storage.chat_summaries import get_manifest, summary_record, record_to_summary
+        manifest = get_manifest(self.chats_dir)
+        n_sidecar = 0
+        live_stems = set()
         for chat_file in files:
             if chat_file.name.startswith('_'):
                 continue
@@ -172,6 +229,7 @@ class ChatStorage(BaseStorage[Chat]):
                 t_stat_total += time.perf_counter() - t_s
             except OSError:
                 continue
+            live_stems.add(chat_file.stem)
 
             path_str = str(chat_file)
             cached = _summary_cache.get(path_str)
@@ -198,19 +256,25 @@ class ChatStorage(BaseStorage[Chat]):
                 continue
             n_miss += 1
 
-            t_r = time.perf_counter()
-            data = self._read_json(chat_file)
-            t_read_total += time.perf_counter() - t_r
-            if not data:
-                _summary_cache[path_str] = (st.st_mtime, st.st_size, None, None)
-                continue
+            with manifest.lock:
+                record = manifest.get_fresh(chat_file.stem, st)
+            if record is not None:
+                n_sidecar += 1
+            else:
+                t_r = time.perf_counter()
+                data = self._read_json(chat_file)
+                t_read_total += time.perf_counter() - t_r
+                if not data:
+                    _summary_cache[path_str] = (st.st_mtime, st.st_size, None, None)
+                    continue
+                record = summary_record(data)
 
             # Expiry check — uses lastActiveAt only, no message validation.
-            last_active = data.get('lastActiveAt') or 0
+            last_active = record.get('lastActiveAt') or 0
             t_e = time.perf_counter()
             try:
                 if self.enforcer.is_expired(last_active / 1000.0, "conversation_data"):
-                    chat_id = data.get('id')
+                    chat_id = record.get('id')
                     if chat_id:
                         logger.info(f"Chat {chat_id} expired per retention policy, removing")
                         self.delete(chat_id)
@@ -222,30 +286,24 @@ class ChatStorage(BaseStorage[Chat]):
                 logger.debug("Retention enforcement failed, keeping chat: %s", e)
             t_retention_total += time.perf_counter() - t_e
 
-            chat_group_id = data.get('groupId')
-            messages = data.get('messages') or []
-            version = data.get('_version') or data.get('lastActiveAt')
-            delegate_meta = data.get('delegateMeta')
-            open_beads = count_open_beads_for_conversation(data, data.get('id'))
-            open_work_items = count_open_work_items(data.get('_work_items'))
-            summary = ChatSummary(
-                id=data['id'],
-                title=data.get('title') or '',
-                groupId=chat_group_id,
-                contextIds=data.get('contextIds') or [],
-                skillIds=data.get('skillIds') or [],
-                additionalFiles=data.get('additionalFiles') or [],
-                messageCount=len(messages) if isinstance(messages, list) else 0,
-                createdAt=data.get('createdAt') or 0,
-                lastActiveAt=data.get('lastActiveAt') or 0,
-                delegateMeta=delegate_meta,
-                openBeadCount=open_beads,
-                openWorkItemCount=open_work_items,
-                **({'_version': version} if version else {})
-            )
+            if not record.get('id'):
+                _summary_cache[path_str] = (st.st_mtime, st.st_size, None, None)
+                continue
+            with manifest.lock:
+                if manifest.get_fresh(chat_file.stem, st) is None:
+                    manifest.put(chat_file.stem, st, record)
+            chat_group_id = record.get('groupId')
+            summary = record_to_summary(record)
             _summary_cache[path_str] = (st.st_mtime, st.st_size, summary, chat_group_id)
             built.append((chat_group_id, summary))
 
+        with manifest.lock:
+            manifest.prune(live_stems)
+            try:
+                manifest.save()
+            except Exception as e:
+                logger.warning(f"list_summaries: failed to persist summary sidecar: {e}")
+
         t_after_loop = time.perf_counter()
         if group_id is not None:
             if group_id == "ungrouped":
@@ -265,7 +323,7 @@ class ChatStorage(BaseStorage[Chat]):
             f"retention={t_retention_total*1000:.0f}ms "
             f"sort+filter={t_sort*1000:.0f}ms "
             f"files={n_files} kept={n_kept} "
-            f"cache={n_hit}H/{n_miss}M"
+            f"cache={n_hit}H/{n_miss}M sidecar={n_sidecar}"
         )
         return summaries
     
@@ -330,6 +388,7 @@ class ChatStorage(BaseStorage[Chat]):
         if not chat_file.exists():
             return False
         chat_file.unlink()
+        self._on_chat_file_removed(chat_id)
         # Drop from the cross-project chat index.  Stale entries would
         # self-heal on next lookup, but eager removal saves a failed
         # file-stat per stale lookup.
@@ -340,6 +399,21 @@ class ChatStorage(BaseStorage[Chat]):
             logger.debug("chat_index.on_chat_deleted failed: %s", e)
         return True
     
+    def _on_chat_file_removed(self, stem: str) -> None:
+        """Drop a removed chat file from the summary sidecar and search index."""
+        from app.storage import chat_log
+        chat_log.forget(self._chat_file(stem))
+        try:
+            from app.storage import chat_summaries
+            chat_summaries.on_chat_deleted(self.chats_dir, stem)
+        except Exception as e:
+            logger.debug("chat_summaries.on_chat_deleted failed: %s", e)
+        try:
+            from app.storage import chat_search_index
+            chat_search_index.on_chat_deleted(self.chats_dir, stem)
+        except Exception as e:
+            logger.debug("chat_search_index.on_chat_deleted failed: %s", e)
+
     def add_message(self, chat_id: str, message: Message) -> Optional[Chat]:
         """Add a message to a chat."""
         chat = self.get(chat_id)
@@ -16,8 +16,8 @@ from typing import List
 from app.utils.logging_utils import logger
 from ..models.chat import Chat, ChatSummary
 from ..models.group import ChatGroup
-from .beads import count_open_beads_for_conversation
-from ..models.work_item import count_open_work_items
+from .chat_log import decode_chat_bytes
+from .chat_summaries import get_manifest, summary_record, record_to_summary
 
 # Per-file mtime cache for collect_global_chat_summaries().
 # Keyed by absolute path string; value is (st_mtime, st_size, ChatSummary|None).
@@ -205,13 +205,10 @@ def collect_global_chats(
                     _full_cache_put(path_str, (st.st_mtime, st.st_size, False, None, None))
                     continue
 
-                from app.utils.encryption import is_encrypted, get_encryptor
-                if is_encrypted(raw):
-                    raw = get_encryptor().decrypt(raw)
                 t_read += time.perf_counter() - t_r
 
                 t_p = time.perf_counter()
-                data = json.loads(raw)
+                data = decode_chat_bytes(raw)
                 own_g = bool(data.get("isGlobal"))
                 grp_id = data.get("groupId")
                 if not (own_g or (grp_id is not None and grp_id in eff_groups)):
@@ -272,6 +269,10 @@ def collect_global_chat_summaries(
 
         # See collect_global_chats: own-global OR group-inherited-global.
         eff_groups = _effective_global_group_ids(project_dir)
+        # Misses consult the owning project's summary sidecar before
+        # opening the chat file, so a cold process reads one manifest per
+        # project instead of every chat body.
+        manifest = get_manifest(chats_dir)
 
         for chat_file in chats_dir.glob("*.json"):
             if chat_file.name.startswith("_"):
@@ -301,44 +302,35 @@ def collect_global_chat_summaries(
                     # Fall through to read+build (rare).
                 n_miss += 1
 
-                t_r = time.perf_counter()
-                raw = chat_file.read_bytes()
-                if not raw:
-                    _summary_cache[path_str] = (st.st_mtime, st.st_size, False, None, None)
-                    continue
+                with manifest.lock:
+                    record = manifest.get_fresh(chat_file.stem, st)
+                if record is None:
+                    t_r = time.perf_counter()
+                    raw = chat_file.read_bytes()
+                    if not raw:
+                        _summary_cache[path_str] = (st.st_mtime, st.st_size, False, None, None)
+                        continue
 
-                from app.utils.encryption import is_encrypted, get_encryptor
-                if is_encrypted(raw):
-                    raw = get_encryptor().decrypt(raw)
-                t_read += time.perf_counter() - t_r
+                    t_read += time.perf_counter() - t_r
+
+                    t_p = time.perf_counter()
+                    data = decode_chat_bytes(raw)
+                    record = summary_record(data)
+                    if record.get("id"):
+                        with manifest.lock:
+                            manifest.put(chat_file.stem, st, record)
+                    t_parse += time.perf_counter() - t_p
 
                 t_p = time.perf_counter()
-                data = json.loads(raw)
-                own_g = bool(data.get("isGlobal"))
-                grp_id = data.get("groupId")
+                own_g = bool(record.get("isGlobal"))
+                grp_id = record.get("groupId")
                 if not (own_g or (grp_id is not None and grp_id in eff_groups)):
                     _summary_cache[path_str] = (st.st_mtime, st.st_size, own_g, grp_id, None)
                     t_parse += time.perf_counter() - t_p
                     continue
 
-                messages = data.get("messages") or []
-                version = data.get("_version") or data.get("lastActiveAt")
-                open_beads = count_open_beads_for_conversation(data, data.get("id"))
-                open_work_items = count_open_work_items(data.get("_work_items"))
-                summary = ChatSummary(
-                    id=data["id"],
-                    title=data.get("title") or "",
-                    groupId=data.get("groupId"),
-                    contextIds=data.get("contextIds") or [],
-                    skillIds=data.get("skillIds") or [],
-                    additionalFiles=data.get("additionalFiles") or [],
-                    messageCount=len(messages) if isinstance(messages, list) else 0,
-                    createdAt=data.get("createdAt") or 0,
-                    lastActiveAt=data.get("lastActiveAt") or 0,
-                    delegateMeta=data.get("delegateMeta"),
-                    openBeadCount=open_beads,
-                    openWorkItemCount=open_work_items,
-                    **({"_version": version} if version else {}),
+                summary = record_to_summary(
+                    record,
                     # Stamp the TRUE owner projectId so the client never
                     # re-homes a global chat under the viewing project. An
                     # owner-less global summary is stamped with the current
@@ -348,8 +340,8 @@ def collect_global_chat_summaries(
                     # that let an ASR-folder chat be demoted to root/private.
                     # Prefer the on-disk projectId; fall back to the owning
                     # project directory name (always correct in this scan).
-                    **({"projectId": data.get("projectId") or project_dir.name}),
-                    **({"isGlobal": True}),
+                    projectId=record.get("projectId") or project_dir.name,
+                    isGlobal=True,
                 )
                 _summary_cache[path_str] = (st.st_mtime, st.st_size, own_g, grp_id, summary)
                 results.append(summary)
@@ -358,6 +350,12 @@ def collect_global_chat_summaries(
             except Exception as exc:
                 logger.debug(f"Skipping {chat_file} during global summary scan: {exc}")
 
+        with manifest.lock:
+            try:
+                manifest.save()
+            except Exception as exc:
+                logger.warning(f"Failed to persist summary sidecar for {project_dir.name}: {exc}")
+
     logger.debug(
         f"collect_global_chat_summaries: total={(time.perf_counter()-t0)*1000:.0f}ms "
         f"stat={t_stat*1000:.0f}ms read={t_read*1000:.0f}ms parse={t_parse*1000:.0f}ms "
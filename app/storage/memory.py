@@ -5,6 +5,7 @@ Phase 0: Single file (~/.ziya/memory/memories.json) with full CRUD.
 Profile and project hints stored alongside.  ALE encryption-aware
 via the same BaseStorage pattern used by chats and skills.
 """
+import functools
 import math
 import json
 import re
@@ -40,6 +41,203 @@ def _tokenize(text: str) -> List[str]:
     return [w for w in words if len(w) > 2 and w not in _STOP_WORDS]
 
 
+def _is_searchable(m: dict) -> bool:
+    """Statuses MemoryStorage.search returns (see its docstring)."""
+    return m.get("status") in (None, "active", "contested")
+
+
+@functools.lru_cache(maxsize=4096)
+def _day_timestamp(date_str: str) -> Optional[float]:
+    """Local-midnight timestamp of a YYYY-MM-DD string, or None if unparseable."""
+    try:
+        return time.mktime(time.strptime(date_str, "%Y-%m-%d"))
+    except (ValueError, OverflowError, TypeError):
+        return None
+
+
+class _KeywordIndex:
+    """Inverted index over searchable memories for keyword scoring.
+
+    Per memory it records the distinct content tokens, lowercased tags,
+    layer, importance and last_accessed date; from those it derives token
+    postings, the document frequencies used for IDF (content tokens plus
+    tags), and tag and layer postings.  Only the per-memory records are
+    persisted — the postings are rebuilt from them on load without
+    re-tokenizing anything.  ``source_mtime`` is the memories.json mtime
+    the index reflects.
+
+    Lowercased content and file order, needed for phrase matches and
+    stable tie-breaking, are derived from the loaded memory list on
+    demand and never persisted.
+    """
+
+    VERSION = 1
+
+    def __init__(self, source_mtime: float = 0.0):
+        self.source_mtime = source_mtime
+        self.docs: Dict[str, dict] = {}
+        self.postings: Dict[str, set] = {}
+        self.doc_freq: Dict[str, int] = {}
+        self.tag_postings: Dict[str, set] = {}
+        self.layer_postings: Dict[str, set] = {}
+        self._attached: Optional[List[dict]] = None
+        self._lowered: Dict[str, str] = {}
+        self._order: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, memories: List[dict], source_mtime: float) -> "_KeywordIndex":
+        index = cls(source_mtime)
+        for m in memories:
+            index.add(m)
+        return index
+
+    @classmethod
+    def from_json(cls, data: Any) -> Optional["_KeywordIndex"]:
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            return None
+        index = cls(data.get("source_mtime", 0.0))
+        for mid, doc in (data.get("docs") or {}).items():
+            index._add_doc(mid, doc)
+        return index
+
+    def to_json(self) -> dict:
+        return {"version": self.VERSION, "source_mtime": self.source_mtime,
+                "docs": self.docs}
+
+    def add(self, m: dict) -> None:
+        """Index one raw memory dict (replacing any previous version)."""
+        mid = m.get("id")
+        if mid is None:
+            return
+        self.remove(mid)
+        if not _is_searchable(m):
+            return
+        self._add_doc(mid, {
+            "terms": sorted(set(_tokenize(m.get("content", "")))),
+            "tags": sorted({t.lower() for t in m.get("tags", [])}),
+            "layer": m.get("layer", ""),
+            "importance": m.get("importance", 0.5),
+            "last_accessed": m.get("last_accessed"),
+        })
+        self._attached = None
+
+    def _add_doc(self, mid: str, doc: dict) -> None:
+        self.docs[mid] = doc
+        for term in doc["terms"]:
+            self.postings.setdefault(term, set()).add(mid)
+        for word in set(doc["terms"]).union(doc["tags"]):
+            self.doc_freq[word] = self.doc_freq.get(word, 0) + 1
+        for tag in doc["tags"]:
+            self.tag_postings.setdefault(tag, set()).add(mid)
+        self.layer_postings.setdefault(doc["layer"], set()).add(mid)
+
+    def remove(self, mid: str) -> None:
+        doc = self.docs.pop(mid, None)
+        if doc is None:
+            return
+        for term in doc["terms"]:
+            self._discard(self.postings, term, mid)
+        for word in set(doc["terms"]).union(doc["tags"]):
+            self.doc_freq[word] -= 1
+            if not self.doc_freq[word]:
+                del self.doc_freq[word]
+        for tag in doc["tags"]:
+            self._discard(self.tag_postings, tag, mid)
+        self._discard(self.layer_postings, doc["layer"], mid)
+        self._attached = None
+
+    @staticmethod
+    def _discard(postings: Dict[str, set], key: str, mid: str) -> None:
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(mid)
+            if not ids:
+                del postings[key]
+
+    def attach(self, memories: List[dict]) -> None:
+        """Derive lowercased content and file order from the loaded list."""
+        if self._attached is memories:
+            return
+        self._lowered = {}
+        self._order = {}
+        for pos, m in enumerate(memories):
+            mid = m.get("id")
+            if mid in self.docs and mid not in self._order:
+                self._lowered[mid] = m.get("content", "").lower()
+                self._order[mid] = pos
+        self._attached = memories
+
+    def _phrase_candidates(self, q_lower: str) -> set:
+        """Memories that may contain *q_lower* verbatim.
+
+        A query token with a non-word character on both sides must occur
+        as a whole token in any content containing the query, so its
+        postings bound the search; otherwise every memory is a candidate.
+        """
+        for match in re.finditer(r'[a-z0-9_]+', q_lower):
+            word = match.group()
+            if (match.start() > 0 and match.end() < len(q_lower)
+                    and len(word) > 2 and word not in _STOP_WORDS):
+                ids = self.postings.get(word, set())
+                break
+        else:
+            ids = self._lowered.keys()
+        return {mid for mid in ids if q_lower in self._lowered.get(mid, "")}
+
+    def score(self, q_lower: str, q_tokens: List[str]) -> List[Tuple[str, float]]:
+        """Keyword scores for every memory with a positive score, best first."""
+        n_docs = len(self.docs)
+        term_ids = {qt: self.postings.get(qt, set()) for qt in set(q_tokens)}
+        tag_ids: Dict[str, set] = {}
+        for qt in set(q_tokens):
+            tag_ids[qt] = set()
+            for tag, ids in self.tag_postings.items():
+                if qt == tag or qt in tag:
+                    tag_ids[qt] |= ids
+        phrase_ids = self._phrase_candidates(q_lower)
+        layer_ids = set()
+        for layer, ids in self.layer_postings.items():
+            if q_lower in layer:
+                layer_ids |= ids
+
+        candidates = phrase_ids | layer_ids
+        for ids in term_ids.values():
+            candidates |= ids
+        for ids in tag_ids.values():
+            candidates |= ids
+
+        today_ts = _day_timestamp(time.strftime("%Y-%m-%d"))
+        scored: List[tuple] = []
+        for mid in candidates:
+            doc = self.docs[mid]
+            word_score = sum(
+                math.log(n_docs / self.doc_freq.get(qt, 1)) + 1.0
+                for qt in q_tokens if mid in term_ids[qt]
+            )
+            tag_score = sum(3.0 for qt in q_tokens if mid in tag_ids[qt])
+            phrase_score = 5.0 if mid in phrase_ids else 0.0
+            layer_score = 1.0 if mid in layer_ids else 0.0
+
+            raw_score = word_score + tag_score + phrase_score + layer_score
+            if raw_score <= 0:
+                continue
+
+            accessed_ts = (_day_timestamp(doc["last_accessed"])
+                           if doc["last_accessed"] else today_ts)
+            if accessed_ts is None or today_ts is None:
+                days_since = 0
+            else:
+                days_since = (today_ts - accessed_ts) / 86400
+            recency = math.exp(-0.01 * max(days_since, 0))
+            final_score = raw_score * (0.5 + doc["importance"]) * (0.3 + 0.7 * recency)
+            scored.append((self._order.get(mid, 0), mid, final_score))
+
+        # File order first so equal scores keep the store's order
+        scored.sort(key=lambda x: x[0])
+        scored.sort(key=lambda x: x[2], reverse=True)
+        return [(mid, final_score) for _, mid, final_score in scored]
+
+
 class MemoryStorage:
     """File-based memory store under ~/.ziya/memory/."""
 
@@ -53,6 +251,9 @@ class MemoryStorage:
         # Invalidated on any write operation.
         self._memories_cache: Optional[List[dict]] = None
         self._memories_cache_mtime: float = 0
+        # Keyword index for search(), kept in step with writes and
+        # persisted alongside the store; stale once the mtimes differ.
+        self._keyword_index: Optional[_KeywordIndex] = None
 
     # -- File paths ----------------------------------------------------------
 
@@ -60,6 +261,10 @@ class MemoryStorage:
     def _memories_file(self) -> Path:
         return self._dir / "memories.json"
 
+    @property
+    def _keyword_index_file(self) -> Path:
+        return self._dir / "keyword_index.json"
+
     @property
     def _proposals_file(self) -> Path:
         return self._dir / "proposals.json"
@@ -137,6 +342,51 @@ class MemoryStorage:
         self._memories_cache = None
         self._memories_cache_mtime = 0
 
+    # -- Keyword index -------------------------------------------------------
+
+    def _current_keyword_index(self, mtime: float) -> Optional[_KeywordIndex]:
+        """The in-memory or persisted index if it reflects *mtime*, else None."""
+        if self._keyword_index is None or self._keyword_index.source_mtime != mtime:
+            self._keyword_index = _KeywordIndex.from_json(
+                self._read_json(self._keyword_index_file))
+        if self._keyword_index is not None and self._keyword_index.source_mtime == mtime:
+            return self._keyword_index
+        return None
+
+    def _persist_keyword_index(self) -> None:
+        try:
+            self._write_json(self._keyword_index_file, self._keyword_index.to_json())
+        except Exception as e:
+            logger.debug(f"Keyword index write failed (non-fatal): {e}")
+
+    def _get_keyword_index(self, raw: List[dict]) -> _KeywordIndex:
+        """Index for the store as last loaded, rebuilding it if stale."""
+        mtime = self._memories_cache_mtime
+        index = self._current_keyword_index(mtime)
+        if index is None:
+            index = self._keyword_index = _KeywordIndex.build(raw, mtime)
+            self._persist_keyword_index()
+            logger.debug(f"Rebuilt keyword index over {len(index.docs)} memories")
+        index.attach(raw)
+        return index
+
+    def _update_keyword_index(self, prev_mtime: float, upserts: List[dict] = (),
+                              removed: List[str] = ()) -> None:
+        """Apply a write to the index if it was in step before the write."""
+        index = self._current_keyword_index(prev_mtime)
+        if index is None:
+            return  # Rebuilt on the next search
+        for mid in removed:
+            index.remove(mid)
+        for m in upserts:
+            index.add(m)
+        try:
+            index.source_mtime = self._memories_file.stat().st_mtime
+        except OSError:
+            self._keyword_index = None
+            return
+        self._persist_keyword_index()
+
     def list_memories(
         self,
         layer: Optional[str] = None,
@@ -164,6 +414,7 @@ class MemoryStorage:
     def save(self, memory: Memory) -> Memory:
         """Create or update a memory in the flat store."""
         memories = self._load_memories()
+        prev_mtime = self._memories_cache_mtime
         existing_idx = next(
             (i for i, m in enumerate(memories) if m.get("id") == memory.id),
             None,
@@ -174,6 +425,7 @@ class MemoryStorage:
         else:
             memories.append(dump)
         self._save_memories(memories)
+        self._update_keyword_index(prev_mtime, upserts=[dump])
         logger.info(f"💾 Memory saved: {memory.id} [{memory.layer}] {memory.content[:60]}")
 
         # Embed asynchronously — non-blocking, best-effort
@@ -196,9 +448,12 @@ class MemoryStorage:
         if not memories:
             return
         store = self._load_memories()
+        prev_mtime = self._memories_cache_mtime
         by_id = {m.get("id"): i for i, m in enumerate(store)}
+        dumps = []
         for memory in memories:
             dump = memory.model_dump()
+            dumps.append(dump)
             idx = by_id.get(memory.id)
             if idx is not None:
                 store[idx] = dump
@@ -206,6 +461,7 @@ class MemoryStorage:
                 by_id[memory.id] = len(store)
                 store.append(dump)
         self._save_memories(store)
+        self._update_keyword_index(prev_mtime, upserts=dumps)
         logger.debug(f"💾 Batch-saved {len(memories)} memories in one write")
 
         # Refresh embeddings best-effort (non-fatal, per-memory).
@@ -218,11 +474,13 @@ class MemoryStorage:
 
     def delete(self, memory_id: str) -> bool:
         memories = self._load_memories()
+        prev_mtime = self._memories_cache_mtime
         before = len(memories)
         memories = [m for m in memories if m.get("id") != memory_id]
         if len(memories) == before:
             return False
         self._save_memories(memories)
+        self._update_keyword_index(prev_mtime, removed=[memory_id])
         logger.info(f"🗑️ Memory deleted: {memory_id}")
 
         # Remove embedding from cache
@@ -247,7 +505,7 @@ class MemoryStorage:
         still find them via memory_search and reason about them.
         """
         raw = self._load_memories()
-        active = [m for m in raw if m.get("status") in (None, "active", "contested")]
+        active = [m for m in raw if _is_searchable(m)]
         if not active:
             return []
 
@@ -274,7 +532,7 @@ class MemoryStorage:
         except Exception as e:
             logger.debug(f"Semantic search unavailable: {e}")
 
-        # -- Keyword search path (existing logic) --
+        # -- Keyword search path --
         q_lower = query.lower()
         q_tokens = _tokenize(q_lower)
         if not q_tokens and not semantic_ranked:
@@ -282,50 +540,9 @@ class MemoryStorage:
 
         keyword_ranked: List[Tuple[str, float]] = []
         if q_tokens:
-            doc_freq: Dict[str, int] = {}
-            for m in active:
-                words = set(_tokenize(m.get("content", "").lower()))
-                words.update(t.lower() for t in m.get("tags", []))
-                for w in words:
-                    doc_freq[w] = doc_freq.get(w, 0) + 1
-            n_docs = len(active)
-
-            today = time.strftime("%Y-%m-%d")
-            keyword_scored: List[tuple] = []
-
-            for m in active:
-                content_lower = m.get("content", "").lower()
-                content_tokens = set(_tokenize(content_lower))
-                mem_tags = {t.lower() for t in m.get("tags", [])}
-
-                word_score = sum(
-                    math.log(n_docs / doc_freq.get(qt, 1)) + 1.0
-                    for qt in q_tokens if qt in content_tokens
-                )
-                tag_score = sum(
-                    3.0 for qt in q_tokens
-                    if any(qt == tag or qt in tag for tag in mem_tags)
-                )
-                phrase_score = 5.0 if q_lower in content_lower else 0.0
-                layer_score = 1.0 if q_lower in m.get("layer", "") else 0.0
-
-                raw_score = word_score + tag_score + phrase_score + layer_score
-                if raw_score <= 0:
-                    continue
-
-                importance = m.get("importance", 0.5)
-                last_accessed = m.get("last_accessed", today)
-                try:
-                    days_since = (time.mktime(time.strptime(today, "%Y-%m-%d"))
-                                  - time.mktime(time.strptime(last_accessed, "%Y-%m-%d"))) / 86400
-                except (ValueError, OverflowError):
-                    days_since = 0
-                recency = math.exp(-0.01 * max(days_since, 0))
-                final_score = raw_score * (0.5 + importance) * (0.3 + 0.7 * recency)
-                keyword_scored.append((m.get("id"), final_score))
-
-            keyword_scored.sort(key=lambda x: x[1], reverse=True)
-            keyword_ranked = keyword_scored[:limit * 2]
+            # Only memories sharing a token, tag, layer or the phrase with
+            # the query are scored (see _KeywordIndex)
+            keyword_ranked = self._get_keyword_index(raw).score(q_lower, q_tokens)[:limit * 2]
 
         # -- Reciprocal Rank Fusion --
         if semantic_ranked and keyword_ranked:
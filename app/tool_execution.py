@@ -27,6 +27,9 @@ from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Set
 
 logger = logging.getLogger(__name__)
 
+# Seconds between flushes of streamed tool output to the client
+TOOL_PROGRESS_INTERVAL = 0.1
+
 
 @dataclass
 class ToolExecContext:
@@ -223,10 +226,36 @@ async def execute_single_tool(ctx: ToolExecContext) -> AsyncGenerator[Dict[str,
                 ctx.args['_workspace_path'] = ctx.project_root
             if task_scope_payload is not None:
                 ctx.args['_task_scope'] = task_scope_payload
-            result = await asyncio.wait_for(
-                ctx.mcp_manager.call_tool(ctx.actual_tool_name, ctx.args, server_name=target_server_name),
-                timeout=TOOL_EXEC_TIMEOUT,
-            )
+            # Run the call as a task so output the server streams while it
+            # runs can be forwarded as tool_progress events meanwhile.
+            from app.mcp.tool_progress import ToolOutputBuffer, tool_output_sink
+            output = ToolOutputBuffer()
+            sink_token = tool_output_sink.set(output.feed)
+            try:
+                call = asyncio.ensure_future(asyncio.wait_for(
+                    ctx.mcp_manager.call_tool(ctx.actual_tool_name, ctx.args, server_name=target_server_name),
+                    timeout=TOOL_EXEC_TIMEOUT,
+                ))
+            finally:
+                tool_output_sink.reset(sink_token)
+            try:
+                while True:
+                    await asyncio.wait({call}, timeout=TOOL_PROGRESS_INTERVAL)
+                    for stream, text in output.drain():
+                        yield {
+                            'type': 'tool_progress',
+                            'tool_id': ctx.tool_id,
+                            'tool_name': ctx.tool_name,
+                            'stream': stream,
+                            'output': text,
+                            'is_internal': ctx.actual_tool_name in ctx.internal_tool_names,
+                        }
+                    if call.done():
+                        break
+            finally:
+                if not call.done():
+                    call.cancel()
+            result = call.result()
 
         # --- Signature verification ---
         is_verified = False
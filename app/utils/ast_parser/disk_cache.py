@@ -3,32 +3,66 @@ Disk-based AST cache.
 
 Persists per-file AST data to .ziya/ast_cache/ so that unchanged files
 don't need to be re-parsed on subsequent startups.  Each project gets its
-own cache file, keyed by a hash of the absolute project root.
-
-Cache format (gzipped JSON):
-    {
-        "version": 1,
-        "files": {
-            "<abs_path>": {
-                "mtime": <float>,
-                "size":  <int>,
-                "ast":   <dict>          # UnifiedAST.to_dict() output
-            }
-        }
-    }
+own cache directory, keyed by a hash of the absolute project root.
+
+The cache is record-oriented so that neither startup nor saving touches
+more than it has to:
+
+    records.dat   header, then one zlib-compressed JSON record per file
+                  (``UnifiedAST.to_dict()`` output), append-only
+    index.dat     header, then an append-only log of index entries:
+                      crc32 u32, mtime f64, size u64, offset u64,
+                      length u32, path_len u16, path (utf-8)
+                  the last entry for a path wins; length 0 deletes it
+    lock          flock'd while appending or compacting
+
+Opening the cache reads only the index, and ASTs are decoded from the
+memory-mapped records file on demand.  Storing a changed file appends one
+record plus one index entry.  When dead records outweigh live ones the
+files are compacted into fresh copies.  Both headers carry the same random
+epoch so a crash between replacing the two files is detected and the
+cache discarded, never misread.
 """
 
 import gzip
 import hashlib
 import json
+import mmap
 import os
+import struct
+import threading
 import time
+import zlib
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, NamedTuple, Optional
 
 from app.utils.logging_utils import logger
 
-CACHE_VERSION = 1
+try:
+    import fcntl
+except ImportError:  # Windows: single-writer assumed
+    fcntl = None
+
+CACHE_VERSION = 2
+
+_RECORDS_MAGIC = b"ZASTREC2"
+_INDEX_MAGIC = b"ZASTIDX2"
+_HEADER = struct.Struct("<8s8s")  # magic, epoch
+_ENTRY = struct.Struct("<IdQQIH")
+
+# Pending records are written once they add up to this many bytes.
+_FLUSH_BYTES = 4 * 1024 * 1024
+
+# Compact once the records file is at least this big and more than half dead.
+_COMPACT_MIN_BYTES = 8 * 1024 * 1024
+
+
+class CacheEntry(NamedTuple):
+    mtime: float
+    size: int
+    offset: int
+    length: int
+    crc: int
 
 
 def _cache_dir() -> Path:
@@ -39,59 +73,329 @@ def _cache_dir() -> Path:
     return d
 
 
-def _cache_path(project_root: str) -> Path:
-    """Deterministic cache file for a project root."""
-    h = hashlib.sha256(project_root.encode()).hexdigest()[:16]
-    return _cache_dir() / f"{h}.json.gz"
+def _project_key(project_root: str) -> str:
+    return hashlib.sha256(project_root.encode()).hexdigest()[:16]
 
 
-def load_cache(project_root: str) -> Dict[str, Any]:
-    """
-    Load the AST cache for *project_root*.
+def _legacy_cache_path(project_root: str) -> Path:
+    """Single-blob cache file written by CACHE_VERSION 1."""
+    return _cache_dir() / f"{_project_key(project_root)}.json.gz"
 
-    Returns a dict mapping absolute file paths to
-    ``{"mtime": float, "size": int, "ast": dict}``.
-    Returns an empty dict on miss, corruption, or version mismatch.
-    """
-    path = _cache_path(project_root)
-    if not path.exists():
-        return {}
-    try:
-        with gzip.open(path, "rt", encoding="utf-8") as f:
-            data = json.load(f)
-        if data.get("version") != CACHE_VERSION:
-            logger.debug("AST cache version mismatch, discarding")
-            return {}
-        return data.get("files", {})
-    except Exception as e:
-        logger.debug(f"AST cache load failed ({e}), will re-index")
-        return {}
-
-
-def save_cache(project_root: str, file_entries: Dict[str, Any]) -> None:
-    """
-    Persist the AST cache for *project_root*.
 
-    *file_entries* maps absolute paths to
-    ``{"mtime": float, "size": int, "ast": dict}``.
-    """
-    path = _cache_path(project_root)
-    payload = {"version": CACHE_VERSION, "files": file_entries}
-    try:
+class ASTDiskCache:
+    """Per-file AST records for one project, read lazily and updated in place."""
+
+    def __init__(self, project_root: str):
+        self.project_root = project_root
+        self.directory = _cache_dir() / _project_key(project_root)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._records_path = self.directory / "records.dat"
+        self._index_path = self.directory / "index.dat"
+        self._lock_path = self.directory / "lock"
+
+        self._entries: Dict[str, CacheEntry] = {}
+        self._epoch = b""
+        self._index_size = 0
+        self._dead_bytes = 0
+        self._map: Optional[mmap.mmap] = None
+        self._pending: list = []  # (path, mtime, size, payload)
+        self._pending_bytes = 0
+        self._mutex = threading.Lock()
+
+    # --- opening ----------------------------------------------------------- #
+
+    @classmethod
+    def open(cls, project_root: str) -> "ASTDiskCache":
+        """Open (or create) the cache for *project_root*."""
+        cache = cls(project_root)
+        try:
+            with cache._locked():
+                cache._load_index()
+        except OSError as e:
+            logger.debug(f"AST cache unavailable ({e}), will re-index")
+        legacy = _legacy_cache_path(project_root)
+        if not cache._entries and legacy.exists():
+            cache._import_legacy(legacy)
+        return cache
+
+    def _locked(self):
+        return _FileLock(self._lock_path)
+
+    def _reset_files(self) -> None:
+        """Start an empty cache with a new epoch.  Caller holds the lock."""
+        self._close_map()
+        self._epoch = os.urandom(8)
+        header_r = _HEADER.pack(_RECORDS_MAGIC, self._epoch)
+        header_i = _HEADER.pack(_INDEX_MAGIC, self._epoch)
+        self._records_path.write_bytes(header_r)
+        self._index_path.write_bytes(header_i)
+        self._entries = {}
+        self._index_size = len(header_i)
+        self._dead_bytes = 0
+
+    def _load_index(self) -> None:
+        """Replay index.dat into memory.  Caller holds the lock."""
+        try:
+            data = self._index_path.read_bytes()
+            with open(self._records_path, "rb") as f:
+                records_header = f.read(_HEADER.size)
+                records_size = os.fstat(f.fileno()).st_size
+        except FileNotFoundError:
+            self._reset_files()
+            return
+        if (len(data) < _HEADER.size or len(records_header) < _HEADER.size
+                or _HEADER.unpack_from(data)[0] != _INDEX_MAGIC
+                or _HEADER.unpack(records_header) != (_RECORDS_MAGIC, data[8:16])):
+            logger.debug("AST cache version or epoch mismatch, discarding")
+            self._reset_files()
+            return
+
+        self._epoch = data[8:16]
+        entries: Dict[str, CacheEntry] = {}
+        dead = 0
+        pos = _HEADER.size
+        while pos + _ENTRY.size <= len(data):
+            crc, mtime, size, offset, length, path_len = _ENTRY.unpack_from(data, pos)
+            end = pos + _ENTRY.size + path_len
+            if end > len(data) or offset + length > records_size:
+                break  # Torn tail from an interrupted append
+            path = data[pos + _ENTRY.size:end].decode("utf-8", errors="surrogateescape")
+            previous = entries.pop(path, None)
+            if previous is not None:
+                dead += previous.length
+            if length:
+                entries[path] = CacheEntry(mtime, size, offset, length, crc)
+            pos = end
+        if pos != len(data):
+            with open(self._index_path, "r+b") as f:
+                f.truncate(pos)
+        self._entries = entries
+        self._index_size = pos
+        live = sum(e.length for e in entries.values())
+        self._dead_bytes = max(dead, records_size - _HEADER.size - live)
+
+    def _import_legacy(self, legacy: Path) -> None:
+        """One-time migration of a CACHE_VERSION 1 blob."""
+        try:
+            with gzip.open(legacy, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == 1:
+                for path, entry in data.get("files", {}).items():
+                    self.put(path, entry["mtime"], entry["size"], entry["ast"])
+                self.flush()
+                logger.info(f"AST cache migrated {len(self._entries)} files to record format")
+        except Exception as e:
+            logger.debug(f"AST cache legacy import failed ({e}), will re-index")
+        try:
+            legacy.unlink()
+        except OSError:
+            pass
+
+    # --- reading ----------------------------------------------------------- #
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, file_path: str) -> bool:
+        return file_path in self._entries
+
+    def entry(self, file_path: str) -> Optional[CacheEntry]:
+        return self._entries.get(file_path)
+
+    def paths(self) -> Iterable[str]:
+        return list(self._entries)
+
+    def is_fresh(self, file_path: str) -> bool:
+        entry = self._entries.get(file_path)
+        return entry is not None and is_fresh(entry, file_path)
+
+    def read(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Decode the cached AST dict for *file_path*, or None if unusable."""
+        with self._mutex:
+            entry = self._entries.get(file_path)
+            if entry is None:
+                return None
+            payload = self._read_bytes(entry.offset, entry.length)
+        if payload is None or zlib.crc32(payload) != entry.crc:
+            logger.debug(f"AST cache record for {file_path} is corrupt, will re-parse")
+            return None
+        try:
+            return json.loads(zlib.decompress(payload))
+        except (zlib.error, ValueError):
+            return None
+
+    def _read_bytes(self, offset: int, length: int) -> Optional[bytes]:
+        end = offset + length
+        if self._map is None or end > len(self._map):
+            self._close_map()
+            try:
+                with open(self._records_path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return None
+        if end > len(self._map):
+            return None
+        return self._map[offset:end]
+
+    def _close_map(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    # --- writing ----------------------------------------------------------- #
+
+    def put(self, file_path: str, mtime: float, size: int, ast: Dict[str, Any]) -> None:
+        """Queue the AST for *file_path*; written on the next flush."""
+        payload = zlib.compress(json.dumps(ast, separators=(",", ":")).encode("utf-8"), 3)
+        with self._mutex:
+            self._pending.append((file_path, mtime, size, payload))
+            self._pending_bytes += len(payload)
+            should_flush = self._pending_bytes >= _FLUSH_BYTES
+        if should_flush:
+            self.flush()
+
+    def remove(self, file_path: str) -> None:
+        """Queue deletion of *file_path*'s record."""
+        with self._mutex:
+            self._pending.append((file_path, 0.0, 0, None))
+
+    def retain(self, file_paths: Iterable[str]) -> int:
+        """Remove every record whose path isn't in *file_paths*."""
+        keep = set(file_paths)
+        stale = [p for p in self._entries if p not in keep]
+        for path in stale:
+            self.remove(path)
+        return len(stale)
+
+    def flush(self) -> None:
+        """Append queued records and their index entries."""
+        with self._mutex:
+            pending, self._pending, self._pending_bytes = self._pending, [], 0
+        if not pending:
+            return
+        try:
+            with self._locked():
+                self._refresh_if_changed()
+                with open(self._records_path, "ab") as records:
+                    offset = records.seek(0, os.SEEK_END)
+                    placed = []
+                    for path, mtime, size, payload in pending:
+                        if payload is None:
+                            placed.append((path, CacheEntry(mtime, size, 0, 0, 0)))
+                            continue
+                        records.write(payload)
+                        placed.append((path, CacheEntry(mtime, size, offset, len(payload),
+                                                        zlib.crc32(payload))))
+                        offset += len(payload)
+                index_bytes = bytearray()
+                for path, entry in placed:
+                    raw = path.encode("utf-8", errors="surrogateescape")
+                    index_bytes += _ENTRY.pack(entry.crc, entry.mtime, entry.size,
+                                               entry.offset, entry.length, len(raw)) + raw
+                with open(self._index_path, "ab") as index:
+                    index.write(index_bytes)
+                self._index_size += len(index_bytes)
+                with self._mutex:
+                    for path, entry in placed:
+                        previous = self._entries.pop(path, None)
+                        if previous is not None:
+                            self._dead_bytes += previous.length
+                        if entry.length:
+                            self._entries[path] = entry
+        except OSError as e:
+            logger.warning(f"AST cache save failed: {e}")
+
+    def _refresh_if_changed(self) -> None:
+        """Reload the index if another process appended to or compacted the cache.
+
+        Caller holds the lock.
+        """
+        try:
+            with open(self._index_path, "rb") as f:
+                header = f.read(_HEADER.size)
+                index_size = os.fstat(f.fileno()).st_size
+        except FileNotFoundError:
+            header, index_size = b"", 0
+        if header[8:16] != self._epoch or index_size != self._index_size:
+            with self._mutex:
+                self._close_map()
+                self._load_index()
+
+    def close(self) -> None:
+        """Flush queued writes and compact if mostly dead."""
+        self.flush()
+        live = sum(e.length for e in self._entries.values())
+        if self._dead_bytes > live and live + self._dead_bytes >= _COMPACT_MIN_BYTES:
+            self.compact()
+        with self._mutex:
+            self._close_map()
+
+    def compact(self) -> None:
+        """Rewrite both files with only the live records."""
         start = time.monotonic()
-        with gzip.open(path, "wt", encoding="utf-8", compresslevel=3) as f:
-            json.dump(payload, f, separators=(",", ":"))
-        elapsed = time.monotonic() - start
-        size_kb = path.stat().st_size / 1024
-        logger.info(
-            f"AST cache saved: {len(file_entries)} files, "
-            f"{size_kb:.0f} KB, {elapsed:.1f}s"
-        )
-    except Exception as e:
-        logger.warning(f"AST cache save failed: {e}")
+        try:
+            with self._locked():
+                # Pick up records other processes appended, so they survive
+                self._refresh_if_changed()
+                epoch = os.urandom(8)
+                records_tmp = self._records_path.with_name("records.dat.tmp")
+                index_tmp = self._index_path.with_name("index.dat.tmp")
+                entries: Dict[str, CacheEntry] = {}
+                index_bytes = bytearray(_HEADER.pack(_INDEX_MAGIC, epoch))
+                # Readers use the map under the mutex; hold it until the
+                # files are swapped so none sees a closed or replaced map
+                with self._mutex:
+                    with open(records_tmp, "wb") as out:
+                        out.write(_HEADER.pack(_RECORDS_MAGIC, epoch))
+                        offset = _HEADER.size
+                        for path, entry in self._entries.items():
+                            payload = self._read_bytes(entry.offset, entry.length)
+                            if payload is None or zlib.crc32(payload) != entry.crc:
+                                continue
+                            out.write(payload)
+                            new_entry = entry._replace(offset=offset)
+                            entries[path] = new_entry
+                            raw = path.encode("utf-8", errors="surrogateescape")
+                            index_bytes += _ENTRY.pack(new_entry.crc, new_entry.mtime, new_entry.size,
+                                                       new_entry.offset, new_entry.length, len(raw)) + raw
+                            offset += len(payload)
+                    index_tmp.write_bytes(bytes(index_bytes))
+                    self._close_map()
+                    os.replace(records_tmp, self._records_path)
+                    os.replace(index_tmp, self._index_path)
+                    self._epoch = epoch
+                    self._entries = entries
+                    self._index_size = len(index_bytes)
+                    self._dead_bytes = 0
+            logger.info(f"AST cache compacted: {len(entries)} files, "
+                        f"{offset / 1024:.0f} KB, {time.monotonic() - start:.1f}s")
+        except OSError as e:
+            logger.warning(f"AST cache compaction failed: {e}")
+
+
+class _FileLock:
+    """Exclusive flock on *path* for the duration of a with-block."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        self._fh = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._fh.close()
+        return False
 
 
-def is_fresh(entry: Dict[str, Any], file_path: str) -> bool:
+def is_fresh(entry: CacheEntry, file_path: str) -> bool:
     """
     Check whether a cache entry is still valid for the file on disk.
 
@@ -100,8 +404,8 @@ def is_fresh(entry: Dict[str, Any], file_path: str) -> bool:
     try:
         st = os.stat(file_path)
         return (
-            abs(st.st_mtime - entry.get("mtime", 0)) < 0.01
-            and st.st_size == entry.get("size", -1)
+            abs(st.st_mtime - entry.mtime) < 0.01
+            and st.st_size == entry.size
         )
     except OSError:
         return False
@@ -9,6 +9,7 @@ import json
 import logging
 import importlib.util
 import threading
+import time
 from typing import Dict, List, Optional, Any, Tuple, Set
 from app.utils.logging_utils import logger
 from app.config.env_registry import ziya_env
@@ -22,6 +23,14 @@ _enhancer_lock = threading.Lock()
 _indexing_in_progress: Set[str] = set()
 _initialized_projects: Set[str] = set()
 
+# Live re-indexing: watcher events are coalesced per path for this long
+# before the file is re-parsed, so a burst of saves costs one parse.
+_AST_UPDATE_DEBOUNCE = 0.5
+# Absolute path -> monotonic time the re-parse is due
+_pending_ast_updates: Dict[str, float] = {}
+_ast_update_cond = threading.Condition()
+_ast_update_worker: Optional[threading.Thread] = None
+
 # Local copy of AST indexing status to avoid circular import
 _ast_indexing_status = {
     'is_indexing': False,
@@ -59,6 +68,75 @@ def get_current_enhancer():
     return get_enhancer_for_project()
 
 
+def _enhancer_for_path(abs_path: str) -> Optional[Tuple[str, Any]]:
+    """Return (project_root, enhancer) for the innermost indexed project containing *abs_path*."""
+    with _enhancer_lock:
+        candidates = list(_enhancers.items())
+    best = None
+    for root, enhancer in candidates:
+        if abs_path.startswith(root + os.sep) and (best is None or len(root) > len(best[0])):
+            best = (root, enhancer)
+    return best
+
+
+def queue_ast_update(file_path: str) -> None:
+    """
+    Schedule a debounced re-parse of a created, modified or deleted file.
+
+    Called by the file watcher.  Repeated events for one path within the
+    debounce window collapse into a single re-parse, which replaces only
+    that file's nodes in its project's AST index.  A no-op until some
+    project has been indexed.
+    """
+    global _ast_update_worker
+    if not _enhancers:
+        return
+    abs_path = os.path.abspath(file_path)
+    with _ast_update_cond:
+        _pending_ast_updates[abs_path] = time.monotonic() + _AST_UPDATE_DEBOUNCE
+        if _ast_update_worker is None or not _ast_update_worker.is_alive():
+            _ast_update_worker = threading.Thread(
+                target=_run_ast_updates, name="ast-live-reindex", daemon=True)
+            _ast_update_worker.start()
+        _ast_update_cond.notify()
+
+
+def _take_due_ast_updates() -> List[str]:
+    """Block until at least one queued path is due, then dequeue the due ones."""
+    with _ast_update_cond:
+        while True:
+            now = time.monotonic()
+            due = [path for path, when in _pending_ast_updates.items() if when <= now]
+            if due:
+                for path in due:
+                    del _pending_ast_updates[path]
+                return due
+            timeout = min(_pending_ast_updates.values()) - now if _pending_ast_updates else None
+            _ast_update_cond.wait(timeout)
+
+
+def _run_ast_updates() -> None:
+    while True:
+        deferred = []
+        for path in _take_due_ast_updates():
+            match = _enhancer_for_path(path)
+            if match is None:
+                continue
+            root, enhancer = match
+            if root in _indexing_in_progress:
+                # The full pass may already have read the old contents
+                deferred.append(path)
+                continue
+            try:
+                enhancer.update_file(path)
+            except Exception as e:
+                logger.warning(f"AST live re-index failed for {path}: {e}")
+        if deferred:
+            with _ast_update_cond:
+                for path in deferred:
+                    _pending_ast_updates.setdefault(path, time.monotonic() + _AST_UPDATE_DEBOUNCE * 4)
+
+
 def check_dependencies() -> bool:
     """
     Check if all required dependencies are installed.
@@ -197,7 +275,8 @@ def get_ast_context() -> str:
     enhancer = get_current_enhancer()
     if enhancer is None:
         return ""
-    return enhancer.generate_ast_context()
+    with enhancer.update_lock:
+        return enhancer.generate_ast_context()
 
 
 def get_ast_token_count() -> int:
@@ -218,7 +297,8 @@ def get_resolution_estimates() -> Dict[str, Dict[str, Any]]:
     enhancer = get_current_enhancer()
     if enhancer is None:
         return {}
-    return enhancer.calculate_resolution_estimates()
+    with enhancer.update_lock:
+        return enhancer.calculate_resolution_estimates()
 
 
 def change_ast_resolution(new_resolution: str) -> None:
@@ -314,4 +394,5 @@ def enhance_query_context(query: str, file_context: Optional[str] = None) -> Dic
     enhancer = get_current_enhancer()
     if enhancer is None:
         return {}
-    return enhancer.enhance_query_context(query, file_context)
+    with enhancer.update_lock:
+        return enhancer.enhance_query_context(query, file_context)
@@ -24,47 +24,69 @@ class ASTQueryEngine:
         self.ast = unified_ast
         self._build_indices()
     
+    # Node lookups share the AST's own indices, which it keeps current as
+    # nodes are added and removed; only the edge indices live here.
+
+    @property
+    def name_index(self) -> Dict[str, Dict[str, None]]:
+        return self.ast.name_index
+
+    @property
+    def type_index(self) -> Dict[str, Dict[str, None]]:
+        return self.ast.type_index
+
+    @property
+    def file_index(self) -> Dict[str, Dict[str, None]]:
+        return self.ast.file_index
+
     def _build_indices(self) -> None:
         """Build indices for efficient querying."""
-        # Build name index
-        self.name_index: Dict[str, List[str]] = {}
-        for node_id, node in self.ast.nodes.items():
-            if node.name not in self.name_index:
-                self.name_index[node.name] = []
-            self.name_index[node.name].append(node_id)
-        
-        # Build type index
-        self.type_index: Dict[str, List[str]] = {}
-        for node_id, node in self.ast.nodes.items():
-            if node.node_type not in self.type_index:
-                self.type_index[node.node_type] = []
-            self.type_index[node.node_type].append(node_id)
-        
-        # Build file index
-        self.file_index: Dict[str, List[str]] = {}
-        for node_id, node in self.ast.nodes.items():
-            file_path = node.source_location.file_path
-            if file_path not in self.file_index:
-                self.file_index[file_path] = []
-            self.file_index[file_path].append(node_id)
-        
-        # Build edge indices
         self.outgoing_edges: Dict[str, List[Edge]] = {}
         self.incoming_edges: Dict[str, List[Edge]] = {}
         self.edge_type_index: Dict[str, List[Edge]] = {}
-        
+
         for edge in self.ast.edges:
-            if edge.source_id not in self.outgoing_edges:
-                self.outgoing_edges[edge.source_id] = []
-            self.outgoing_edges[edge.source_id].append(edge)
-            
-            if edge.target_id not in self.incoming_edges:
-                self.incoming_edges[edge.target_id] = []
-            self.incoming_edges[edge.target_id].append(edge)
+            self._index_edge(edge)
+
+    def _index_edge(self, edge: Edge) -> None:
+        self.outgoing_edges.setdefault(edge.source_id, []).append(edge)
+        self.incoming_edges.setdefault(edge.target_id, []).append(edge)
+        self.edge_type_index.setdefault(edge.edge_type, []).append(edge)
+
+    def replace_file(self, file_path: str, file_ast: Optional[UnifiedAST]) -> None:
+        """
+        Swap one file's nodes and edges for those in *file_ast*.
+
+        Updates the AST and every index in place, touching only the index
+        buckets of the nodes and edges involved, so re-indexing a single
+        file doesn't rebuild the project-wide indices.  Pass None to drop
+        the file entirely.
+
+        Args:
+            file_path: Path of the file whose nodes are replaced
+            file_ast: Freshly parsed AST for the file, or None
+        """
+        old_ids = set(self.file_index.get(file_path, ()))
+        _, removed_edges = self.ast.remove_nodes(old_ids)
+        # Edges compare by identity, which is what membership needs here
+        removed_edge_set = set(map(id, removed_edges))
+        for edge in removed_edges:
+            for index, key in ((self.outgoing_edges, edge.source_id),
+                               (self.incoming_edges, edge.target_id),
+                               (self.edge_type_index, edge.edge_type)):
+                bucket = index.get(key)
+                if bucket is None:
+                    continue
+                bucket[:] = [e for e in bucket if id(e) not in removed_edge_set]
+                if not bucket:
+                    del index[key]
 
-            if edge.edge_type not in self.edge_type_index:
-                self.edge_type_index[edge.edge_type] = []
-            self.edge_type_index[edge.edge_type].append(edge)
+        if file_ast is None:
+            return
+        first_new_edge = len(self.ast.edges)
+        self.ast.merge(file_ast)
+        for edge in self.ast.edges[first_new_edge:]:
+            self._index_edge(edge)
     
     def find_definitions(self, name: str) -> List[Node]:
         """
@@ -302,8 +324,8 @@ class ASTQueryEngine:
         # Strategy 1: Edge-based lookup (same-file calls where "calls" edges exist)
         calls = []
         function_node_ids = {
-            node.node_id for node in self.ast.nodes.values()
-            if node.node_type == "function" and node.name == function_name
+            node_id for node_id in self.name_index.get(function_name, ())
+            if node_id in self.type_index.get("function", ())
         }
 
         if function_node_ids:
@@ -318,8 +340,8 @@ class ASTQueryEngine:
         if not calls:
             seen_ids: Set[str] = set()
             name_lower = function_name.lower()
-            for node in self.ast.nodes.values():
-                if node.node_type == "call" and node.node_id not in seen_ids:
+            for node in self.ast.get_nodes_by_type("call"):
+                if node.node_id not in seen_ids:
                     # Exact match or attribute-style match (e.g. "self.foo" matches "foo")
                     node_name = node.name
                     if (node_name == function_name or
@@ -137,6 +137,61 @@ class Edge:
         )
 
 
+class _IntervalIndex:
+    """
+    Static interval tree over the source spans of one file's nodes.
+
+    Spans are sorted by start position and stored as an implicit balanced
+    tree over that array (the middle element of each range is its root),
+    with each root holding the largest end position in its subtree.  A
+    stabbing query prunes subtrees that end before the point and never
+    descends right of a start past it, so it costs O(log n + k).
+    """
+
+    def __init__(self, nodes: List[Node]):
+        spans = sorted(
+            ((n.source_location.start_line, n.source_location.start_column),
+             (n.source_location.end_line, n.source_location.end_column),
+             rank, n)
+            for rank, n in enumerate(nodes)
+        ) if nodes else []
+        self._starts = [span[0] for span in spans]
+        self._ends = [span[1] for span in spans]
+        self._ranks = [span[2] for span in spans]
+        self._nodes = [span[3] for span in spans]
+        self._max_end: List[Tuple[int, int]] = list(self._ends)
+        self._fill_max_end(0, len(spans))
+
+    def _fill_max_end(self, lo: int, hi: int) -> Optional[Tuple[int, int]]:
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        best = self._ends[mid]
+        for child in (self._fill_max_end(lo, mid), self._fill_max_end(mid + 1, hi)):
+            if child is not None and child > best:
+                best = child
+        self._max_end[mid] = best
+        return best
+
+    def stab(self, point: Tuple[int, int]) -> List[Tuple[int, Node]]:
+        """Return (insertion rank, node) for every span containing *point*."""
+        hits = []
+        stack = [(0, len(self._nodes))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] < point:
+                continue  # Nothing in this subtree reaches the point
+            stack.append((lo, mid))
+            if self._starts[mid] <= point:
+                if point <= self._ends[mid]:
+                    hits.append((self._ranks[mid], self._nodes[mid]))
+                stack.append((mid + 1, hi))
+        return hits
+
+
 class UnifiedAST:
     """Language-agnostic unified AST representation."""
     
@@ -149,6 +204,68 @@ class UnifiedAST:
             'file_path': None,
             'version': '1.0'
         }
+        # Lookup indices, built on first use and then maintained by
+        # add_node/merge/remove_nodes.  Buckets are insertion-ordered id
+        # sets (dicts with None values) so results keep node order.
+        self._name_index: Optional[Dict[str, Dict[str, None]]] = None
+        self._type_index: Dict[str, Dict[str, None]] = {}
+        self._file_index: Dict[str, Dict[str, None]] = {}
+        self._indexed_count = 0
+        # Per-file interval trees, built on the first location query for a
+        # file and dropped when that file's nodes change.
+        self._intervals: Dict[str, _IntervalIndex] = {}
+
+    # --- indices ----------------------------------------------------------- #
+
+    def _ensure_indices(self) -> None:
+        # Also catches nodes written straight into self.nodes
+        if self._name_index is not None and self._indexed_count == len(self.nodes):
+            return
+        self._name_index = {}
+        self._type_index = {}
+        self._file_index = {}
+        self._intervals = {}
+        self._indexed_count = 0
+        for node in self.nodes.values():
+            self._index_node(node)
+
+    def _index_node(self, node: Node) -> None:
+        self._name_index.setdefault(node.name, {})[node.node_id] = None
+        self._type_index.setdefault(node.node_type, {})[node.node_id] = None
+        file_path = node.source_location.file_path
+        self._file_index.setdefault(file_path, {})[node.node_id] = None
+        self._intervals.pop(file_path, None)
+        self._indexed_count += 1
+
+    def _unindex_node(self, node: Node) -> None:
+        for index, key in ((self._name_index, node.name),
+                           (self._type_index, node.node_type),
+                           (self._file_index, node.source_location.file_path)):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(node.node_id, None)
+                if not bucket:
+                    del index[key]
+        self._intervals.pop(node.source_location.file_path, None)
+        self._indexed_count -= 1
+
+    @property
+    def name_index(self) -> Dict[str, Dict[str, None]]:
+        """Node name -> ids of the nodes with that name."""
+        self._ensure_indices()
+        return self._name_index
+
+    @property
+    def type_index(self) -> Dict[str, Dict[str, None]]:
+        """Node type -> ids of the nodes of that type."""
+        self._ensure_indices()
+        return self._type_index
+
+    @property
+    def file_index(self) -> Dict[str, Dict[str, None]]:
+        """File path -> ids of the nodes located in that file."""
+        self._ensure_indices()
+        return self._file_index
     
     def add_node(self, node_type: str, name: str, source_location: SourceLocation, 
                  attributes: Optional[Dict[str, Any]] = None) -> str:
@@ -166,7 +283,10 @@ class UnifiedAST:
         """
         node_id = str(uuid.uuid4())
         node = Node(node_id, node_type, name, source_location, attributes)
+        in_sync = self._name_index is not None and self._indexed_count == len(self.nodes)
         self.nodes[node_id] = node
+        if in_sync:
+            self._index_node(node)
         return node_id
     
     def add_edge(self, source_id: str, target_id: str, edge_type: str, 
@@ -261,9 +381,12 @@ class UnifiedAST:
         logger.debug(f"Merging AST: current has {len(self.nodes)} nodes, other has {len(other.nodes)} nodes")
         
         # Add nodes from other AST
+        in_sync = self._name_index is not None and self._indexed_count == len(self.nodes)
         for node_id, node in other.nodes.items():
             if node_id not in self.nodes:
                 self.nodes[node_id] = node
+                if in_sync:
+                    self._index_node(node)
         
         logger.debug(f"After node merge: {len(self.nodes)} total nodes")
         
@@ -273,6 +396,33 @@ class UnifiedAST:
             if edge.source_id in self.nodes and edge.target_id in self.nodes:
                 self.edges.append(edge)
     
+    def remove_nodes(self, node_ids: Set[str]) -> Tuple[List[Node], List[Edge]]:
+        """
+        Remove nodes and every edge that touches them.
+
+        Args:
+            node_ids: IDs of the nodes to remove
+
+        Returns:
+            The removed nodes and edges
+        """
+        in_sync = self._name_index is not None and self._indexed_count == len(self.nodes)
+        removed_nodes = [self.nodes.pop(node_id) for node_id in node_ids if node_id in self.nodes]
+        if not removed_nodes:
+            return [], []
+        if in_sync:
+            for node in removed_nodes:
+                self._unindex_node(node)
+        kept_edges = []
+        removed_edges = []
+        for edge in self.edges:
+            if edge.source_id in node_ids or edge.target_id in node_ids:
+                removed_edges.append(edge)
+            else:
+                kept_edges.append(edge)
+        self.edges = kept_edges
+        return removed_nodes, removed_edges
+
     def get_node_by_location(self, file_path: str, line: int, column: int) -> Optional[Node]:
         """
         Find a node at the given source location.
@@ -285,24 +435,30 @@ class UnifiedAST:
         Returns:
             Node at the location or None if not found
         """
-        candidates = []
-        
-        for node in self.nodes.values():
-            loc = node.source_location
-            if (loc.file_path == file_path and
-                loc.start_line <= line <= loc.end_line and
-                (loc.start_line != line or loc.start_column <= column) and
-                (loc.end_line != line or column <= loc.end_column)):
-                candidates.append(node)
-        
+        intervals = self._intervals_for(file_path)
+        if intervals is None:
+            return None
+        candidates = intervals.stab((line, column))
         if not candidates:
             return None
         
-        # Return the most specific (smallest) node
-        return min(candidates, key=lambda n: (
-            (n.source_location.end_line - n.source_location.start_line),
-            (n.source_location.end_column - n.source_location.start_column)
-        ))
+        # Return the most specific (smallest) node; ties go to the node
+        # added first
+        return min(candidates, key=lambda hit: (
+            (hit[1].source_location.end_line - hit[1].source_location.start_line),
+            (hit[1].source_location.end_column - hit[1].source_location.start_column),
+            hit[0],
+        ))[1]
+
+    def _intervals_for(self, file_path: str) -> Optional[_IntervalIndex]:
+        node_ids = self.file_index.get(file_path)
+        if not node_ids:
+            return None
+        intervals = self._intervals.get(file_path)
+        if intervals is None:
+            intervals = _IntervalIndex([self.nodes[node_id] for node_id in node_ids])
+            self._intervals[file_path] = intervals
+        return intervals
     
     def get_nodes_by_type(self, node_type: str) -> List[Node]:
         """
@@ -314,7 +470,7 @@ class UnifiedAST:
         Returns:
             List of matching nodes
         """
-        return [node for node in self.nodes.values() if node.node_type == node_type]
+        return [self.nodes[node_id] for node_id in self.type_index.get(node_type, ())]
     
     def get_nodes_by_name(self, name: str) -> List[Node]:
         """
@@ -326,4 +482,16 @@ class UnifiedAST:
         Returns:
             List of matching nodes
         """
-        return [node for node in self.nodes.values() if node.name == name]
+        return [self.nodes[node_id] for node_id in self.name_index.get(name, ())]
+
+    def get_nodes_by_file(self, file_path: str) -> List[Node]:
+        """
+        Get all nodes located in a specific file.
+        
+        Args:
+            file_path: Path of the file
+            
+        Returns:
+            List of matching nodes
+        """
+        return [self.nodes[node_id] for node_id in self.file_index.get(file_path, ())]
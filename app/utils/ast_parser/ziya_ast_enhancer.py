@@ -7,6 +7,7 @@ enhancing context generation with semantic code information.
 
 import os
 import logging
+import threading
 from typing import Dict, List, Optional, Any, Set
 import time
 
@@ -19,6 +20,44 @@ from .python_parser import PythonASTParser
 from .typescript_parser import TypeScriptASTParser
 from .html_css_parser import HTMLCSSParser
 
+# Cold indexing parses cache misses on a process pool once there are at
+# least this many; smaller batches aren't worth the worker start-up.
+_PARALLEL_MIN_FILES = 64
+_MAX_PARSE_WORKERS = 8
+
+# Per-worker enhancer, created by _init_parse_worker in each pool process.
+_worker_enhancer: Optional["ZiyaASTEnhancer"] = None
+
+
+def _init_parse_worker() -> None:
+    global _worker_enhancer
+    _worker_enhancer = ZiyaASTEnhancer()
+
+
+def _parse_in_worker(file_path: str):
+    """
+    Pool task: parse one file and return ``(ast_dict, error)``.
+
+    The AST travels back as ``UnifiedAST.to_dict()`` output, which is also
+    what the disk cache stores, so the parent never re-serialises it.
+    """
+    parser_class = _worker_enhancer.parser_registry.get_parser(file_path)
+    if not parser_class:
+        return None, "no parser in worker"
+    try:
+        return _worker_enhancer._parse_file(file_path, parser_class).to_dict(), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _get_parse_workers() -> int:
+    from app.config.env_registry import ziya_env
+    workers = ziya_env("ZIYA_AST_WORKERS") or 0
+    if workers > 0:
+        return workers
+    return max(1, min(os.cpu_count() or 1, _MAX_PARSE_WORKERS))
+
+
 class ZiyaASTEnhancer:
     """Enhancer for Ziya using AST capabilities."""
     
@@ -46,6 +85,12 @@ class ZiyaASTEnhancer:
         self.project_ast = UnifiedAST()
         self.UnifiedAST = UnifiedAST  # Store reference for re-initialization
         self.resolution_estimates = {}
+        # Set by _process_directory; used by update_file for live re-indexing
+        self.codebase_dir: Optional[str] = None
+        self._disk_cache = None
+        # Held by live updates while they change the index in place, and by
+        # readers while they walk it (see integration and the AST tools)
+        self.update_lock = threading.RLock()
     
     def _register_parsers(self):
         """Register available parsers."""
@@ -86,20 +131,23 @@ class ZiyaASTEnhancer:
         Process all files in the directory and build ASTs.
 
         Uses a single os.walk pass with a file count cap and time deadline
-        to avoid runaway scanning in large directory trees.
+        to avoid runaway scanning in large directory trees.  Files missing
+        from the disk cache are parsed on a process pool when there are
+        enough of them, and merged in walk order as results stream back.
 
         Args:
             codebase_dir: Path to the codebase root
-            should_ignore_fn: Function to check if a path should be ignored
+            should_ignore_fn: Compiled GitignoreMatcher for the codebase
             max_depth: Maximum directory depth to traverse
             progress_callback: Optional callback to report progress
         """
         # Load disk cache for this project
-        from .disk_cache import load_cache, save_cache, is_fresh
+        from .disk_cache import ASTDiskCache
         abs_codebase = os.path.abspath(codebase_dir)
-        cached_files = load_cache(abs_codebase)
+        disk_cache = ASTDiskCache.open(abs_codebase)
+        self.codebase_dir = codebase_dir
+        self._disk_cache = disk_cache
         cache_hits = 0
-        cache_entries: dict = {}  # will be saved at end
 
         files_processed = 0
         files_total = 0
@@ -126,14 +174,11 @@ class ZiyaASTEnhancer:
                 dirs.clear()
                 continue
 
-            dirs[:] = [d for d in dirs
-                       if d not in self._SKIP_DIRS
-                       and not should_ignore_fn(os.path.join(root, d))]
+            dirs[:] = should_ignore_fn.filter_names(
+                root, [d for d in dirs if d not in self._SKIP_DIRS], dirs=True)
 
-            for file in files:
+            for file in should_ignore_fn.filter_names(root, files):
                 file_path = os.path.join(root, file)
-                if should_ignore_fn(file_path):
-                    continue
                 if self.parser_registry.get_parser(file_path):
                     eligible_files.append(file_path)
                     if len(eligible_files) >= _FILE_CAP:
@@ -148,7 +193,9 @@ class ZiyaASTEnhancer:
             progress_callback(0, files_total, 0)
         logger.debug(f"AST: found {files_total} parseable files")
 
-        # Process collected files
+        # Split into cache hits and misses, keeping walk order
+        to_index = []
+        misses = []
         for file_path in eligible_files:
             rel_file_path = os.path.relpath(file_path, codebase_dir)
             parser_class = self.parser_registry.get_parser(file_path)
@@ -156,44 +203,61 @@ class ZiyaASTEnhancer:
                 continue
             if 'node_modules' in rel_file_path and parser_class.__name__ == 'TypeScriptASTParser':
                 continue
-
-            try:
-                cached = cached_files.get(file_path)
-                if cached and is_fresh(cached, file_path):
-                    unified_ast = UnifiedAST.from_dict(cached["ast"])
-                    cache_hits += 1
-                else:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        file_content = f.read()
-                    parser = parser_class()
-                    native_ast = parser.parse(file_path, file_content)
-                    unified_ast = parser.to_unified_ast(native_ast, file_path)
-
-                self.ast_cache[file_path] = unified_ast
-
+            if disk_cache.is_fresh(file_path):
+                to_index.append((file_path, parser_class, True))
+            else:
+                to_index.append((file_path, parser_class, False))
+                misses.append(file_path)
+        parsed = self._parse_files(misses)
+        try:
+            # Merge in walk order; misses arrive from the pool in the same order
+            for file_path, parser_class, hit in to_index:
+                rel_file_path = os.path.relpath(file_path, codebase_dir)
                 try:
-                    st = os.stat(file_path)
-                    cache_entries[file_path] = {
-                        "mtime": st.st_mtime,
-                        "size": st.st_size,
-                        "ast": unified_ast.to_dict(),
-                    }
-                except OSError:
-                    pass
-
-                self.query_engines[file_path] = ASTQueryEngine(unified_ast)
-                self.project_ast.merge(unified_ast)
+                    ast_dict = disk_cache.read(file_path) if hit else None
+                    if ast_dict is not None:
+                        unified_ast = UnifiedAST.from_dict(ast_dict)
+                        cache_hits += 1
+                    else:
+                        if not hit:
+                            try:
+                                # An exhausted or failed stream means "parse it here"
+                                ast_dict, error = next(parsed, (None, None))
+                            except Exception as e:
+                                logger.warning(f"AST: parse stream failed ({e}), continuing in-process")
+                                ast_dict, error = None, None
+                            if error:
+                                # Retry here so a worker-only failure costs one
+                                # file's parse time, not the file.
+                                logger.debug(f"AST: worker could not parse {rel_file_path}: {error}")
+                        if ast_dict is None:
+                            unified_ast = self._parse_file(file_path, parser_class)
+                            ast_dict = unified_ast.to_dict()
+                        else:
+                            unified_ast = UnifiedAST.from_dict(ast_dict)
+                        try:
+                            st = os.stat(file_path)
+                            disk_cache.put(file_path, st.st_mtime, st.st_size, ast_dict)
+                        except OSError:
+                            pass
+
+                    self.ast_cache[file_path] = unified_ast
+
+                    self.query_engines[file_path] = ASTQueryEngine(unified_ast)
+                    self.project_ast.merge(unified_ast)
+
+                    files_processed += 1
+                    if files_processed % 10 == 0 or files_processed == files_total:
+                        if progress_callback:
+                            progress_percentage = int((files_processed / files_total) * 100) if files_total > 0 else 0
+                            progress_callback(files_processed, files_total, progress_percentage)
+                        logger.debug(f"AST indexing: {files_processed}/{files_total} files ({time.time() - start_time:.1f}s)")
+
+                except Exception as e:
+                    logger.debug(f"AST: skipped {rel_file_path}: {e}")
+        finally:
+            parsed.close()
 
-                files_processed += 1
-                if files_processed % 10 == 0 or files_processed == files_total:
-                    if progress_callback:
-                        progress_percentage = int((files_processed / files_total) * 100) if files_total > 0 else 0
-                        progress_callback(files_processed, files_total, progress_percentage)
-                    logger.debug(f"AST indexing: {files_processed}/{files_total} files ({time.time() - start_time:.1f}s)")
-
-            except Exception as e:
-                logger.debug(f"AST: skipped {rel_file_path}: {e}")
-        
         # Create project-wide query engine
         if self.project_ast:
             self.query_engines['project'] = ASTQueryEngine(self.project_ast)
@@ -204,8 +268,116 @@ class ZiyaASTEnhancer:
             f"({cache_hits} from cache)"
         )
 
-        # Persist cache to disk for next startup
-        save_cache(abs_codebase, cache_entries)
+        # Persist new records and drop files that are gone; unchanged
+        # records are left where they are
+        disk_cache.retain(self.ast_cache)
+        disk_cache.close()
+
+    def _indexed_path(self, file_path: str) -> str:
+        """Map an absolute path onto the form used as ast_cache key."""
+        if self.codebase_dir is None:
+            return file_path
+        rel_path = os.path.relpath(os.path.abspath(file_path), os.path.abspath(self.codebase_dir))
+        return os.path.join(self.codebase_dir, rel_path)
+
+    def update_file(self, file_path: str) -> bool:
+        """
+        Re-parse one changed file and swap its nodes into the project index.
+
+        Only the file's own nodes and edges are replaced in project_ast and
+        the project query engine; nothing else is rebuilt.  A file that no
+        longer exists, or that no parser handles, is removed instead.
+
+        Returns:
+            True if the index changed
+        """
+        key = self._indexed_path(file_path)
+        parser_class = self.parser_registry.get_parser(key)
+        if not parser_class or not os.path.isfile(key):
+            return self.remove_file(key)
+        try:
+            unified_ast = self._parse_file(key, parser_class)
+            st = os.stat(key)
+        except Exception as e:
+            logger.debug(f"AST: live re-parse of {key} failed: {e}")
+            return False
+
+        with self.update_lock:
+            project_engine = self.query_engines.get('project')
+            if project_engine is not None:
+                project_engine.replace_file(key, unified_ast)
+            else:
+                self.project_ast.merge(unified_ast)
+                self.query_engines['project'] = ASTQueryEngine(self.project_ast)
+            self.ast_cache[key] = unified_ast
+            self.query_engines[key] = ASTQueryEngine(unified_ast)
+            if self._disk_cache is not None:
+                self._disk_cache.put(key, st.st_mtime, st.st_size, unified_ast.to_dict())
+                self._disk_cache.flush()
+        logger.debug(f"AST: re-indexed {key} ({len(unified_ast.nodes)} nodes)")
+        return True
+
+    def remove_file(self, file_path: str) -> bool:
+        """Drop a deleted file's nodes from the index.  Returns True if it was indexed."""
+        key = self._indexed_path(file_path)
+        with self.update_lock:
+            if self.ast_cache.pop(key, None) is None:
+                return False
+            self.query_engines.pop(key, None)
+            project_engine = self.query_engines.get('project')
+            if project_engine is not None:
+                project_engine.replace_file(key, None)
+            if self._disk_cache is not None:
+                self._disk_cache.remove(key)
+                self._disk_cache.flush()
+        logger.debug(f"AST: removed {key} from index")
+        return True
+
+    def _parse_file(self, file_path: str, parser_class) -> UnifiedAST:
+        """Read and parse one file into a UnifiedAST."""
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            file_content = f.read()
+        parser = parser_class()
+        native_ast = parser.parse(file_path, file_content)
+        return parser.to_unified_ast(native_ast, file_path)
+
+    def _parse_files(self, file_paths: List[str]):
+        """
+        Yield ``(ast_dict, error)`` for each of *file_paths*, in order.
+
+        Large batches are parsed on a process pool (ZIYA_AST_WORKERS,
+        default CPU count capped at 8) and streamed back as they complete
+        in order.  Small batches, single-worker setups and a pool that
+        fails to start or dies part way all fall back to ``(None, None)``,
+        which tells the caller to parse the file in-process.
+        """
+        workers = min(_get_parse_workers(), len(file_paths))
+        if workers <= 1 or len(file_paths) < _PARALLEL_MIN_FILES:
+            for _ in file_paths:
+                yield None, None
+            return
+
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # Never fork: this runs on a background thread of a threaded server,
+        # and a child forked while another thread holds a lock can deadlock.
+        mp_context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+        done = 0
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker,
+                                     mp_context=mp_context) as executor:
+                logger.info(f"AST: parsing {len(file_paths)} files on {workers} worker processes")
+                chunksize = max(1, min(64, len(file_paths) // (workers * 4)))
+                for result in executor.map(_parse_in_worker, file_paths, chunksize=chunksize):
+                    yield result
+                    done += 1
+        except (OSError, RuntimeError, ValueError) as e:
+            # BrokenProcessPool is a RuntimeError
+            logger.warning(f"AST: parse pool failed after {done}/{len(file_paths)} files ({e}), "
+                           f"continuing in-process")
+            for _ in file_paths[done:]:
+                yield None, None
 
     def process_codebase(self, codebase_dir: str, ignored_patterns: Optional[List[str]] = None, max_depth: int = 15) -> Dict[str, Any]:
         """
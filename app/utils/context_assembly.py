@@ -0,0 +1,185 @@
+"""
+Incremental assembly of the codebase context.
+
+Every turn renders each selected file as
+
+    File: <path>
+    [001 ] first line
+    [002+] second line
+    ...
+
+Re-reading every file from disk and re-rendering it each turn dominates
+context assembly for large selections.  This module keeps two caches:
+
+  * file contents, revalidated by ``stat`` (mtime, size, inode) and read
+    again only when one of those changed; changed files are read on a small
+    thread pool, and the least recently used contents are evicted once the
+    cache holds more than _MAX_CACHED_CHARS;
+  * rendered segments per conversation, revalidated by the file state's
+    content hash and line annotations, so a segment is only re-rendered
+    when its text would actually differ.
+
+Segments are joined once per turn.  Rendering is deterministic, so an
+unchanged selection yields a byte-identical context and keeps the
+provider's prompt-cache prefix intact.
+"""
+
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.file_utils import read_file_content
+from app.utils.logging_utils import logger
+
+_READ_WORKERS = 8
+
+# Files modified this close to when they were read may change again within
+# the same mtime tick, so their stat alone doesn't prove the content is
+# unchanged (the "racy git" problem).  They are re-read next time.
+_RACY_WINDOW_NS = 2_000_000_000
+
+# Conversations whose segments are kept; matches the file state manager's
+# in-memory conversation limit.
+_MAX_CONVERSATIONS = 20
+
+# Upper bound on cached file text across all projects and conversations.
+_MAX_CACHED_CHARS = 64 * 1024 * 1024
+
+# full_path -> (mtime_ns, size, inode, read_at_ns, content), oldest use first
+_contents: "OrderedDict[str, Tuple[int, int, int, int, str]]" = OrderedDict()
+_contents_chars = 0
+_contents_lock = threading.Lock()
+
+# conversation_id -> {file_path: (fingerprint, segment)}
+_segments: "OrderedDict[str, Dict[str, Tuple[tuple, str]]]" = OrderedDict()
+_segments_lock = threading.Lock()
+
+
+def _stat_key(st: os.stat_result) -> Tuple[int, int, int]:
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _forget(path: str) -> None:
+    """Drop one cached file; caller holds _contents_lock."""
+    global _contents_chars
+    cached = _contents.pop(path, None)
+    if cached is not None:
+        _contents_chars -= len(cached[4])
+
+
+def read_files(full_paths: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Contents of each path, or None for directories and unreadable files.
+
+    Unchanged files are answered from the cache; the rest are read with
+    ``read_file_content`` in parallel.
+    """
+    results: Dict[str, Optional[str]] = {}
+    stale: List[Tuple[str, Tuple[int, int, int]]] = []
+    with _contents_lock:
+        for path in full_paths:
+            if path in results:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                _forget(path)
+                results[path] = None
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                results[path] = None
+                continue
+            key = _stat_key(st)
+            cached = _contents.get(path)
+            if cached is not None and cached[:3] == key and cached[3] - key[0] > _RACY_WINDOW_NS:
+                _contents.move_to_end(path)
+                results[path] = cached[4]
+            else:
+                results[path] = None
+                stale.append((path, key))
+
+    if not stale:
+        return results
+
+    def load(item):
+        path, key = item
+        read_at = time.time_ns()
+        try:
+            return path, key, read_at, read_file_content(path)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.debug(f"Could not read {path}: {e}")
+            return path, key, read_at, None
+
+    if len(stale) == 1:
+        loaded = [load(stale[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(_READ_WORKERS, len(stale)),
+                                thread_name_prefix="context-read") as pool:
+            loaded = list(pool.map(load, stale))
+
+    global _contents_chars
+    with _contents_lock:
+        for path, key, read_at, content in loaded:
+            results[path] = content
+            _forget(path)
+            if content and len(content) <= _MAX_CACHED_CHARS:
+                _contents[path] = (*key, read_at, content)
+                _contents_chars += len(content)
+        while _contents_chars > _MAX_CACHED_CHARS:
+            _forget(next(iter(_contents)))
+    logger.debug(f"Context assembly: read {len(stale)} of {len(results)} files from disk")
+    return results
+
+
+def _fingerprint(state) -> tuple:
+    return state.content_hash, tuple(sorted(state.line_states.items()))
+
+
+def render_segment(file_path: str, state) -> str:
+    """The context block for one file, with backticks escaped for the model."""
+    line_states = state.line_states
+    body = "\n".join(f"[{i:03d}{line_states.get(i, ' ')}] {line}"
+                     for i, line in enumerate(state.current_content, 1))
+    return f"File: {file_path}\n" + body.replace('`', '\\`') + "\n\n"
+
+
+def segment_for(conversation_id: str, file_path: str, state) -> str:
+    """Rendered segment for `file_path`, re-rendered only if its state changed."""
+    fingerprint = _fingerprint(state)
+    with _segments_lock:
+        segments = _segments.get(conversation_id)
+        if segments is not None:
+            _segments.move_to_end(conversation_id)
+            cached = segments.get(file_path)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1]
+    segment = render_segment(file_path, state)
+    with _segments_lock:
+        segments = _segments.setdefault(conversation_id, {})
+        _segments.move_to_end(conversation_id)
+        segments[file_path] = (fingerprint, segment)
+        while len(_segments) > _MAX_CONVERSATIONS:
+            _segments.popitem(last=False)
+    return segment
+
+
+def retain_segments(conversation_id: str, file_paths: Iterable[str]) -> None:
+    """Drop cached segments for files no longer in the conversation's selection."""
+    keep = set(file_paths)
+    with _segments_lock:
+        segments = _segments.get(conversation_id)
+        if segments:
+            for path in [p for p in segments if p not in keep]:
+                del segments[path]
+
+
+def clear() -> None:
+    global _contents_chars
+    with _contents_lock:
+        _contents.clear()
+        _contents_chars = 0
+    with _segments_lock:
+        _segments.clear()
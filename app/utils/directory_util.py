@@ -1,11 +1,14 @@
+import concurrent.futures
 import glob
+import heapq
+import itertools
 import os
 import sys
 import time
 import re
 import threading
 import signal
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Set, Tuple, Dict, Any, Optional
 import mimetypes
 from pathlib import Path
 from app.config.env_registry import ziya_env
@@ -55,9 +58,6 @@ def _progress_slot(directory: Optional[str] = None) -> Dict[str, Any]:
 # Add new globals for background scanning
 _scan_thread: Optional[threading.Thread] = None
 _scan_lock = threading.Lock()
-    
-# Track visited directories to prevent infinite loops
-_visited_directories = set()
 
 # Global cache for ignored patterns to avoid re-scanning on every API call
 _ignored_patterns_cache: Optional[List[Tuple[str, str]]] = None
@@ -471,13 +471,12 @@ def get_complete_file_list(user_codebase_dir: str, ignored_patterns: List[str],
                 break
             # Filter out ignored directories and hidden directories
             # Append trailing slash to directory paths for gitignore matching.
-            dirs[:] = [d for d in dirs 
-                      if not should_ignore_fn(os.path.join(root, d) + os.sep) 
-                      and not d.startswith('.')]
+            dirs[:] = [d for d in should_ignore_fn.filter_names(root, dirs, dirs=True)
+                      if not d.startswith('.')]
 
-            for file in files:
+            for file in should_ignore_fn.filter_names(root, files):
                 file_path = os.path.join(root, file)
-                if not should_ignore_fn(file_path) and not is_binary_file(file_path) and not file.startswith('.'):
+                if not is_binary_file(file_path) and not file.startswith('.'):
                     file_dict[file_path] = {}
                     if len(file_dict) >= MAX_FILES:
                         logger.warning(f"get_complete_file_list: hit {MAX_FILES} file cap, returning partial list")
@@ -548,77 +547,52 @@ def detect_large_directory_and_warn(directory: str) -> None:
         print("   Or use: --include-only <path> to scan specific directories", file=sys.stderr)
         print("="*70 + "\n", file=sys.stderr)
 
-def estimate_directory_count(directory: str, ignored_patterns: List[Tuple[str, str]], max_depth: int = 3, progress: Optional[Dict[str, Any]] = None) -> int:
-    """Quick estimate of total directories to scan (only go 3 levels deep for estimate).
+# Directory names the tree scan never descends into (macOS home-directory
+# bulk that makes a scan crawl without adding anything useful).
+SLOW_SCAN_DIR_NAMES = frozenset({
+    'Library', 'CoreSimulator', 'Containers', 'Caches', 'Logs',
+    'Application Support', 'Developer', 'News', 'Trial',
+    '.Trash', 'Downloads', 'Applications', 'Movies', 'Music', 'Pictures'
+})
 
-    `progress` is the scan-progress slot whose 'cancelled' flag aborts the
-    estimate early; None selects the legacy global slot so existing callers
-    are unchanged.
-    """
-    _progress = progress if progress is not None else _scan_progress
-    should_ignore_fn = parse_gitignore_patterns(ignored_patterns)
-    count = 0
-    # Estimation is depth-limited (2 levels) + count-capped (1000 dirs); the
-    # wall-clock bound is a safety net, not the primary limit.
-    _estimate_deadline = time.time() + ziya_env("ZIYA_ESTIMATE_TIMEOUT")
-    
-    # CRITICAL: Skip Library directory in estimation to avoid hanging
-    if 'Library' in directory or directory.endswith('/Library'):
-        logger.info("Skipping Library directory in estimation")
-        return 0
-    
-    def quick_count(path: str, depth: int, symlink_hops: int = 0) -> int:
-        # Even more aggressive depth limit for estimation
-        if depth > 2:  # Only scan 2 levels deep for estimate
-            return 0
-        
-        # Check for cancellation
-        if time.time() > _estimate_deadline:
-            return 0
+# Skip pathologically large flat directories
+MAX_ENTRIES_PER_DIR = 10000
 
-        if _progress.get("cancelled"):
-            return 0
-        
-        nonlocal count
-        try:
-            entries = os.scandir(path)
-            for entry in entries:
-                is_symlink = entry.is_symlink()
-                entry_hops = symlink_hops
-                if is_symlink and entry.name not in _included_symlink_names:
-                    entry_hops = symlink_hops + 1
-                    if entry_hops > MAX_SYMLINK_HOPS:
-                        continue
-                if not entry.is_dir(follow_symlinks=is_symlink):
-                    continue
-                entry_path = entry.path
-                
-                # Skip Library and other known slow directories
-                basename = entry.name
-                if basename in {'Library', 'Applications', 'Downloads', '.Trash'}:
-                    continue
-                
-                if should_ignore_fn(entry_path):
-                    continue
-                count += 1
-                quick_count(entry_path, depth + 1, entry_hops)
-                
-                # Add a limit to prevent estimation from taking too long
-                if count > 1000:  # Stop counting after 1000 dirs found
-                    return count
-        except (PermissionError, OSError):
-            pass
-        return count
-    
-    count = quick_count(directory, 0)
-    
-    # Extrapolate to full depth based on estimation depth vs actual max_depth
-    if count > 0:
-        scaled = count * (max_depth // 2) if max_depth > 2 else count
-        return min(scaled, count * 10)  # Cap at 10x to avoid ridiculous estimates
-    return 0
 
-def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]], max_depth: int) -> Dict[str, Any]:
+def classify_scan_entry(de: os.DirEntry, symlink_hops: int) -> Optional[Tuple[bool, int]]:
+    """Decide whether the folder-tree scan keeps a directory entry.
+
+    Returns (is_dir, entry_hops) for a directory or regular file the scan
+    would include, before gitignore filtering, or None to skip it.
+    """
+    # Symlink hop budget: follow up to MAX_SYMLINK_HOPS (default 1).
+    # A shared asset linked at the root is 1 hop; any symlink found
+    # while already inside a symlinked subtree is 2+ and is skipped.
+    # Combined with the permanent realpath visited-set, this prevents
+    # Brazil-style cross-package symlink webs from exploding the scan
+    # while still allowing legitimate root-level shared-asset links.
+    # Explicit --include names override the hop budget.
+    try:
+        is_symlink = de.is_symlink()
+    except OSError:
+        return None
+    entry_hops = symlink_hops
+    if is_symlink:
+        if de.name not in _included_symlink_names:
+            entry_hops = symlink_hops + 1
+            if entry_hops > MAX_SYMLINK_HOPS:
+                return None
+    try:
+        if de.is_dir(follow_symlinks=is_symlink):
+            return True, entry_hops
+        if de.is_file(follow_symlinks=False):
+            return False, entry_hops
+    except OSError:
+        pass
+    return None
+
+def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]], max_depth: int,
+                         stat_sink: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Get the folder structure of a directory with token counts.
     Now returns immediately with estimated counts, accurate counts calculated in background.
@@ -627,6 +601,11 @@ def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]]
         directory: The directory to get the structure of
         ignored_patterns: Patterns to ignore
         max_depth: Maximum depth to traverse
+        stat_sink: Optional dict with 'dirs' and 'files' maps. When given,
+            the scan records each directory's [mtime_ns, symlink_hops] and
+            each file's size under its project-relative path, and sets
+            'complete' to False if anything outside the project was grafted
+            on. Used to persist a revalidatable snapshot of the tree.
         
     Returns:
         Dict with folder structure including token counts
@@ -682,33 +661,11 @@ def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]]
         logger.info("Scan cancelled before starting")
         return {"error": "Scan cancelled by user", "cancelled": True}
     
-    logger.debug("Estimating directory count for progress tracking...")
-    # Quick estimate of total work for better progress reporting
-    try:
-        # Skip estimation for home directories - it's too slow
-        home_dir = os.path.expanduser("~")
-        is_home = os.path.abspath(directory).startswith(home_dir)
-        
-        if is_home:
-            logger.debug("Skipping estimation for home directory (too large)")
-            estimated_total = 0
-        else:
-            estimated_total = estimate_directory_count(directory, ignored_patterns, progress=progress)
-        
-        # Check cancellation after estimation
-        if progress.get("cancelled") or _scan_progress.get("cancelled"):
-            logger.info("Scan cancelled during estimation")
-            progress["active"] = False
-            _scan_progress["active"] = False
-            return {"error": "Scan cancelled by user", "cancelled": True}
-        
-    except Exception as e:
-        logger.warning(f"Failed to estimate directory count: {e}")
-        estimated_total = 0
-    
-    progress["estimated_total"] = estimated_total
-    _scan_progress["estimated_total"] = estimated_total
-    logger.debug(f"Estimated ~{estimated_total} directories to scan" if estimated_total > 0 else "Starting scan without estimate (will show raw counts)")
+    # No separate estimation walk: the scanner counts directories as it
+    # discovers them, and estimated_total tracks scanned + queued so the
+    # progress percentage comes out of the same pass.
+    progress["estimated_total"] = 0
+    _scan_progress["estimated_total"] = 0
     # Set a maximum time limit for scanning. Default 120s accommodates large
     # source trees; extreme cases can extend via ZIYA_SCAN_TIMEOUT.
     max_scan_time = ziya_env("ZIYA_SCAN_TIMEOUT", default=120)
@@ -721,86 +678,80 @@ def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]]
     progress_interval = 2.0  # Log progress every 2 seconds
     last_stderr_progress_time = time.time()
 
-    # Clear visited directories at start of scan
-    global _visited_directories
-    _visited_directories.clear()
-    
-    # Process the root directory using breadth-first strategy:
-    # Scan everything up to BFS_DEPTH_THRESHOLD first so the UI has a
-    # usable tree quickly, then go deeper for directories that were deferred.
+    # Real paths listed by this scan, to prevent symlink loops. Kept per
+    # call: concurrent scans of the same tree must not see each other's.
+    visited_directories: Set[str] = set()
+    visited_lock = threading.Lock()
+
+    # Directory listings are latency-bound (network filesystems, cold
+    # caches), so they fan out across a worker pool. The calling thread
+    # owns the tree: it merges each finished listing and queues the child
+    # directories. The queue is ordered by depth, so everything up to
+    # BFS_DEPTH_THRESHOLD is listed first and the UI has a usable tree
+    # quickly; deeper directories are then filled in breadth-first.
     BFS_DEPTH_THRESHOLD = 6
-    deferred_dirs: list = []  # [(parent_children_dict, entry_name, entry_path, depth, effective_max)]
-
     MAX_DEFERRED = 5000  # Prevent OOM on extremely wide trees
-    MAX_ENTRIES_PER_DIR = 10000  # Skip pathologically large flat directories
+    scan_workers = max(1, ziya_env("ZIYA_SCAN_WORKERS"))
 
-    def process_dir_bfs(path: str, depth: int, effective_max: int = 0, symlink_hops: int = 0) -> Dict[str, Any]:
-        """Process a directory, deferring children beyond BFS_DEPTH_THRESHOLD.
+    def _sink_rel_path(path: str) -> Optional[str]:
+        """Project-relative key for stat_sink, or None for grafted external paths."""
+        if path == directory:
+            return ''
+        if not path.startswith(directory + os.sep):
+            stat_sink['complete'] = False
+            return None
+        return path[len(directory) + 1:]
+
+    def _cancelled() -> bool:
+        return bool(progress.get("cancelled") or _scan_progress.get("cancelled"))
+
+    def list_dir(path: str, depth: int, effective_max: int, symlink_hops: int,
+                 ignore_fn) -> Optional[Dict[str, Any]]:
+        """List one directory on a worker thread.
+
+        Returns {'entries': [...], 'elapsed': secs} where each entry is
+        (name, None, tokens) for a file or (name, (path, hops, child_max), 0)
+        for a subdirectory to queue, in listing order; None if the directory
+        is skipped.
 
         Args:
             effective_max: When > 0, overrides the global max_depth for this
                 subtree (set by DirectoryScanProvider customizations).
             symlink_hops: Count of symlink hops taken to reach this directory.
         """
-        nonlocal last_progress_check
-
         dir_basename = os.path.basename(path.rstrip(os.sep))
 
-        if dir_basename in {
-            'Library', 'CoreSimulator', 'Containers', 'Caches', 'Logs',
-            'Application Support', 'Developer', 'News', 'Trial',
-            '.Trash', 'Downloads', 'Applications', 'Movies', 'Music', 'Pictures'
-        }:
-            return {'token_count': 0}
+        if dir_basename in SLOW_SCAN_DIR_NAMES:
+            return None
 
         local_max = effective_max if effective_max > 0 else max_depth
 
         if depth > local_max:
-            return {'token_count': 0}
+            return None
 
         try:
             real_path = os.path.realpath(path)
         except (OSError, ValueError):
-            return {'token_count': 0}
-        if real_path in _visited_directories:
-            return {'token_count': 0}
-        _visited_directories.add(real_path)
+            return None
+        with visited_lock:
+            if real_path in visited_directories:
+                return None
+            visited_directories.add(real_path)
+
+        if stat_sink is not None:
+            # Stat before listing so a change made mid-scan shows up as a
+            # newer mtime when the snapshot is next revalidated.
+            rel_dir = _sink_rel_path(path)
+            if rel_dir is not None:
+                try:
+                    stat_sink['dirs'][rel_dir] = [os.stat(path).st_mtime_ns, symlink_hops]
+                except OSError:
+                    pass
 
         dir_start_time = time.time()
 
-        if progress.get("cancelled") or _scan_progress.get("cancelled"):
-            progress["active"] = False
-            _scan_progress["active"] = False
-            return {'token_count': 0, 'cancelled': True}
-
-        current_time = time.time()
-        elapsed = current_time - scan_stats['start_time']
-
-        if elapsed - (last_progress_check['time'] - scan_stats['start_time']) > 10:
-            dirs_since = scan_stats['directories_scanned'] - last_progress_check['directories']
-            if dirs_since > 0:
-                last_progress_check = {'time': current_time, 'directories': scan_stats['directories_scanned']}
-            elif elapsed > max_scan_time:
-                return {'token_count': 0, 'timeout': True}
-
-        if elapsed > max_scan_time * 2:
-            return {'token_count': 0, 'timeout': True}
-
-        nonlocal last_progress_time
-        scan_stats['directories_scanned'] += 1
-        _prog = {
-            "directories": scan_stats['directories_scanned'],
-            "files": scan_stats['files_processed'],
-            "elapsed": int(elapsed)
-        }
-        progress["progress"] = _prog
-        _scan_progress["progress"] = _prog
-        _pt = time.time()
-        progress["last_update"] = _pt
-        _scan_progress["last_update"] = _pt
-
-        result = {'token_count': 0, 'children': {}}
-        total_tokens = 0
+        if _cancelled():
+            return None
 
         # Ask directory-scan providers for per-child customizations
         scan_custom = None
@@ -817,15 +768,15 @@ def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]]
             dir_scanner = os.scandir(path)
         except (PermissionError, OSError) as e:
             logger.debug(f"Cannot access directory {path}: {e}")
-            return {'token_count': 0}
+            return None
 
         # Materialize entries with a circuit breaker for pathologically large dirs.
         # os.scandir is lazy; we consume entries one at a time to stay interruptible.
-        entries = []
+        raw_entries = []
         try:
             for de in dir_scanner:
-                entries.append(de)
-                if len(entries) > MAX_ENTRIES_PER_DIR:
+                raw_entries.append(de)
+                if len(raw_entries) > MAX_ENTRIES_PER_DIR:
                     logger.warning(f"⚠️ Directory {path} has >{MAX_ENTRIES_PER_DIR} entries, truncating scan")
                     break
         except (PermissionError, OSError) as e:
@@ -833,55 +784,23 @@ def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]]
         finally:
             dir_scanner.close()
 
-        for de in entries:
+        entries = []
+        for de in raw_entries:
             entry = de.name
-            if progress.get("cancelled") or _scan_progress.get("cancelled"):
+            if _cancelled():
                 break
 
-            current_time = time.time()
-            elapsed = current_time - scan_stats['start_time']
-            if current_time - last_progress_time > progress_interval:
-                progress_pct = f" ({scan_stats['directories_scanned']}/{estimated_total}, {scan_stats['directories_scanned']*100//max(estimated_total,1)}%)" if estimated_total > 0 else ""
-                logger.debug(f"📊 Scan progress: {scan_stats['directories_scanned']} dirs{progress_pct}, {scan_stats['files_processed']} files in {elapsed:.1f}s")
-                last_progress_time = current_time
-
-                nonlocal last_stderr_progress_time
-                if current_time - last_stderr_progress_time > 5.0:
-                    import sys
-                    print(f"\r⏳ Scanning... {scan_stats['directories_scanned']} directories, "
-                          f"{scan_stats['files_processed']} files ({elapsed:.0f}s elapsed)",
-                          end='', file=sys.stderr, flush=True)
-                    last_stderr_progress_time = current_time
-
             if entry.startswith('.'):
                 continue
 
             entry_path = de.path
-            # Symlink hop budget: follow up to MAX_SYMLINK_HOPS (default 1).
-            # A shared asset linked at the root is 1 hop; any symlink found
-            # while already inside a symlinked subtree is 2+ and is skipped.
-            # Combined with the permanent realpath visited-set, this prevents
-            # Brazil-style cross-package symlink webs from exploding the scan
-            # while still allowing legitimate root-level shared-asset links.
-            # Explicit --include names override the hop budget.
-            try:
-                is_symlink = de.is_symlink()
-            except OSError:
-                continue
-            entry_hops = symlink_hops
-            if is_symlink:
-                if entry not in _included_symlink_names:
-                    entry_hops = symlink_hops + 1
-                    if entry_hops > MAX_SYMLINK_HOPS:
-                        continue
-            try:
-                is_dir = de.is_dir(follow_symlinks=is_symlink)
-                is_file = de.is_file(follow_symlinks=False) if not is_dir else False
-            except OSError:
+            kind = classify_scan_entry(de, symlink_hops)
+            if kind is None:
                 continue
+            is_dir, entry_hops = kind
 
             check_path = entry_path + os.sep if is_dir else entry_path
-            if should_ignore_fn(check_path):
+            if ignore_fn(check_path):
                 continue
 
             if is_dir:
@@ -903,63 +822,176 @@ def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]]
                         child_max = scan_custom.default_child_max_depth
 
                 if depth < child_max:
-                    if len(deferred_dirs) >= MAX_DEFERRED:
-                        # Too many deferred dirs — skip to prevent OOM
-                        pass
-                    elif depth >= BFS_DEPTH_THRESHOLD:
-                        # Defer: record a placeholder so the UI sees the directory exists
-                        result['children'][entry] = {'token_count': 0, 'children': {}}
-                        deferred_dirs.append((result['children'], entry, entry_path, depth + 1, child_max, entry_hops))
-                    else:
-                        sub_result = process_dir_bfs(entry_path, depth + 1, child_max, entry_hops)
-                        if sub_result['token_count'] > 0 or sub_result.get('children'):
-                            result['children'][entry] = sub_result
-                            total_tokens += sub_result['token_count']
-            elif is_file:
+                    entries.append((entry, (entry_path, entry_hops, child_max), 0))
+            else:
                 tokens = estimate_tokens_fast(entry_path)
                 if tokens >= 0 or tokens == -1:
-                    scan_stats['files_processed'] += 1
-                    result['children'][entry] = {'token_count': tokens}
-                    if tokens > 0:
-                        total_tokens += tokens
-
-        result['token_count'] = total_tokens
-
-        dir_time = time.time() - dir_start_time
-        if dir_time > 2.0:
-            scan_stats['slow_directories'].append((path, dir_time, 'slow_directory'))
-
-        return result
-
-    # Phase 1: BFS — scan everything up to BFS_DEPTH_THRESHOLD
-    root_result = process_dir_bfs(directory, 1)
-
-    # Publish the Phase-1 shallow tree (everything to BFS_DEPTH_THRESHOLD, with
-    # deeper dirs present as expandable placeholders) so a concurrent poll can
-    # render breadth immediately instead of waiting for Phase 2 to finish. This
-    # is a LIVE reference: as Phase 2 fills placeholders below, the served tree
-    # progressively deepens. Read-only access during mutation is benign.
-    _children = root_result.get('children', {})
-    progress["partial_tree"] = _children
-    _scan_progress["partial_tree"] = _children
-
-    # Phase 2: Process deferred deep directories (breadth-first order)
-    if deferred_dirs:
-        logger.info(f"📂 BFS Phase 2: Processing {len(deferred_dirs)} deferred deep directories")
-    while deferred_dirs:
-        if progress.get("cancelled") or _scan_progress.get("cancelled"):
-            break
-        elapsed = time.time() - scan_stats['start_time']
-        if elapsed > max_scan_time * 2:
-            logger.warning(f"Timeout during BFS phase 2 at {elapsed:.1f}s, {len(deferred_dirs)} dirs remaining")
-            break
-        parent_children, entry_name, entry_path, depth, eff_max, hops = deferred_dirs.pop(0)
-        sub_result = process_dir_bfs(entry_path, depth, eff_max, hops)
-        if sub_result['token_count'] > 0 or sub_result.get('children'):
-            parent_children[entry_name] = sub_result
-        else:
-            # Remove empty placeholder
-            parent_children.pop(entry_name, None)
+                    entries.append((entry, None, tokens))
+                    if stat_sink is not None:
+                        rel_file = _sink_rel_path(entry_path)
+                        if rel_file is not None:
+                            try:
+                                stat_sink['files'][rel_file] = de.stat().st_size
+                            except OSError:
+                                pass
+
+        return {'entries': entries, 'elapsed': time.time() - dir_start_time}
+
+    def prune_empty(children: Dict[str, Any]) -> None:
+        """Drop directories that ended up with no tokens and no children."""
+        for name, node in list(children.items()):
+            sub = node.get('children')
+            if sub is None:
+                continue
+            prune_empty(sub)
+            if node['token_count'] <= 0 and not sub:
+                del children[name]
+
+    def scan_tree(root_path: str, ignore_fn, publish: bool) -> Dict[str, Any]:
+        """Scan `root_path` with the worker pool and return its root node.
+
+        With publish=True the live tree is exposed as partial_tree once every
+        directory up to BFS_DEPTH_THRESHOLD has been listed; placeholders for
+        deeper directories fill in as the scan continues.
+        """
+        nonlocal last_progress_check, last_progress_time, last_stderr_progress_time
+        root_node = {'token_count': 0, 'children': {}}
+        # (depth, seq, node, ancestors, path, effective_max, symlink_hops)
+        queue: list = [(1, 0, root_node, (), root_path, 0, 0)]
+        seq = itertools.count(1)
+        in_flight: Dict[Any, tuple] = {}
+        shallow_outstanding = 1
+        deep_outstanding = 0
+        published = False
+
+        pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=scan_workers, thread_name_prefix="FolderScan")
+        try:
+            while queue or in_flight:
+                if _cancelled():
+                    progress["active"] = False
+                    _scan_progress["active"] = False
+                    break
+
+                current_time = time.time()
+                elapsed = current_time - scan_stats['start_time']
+                if elapsed - (last_progress_check['time'] - scan_stats['start_time']) > 10:
+                    dirs_since = scan_stats['directories_scanned'] - last_progress_check['directories']
+                    if dirs_since > 0:
+                        last_progress_check = {'time': current_time, 'directories': scan_stats['directories_scanned']}
+                    elif elapsed > max_scan_time:
+                        logger.warning(f"Folder scan stalled at {elapsed:.1f}s, {len(queue) + len(in_flight)} dirs remaining")
+                        break
+                if elapsed > max_scan_time * 2:
+                    logger.warning(f"Folder scan timeout at {elapsed:.1f}s, {len(queue) + len(in_flight)} dirs remaining")
+                    break
+
+                # Keep a couple of listings per worker in flight, shallowest first.
+                while queue and len(in_flight) < scan_workers * 2:
+                    item = heapq.heappop(queue)
+                    depth, _, _, _, path, eff_max, hops = item
+                    future = pool.submit(list_dir, path, depth, eff_max, hops, ignore_fn)
+                    in_flight[future] = item
+
+                done, _ = concurrent.futures.wait(
+                    in_flight, timeout=0.5,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    depth, _, node, ancestors, path, _, _ = in_flight.pop(future)
+                    if depth > BFS_DEPTH_THRESHOLD:
+                        deep_outstanding -= 1
+                    else:
+                        shallow_outstanding -= 1
+                    try:
+                        listing = future.result()
+                    except Exception as e:
+                        logger.debug(f"Error scanning directory {path}: {e}")
+                        listing = None
+                    if listing is None:
+                        continue
+
+                    scan_stats['directories_scanned'] += 1
+                    if listing['elapsed'] > 2.0:
+                        scan_stats['slow_directories'].append((path, listing['elapsed'], 'slow_directory'))
+
+                    added = 0
+                    children = node['children']
+                    child_ancestors = ancestors + (node,)
+                    for name, subdir, tokens in listing['entries']:
+                        if subdir is None:
+                            scan_stats['files_processed'] += 1
+                            children[name] = {'token_count': tokens}
+                            if tokens > 0:
+                                added += tokens
+                            continue
+                        child_path, child_hops, child_max = subdir
+                        if depth >= BFS_DEPTH_THRESHOLD:
+                            if deep_outstanding >= MAX_DEFERRED:
+                                continue  # Too many deferred dirs — skip to prevent OOM
+                            deep_outstanding += 1
+                        else:
+                            shallow_outstanding += 1
+                        # Placeholder so the UI sees the directory exists
+                        child = children[name] = {'token_count': 0, 'children': {}}
+                        heapq.heappush(queue, (depth + 1, next(seq), child, child_ancestors,
+                                               child_path, child_max, child_hops))
+                    if added:
+                        for n in child_ancestors:
+                            n['token_count'] += added
+
+                if publish and not published and shallow_outstanding == 0:
+                    # Publish the shallow tree (everything to BFS_DEPTH_THRESHOLD,
+                    # with deeper dirs present as expandable placeholders) so a
+                    # concurrent poll can render breadth immediately instead of
+                    # waiting for the deep directories. This is a LIVE reference:
+                    # as the scan fills placeholders below, the served tree
+                    # progressively deepens. Read-only access during mutation is
+                    # benign.
+                    published = True
+                    _children = root_node['children']
+                    progress["partial_tree"] = _children
+                    _scan_progress["partial_tree"] = _children
+                    if deep_outstanding:
+                        logger.info(f"📂 BFS: shallow tree published, {deep_outstanding} deep directories queued")
+
+                current_time = time.time()
+                elapsed = current_time - scan_stats['start_time']
+                discovered = scan_stats['directories_scanned'] + len(queue) + len(in_flight)
+                _prog = {
+                    "directories": scan_stats['directories_scanned'],
+                    "files": scan_stats['files_processed'],
+                    "elapsed": int(elapsed)
+                }
+                progress["progress"] = _prog
+                _scan_progress["progress"] = _prog
+                progress["estimated_total"] = discovered
+                _scan_progress["estimated_total"] = discovered
+                progress["last_update"] = current_time
+                _scan_progress["last_update"] = current_time
+
+                if current_time - last_progress_time > progress_interval:
+                    progress_pct = f" ({scan_stats['directories_scanned']}/{discovered}, {scan_stats['directories_scanned']*100//max(discovered,1)}%)"
+                    logger.debug(f"📊 Scan progress: {scan_stats['directories_scanned']} dirs{progress_pct}, {scan_stats['files_processed']} files in {elapsed:.1f}s")
+                    last_progress_time = current_time
+
+                    if current_time - last_stderr_progress_time > 5.0:
+                        print(f"\r⏳ Scanning... {scan_stats['directories_scanned']} directories, "
+                              f"{scan_stats['files_processed']} files ({elapsed:.0f}s elapsed)",
+                              end='', file=sys.stderr, flush=True)
+                        last_stderr_progress_time = current_time
+        finally:
+            # Listings already running finish on their own (one directory
+            # each); nothing queued behind them is started.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if publish and not published:
+            progress["partial_tree"] = root_node['children']
+            _scan_progress["partial_tree"] = root_node['children']
+
+        prune_empty(root_node['children'])
+        return root_node
+
+    root_result = scan_tree(directory, should_ignore_fn, publish=True)
     
     # Check if we need to include external paths
     # Note: The ignore pattern override above handles paths within the codebase
@@ -1002,7 +1034,7 @@ def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]]
             # Resolve the real path so ignore patterns match resolved paths
             # (scandir follows symlinks, producing real paths not symlink paths)
             ext_real_path = os.path.realpath(ext_path)
-            original_should_ignore_fn = should_ignore_fn
+            ext_should_ignore_fn = should_ignore_fn
             if ext_real_path != os.path.realpath(directory):
                 ext_patterns = list(ignored_patterns)
                 # Duplicate all patterns scoped to the external dir's real path
@@ -1019,13 +1051,10 @@ def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]]
                                     ext_patterns.append((line, ext_real_path))
                     except (IOError, OSError):
                         pass
-                should_ignore_fn = parse_gitignore_patterns(ext_patterns)
+                ext_should_ignore_fn = parse_gitignore_patterns(ext_patterns)
 
             # Process the external directory
-            ext_result = process_dir_bfs(ext_real_path, 1)
-
-            # Restore original ignore function for subsequent external paths
-            should_ignore_fn = original_should_ignore_fn
+            ext_result = scan_tree(ext_real_path, ext_should_ignore_fn, publish=False)
             
             # Add the external directory to the root result
             if ext_result['token_count'] > 0 or ext_result.get('children'):
@@ -1050,9 +1079,6 @@ def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]]
     _scan_progress["partial_tree"] = None
     
     # Return just the children of the root to match expected format
-    # Clear visited directories after scan
-    _visited_directories.clear()
-    
     total_time = time.time() - scan_stats['start_time']
     
     # Print completion message to stdout for visibility
@@ -1092,7 +1118,6 @@ def get_folder_structure(directory: str, ignored_patterns: List[Tuple[str, str]]
             '_cancelled': True
         }
     
-    _visited_directories.clear()
     logger.debug(f"Returning folder structure with {len(result)} top-level entries")
     return result
 
@@ -1219,20 +1244,58 @@ TOKEN_CACHE_MAX_ENTRIES = 16   # typical use is 1-2 per codebase
 # Global thread management for background token calculation
 _background_thread = None
 _background_thread_lock = threading.Lock()
-
-# Global cache for accurate token counts
+# Bumped for every new pass; a running pass stops once it no longer matches,
+# so a request for another project cancels the current one.
+_token_calc_generation = 0
+_token_calc_directory: Optional[str] = None
+# Relative paths seen by the running pass; anything else is dropped from
+# _accurate_token_cache when the pass completes.
+_token_calc_visited: Optional[Set[str]] = None
+
+# Accurate token counts for the project in _accurate_token_cache_dir, keyed
+# by path relative to it. Filled by the background calculation and kept
+# current by file watcher events through refresh_accurate_token_count.
 _accurate_token_cache = {}
+_accurate_token_cache_dir: Optional[str] = None
+_token_refresh_executor = None
+
+DOCUMENT_EXTENSIONS = {'.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx'}
+
+
+# Files with more tokens than this are left out of accurate counts.
+MAX_ACCURATE_TOKENS = 50000
+# Plain text of this many bytes can't come in under MAX_ACCURATE_TOKENS
+# (tokenizers average well under 10 bytes per token even on sparse text),
+# so such files are skipped without being read.
+MAX_ACCURATE_TEXT_BYTES = MAX_ACCURATE_TOKENS * 10
+
+def _too_large_to_count(file_path: str) -> bool:
+    """True if a text file is certainly over MAX_ACCURATE_TOKENS, judged by size alone."""
+    # Documents are sized by their extracted text, not the file
+    if os.path.splitext(file_path.lower())[1] in DOCUMENT_EXTENSIONS:
+        return False
+    return os.path.getsize(file_path) > MAX_ACCURATE_TEXT_BYTES
+
+def _adjust_accurate_count(file_path: str, token_count: int) -> Optional[int]:
+    """Apply the file-tree rules to an exact count; None means leave the file out."""
+    if token_count > MAX_ACCURATE_TOKENS:  # skip huge files
+        return None
+    # For document files (PDF, DOCX, etc.), read_file_content
+    # already extracts text, so the token count IS the real
+    # count — don't apply the file-type multiplier which is
+    # designed for raw file sizes, not extracted text.
+    _, ext = os.path.splitext(file_path.lower())
+    if ext in DOCUMENT_EXTENSIONS:
+        return token_count
+    return int(token_count * get_file_type_multiplier(file_path))
 
 def ensure_background_token_calculation(directory: str, ignored_patterns: List[Tuple[str, str]], max_depth: int):
     """
     Ensure background token calculation is running for the given directory.
     This is the single entry point for starting background calculation.
     """
-    if not is_background_calculation_running():
-        logger.debug(f"🔍 PERF: Ensuring background token calculation for {directory}")
-        start_background_token_calculation(directory, ignored_patterns, max_depth)
-    else:
-        logger.debug("🔍 PERF: Background token calculation already running")
+    logger.debug(f"🔍 PERF: Ensuring background token calculation for {directory}")
+    start_background_token_calculation(directory, ignored_patterns, max_depth)
 
 def get_cached_folder_structure_with_tokens(directory: str, ignored_patterns: List[Tuple[str, str]], max_depth: int) -> Optional[Dict[str, Any]]:
     """Get cached folder structure if available and fresh."""
@@ -1279,86 +1342,95 @@ def cache_folder_structure_with_tokens(directory: str, ignored_patterns: List[Tu
         logger.debug(f"🔍 PERF: Cached folder structure with {len(result)} entries")
 
 def start_background_token_calculation(directory: str, ignored_patterns: List[Tuple[str, str]], max_depth: int):
-    """Start background thread to calculate accurate token counts (with deduplication)."""
-    global _background_thread, _background_thread_lock
+    """Start background thread to calculate accurate token counts (with deduplication).
+
+    A pass already running for `directory` is left alone; one running for
+    another project is cancelled in favour of this one.
+    """
+    global _background_thread, _background_thread_lock, _token_calc_generation, _token_calc_directory
     
     with _background_thread_lock:
         # Check if a background thread is already running
         if _background_thread is not None and _background_thread.is_alive():
-            logger.debug("🔍 PERF: Background token calculation already in progress, skipping duplicate request")
-            return
+            if _token_calc_directory == directory:
+                logger.debug("🔍 PERF: Background token calculation already in progress, skipping duplicate request")
+                return
+            logger.debug(f"🔍 PERF: Cancelling background token calculation for {_token_calc_directory}")
         
         logger.debug(f"🔍 PERF: Starting new background token calculation thread for {directory}")
+        _token_calc_generation += 1
+        generation = _token_calc_generation
+        _token_calc_directory = directory
     
+    def cancelled() -> bool:
+        return _token_calc_generation != generation
+
     def calculate_accurate_tokens():
         try:
             logger.debug(f"🔍 PERF: Starting background accurate token calculation for {directory}")
-            
-            # Early return is still in place - remove it when ready to re-enable
-            logger.debug("🔍 PERF: Background token calculation temporarily disabled")
-            return
-            
-            # Use compatibility layer for tiktoken with automatic fallbacks
-            from app.utils.tiktoken_compat import tiktoken
-            
-            if tiktoken is None:
-                return
-            encoding = tiktoken.get_encoding("cl100k_base")
+            from app.utils.token_count_store import count_texts
+
             should_ignore_fn = parse_gitignore_patterns(ignored_patterns)
-            
-            accurate_counts = {}
-            files_processed = 0
-            
-            for root, dirs, files in os.walk(directory):
-                # Filter directories
-                dirs[:] = [d for d in dirs 
-                          if not should_ignore_fn(os.path.join(root, d)) 
-                          and not d.startswith('.') 
-                          and (not os.path.islink(os.path.join(root, d)) or d in _included_symlink_names)]
-                
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if should_ignore_fn(file_path) or file.startswith('.'):
-                        continue
-                    
-                    if not is_processable_file(file_path):
-                        continue
-                    
-                    try:
-                        content = read_file_content(file_path)
+
+            global _accurate_token_cache, _accurate_token_cache_dir, _token_calc_visited
+            with _background_thread_lock:
+                if cancelled():
+                    return
+                if _accurate_token_cache_dir != directory:
+                    _accurate_token_cache = {}
+                    _accurate_token_cache_dir = directory
+                accurate_counts = _accurate_token_cache
+                visited: Set[str] = set()
+                _token_calc_visited = visited
+
+            def iter_file_contents():
+                for root, dirs, files in os.walk(directory):
+                    # Filter directories
+                    dirs[:] = [d for d in should_ignore_fn.filter_names(root, dirs, dirs=True)
+                              if not d.startswith('.') 
+                              and (not os.path.islink(os.path.join(root, d)) or d in _included_symlink_names)]
+                    if root != directory and os.path.relpath(root, directory).count(os.sep) + 1 >= max_depth:
+                        dirs[:] = []
+
+                    for file in should_ignore_fn.filter_names(root, files):
+                        file_path = os.path.join(root, file)
+                        if file.startswith('.'):
+                            continue
+                        if not is_processable_file(file_path):
+                            continue
+                        rel_path = os.path.relpath(file_path, directory)
+                        visited.add(rel_path)
+                        try:
+                            if _too_large_to_count(file_path):
+                                accurate_counts.pop(rel_path, None)
+                                continue
+                            content = read_file_content(file_path)
+                        except Exception as e:
+                            logger.debug(f"Error processing {file_path}: {e}")
+                            continue
                         if content:
-                            token_count = len(encoding.encode(content))
-                            if token_count <= 50000:  # skip huge files
-                                # For document files (PDF, DOCX, etc.), read_file_content
-                                # already extracts text, so the token count IS the real
-                                # count — don't apply the file-type multiplier which is
-                                # designed for raw file sizes, not extracted text.
-                                _, ext = os.path.splitext(file_path.lower())
-                                is_doc = ext in {'.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx'}
-                                if is_doc:
-                                    adjusted_count = token_count
-                                else:
-                                    multiplier = get_file_type_multiplier(file_path)
-                                    adjusted_count = int(token_count * multiplier)
-                                
-                                # Store relative path
-                                rel_path = os.path.relpath(file_path, directory)
-                                accurate_counts[rel_path] = adjusted_count
-                                files_processed += 1
-                                
-                                if files_processed % 1000 == 0:
-                                    logger.debug(f"🔍 PERF: Background processed {files_processed} files so far")
-                    except Exception as e:
-                        logger.debug(f"Error processing {file_path}: {e}")
-                        continue
-            
-            # Update cache with accurate counts
-            logger.debug(f"🔍 PERF: Background calculation complete: {files_processed} files processed")
-            # Store accurate counts in a separate cache for API access
-            logger.debug(f"🔍 PERF: Storing {len(accurate_counts)} accurate token counts in cache")
-            global _accurate_token_cache
-            _accurate_token_cache = accurate_counts
-            
+                            yield file_path, content
+
+            def record(file_path, token_count):
+                rel_path = os.path.relpath(file_path, directory)
+                adjusted_count = _adjust_accurate_count(file_path, token_count)
+                if adjusted_count is None:
+                    accurate_counts.pop(rel_path, None)
+                else:
+                    accurate_counts[rel_path] = adjusted_count
+
+            # File reads and hashing stay on this thread; only content the
+            # token count store hasn't seen is tokenized, on the bounded pool.
+            tokenized = count_texts(iter_file_contents(), record, should_stop=cancelled)
+            if cancelled():
+                logger.debug(f"🔍 PERF: Background calculation for {directory} cancelled")
+                return
+            # Files deleted, or newly ignored, since the counts were made
+            for rel_path in [p for p in accurate_counts if p not in visited]:
+                accurate_counts.pop(rel_path, None)
+            logger.debug(f"🔍 PERF: Background calculation complete: {len(accurate_counts)} files counted, "
+                         f"{tokenized} tokenized")
+
             # Also update the folder structure cache with accurate counts
             cache_key = f"{directory}:{max_depth}:{hash(str(ignored_patterns))}"
             with _cache_lock:
@@ -1369,13 +1441,18 @@ def start_background_token_calculation(directory: str, ignored_patterns: List[Tu
         except Exception as e:
             logger.error(f"Background token calculation failed: {e}")
         finally:
-            # Clean up thread reference when done
+            # Clean up thread reference when done, unless a newer pass replaced it
             global _background_thread
             with _background_thread_lock:
-                _background_thread = None
+                if _background_thread is threading.current_thread():
+                    _background_thread = None
+                if not cancelled():
+                    _token_calc_visited = None
             logger.debug("🔍 PERF: Background token calculation thread completed")
     
     with _background_thread_lock:
+        if cancelled():
+            return  # A request for another project got in first
         _background_thread = threading.Thread(target=calculate_accurate_tokens, daemon=True, name="TokenCalculation")
         _background_thread.start()
         logger.debug(f"🔍 PERF: Background thread started: {_background_thread.name}")
@@ -1394,14 +1471,59 @@ def get_background_calculation_status() -> dict:
         "thread_name": _background_thread.name if _background_thread and _background_thread.is_alive() else None
     }
 
+def refresh_accurate_token_count(file_path: str) -> None:
+    """Recount one changed or deleted file into _accurate_token_cache.
+
+    Called from file watcher events; the count runs on a single background
+    thread so the watcher is never blocked, and is a no-op until a
+    background calculation has covered the file's project.
+    """
+    global _token_refresh_executor
+    directory = _accurate_token_cache_dir
+    if directory is None or not file_path.startswith(directory + os.sep):
+        return
+
+    def refresh():
+        rel_path = os.path.relpath(file_path, directory)
+        if _accurate_token_cache_dir != directory:
+            return
+        visited = _token_calc_visited
+        if visited is not None:
+            visited.add(rel_path)  # Counted here even if the walk already passed it
+        if not os.path.isfile(file_path) or not is_processable_file(file_path):
+            _accurate_token_cache.pop(rel_path, None)
+            return
+        try:
+            if _too_large_to_count(file_path):
+                _accurate_token_cache.pop(rel_path, None)
+                return
+            content = read_file_content(file_path)
+            if not content:
+                _accurate_token_cache.pop(rel_path, None)
+                return
+            from app.utils.token_count_store import count_tokens
+            adjusted = _adjust_accurate_count(file_path, count_tokens(content))
+        except Exception as e:
+            logger.debug(f"Could not refresh token count for {file_path}: {e}")
+            return
+        if adjusted is None:
+            _accurate_token_cache.pop(rel_path, None)
+        else:
+            _accurate_token_cache[rel_path] = adjusted
+
+    with _background_thread_lock:
+        if _token_refresh_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _token_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="TokenRefresh")
+        _token_refresh_executor.submit(refresh)
+
 def get_accurate_token_count(file_path: str) -> int:
     """
     Get accurate token count for a specific file using tiktoken.
     This is the slow but precise method - use sparingly.
     """
     from app.utils.token_calibrator import get_token_calibrator
-    # Use compatibility layer for tiktoken with automatic fallbacks
-    from app.utils.tiktoken_compat import tiktoken
+    from app.utils.token_count_store import count_tokens
     
     try:
         # Tool-backed files should return special marker
@@ -1437,8 +1559,7 @@ def get_accurate_token_count(file_path: str) -> int:
                 return 0
             
             # Count tokens in extracted text
-            encoding = tiktoken.get_encoding("cl100k_base")
-            token_count = len(encoding.encode(text))
+            token_count = count_tokens(text)
             
             # Update cache with accurate count
             calibrator = get_token_calibrator()
@@ -1457,17 +1578,16 @@ def get_accurate_token_count(file_path: str) -> int:
             
             return token_count
         
-        encoding = tiktoken.get_encoding("cl100k_base")
-        
         # Skip binary files
         if not is_processable_file(file_path):
             logger.debug(f"Skipping binary/unprocessable file: {file_path}")
             return 0
                 
-        # Read file and count tokens
+        # Read file and count tokens; content counted before (in any
+        # session) comes from the persistent token count store.
         content = read_file_content(file_path)
         if content:
-            token_count = len(encoding.encode(content))
+            token_count = count_tokens(content)
             
             # Skip files with excessive token counts (>50k tokens)
             if token_count > 50000:
@@ -323,11 +323,14 @@ class DataEncryptor:
             import shutil
             shutil.copytree(projects_dir, backup_dir / "projects")
 
-            # Also back up file_states.json if it exists
+            # Also back up file_states.json (and its snapshot blobs) if present
             for name in ("file_states.json", "token_calibration.json"):
                 src = ziya_home / name
                 if src.exists():
                     shutil.copy2(src, backup_dir / name)
+            blobs = ziya_home / "file_state_blobs"
+            if blobs.exists():
+                shutil.copytree(blobs, backup_dir / "file_state_blobs")
 
             logger.info(f"🔐 Pre-encryption backup created at {backup_dir}")
         except Exception as e:
@@ -0,0 +1,188 @@
+"""
+Content-addressed blob store for ``FileStateManager`` snapshots.
+
+Each tracked file keeps four line-list snapshots (original, current, last
+seen, last context submission) per conversation, and most of them are
+identical — across the four fields and across conversations that include
+the same file.  Rather than serialising every list into the conversation
+state, the manager stores each distinct snapshot once here and keeps only
+its key.
+
+Layout (next to the state file)::
+
+    ~/.ziya/file_state_blobs/
+        3f/3fa2...e1    zlib(JSON list of lines), ALE-encrypted when the
+        a0/a07c...9b    "file_state" category is enabled
+
+Keys are the SHA-256 of the compact JSON encoding of the line list, so the
+same snapshot always maps to the same file and a save only writes blobs it
+has not seen before.
+
+Blobs are immutable.  Because conversation shards are loaded lazily, the
+store can't know every key still referenced on disk; instead every blob is
+touched (mtime bumped) at least every ``_TOUCH_INTERVAL_SECONDS`` while a
+shard referencing it is being written, and :meth:`BlobStore.sweep` only
+removes unreferenced blobs whose mtime is older than the caller's cutoff.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.logging_utils import logger
+
+_ENCRYPTION_CATEGORY = "file_state"
+
+# How stale a referenced blob's mtime may get before a write re-touches it.
+_TOUCH_INTERVAL_SECONDS = 600
+
+
+def _encode(lines: List[str]) -> bytes:
+    return json.dumps(lines, ensure_ascii=False, separators=(",", ":")).encode("utf-8", "surrogatepass")
+
+
+def blob_key(lines: List[str]) -> str:
+    """Content address of a line list."""
+    return hashlib.sha256(_encode(lines)).hexdigest()
+
+
+class BlobStore:
+    """Deduplicated, compressed snapshot storage under one directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        # Keys known to exist on disk; populated by one directory scan on
+        # first use and kept current by put()/sweep().
+        self._known: Optional[Set[str]] = None
+        # key -> when this process last wrote or touched the blob
+        self._touched: Dict[str, float] = {}
+        # scope -> id(list) -> (list, key) for the lists referenced by the
+        # scope's last save, so unchanged snapshots aren't re-hashed.
+        # Holding the list keeps its id from being reused.  Snapshot lists
+        # are replaced, never mutated in place, so identity implies equal
+        # content.
+        self._key_memo: Dict[str, Dict[int, Tuple[list, str]]] = {}
+        self._next_memo: Dict[str, Dict[int, Tuple[list, str]]] = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:])
+
+    def _known_keys(self) -> Set[str]:
+        if self._known is None:
+            known: Set[str] = set()
+            try:
+                for prefix in os.listdir(self.root):
+                    subdir = os.path.join(self.root, prefix)
+                    if len(prefix) != 2 or not os.path.isdir(subdir):
+                        continue
+                    for name in os.listdir(subdir):
+                        if not name.endswith(".tmp"):
+                            known.add(prefix + name)
+            except FileNotFoundError:
+                pass
+            self._known = known
+        return self._known
+
+    def put(self, lines: List[str], scope: str) -> str:
+        """Store *lines* if not already present and return its key.
+
+        *scope* (the conversation being saved) groups the hash memo; call
+        :meth:`end_save` with the same scope once its save is complete.
+        """
+        memo = self._key_memo.get(scope, {}).get(id(lines))
+        if memo is not None and memo[0] is lines:
+            key = memo[1]
+        else:
+            key = blob_key(lines)
+        self._next_memo.setdefault(scope, {})[id(lines)] = (lines, key)
+
+        now = time.time()
+        path = self._path(key)
+        # Checked and touched under the lock so sweep() can't remove the
+        # blob between our deciding it exists and its mtime being bumped.
+        with self._lock:
+            if key in self._known_keys():
+                if self._touched.get(key, 0.0) > now - _TOUCH_INTERVAL_SECONDS:
+                    return key
+                try:
+                    os.utime(path)
+                except FileNotFoundError:
+                    self._known_keys().discard(key)
+                else:
+                    self._touched[key] = now
+                    return key
+
+        payload = zlib.compress(_encode(lines))
+        from app.utils.encryption import get_encryptor
+        encryptor = get_encryptor()
+        if encryptor.is_enabled(_ENCRYPTION_CATEGORY):
+            payload = encryptor.encrypt(payload, _ENCRYPTION_CATEGORY)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        with self._lock:
+            self._known_keys().add(key)
+            self._touched[key] = now
+        return key
+
+    def end_save(self, scope: str) -> None:
+        """Retire *scope*'s key memo from its previous save in favour of this one's."""
+        self._key_memo[scope] = self._next_memo.pop(scope, {})
+
+    def remember(self, lines: list, key: str, scope: str) -> None:
+        """Record that *lines* (just loaded) has *key*, skipping a re-hash."""
+        self._key_memo.setdefault(scope, {})[id(lines)] = (lines, key)
+
+    def forget(self, scope: str) -> None:
+        """Drop the hash memo of a conversation that is gone."""
+        self._key_memo.pop(scope, None)
+        self._next_memo.pop(scope, None)
+
+    def get(self, key: str) -> List[str]:
+        """Load the line list stored under *key*.  Raises if missing."""
+        with open(self._path(key), "rb") as f:
+            raw = f.read()
+        from app.utils.encryption import is_encrypted, get_encryptor
+        if is_encrypted(raw):
+            raw = get_encryptor().decrypt(raw)
+        return json.loads(zlib.decompress(raw))
+
+    def sweep(self, live_keys: Iterable[str], older_than: float) -> int:
+        """Delete blobs not in *live_keys* whose mtime is before *older_than*.
+
+        Returns the number removed.
+        """
+        live = set(live_keys)
+        with self._lock:
+            candidates = [k for k in self._known_keys() if k not in live]
+        removed = 0
+        for key in candidates:
+            path = self._path(key)
+            with self._lock:
+                try:
+                    if os.path.getmtime(path) >= older_than:
+                        continue
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.debug("file_state_blobs: could not remove %s: %s", path, e)
+                    continue
+                self._known_keys().discard(key)
+                self._touched.pop(key, None)
+            removed += 1
+        return removed
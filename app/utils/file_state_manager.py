@@ -1,12 +1,16 @@
 from dataclasses import dataclass
+import atexit
 import json
 import os
 import time
 import shutil
 import threading
-from typing import Dict, List, Optional, Set, Tuple, Any
+import weakref
+from typing import Callable, Dict, List, Optional, Set, Tuple, Any
+from urllib.parse import quote, unquote
 import hashlib
 from difflib import SequenceMatcher
+from app.utils.file_state_blobs import BlobStore
 from app.utils.file_utils import read_file_content
 from app.utils.logging_utils import logger
 from app.utils.prompt_cache import get_prompt_cache
@@ -26,127 +30,481 @@ class FileState:
 _MAX_CONVERSATIONS = 20           # Keep at most 20 conversations in memory
 _CONVERSATION_TTL_SECONDS = 3600  # Evict conversations not accessed for 1 hour
 
+# On-disk layout, all next to state_file (~/.ziya/file_states.json):
+#   file_states/<quoted conversation id>.json  one shard per conversation
+#   file_state_blobs/                          snapshot blobs (file_state_blobs.py)
+# state_file itself is only read to migrate the older single-file formats
+# (version 2: snapshot keys; unversioned: inlined line lists).
+_SHARD_FORMAT_VERSION = 3
+_LEGACY_BLOB_FORMAT_VERSION = 2
+_BLOB_DIR_NAME = "file_state_blobs"
+_SNAPSHOT_FIELDS = (
+    'original_content',
+    'current_content',
+    'last_seen_content',
+    'last_context_submission_content',
+)
+
+# Write-behind: mutations mark their conversation dirty and a flush runs
+# this long after the first one, so a burst of updates costs one write.
+_WRITE_BEHIND_DELAY_SECONDS = 1.0
+# Minimum spacing between sweeps of unreferenced snapshot blobs.
+_BLOB_SWEEP_INTERVAL_SECONDS = 600
+
+
+class _ConversationShards(dict):
+    """conversation_id -> {file_path: FileState}, loading shards on first access.
+
+    Conversations persisted by an earlier process are listed in ``on_disk``
+    and only read when something looks them up (``in``, ``[]``, ``get``).
+    Iteration and ``len`` cover loaded conversations only.
+    """
+
+    def __init__(self, loader: Callable[[str], Optional[Dict[str, FileState]]],
+                 lock_for: Callable[[str], threading.Lock]):
+        super().__init__()
+        self._loader = loader
+        self._lock_for = lock_for
+        # conversation_id -> shard mtime, for shards not loaded yet
+        self.on_disk: Dict[str, float] = {}
+
+    def _load(self, conversation_id: str) -> None:
+        if conversation_id not in self.on_disk or dict.__contains__(self, conversation_id):
+            return
+        with self._lock_for(conversation_id):
+            if self.on_disk.get(conversation_id) is None:
+                return
+            states = self._loader(conversation_id)
+            if states is not None and not dict.__contains__(self, conversation_id):
+                dict.__setitem__(self, conversation_id, states)
+            self.on_disk.pop(conversation_id, None)
+
+    def __contains__(self, conversation_id) -> bool:
+        self._load(conversation_id)
+        return dict.__contains__(self, conversation_id)
+
+    def __missing__(self, conversation_id):
+        self._load(conversation_id)
+        if dict.__contains__(self, conversation_id):
+            return dict.__getitem__(self, conversation_id)
+        raise KeyError(conversation_id)
+
+    def get(self, conversation_id, default=None):
+        self._load(conversation_id)
+        return dict.get(self, conversation_id, default)
+
+    def pop(self, conversation_id, *default):
+        self.on_disk.pop(conversation_id, None)
+        return dict.pop(self, conversation_id, *default)
+
+    def __delitem__(self, conversation_id) -> None:
+        self.on_disk.pop(conversation_id, None)
+        dict.__delitem__(self, conversation_id)
+
+
+# Managers with pending writes are flushed at interpreter exit.
+_live_managers: "weakref.WeakSet[FileStateManager]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_managers():
+    for manager in list(_live_managers):
+        manager._flush()
+
+
 class FileStateManager:
     """Manages file states and changes within a conversation context"""
-    
+
     def __init__(self):
         self.state_file = os.path.join(os.path.expanduser("~"), ".ziya", "file_states.json")
         self.conversation_states: Dict[str, Dict[str, FileState]] = {}
         self.conversation_diffs: Dict[str, List[Dict[str, Any]]] = {}
         self._conversation_access_times: Dict[str, float] = {}
+        # Guards the dirty set and flush timer only; shard reads and writes
+        # take the per-conversation lock from _shard_lock().
         self._lock = threading.Lock()
+        self._dirty: Set[str] = set()
+        self._flush_timer: Optional[threading.Timer] = None
+        self._shard_locks: Dict[str, threading.Lock] = {}
+        # conversation_id -> blob keys its shard on disk refers to
+        self._shard_keys: Dict[str, Set[str]] = {}
+        self._last_blob_sweep = 0.0
+        _live_managers.add(self)
         self._load_state()
-        
+
+    @property
+    def shard_dir(self) -> str:
+        """Directory holding one state shard per conversation."""
+        return os.path.splitext(self.state_file)[0]
+
+    def _shard_path(self, conversation_id: str) -> str:
+        return os.path.join(self.shard_dir, quote(conversation_id, safe='') + '.json')
+
+    def _shard_lock(self, conversation_id: str) -> threading.Lock:
+        with self._lock:
+            lock = self._shard_locks.get(conversation_id)
+            if lock is None:
+                lock = self._shard_locks[conversation_id] = threading.Lock()
+            return lock
+
     def _load_state(self):
-        """Load file states from disk."""
+        """Index the persisted conversation shards; each loads on first access.
+
+        A state file in one of the older single-file formats is loaded
+        eagerly and migrated into shards.
+        """
         with self._lock:
+            shards = _ConversationShards(self._load_shard, self._shard_lock)
+            shards.update(self.conversation_states)
+            self.conversation_states = shards
+        self._scan_shards()
+        if self._load_single_file_state():
+            self._flush()
+            if not self._dirty:
+                try:
+                    os.remove(self.state_file)
+                    logger.info(f"Migrated file states to per-conversation shards in {self.shard_dir}")
+                except OSError as e:
+                    logger.debug("file state migration: could not remove %s: %s", self.state_file, e)
+
+    def _scan_shards(self):
+        """List persisted shards, dropping any past the TTL or the count cap."""
+        shards = self.conversation_states
+        try:
+            names = os.listdir(self.shard_dir)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Failed to list file state shards: {e}")
+            return
+
+        now = time.time()
+        found: Dict[str, float] = {}
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            conv_id = unquote(name[:-len('.json')])
+            try:
+                mtime = os.path.getmtime(os.path.join(self.shard_dir, name))
+            except OSError:
+                continue
+            # Shard mtime stands in for last access, as the state file's
+            # mtime did for the single-file format.
+            if now - mtime > _CONVERSATION_TTL_SECONDS:
+                self._remove_shard(conv_id)
+                continue
+            found[conv_id] = mtime
+
+        overflow = len(found) - _MAX_CONVERSATIONS
+        if overflow > 0:
+            for conv_id in sorted(found, key=found.get)[:overflow]:
+                self._remove_shard(conv_id)
+                del found[conv_id]
+
+        for conv_id, mtime in found.items():
+            if not dict.__contains__(shards, conv_id):
+                shards.on_disk[conv_id] = mtime
+        if found:
+            logger.info(f"Found file state shards for {len(found)} conversations")
+
+    def _read_state_bytes(self, path: str) -> Any:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        from app.utils.encryption import is_encrypted, get_encryptor
+        if is_encrypted(raw):
+            raw = get_encryptor().decrypt(raw)
+        return json.loads(raw)
+
+    def _load_shard(self, conversation_id: str) -> Optional[Dict[str, FileState]]:
+        """Read one conversation's shard.  Returns None if it is gone or unusable."""
+        path = self._shard_path(conversation_id)
+        try:
+            mtime = os.path.getmtime(path)
+            if time.time() - mtime > _CONVERSATION_TTL_SECONDS:
+                self._remove_shard(conversation_id, locked=True)
+                return None
+            data = self._read_state_bytes(path)
+            if data.get('version') != _SHARD_FORMAT_VERSION:
+                logger.warning(f"Ignoring file state shard with unknown version: {path}")
+                return None
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to load file state shard {path}: {e}")
+            return None
+
+        states, keys = self._states_from_records(conversation_id, data.get('files') or {})
+        self._shard_keys[conversation_id] = keys
+        if data.get('diff_history'):
+            self.conversation_diffs[conversation_id] = data['diff_history']
+        self._conversation_access_times[conversation_id] = mtime
+        logger.debug(f"Loaded file state shard for {conversation_id} ({len(states)} files)")
+        return states
+
+    def _load_single_file_state(self) -> bool:
+        """Load a pre-shard state_file, if any.  Returns True if it needs migrating."""
+        try:
+            if not os.path.exists(self.state_file):
+                return False
+            # Check file size before loading
+            file_size = os.path.getsize(self.state_file)
+            if file_size > 50 * 1024 * 1024:  # 50MB limit
+                logger.warning(f"File state file is corrupted (size: {file_size:,} bytes). Creating backup and resetting.")
+                backup_file = self.state_file + f".backup.{int(time.time())}"
+                shutil.move(self.state_file, backup_file)
+                return False
+
+            try:
+                data = self._read_state_bytes(self.state_file)
+            except (json.JSONDecodeError, ValueError) as e:
+                logger.warning(f"File state JSON corrupted: {e}. Resetting.")
+                backup_file = self.state_file + f".backup.{int(time.time())}"
+                shutil.move(self.state_file, backup_file)
+                return False
+
+            # Use the state file's mtime as the access-time proxy for
+            # loaded conversations (no per-conversation timestamp is
+            # persisted). This lets Phase 1 TTL eviction apply to them.
+            state_mtime = os.path.getmtime(self.state_file)
+            if isinstance(data, dict) and data.get('version') == _LEGACY_BLOB_FORMAT_VERSION:
+                loaded = self._load_blob_state(data.get('conversations') or {}, state_mtime)
+            else:
+                loaded = self._load_legacy_state(data, state_mtime)
+            with self._lock:
+                self._dirty.update(loaded)
+            if loaded:
+                logger.info(f"Loaded file states for {len(loaded)} conversations")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to load file states: {e}")
+            return False
+
+    def _load_legacy_state(self, data: Dict[str, Any], state_mtime: float) -> List[str]:
+        """Load the original format, where snapshots are inlined as line lists."""
+        for conv_id, files in data.items():
+            self.conversation_states.on_disk.pop(conv_id, None)
+            self.conversation_states[conv_id] = {}
+            for file_path, state_data in files.items():
+                # Skip special keys that aren't file states
+                if file_path == '_diff_history':
+                    if conv_id not in self.conversation_diffs:
+                        self.conversation_diffs[conv_id] = []
+                    self.conversation_diffs[conv_id] = state_data
+                    continue
+                self.conversation_states[conv_id][file_path] = FileState(
+                    path=state_data['path'],
+                    content_hash=state_data['content_hash'],
+                    line_states={int(k): v for k, v in state_data['line_states'].items()},
+                    original_content=state_data['original_content'],
+                    current_content=state_data['current_content'],
+                    last_seen_content=state_data['last_seen_content'],
+                    last_context_submission_content=state_data.get('last_context_submission_content', state_data['current_content'])
+                )
+            self._conversation_access_times[conv_id] = state_mtime
+        return list(data)
+
+    def _load_blob_state(self, conversations: Dict[str, Any], state_mtime: float) -> List[str]:
+        """Load the single-file blob format (snapshot keys, no shards)."""
+        for conv_id, conv in conversations.items():
+            self.conversation_states.on_disk.pop(conv_id, None)
+            self.conversation_states[conv_id], _ = self._states_from_records(conv_id, conv.get('files') or {})
+            if conv.get('diff_history'):
+                self.conversation_diffs[conv_id] = conv['diff_history']
+            self._conversation_access_times[conv_id] = state_mtime
+        return list(conversations)
+
+    def _states_from_records(self, conversation_id: str, records: Dict[str, Any]) -> Tuple[Dict[str, FileState], Set[str]]:
+        """Rebuild FileStates from persisted records, resolving snapshot keys."""
+        blobs = self._get_blob_store()
+        # Each distinct snapshot is read once; every FileState that refers to
+        # it gets its own list sharing the same line strings.
+        decoded: Dict[str, List[str]] = {}
+
+        def resolve(key: str) -> List[str]:
+            if key not in decoded:
+                decoded[key] = blobs.get(key)
+            lines = list(decoded[key])
+            blobs.remember(lines, key, conversation_id)
+            return lines
+
+        states: Dict[str, FileState] = {}
+        for file_path, record in records.items():
             try:
-                if os.path.exists(self.state_file):
-                    # Check file size before loading
-                    file_size = os.path.getsize(self.state_file)
-                    if file_size > 50 * 1024 * 1024:  # 50MB limit
-                        logger.warning(f"File state file is corrupted (size: {file_size:,} bytes). Creating backup and resetting.")
-                        backup_file = self.state_file + f".backup.{int(time.time())}"
-                        shutil.move(self.state_file, backup_file)
-                        self.conversation_states = {}
-                        return
-                    
-                    raw = open(self.state_file, 'rb').read()
-                    try:
-                        from app.utils.encryption import is_encrypted, get_encryptor
-                        if is_encrypted(raw):
-                            encryptor = get_encryptor()
-                            plaintext = encryptor.decrypt(raw)
-                            data = json.loads(plaintext)
-                        else:
-                            data = json.loads(raw)
-                    except (json.JSONDecodeError, ValueError) as e:
-                        logger.warning(f"File state JSON corrupted: {e}. Resetting.")
-                        backup_file = self.state_file + f".backup.{int(time.time())}"
-                        shutil.move(self.state_file, backup_file)
-                        self.conversation_states = {}
-                        return
-
-                    # Use the state file's mtime as the access-time proxy for
-                    # loaded conversations (no per-conversation timestamp is
-                    # persisted). This lets Phase 1 TTL eviction apply to them.
-                    state_mtime = os.path.getmtime(self.state_file)
-                    for conv_id, files in data.items():
-                        self.conversation_states[conv_id] = {}
-                        for file_path, state_data in files.items():
-                            # Skip special keys that aren't file states
-                            if file_path == '_diff_history':
-                                if conv_id not in self.conversation_diffs:
-                                    self.conversation_diffs[conv_id] = []
-                                self.conversation_diffs[conv_id] = state_data
-                                continue
-                            self.conversation_states[conv_id][file_path] = FileState(
-                                path=state_data['path'],
-                                content_hash=state_data['content_hash'],
-                                line_states={int(k): v for k, v in state_data['line_states'].items()},
-                                original_content=state_data['original_content'],
-                                current_content=state_data['current_content'],
-                                last_seen_content=state_data['last_seen_content'],
-                                last_context_submission_content=state_data.get('last_context_submission_content', state_data['current_content'])
-                            )
-                        self._conversation_access_times[conv_id] = state_mtime
-                    if self.conversation_states:
-                        logger.info(f"Loaded file states for {len(self.conversation_states)} conversations")
+                states[file_path] = FileState(
+                    path=record['path'],
+                    content_hash=record['content_hash'],
+                    line_states={int(k): v for k, v in record['line_states'].items()},
+                    **{field: resolve(record[field]) for field in _SNAPSHOT_FIELDS}
+                )
             except Exception as e:
-                logger.warning(f"Failed to load file states: {e}")
-                self.conversation_states = {}
-    
+                logger.warning(f"Dropping file state for {file_path} in {conversation_id}: {e}")
+        return states, set(decoded)
+
+    def _get_blob_store(self) -> BlobStore:
+        """Return the blob store that lives next to the current state file."""
+        root = os.path.join(os.path.dirname(self.state_file), _BLOB_DIR_NAME)
+        store = getattr(self, '_blob_store', None)
+        if store is None or store.root != root:
+            store = self._blob_store = BlobStore(root)
+        return store
+
+    def _schedule_save(self, conversation_id: str):
+        """Mark a conversation dirty and arm the write-behind flush."""
+        # /dev/null means "don't persist" (used by tests)
+        if self.state_file == os.devnull or conversation_id.startswith('precision_'):
+            return
+        with self._lock:
+            self._dirty.add(conversation_id)
+            if self._flush_timer is None:
+                timer = threading.Timer(_WRITE_BEHIND_DELAY_SECONDS, self._flush)
+                timer.daemon = True
+                self._flush_timer = timer
+                timer.start()
+
     def _save_state(self):
-        """Save file states to disk."""
+        """Evict stale conversations and write every dirty shard now."""
         try:
-            # Evict before saving to prevent the on-disk file from growing unboundedly
+            # Evict before saving to prevent the on-disk state from growing unboundedly
             self._evict_stale_conversations()
+        except Exception as e:
+            logger.warning(f"Failed to evict file states: {e}")
+        self._flush()
 
-            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
-            data = {}
+    def _flush(self):
+        """Write the shards of conversations changed since the last flush."""
+        if self.state_file == os.devnull:
+            return
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            timer, self._flush_timer = self._flush_timer, None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
 
-            # Build the data dict (existing logic unchanged)
-            for conv_id, files in self.conversation_states.items():
-                # Skip temporary precision_ conversations
-                if conv_id.startswith('precision_'):
-                    continue
-                    
-                data[conv_id] = {}
-                for file_path, state in files.items():
-                    data[conv_id][file_path] = {
-                        'path': state.path,
-                        'content_hash': state.content_hash,
-                        'line_states': {str(k): v for k, v in state.line_states.items()},  # JSON keys must be strings
-                        'original_content': state.original_content,
-                        'current_content': state.current_content,
-                        'last_seen_content': state.last_seen_content,
-                        'last_context_submission_content': state.last_context_submission_content
-                    }
-            
-            # Save diff history per conversation
-            for conv_id, diffs in self.conversation_diffs.items():
-                if conv_id.startswith('precision_'):
-                    continue
-                if conv_id in data:
-                    data[conv_id]['_diff_history'] = diffs
-            
+        failed = set()
+        for conv_id in dirty:
+            try:
+                self._write_shard(conv_id)
+            except Exception as e:
+                logger.warning(f"Failed to save file states for {conv_id}: {e}")
+                failed.add(conv_id)
+        if failed:
+            # Retried with the next flush rather than in a tight loop
             with self._lock:
-                from app.utils.encryption import get_encryptor
-                encryptor = get_encryptor()
-                plaintext = json.dumps(data, indent=2).encode("utf-8")
-
-                if encryptor.is_enabled("file_state"):
-                    encrypted = encryptor.encrypt(plaintext, "file_state")
-                    with open(self.state_file, 'wb') as f:
-                        f.write(encrypted)
-                else:
-                    with open(self.state_file, 'w') as f:
-                        f.write(plaintext.decode("utf-8"))
-
-            logger.debug(f"Saved file states for {len(data)} conversations")
+                self._dirty.update(failed)
+
+        try:
+            self._maybe_sweep_blobs()
         except Exception as e:
-            logger.warning(f"Failed to save file states: {e}")
-    
+            logger.debug("file state blob sweep failed: %s", e)
+        if dirty:
+            logger.debug(f"Saved file states for {len(dirty) - len(failed)} conversations")
+
+    def _write_shard(self, conversation_id: str):
+        """Persist one conversation; only its shard lock is held."""
+        with self._shard_lock(conversation_id):
+            # Plain dict lookup: a conversation dropped since it was marked
+            # dirty must not be reloaded just to be written back.
+            files = dict.get(self.conversation_states, conversation_id)
+            if files is None:
+                return
+
+            blobs = self._get_blob_store()
+            keys: Set[str] = set()
+            records = {}
+            # Snapshot the containers; request threads may still be mutating
+            # this conversation, and will mark it dirty again if they do.
+            for file_path, state in list(files.items()):
+                record = {
+                    'path': state.path,
+                    'content_hash': state.content_hash,
+                    'line_states': {str(k): v for k, v in list(state.line_states.items())},  # JSON keys must be strings
+                }
+                # Snapshots are stored once in the blob store and referenced
+                # by key; only unseen ones are written.
+                for field in _SNAPSHOT_FIELDS:
+                    key = blobs.put(getattr(state, field), conversation_id)
+                    record[field] = key
+                    keys.add(key)
+                records[file_path] = record
+            blobs.end_save(conversation_id)
+
+            payload = {
+                'version': _SHARD_FORMAT_VERSION,
+                'conversation_id': conversation_id,
+                'files': records,
+            }
+            diffs = self.conversation_diffs.get(conversation_id)
+            if diffs:
+                payload['diff_history'] = list(diffs)
+
+            from app.utils.encryption import get_encryptor
+            encryptor = get_encryptor()
+            plaintext = json.dumps(payload, separators=(',', ':')).encode("utf-8")
+            if encryptor.is_enabled("file_state"):
+                plaintext = encryptor.encrypt(plaintext, "file_state")
+
+            path = self._shard_path(conversation_id)
+            os.makedirs(self.shard_dir, exist_ok=True)
+            temp_file = path + ".tmp"
+            try:
+                with open(temp_file, 'wb') as f:
+                    f.write(plaintext)
+                os.replace(temp_file, path)
+            except Exception:
+                if os.path.exists(temp_file):
+                    os.unlink(temp_file)
+                raise
+            self._shard_keys[conversation_id] = keys
+
+    def _remove_shard(self, conversation_id: str, locked: bool = False):
+        """Delete a conversation's shard file (caller may already hold its lock)."""
+        path = self._shard_path(conversation_id)
+        if locked:
+            self._unlink_quietly(path)
+        else:
+            with self._shard_lock(conversation_id):
+                self._unlink_quietly(path)
+        self._shard_keys.pop(conversation_id, None)
+
+    @staticmethod
+    def _unlink_quietly(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug("could not remove file state shard %s: %s", path, e)
+
+    def _maybe_sweep_blobs(self):
+        """Remove snapshot blobs no shard refers to any more (rate limited).
+
+        Only loaded shards' keys are known here, so unreferenced blobs are
+        also required to be older than any shard that could still be loaded
+        (see file_state_blobs for the touch protocol).
+        """
+        now = time.time()
+        if now - self._last_blob_sweep < _BLOB_SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_blob_sweep = now
+        from app.utils.file_state_blobs import _TOUCH_INTERVAL_SECONDS
+        live = set().union(*self._shard_keys.values()) if self._shard_keys else set()
+        cutoff = now - _CONVERSATION_TTL_SECONDS - _TOUCH_INTERVAL_SECONDS
+        removed = self._get_blob_store().sweep(live, cutoff)
+        if removed:
+            logger.debug(f"Removed {removed} unreferenced file state snapshots")
+
+    def _drop_conversation(self, conversation_id: str):
+        """Forget a conversation in memory and on disk."""
+        self.conversation_states.pop(conversation_id, None)
+        self.conversation_diffs.pop(conversation_id, None)
+        self._conversation_access_times.pop(conversation_id, None)
+        if self.state_file == os.devnull:
+            return
+        with self._lock:
+            self._dirty.discard(conversation_id)
+        self._remove_shard(conversation_id)
+        self._get_blob_store().forget(conversation_id)
+
     def cleanup_temporary_conversations(self):
         """Remove temporary precision_ conversations from memory."""
         temp_convs = [conv_id for conv_id in self.conversation_states.keys() if conv_id.startswith('precision_')]
@@ -168,15 +526,18 @@ class FileStateManager:
         """
         now = time.time()
 
-        # Phase 1: evict by TTL
+        # Phase 1: evict by TTL (including shards not loaded yet)
         expired = [
             cid for cid, t in self._conversation_access_times.items()
             if (now - t) > _CONVERSATION_TTL_SECONDS
         ]
+        on_disk = getattr(self.conversation_states, 'on_disk', {})
+        expired += [
+            cid for cid, t in list(on_disk.items())
+            if (now - t) > _CONVERSATION_TTL_SECONDS and cid not in self._conversation_access_times
+        ]
         for cid in expired:
-            self.conversation_states.pop(cid, None)
-            self.conversation_diffs.pop(cid, None)
-            self._conversation_access_times.pop(cid, None)
+            self._drop_conversation(cid)
         if expired:
             logger.info(f"♻️ Evicted {len(expired)} expired conversations (TTL={_CONVERSATION_TTL_SECONDS}s)")
 
@@ -194,11 +555,9 @@ class FileStateManager:
                 key=lambda cid: self._conversation_access_times.get(cid, 0.0)
             )
             for cid in sorted_convs[:overflow]:
-                self.conversation_states.pop(cid, None)
-                self.conversation_diffs.pop(cid, None)
-                self._conversation_access_times.pop(cid, None)
+                self._drop_conversation(cid)
             logger.info(f"♻️ Evicted {overflow} oldest conversations (max={_MAX_CONVERSATIONS})")
-    
+
     def initialize_conversation(self, conversation_id: str, files: Dict[str, str], force_reset: bool = False) -> None:
         """
         Initialize file states for a conversation.
@@ -242,7 +601,7 @@ class FileStateManager:
             )
             logger.debug(f"Initialized state for {file_path} with {len(lines)} lines")
         
-        self._save_state()  # Persist new conversation state
+        self._schedule_save(conversation_id)  # Persist new conversation state
     
     def get_changes_since_last_submission(self, conversation_id: str) -> Dict[str, Set[int]]:
         """Get changes that occurred since the last context submission."""
@@ -251,7 +610,7 @@ class FileStateManager:
         if conversation_id in self.conversation_diffs:
             for diff_record in self.conversation_diffs[conversation_id]:
                 diff_record['exchanges_ago'] = diff_record.get('exchanges_ago', 0) + 1
-            self._save_state()
+            self._schedule_save(conversation_id)
         
         self._touch_conversation(conversation_id)
         if conversation_id not in self.conversation_states:
@@ -286,7 +645,7 @@ class FileStateManager:
             state.last_context_submission_content = state.current_content.copy()
             logger.debug(f"Updated context submission baseline for {file_path}")
         
-        self._save_state()  # Persist the updated baselines
+        self._schedule_save(conversation_id)  # Persist the updated baselines
         logger.info(f"Context submission marked for {len(self.conversation_states[conversation_id])} files")
     
     def has_changes_since_last_context_submission(self, conversation_id: str, file_path: str) -> bool:
@@ -350,6 +709,27 @@ class FileStateManager:
                 }
         return changes
 
+    def get_file_state(self, conversation_id: str, file_path: str) -> Optional[FileState]:
+        """The tracked state of one file, or None if it isn't tracked."""
+        self._touch_conversation(conversation_id)
+        return self.conversation_states.get(conversation_id, {}).get(file_path)
+
+    def track_file(self, conversation_id: str, file_path: str, content: str) -> FileState:
+        """Start tracking one file with `content` as its baseline, and persist it."""
+        lines = content.splitlines()
+        state = FileState(
+            path=file_path,
+            content_hash=self._compute_hash(lines),
+            line_states={},
+            original_content=lines.copy(),
+            current_content=lines.copy(),
+            last_seen_content=lines.copy(),
+            last_context_submission_content=lines.copy()
+        )
+        self.conversation_states.setdefault(conversation_id, {})[file_path] = state
+        self._schedule_save(conversation_id)
+        return state
+
     def get_annotated_content(self, conversation_id: str, file_path: str) -> Tuple[List[str], bool]:
         """Get content with line state annotations"""
         self._touch_conversation(conversation_id)
@@ -364,13 +744,16 @@ class FileStateManager:
             
         return annotated_lines, True
 
-    def refresh_file_from_disk(self, conversation_id: str, file_path: str, base_dir: str) -> bool:
+    def refresh_file_from_disk(self, conversation_id: str, file_path: str, base_dir: str,
+                               disk_content: Optional[str] = None) -> bool:
         """
         Refresh a file's current_content from disk without resetting the baseline.
         
         This is critical for detecting when a user has NOT applied a suggested diff -
         the file on disk won't have changed, but we need to track the actual state.
         
+        Callers that already read the file pass its text as ``disk_content``.
+        
         Returns:
             True if the file was refreshed and had changes, False otherwise
         """
@@ -386,8 +769,9 @@ class FileStateManager:
         from app.utils.file_utils import resolve_external_path
         full_path = resolve_external_path(file_path, base_dir)
         
-        # Use read_file_content which handles documents, images, etc.
-        disk_content = read_file_content(full_path)
+        if disk_content is None:
+            # Use read_file_content which handles documents, images, etc.
+            disk_content = read_file_content(full_path)
         
         if disk_content is None:
             # read_file_content returns None on error or unsupported files
@@ -409,23 +793,30 @@ class FileStateManager:
                 elif state.line_states[line_num] != '+':
                     state.line_states[line_num] = '*'
             
+            self._schedule_save(conversation_id)
             return True
         
         return False
     
-    def refresh_all_files_from_disk(self, conversation_id: str, base_dir: str) -> Dict[str, bool]:
-        """Refresh all files in a conversation from disk."""
+    def refresh_all_files_from_disk(self, conversation_id: str, base_dir: str,
+                                    contents: Optional[Dict[str, str]] = None) -> Dict[str, bool]:
+        """Refresh all files in a conversation from disk.
+
+        ``contents`` maps file paths to text the caller already read; other
+        files are read here.
+        """
         if conversation_id not in self.conversation_states:
             return {}
         
+        contents = contents or {}
         results = {}
         for file_path in list(self.conversation_states[conversation_id].keys()):
-            results[file_path] = self.refresh_file_from_disk(conversation_id, file_path, base_dir)
+            results[file_path] = self.refresh_file_from_disk(
+                conversation_id, file_path, base_dir, contents.get(file_path))
         
         changed_files = [f for f, changed in results.items() if changed]
         if changed_files:
             logger.debug(f"Refreshed {len(changed_files)} files from disk: {changed_files}")
-            self._save_state()
         
         return results
 
@@ -463,6 +854,7 @@ class FileStateManager:
             elif state.line_states[line_num] != '+':
                 state.line_states[line_num] = '*'  # Modified line
                 
+        self._schedule_save(conversation_id)
         return changed_lines
 
     def update_files(self, conversation_id: str, files: Dict[str, str]) -> Dict[str, Set[int]]:
@@ -660,7 +1052,7 @@ Files being tracked for changes: """ + ", ".join(files_with_changes) + "\n"
 
                     logger.debug(f"Updated existing file in state: {file_path} with {len(changed_lines)} changed lines")    
 
-        self._save_state()
+        self._schedule_save(conversation_id)
 
     def record_applied_diff(self, conversation_id: str, file_path: str, diff_content: str, description: str = ""):
         """
@@ -691,4 +1083,4 @@ Files being tracked for changes: """ + ", ".join(files_with_changes) + "\n"
             if d.get('exchanges_ago', 0) < 10
         ][-5:]
         
-        self._save_state()
+        self._schedule_save(conversation_id)
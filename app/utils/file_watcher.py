@@ -42,7 +42,7 @@ class FileChangeHandler(FileSystemEventHandler):
         # across a large home directory is expensive and blocks startup.
         self._ignored_patterns_loaded = False
         self.ignored_patterns = []
-        self.should_ignore_fn = lambda path: False  # placeholder until loaded
+        self.should_ignore_fn = parse_gitignore_patterns([])  # placeholder until loaded
         # Per-directory .gitignore cache for inline checks.
         # Maps directory path → set of ignore patterns found in that dir's .gitignore.
         self._inline_gitignore_cache: Dict[str, Optional[set]] = {}
@@ -126,7 +126,7 @@ class FileChangeHandler(FileSystemEventHandler):
                 # Also check parent directories between current and the file
                 check_dir = file_dir
                 while check_dir != current and len(check_dir) > len(current):
-                    if check_fn(check_dir):
+                    if check_fn.is_ignored_dir(check_dir):
                         return True
                     check_dir = os.path.dirname(check_dir)
 
@@ -154,9 +154,11 @@ class FileChangeHandler(FileSystemEventHandler):
             if self.should_ignore_fn(abs_path):
                 return True
             
+            # Ancestor decisions are memoized by the matcher, so events in
+            # the same directory don't re-evaluate the rules for each level.
             parent_dir = os.path.dirname(abs_path)
             while parent_dir and parent_dir != self.base_dir and len(parent_dir) > len(self.base_dir):
-                if self.should_ignore_fn(parent_dir):
+                if self.should_ignore_fn.is_ignored_dir(parent_dir):
                     return True
                 parent_dir = os.path.dirname(parent_dir)
 
@@ -288,6 +290,9 @@ class FileChangeHandler(FileSystemEventHandler):
         # Skip backup files
         if abs_path.endswith('.backup') or '.backup.' in abs_path:
             return
+
+        self._queue_ast_update(abs_path)
+        self._queue_token_refresh(abs_path)
         
         # Read the file content
         try:
@@ -377,6 +382,9 @@ class FileChangeHandler(FileSystemEventHandler):
             logger.info(f"File created: {rel_path} (in context)")
         else:
             logger.debug(f"File created: {rel_path}")
+
+        self._queue_ast_update(abs_path)
+        self._queue_token_refresh(abs_path)
         
         # Try to add to cache incrementally
         from app.services.folder_service import add_file_to_folder_cache as _add_cache
@@ -491,6 +499,9 @@ class FileChangeHandler(FileSystemEventHandler):
 
         logger.info(f"File deleted: {rel_path}" + (" (was in context)" if was_in_context else ""))
 
+        self._queue_ast_update(abs_path)
+        self._queue_token_refresh(abs_path)
+
         # Remove from cache incrementally instead of invalidating
         from app.services.folder_service import remove_file_from_folder_cache as _remove_cache
         if _remove_cache(rel_path, base_dir=self.base_dir):
@@ -499,6 +510,22 @@ class FileChangeHandler(FileSystemEventHandler):
             # Fallback to invalidation if incremental remove fails
             self._debounced_cache_invalidation()
     
+    def _queue_ast_update(self, abs_path: str) -> None:
+        """Hand the change to the AST index's debounced re-parse queue."""
+        try:
+            from app.utils.ast_parser.integration import queue_ast_update
+            queue_ast_update(abs_path)
+        except Exception as e:
+            logger.debug(f"Could not queue AST update for {abs_path}: {e}")
+
+    def _queue_token_refresh(self, abs_path: str) -> None:
+        """Recount the file's exact tokens in the background."""
+        try:
+            from app.utils.directory_util import refresh_accurate_token_count
+            refresh_accurate_token_count(abs_path)
+        except Exception as e:
+            logger.debug(f"Could not queue token refresh for {abs_path}: {e}")
+
     def _debounced_cache_invalidation(self):
         """Call cache invalidation with debouncing to prevent excessive calls."""
         if not self.cache_invalidation_callback:
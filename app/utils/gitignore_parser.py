@@ -4,7 +4,7 @@ import re
 
 from os.path import abspath, dirname
 from pathlib import Path
-from typing import Reversible, Union, List, Tuple
+from typing import Dict, Iterable, Reversible, Union, List, Tuple
 
 
 def handle_negation(file_path, rules: Reversible["IgnoreRule"]):
@@ -14,19 +14,146 @@ def handle_negation(file_path, rules: Reversible["IgnoreRule"]):
     return False
 
 
-def parse_gitignore_patterns(patterns: List[Tuple[str, str]]):
+def parse_gitignore_patterns(patterns: List[Tuple[str, str]]) -> "GitignoreMatcher":
     rules = []
     for counter, (pattern, directory) in enumerate(patterns, start=1):
         rule = rule_from_pattern(pattern, base_path=_normalize_path(directory),
                                  source=('in-memory', counter))
         if rule:
             rules.append(rule)
-    if not any(r.negation for r in rules):
-        return lambda file_path: any(r.match(file_path) for r in rules)
-    else:
-        # We have negation rules. We can't use a simple "any" to evaluate them.
-        # Later rules override earlier rules.
-        return lambda file_path: handle_negation(file_path, rules)
+    return GitignoreMatcher(rules)
+
+
+class GitignoreMatcher:
+    """
+    Compiled form of a rule list, callable as ``matcher(path) -> bool``.
+
+    Rules are grouped into runs that share a base directory and negation
+    flag; each run becomes one combined regex, so a path costs one search
+    per run instead of one per rule.  Later runs override earlier ones,
+    which preserves gitignore's last-match-wins semantics.  When there are
+    no negations, order does not matter and all rules with the same base
+    collapse into a single regex.
+
+    The base directories that apply to a directory and the path of that
+    directory relative to each are memoized, so checking the entries of
+    one directory only appends the entry name; ``filter_names`` checks a
+    whole listing at once.  Decisions for directories are memoized by
+    ``is_ignored_dir``.
+    """
+
+    # Entries kept in each per-directory cache before it is cleared
+    MAX_CACHED_DIRS = 8192
+
+    def __init__(self, rules: List["IgnoreRule"]):
+        self.rules = list(rules)
+        self.has_negation = any(r.negation for r in self.rules)
+        runs: List[list] = []
+        for rule in self.rules:
+            key = (rule.base_path, rule.negation)
+            if not self.has_negation:
+                same = next((run for run in runs if run[0] == key), None)
+            else:
+                same = runs[-1] if runs and runs[-1][0] == key else None
+            if same is None:
+                runs.append([key, []])
+                same = runs[-1]
+            same[1].append(rule)
+        # (base, negation, regex) in evaluation order: last run first
+        self._runs = [
+            (str(base) if base is not None else None, negation,
+             re.compile('|'.join('(?:%s)' % r.regex for r in run_rules)))
+            for (base, negation), run_rules in reversed(runs)
+        ]
+        self._bases = {base for base, _, _ in self._runs if base is not None}
+        self._dir_bases: Dict[str, Dict[str, str]] = {}
+        self._dir_decisions: Dict[str, bool] = {}
+
+    def __call__(self, file_path: Union[str, Path]) -> bool:
+        if not self._runs:
+            return False
+        trailing_slash = isinstance(file_path, str) and file_path.endswith('/')
+        path = abspath(file_path)
+        parent, name = os.path.split(path)
+        if not name:
+            return self._decide(self._applicable_bases(path), trailing_slash, path)
+        return self._decide(self._child_bases(parent, name), trailing_slash, path)
+
+    def is_ignored_dir(self, dir_path: Union[str, Path]) -> bool:
+        """``matcher(dir_path)`` memoized per directory."""
+        key = abspath(dir_path)
+        decision = self._dir_decisions.get(key)
+        if decision is None:
+            decision = self(key)
+            if len(self._dir_decisions) >= self.MAX_CACHED_DIRS:
+                self._dir_decisions.clear()
+            self._dir_decisions[key] = decision
+        return decision
+
+    def filter_names(self, parent: Union[str, Path], names: Iterable[str],
+                     dirs: bool = False) -> List[str]:
+        """
+        Return the entries of ``parent`` that are not ignored.
+
+        ``dirs`` marks the names as directories, matching them as though
+        given with a trailing slash so directory-only negations apply.
+        """
+        names = list(names)
+        if not self._runs:
+            return names
+        parent = abspath(parent)
+        return [name for name in names
+                if not self._decide(self._child_bases(parent, name), dirs,
+                                    os.path.join(parent, name))]
+
+    def _decide(self, rel_paths: Dict[str, str], trailing_slash: bool, path: str) -> bool:
+        for base, negation, regex in self._runs:
+            if base is None:
+                rel = path
+            else:
+                rel = rel_paths.get(base)
+                if rel is None:
+                    continue
+            # Directory-only negations need the trailing slash to match
+            if negation and trailing_slash:
+                rel += '/'
+                if rel.startswith('./'):
+                    rel = rel[2:]
+            if regex.search(rel):
+                return not negation
+        return False
+
+    def _child_bases(self, parent: str, name: str) -> Dict[str, str]:
+        rel_paths = {base: (name if rel == '.' else rel + os.sep + name)
+                     for base, rel in self._applicable_bases(parent).items()}
+        child = os.path.join(parent, name)
+        if child in self._bases:
+            rel_paths[child] = '.'
+        return rel_paths
+
+    def _applicable_bases(self, dir_path: str) -> Dict[str, str]:
+        """Map each rule base containing ``dir_path`` to the relative path."""
+        cached = self._dir_bases.get(dir_path)
+        if cached is not None:
+            return cached
+        rel_paths = {}
+        current = dir_path
+        while True:
+            if current in self._bases:
+                if current == dir_path:
+                    rel_paths[current] = '.'
+                else:
+                    prefix = len(current) if current.endswith(os.sep) else len(current) + 1
+                    rel_paths[current] = dir_path[prefix:]
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+        if len(self._dir_bases) >= self.MAX_CACHED_DIRS:
+            self._dir_bases.clear()
+        self._dir_bases[dir_path] = rel_paths
+        return rel_paths
+
 
 def rule_from_pattern(pattern, base_path=None, source=None):
     """
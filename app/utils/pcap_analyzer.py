@@ -9,13 +9,16 @@ import os
 from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
 import logging
+
+from app.utils.pcap_stream import PcapFile, DSCP_NAMES
+from app.utils.pcap_index import CaptureIndex
  
 logger = logging.getLogger(__name__)
 
 # Try to import scapy, but don't fail if it's not available
 try:
-    from scapy.all import (rdpcap, IP, IPv6, TCP, UDP, ICMP, 
-                          ARP, DNS, DNSQR, DNSRR, GRE, Raw, Ether)
+    from scapy.all import (IP, IPv6, TCP, UDP, ICMP, 
+                          ARP, DNS, DNSQR, DNSRR, GRE, Raw, Ether, conf)
     from scapy.contrib.geneve import GENEVE
     from scapy.packet import Packet
     SCAPY_AVAILABLE = True
@@ -24,6 +27,51 @@ except ImportError:
     logger.warning("Scapy not available - pcap analysis will be disabled")
  
  
+class _LazyPackets:
+    """
+    Sequence view of a capture that dissects packets on demand.
+
+    Only the byte-offset index is held in memory; iteration streams the file
+    and indexing seeks straight to the one record asked for, so the
+    analyses that still need full scapy dissection never materialise the
+    whole capture.
+    """
+
+    def __init__(self, capture: PcapFile, offsets):
+        self._capture = capture
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __bool__(self) -> bool:
+        return len(self._offsets) > 0
+
+    def __iter__(self):
+        # A separate handle so iteration doesn't disturb random access
+        with PcapFile(self._capture.path) as capture:
+            for record in capture:
+                yield self._dissect(record)
+
+    def __getitem__(self, index: int) -> 'Packet':
+        if index < 0:
+            index += len(self._offsets)
+        if not 0 <= index < len(self._offsets):
+            raise IndexError("packet index out of range")
+        return self._dissect(self._capture.read_at(self._offsets[index], index))
+
+    @staticmethod
+    def _dissect(record) -> 'Packet':
+        cls = conf.l2types.get(record.linktype, Raw)
+        try:
+            packet = cls(record.data)
+        except Exception:
+            packet = Raw(record.data)
+        packet.time = record.timestamp
+        packet.wirelen = record.wirelen
+        return packet
+
+
 class PcapAnalyzer:
     """Analyzer for packet capture files"""
     
@@ -42,17 +90,36 @@ class PcapAnalyzer:
             raise FileNotFoundError(f"PCAP file not found: {pcap_path}")
         
         self.packets = None
+        self._capture: Optional[PcapFile] = None
+        self._index: Optional[CaptureIndex] = None
         self._load_packets()
     
     def _load_packets(self):
-        """Load packets from the pcap file"""
+        """
+        Load the capture's persisted index, indexing it in one streaming
+        pass if this (path, size, mtime) hasn't been seen before.
+
+        Summary, flow, TCP health and DNS results come precomputed from the
+        index; ``self.packets`` is a lazy view that dissects individual
+        packets with scapy only when an operation needs them.
+        """
         try:
-            self.packets = rdpcap(str(self.pcap_path))
-            logger.info(f"Loaded {len(self.packets)} packets from {self.pcap_path}")
+            self._capture = PcapFile(str(self.pcap_path))
+            self._index = CaptureIndex.get_or_build(str(self.pcap_path), self._capture)
+            if self._capture.format == "pcapng" and not self._capture.sections:
+                self._capture.sections = self._index.sections
+            self.packets = _LazyPackets(self._capture, self._index.offsets)
         except Exception as e:
+            if self._capture is not None:
+                self._capture.close()
             logger.error(f"Failed to load pcap file: {e}")
             raise
     
+    def close(self):
+        """Release the underlying capture file handle"""
+        if self._capture is not None:
+            self._capture.close()
+    
     def get_summary(self) -> Dict[str, Any]:
         """
         Get a high-level summary of the pcap file
@@ -80,226 +147,35 @@ class PcapAnalyzer:
     
     def _count_tunneling_protocols(self) -> Dict[str, int]:
         """Count packets by tunneling protocol"""
-        tunneling = {}
-        
-        for packet in self.packets:
-            if GRE in packet:
-                tunneling['GRE'] = tunneling.get('GRE', 0) + 1
-            if GENEVE in packet:
-                tunneling['GENEVE'] = tunneling.get('GENEVE', 0) + 1
-            # VXLAN uses UDP port 4789
-            if UDP in packet and packet[UDP].dport == 4789:
-                tunneling['VXLAN'] = tunneling.get('VXLAN', 0) + 1
-            # ERSPAN uses GRE protocol 0x88BE
-            if GRE in packet and packet[GRE].proto == 0x88be:
-                tunneling['ERSPAN'] = tunneling.get('ERSPAN', 0) + 1
-        
-        return tunneling
+        return dict(self._index.tunneling)
     
     def _count_protocols(self) -> Dict[str, int]:
         """Count packets by protocol"""
-        protocols = {}
-        
-        for packet in self.packets:
-            if IP in packet:
-                proto = packet[IP].proto
-                proto_name = {1: 'ICMP', 6: 'TCP', 17: 'UDP'}.get(proto, f'Other({proto})')
-            elif ARP in packet:
-                proto_name = 'ARP'
-            elif IPv6 in packet:
-                # IPv6 next header field
-                nh = packet[IPv6].nh
-                proto_name = {
-                    1: 'ICMPv6',
-                    6: 'TCP',
-                    17: 'UDP',
-                    43: 'IPv6-Route',
-                    44: 'IPv6-Frag',
-                    58: 'ICMPv6',
-                    59: 'IPv6-NoNxt',
-                    60: 'IPv6-Opts'
-                }.get(nh, f'IPv6-Other({nh})')
-            elif GRE in packet:
-                proto_name = 'GRE'
-            else:
-                proto_name = 'Other'
-            
-            protocols[proto_name] = protocols.get(proto_name, 0) + 1
-        
-        return protocols
+        return dict(self._index.protocols)
     
     def _count_unique_ips(self) -> Dict[str, int]:
         """Count unique source and destination IPs"""
-        src_ips = set()
-        dst_ips = set()
-        
-        for packet in self.packets:
-            if IP in packet:
-                src_ips.add(packet[IP].src)
-                dst_ips.add(packet[IP].dst)
-            if IPv6 in packet:
-                src_ips.add(packet[IPv6].src)
-                dst_ips.add(packet[IPv6].dst)
-        
-        return {
-            "unique_sources": len(src_ips),
-            "unique_destinations": len(dst_ips),
-            "unique_total": len(src_ips | dst_ips)
-        }
+        return self._index.unique_ips()
     
     def _get_ipv6_stats(self) -> Dict[str, Any]:
         """Get IPv6-specific statistics"""
-        ipv6_count = 0
-        extension_headers = {}
-        hop_by_hop_count = 0
-        dest_opts_count = 0
-        
-        for packet in self.packets:
-            if IPv6 in packet:
-                ipv6_count += 1
-                
-                # Check for extension headers
-                # Hop-by-Hop Options (next header = 0)
-                if packet[IPv6].nh == 0:
-                    hop_by_hop_count += 1
-                    extension_headers['HopByHop'] = extension_headers.get('HopByHop', 0) + 1
-                
-                # Destination Options (next header = 60)
-                if packet[IPv6].nh == 60:
-                    dest_opts_count += 1
-                    extension_headers['DestOpts'] = extension_headers.get('DestOpts', 0) + 1
-                
-                # Routing Header (next header = 43)
-                if packet[IPv6].nh == 43:
-                    extension_headers['Routing'] = extension_headers.get('Routing', 0) + 1
-                
-                # Fragment Header (next header = 44)
-                if packet[IPv6].nh == 44:
-                    extension_headers['Fragment'] = extension_headers.get('Fragment', 0) + 1
-        
-        return {
-            "ipv6_packets": ipv6_count,
-            "extension_headers": extension_headers,
-            "hop_by_hop_options": hop_by_hop_count,
-            "destination_options": dest_opts_count
-        }
+        return self._index.ipv6_stats()
     
     def _get_dscp_distribution(self) -> Dict[str, int]:
         """Get DSCP (Differentiated Services Code Point) distribution"""
-        dscp_counts = {}
-        
-        for packet in self.packets:
-            dscp_value = None
-            
-            if IP in packet:
-                # DSCP is the upper 6 bits of the TOS field
-                tos = packet[IP].tos
-                dscp_value = (tos >> 2) & 0x3F
-            elif IPv6 in packet:
-                # DSCP is the upper 6 bits of the traffic class
-                tc = packet[IPv6].tc
-                dscp_value = (tc >> 2) & 0x3F
-            
-            if dscp_value is not None:
-                # Common DSCP names
-                dscp_name = {
-                    0: 'BE (Best Effort)',
-                    8: 'CS1',
-                    10: 'AF11',
-                    12: 'AF12',
-                    14: 'AF13',
-                    16: 'CS2',
-                    18: 'AF21',
-                    20: 'AF22',
-                    22: 'AF23',
-                    24: 'CS3',
-                    26: 'AF31',
-                    28: 'AF32',
-                    30: 'AF33',
-                    32: 'CS4',
-                    34: 'AF41',
-                    36: 'AF42',
-                    38: 'AF43',
-                    40: 'CS5',
-                    46: 'EF (Expedited Forwarding)',
-                    48: 'CS6',
-                    56: 'CS7'
-                }.get(dscp_value, f'DSCP-{dscp_value}')
-                
-                dscp_counts[dscp_name] = dscp_counts.get(dscp_name, 0) + 1
-        
-        # Sort by count
-        return dict(sorted(dscp_counts.items(), key=lambda x: x[1], reverse=True))
+        return self._index.dscp_distribution()
     
     def _get_time_range(self) -> Optional[Dict[str, float]]:
         """Get the time range of captured packets"""
         if not self.packets:
             return None
-        
-        timestamps = [float(p.time) for p in self.packets if hasattr(p, 'time')]
-        if not timestamps:
-            return None
-        
-        return {
-            "start": min(timestamps),
-            "end": max(timestamps),
-            "duration_seconds": max(timestamps) - min(timestamps)
-        }
+        return self._index.time_range()
     
     def _get_top_talkers(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get the most active IP addresses"""
-        ip_stats = {}
-        
-        for packet in self.packets:
-            if IP in packet:
-                src = packet[IP].src
-                dst = packet[IP].dst
-                
-            elif IPv6 in packet:
-                src = packet[IPv6].src
-                dst = packet[IPv6].dst
-                
-                if src not in ip_stats:
-                    ip_stats[src] = {"sent": 0, "received": 0, "bytes_sent": 0, "bytes_received": 0}
-                if dst not in ip_stats:
-                    ip_stats[dst] = {"sent": 0, "received": 0, "bytes_sent": 0, "bytes_received": 0}
-                
-                packet_size = len(packet)
-                ip_stats[src]["sent"] += 1
-                ip_stats[src]["bytes_sent"] += packet_size
-                ip_stats[dst]["received"] += 1
-                ip_stats[dst]["bytes_received"] += packet_size
-            else:
-                continue
-            
-            if src not in ip_stats:
-                ip_stats[src] = {"sent": 0, "received": 0, "bytes_sent": 0, "bytes_received": 0}
-            if dst not in ip_stats:
-                ip_stats[dst] = {"sent": 0, "received": 0, "bytes_sent": 0, "bytes_received": 0}
-                packet_size = len(packet)
-                ip_stats[src]["sent"] += 1
-                ip_stats[src]["bytes_sent"] += packet_size
-                ip_stats[dst]["received"] += 1
-                ip_stats[dst]["bytes_received"] += packet_size
-        
-        # Sort by total packets
-        sorted_ips = sorted(
-            ip_stats.items(),
-            key=lambda x: x[1]["sent"] + x[1]["received"],
-            reverse=True
-        )[:limit]
-        
-        return [
-            {
-                "ip": ip,
-                "packets_sent": stats["sent"],
-                "packets_received": stats["received"],
-                "bytes_sent": stats["bytes_sent"],
-                "bytes_received": stats["bytes_received"],
-                "total_packets": stats["sent"] + stats["received"]
-            }
-            for ip, stats in sorted_ips
-        ]
+        if self._index.table is not None:
+            return self._index.table.top_talkers(limit=limit)
+        return self._index.top_talkers(limit=limit)
     
     def get_tcp_health_analysis(self) -> Dict[str, Any]:
         """
@@ -316,200 +192,7 @@ class PcapAnalyzer:
         if not self.packets:
             return {"error": "No packets loaded"}
         
-        # Track per-IP health metrics
-        ip_health = {}
-        
-        # Track sequence numbers per flow to detect retransmissions
-        flow_sequences = {}
-        flow_acks = {}
-        
-        # Track connection attempts
-        syn_packets = {}
-        
-        for i, packet in enumerate(self.packets):
-            if TCP not in packet:
-                continue
-            
-            # Get IP addresses
-            src_ip = None
-            dst_ip = None
-            if IP in packet:
-                src_ip = packet[IP].src
-                dst_ip = packet[IP].dst
-            elif IPv6 in packet:
-                src_ip = packet[IPv6].src
-                dst_ip = packet[IPv6].dst
-            else:
-                continue
-            
-            # Initialize health tracking for this IP
-            if src_ip not in ip_health:
-                ip_health[src_ip] = {
-                    'total_packets': 0,
-                    'retransmissions': 0,
-                    'resets': 0,
-                    'fins': 0,
-                    'zero_windows': 0,
-                    'out_of_order': 0,
-                    'connection_attempts': 0,
-                    'failed_connections': 0,
-                    'duplicate_acks': 0,
-                    'issues': []
-                }
-            
-            ip_health[src_ip]['total_packets'] += 1
-            
-            # Get TCP details
-            tcp_layer = packet[TCP]
-            flags = str(tcp_layer.flags)
-            seq = tcp_layer.seq
-            ack = tcp_layer.ack
-            window = tcp_layer.window if hasattr(tcp_layer, 'window') else None
-            
-            # Create flow identifier
-            flow_id = (src_ip, tcp_layer.sport, dst_ip, tcp_layer.dport)
-            
-            # Initialize flow tracking
-            if flow_id not in flow_sequences:
-                flow_sequences[flow_id] = {'sequences': {}, 'last_seq': None, 'expected_seq': None}
-                flow_acks[flow_id] = {'last_ack': None, 'ack_count': {}}
-            
-            flow_track = flow_sequences[flow_id]
-            ack_track = flow_acks[flow_id]
-            
-            # Check for TCP flags indicating issues
-            if 'R' in flags:  # Reset
-                ip_health[src_ip]['resets'] += 1
-                ip_health[src_ip]['issues'].append({
-                    'type': 'reset',
-                    'packet_index': i,
-                    'timestamp': float(packet.time),
-                    'dst_ip': dst_ip,
-                    'port': f"{tcp_layer.sport}->{tcp_layer.dport}"
-                })
-            
-            if 'F' in flags:  # Fin (normal close)
-                ip_health[src_ip]['fins'] += 1
-            
-            # Track SYN packets for connection analysis
-            if 'S' in flags and 'A' not in flags:  # SYN only
-                ip_health[src_ip]['connection_attempts'] += 1
-                syn_packets[flow_id] = {
-                    'packet_index': i,
-                    'timestamp': float(packet.time),
-                    'responded': False
-                }
-            
-            # Mark SYN as responded if we see SYN-ACK
-            if 'S' in flags and 'A' in flags:  # SYN-ACK
-                reverse_flow = (dst_ip, tcp_layer.dport, src_ip, tcp_layer.sport)
-                if reverse_flow in syn_packets:
-                    syn_packets[reverse_flow]['responded'] = True
-            
-            # Check for zero window (flow control issue)
-            if window == 0:
-                ip_health[src_ip]['zero_windows'] += 1
-                ip_health[src_ip]['issues'].append({
-                    'type': 'zero_window',
-                    'packet_index': i,
-                    'timestamp': float(packet.time),
-                    'dst_ip': dst_ip,
-                    'port': f"{tcp_layer.sport}->{tcp_layer.dport}"
-                })
-            
-            # Detect retransmissions (same seq with payload seen before)
-            payload_len = len(tcp_layer.payload) if hasattr(tcp_layer, 'payload') else 0
-            
-            if payload_len > 0:  # Only check packets with data
-                if seq in flow_track['sequences']:
-                    # This is a retransmission
-                    ip_health[src_ip]['retransmissions'] += 1
-                    ip_health[src_ip]['issues'].append({
-                        'type': 'retransmission',
-                        'packet_index': i,
-                        'timestamp': float(packet.time),
-                        'seq': seq,
-                        'dst_ip': dst_ip,
-                        'port': f"{tcp_layer.sport}->{tcp_layer.dport}"
-                    })
-                else:
-                    flow_track['sequences'][seq] = i
-                
-                # Track expected sequence for out-of-order detection
-                if flow_track['last_seq'] is not None:
-                    expected_next = flow_track['last_seq'] + payload_len
-                    if seq < expected_next and seq != flow_track['last_seq']:
-                        # Out of order packet
-                        ip_health[src_ip]['out_of_order'] += 1
-                
-                flow_track['last_seq'] = seq
-            
-            # Detect duplicate ACKs (sign of packet loss)
-            if 'A' in flags and payload_len == 0:  # Pure ACK
-                if ack == ack_track['last_ack']:
-                    ack_count = ack_track['ack_count'].get(ack, 0) + 1
-                    ack_track['ack_count'][ack] = ack_count
-                    
-                    if ack_count >= 3:  # 3 duplicate ACKs = fast retransmit trigger
-                        ip_health[src_ip]['duplicate_acks'] += 1
-                
-                ack_track['last_ack'] = ack
-        
-        # Check for failed connection attempts
-        for flow_id, syn_info in syn_packets.items():
-            if not syn_info['responded']:
-                src_ip = flow_id[0]
-                if src_ip in ip_health:
-                    ip_health[src_ip]['failed_connections'] += 1
-                    ip_health[src_ip]['issues'].append({
-                        'type': 'failed_connection',
-                        'packet_index': syn_info['packet_index'],
-                        'timestamp': syn_info['timestamp'],
-                        'dst_ip': flow_id[2],
-                        'port': f"{flow_id[1]}->{flow_id[3]}"
-                    })
-        
-        # Calculate health scores and identify problematic IPs
-        problematic_ips = []
-        
-        for ip, metrics in ip_health.items():
-            # Calculate issue rate
-            total_issues = (metrics['retransmissions'] + 
-                          metrics['resets'] + 
-                          metrics['zero_windows'] + 
-                          metrics['failed_connections'])
-            
-            issue_rate = total_issues / metrics['total_packets'] if metrics['total_packets'] > 0 else 0
-            metrics['issue_rate'] = round(issue_rate * 100, 2)  # Percentage
-            
-            # Mark as problematic if issue rate > 5% or has resets/failed connections
-            if issue_rate > 0.05 or metrics['resets'] > 0 or metrics['failed_connections'] > 0:
-                problematic_ips.append(ip)
-                metrics['health_status'] = 'poor'
-            elif issue_rate > 0.01:
-                metrics['health_status'] = 'fair'
-            else:
-                metrics['health_status'] = 'good'
-            
-            # Sort issues by timestamp
-            metrics['issues'].sort(key=lambda x: x['timestamp'])
-            
-            # Limit issues list to most recent 10
-            if len(metrics['issues']) > 10:
-                metrics['issues'] = metrics['issues'][-10:]
-        
-        return {
-            'per_ip_health': ip_health,
-            'problematic_ips': problematic_ips,
-            'summary': {
-                'total_ips_analyzed': len(ip_health),
-                'ips_with_issues': len(problematic_ips),
-                'total_retransmissions': sum(m['retransmissions'] for m in ip_health.values()),
-                'total_resets': sum(m['resets'] for m in ip_health.values()),
-                'total_zero_windows': sum(m['zero_windows'] for m in ip_health.values()),
-                'total_failed_connections': sum(m['failed_connections'] for m in ip_health.values())
-            }
-        }
+        return self._index.tcp_health()
     
     def get_flow_statistics(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
@@ -522,106 +205,9 @@ class PcapAnalyzer:
         if not self.packets:
             return []
         
-        flows = {}
-        
-        for packet in self.packets:
-            # Get IP addresses and ports
-            src_ip = None
-            dst_ip = None
-            src_port = None
-            dst_port = None
-            protocol = None
-            
-            # Extract IP layer
-            if IP in packet:
-                src_ip = packet[IP].src
-                dst_ip = packet[IP].dst
-            elif IPv6 in packet:
-                src_ip = packet[IPv6].src
-                dst_ip = packet[IPv6].dst
-            
-            # Extract transport layer
-            if TCP in packet:
-                src_port = packet[TCP].sport
-                dst_port = packet[TCP].dport
-                protocol = "TCP"
-            elif UDP in packet:
-                src_port = packet[UDP].sport
-                dst_port = packet[UDP].dport
-                protocol = "UDP"
-            
-            # Skip if we don't have complete 5-tuple
-            if not (src_ip and dst_ip and src_port and dst_port and protocol):
-                continue
-            
-            # Create bidirectional flow key
-            flow_key = tuple(sorted([
-                (src_ip, src_port),
-                (dst_ip, dst_port)
-            ]))
-            
-            # Initialize flow if new
-            if flow_key not in flows:
-                flows[flow_key] = {
-                    'endpoints': [
-                        {'ip': flow_key[0][0], 'port': flow_key[0][1]},
-                        {'ip': flow_key[1][0], 'port': flow_key[1][1]}
-                    ],
-                    'protocol': protocol,
-                    'packet_count': 0,
-                    'bytes_sent': {flow_key[0][0]: 0, flow_key[1][0]: 0},
-                    'packets_sent': {flow_key[0][0]: 0, flow_key[1][0]: 0},
-                    'first_seen': float(packet.time),
-                    'last_seen': float(packet.time),
-                    'timestamps': []
-                }
-            
-            flow = flows[flow_key]
-            flow['packet_count'] += 1
-            flow['last_seen'] = float(packet.time)
-            flow['timestamps'].append(float(packet.time))
-            
-            # Track directional statistics
-            flow['bytes_sent'][src_ip] += len(packet)
-            flow['packets_sent'][src_ip] += 1
-        
-        # Calculate derived metrics for each flow
-        flow_list = []
-        for flow_key, flow in flows.items():
-            duration = flow['last_seen'] - flow['first_seen']
-            flow['duration_seconds'] = round(duration, 3)
-            
-            # Calculate inter-packet timing statistics
-            if len(flow['timestamps']) > 1:
-                intervals = [flow['timestamps'][i+1] - flow['timestamps'][i] 
-                           for i in range(len(flow['timestamps'])-1)]
-                flow['avg_interval_ms'] = round(sum(intervals) / len(intervals) * 1000, 2)
-                flow['max_interval_ms'] = round(max(intervals) * 1000, 2)
-                flow['min_interval_ms'] = round(min(intervals) * 1000, 2)
-            else:
-                flow['avg_interval_ms'] = 0
-                flow['max_interval_ms'] = 0
-                flow['min_interval_ms'] = 0
-            
-            # Calculate throughput
-            if duration > 0:
-                total_bytes = sum(flow['bytes_sent'].values())
-                flow['throughput_bps'] = int(total_bytes * 8 / duration)
-            else:
-                flow['throughput_bps'] = 0
-            
-            # Remove raw timestamps to reduce output size
-            del flow['timestamps']
-            
-            flow_list.append(flow)
-        
-        # Sort by packet count
-        flow_list.sort(key=lambda x: x['packet_count'], reverse=True)
-        
-        if limit:
-            flow_list = flow_list[:limit]
-        
-        return flow_list
+        if self._index.table is not None:
+            return self._index.table.flow_statistics(limit=limit)
+        return self._index.flow_statistics(limit=limit)
     
     def get_connectivity_map(self) -> Dict[str, Any]:
         """
@@ -815,35 +401,7 @@ class PcapAnalyzer:
         tunneling_packets = []
         
         for i, packet in enumerate(self.packets):
-            tunnel_info = None
-            
-            if GRE in packet:
-                tunnel_info = {
-                    'packet_index': i,
-                    'timestamp': float(packet.time),
-                    'protocol': 'GRE',
-                    'gre_protocol': packet[GRE].proto if hasattr(packet[GRE], 'proto') else None
-                }
-                
-                if IP in packet:
-                    tunnel_info['outer_src'] = packet[IP].src
-                    tunnel_info['outer_dst'] = packet[IP].dst
-            
-            elif GENEVE in packet:
-                tunnel_info = {
-                    'packet_index': i,
-                    'timestamp': float(packet.time),
-                    'protocol': 'GENEVE',
-                    'vni': packet[GENEVE].vni if hasattr(packet[GENEVE], 'vni') else None
-                }
-            
-            elif UDP in packet and packet[UDP].dport == 4789:  # VXLAN
-                tunnel_info = {
-                    'packet_index': i,
-                    'timestamp': float(packet.time),
-                    'protocol': 'VXLAN',
-                    'udp_port': 4789
-                }
+            tunnel_info = self._tunnel_info(i, packet)
             
             if tunnel_info:
                 tunneling_packets.append(tunnel_info)
@@ -853,6 +411,40 @@ class PcapAnalyzer:
         
         return tunneling_packets
     
+    def _tunnel_info(self, index: int, packet: 'Packet') -> Optional[Dict[str, Any]]:
+        """Tunneling details for one packet, or None if it isn't tunneled"""
+        tunnel_info = None
+        
+        if GRE in packet:
+            tunnel_info = {
+                'packet_index': index,
+                'timestamp': float(packet.time),
+                'protocol': 'GRE',
+                'gre_protocol': packet[GRE].proto if hasattr(packet[GRE], 'proto') else None
+            }
+            
+            if IP in packet:
+                tunnel_info['outer_src'] = packet[IP].src
+                tunnel_info['outer_dst'] = packet[IP].dst
+        
+        elif GENEVE in packet:
+            tunnel_info = {
+                'packet_index': index,
+                'timestamp': float(packet.time),
+                'protocol': 'GENEVE',
+                'vni': packet[GENEVE].vni if hasattr(packet[GENEVE], 'vni') else None
+            }
+        
+        elif UDP in packet and packet[UDP].dport == 4789:  # VXLAN
+            tunnel_info = {
+                'packet_index': index,
+                'timestamp': float(packet.time),
+                'protocol': 'VXLAN',
+                'udp_port': 4789
+            }
+        
+        return tunnel_info
+    
     def get_ipv6_extension_headers(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Extract IPv6 extension header information.
@@ -1042,6 +634,15 @@ class PcapAnalyzer:
         Returns:
             List of matching packets
         """
+        if self._index.table is not None:
+            # Vectorized match; only the returned packets are dissected
+            indices = self._index.table.filter_indices(
+                src_ip=src_ip, dst_ip=dst_ip, protocol=protocol, port=port,
+                tcp_flags=tcp_flags, min_size=min_size, max_size=max_size,
+                limit=limit
+            )
+            return [self._packet_to_dict(self.packets[int(i)]) for i in indices]
+        
         matches = []
         
         for packet in self.packets:
@@ -1104,27 +705,14 @@ class PcapAnalyzer:
         Returns:
             List of DNS query dictionaries
         """
-        dns_queries = []
-        
-        for packet in self.packets:
-            if DNS in packet and packet[DNS].qr == 0:  # Query (not response)
-                if DNSQR in packet:
-                    query = {
-                        "query_name": packet[DNSQR].qname.decode('utf-8', errors='ignore'),
-                        "query_type": packet[DNSQR].qtype,
-                        "timestamp": float(packet.time)
-                    }
-                    
-                    if IP in packet:
-                        query["source_ip"] = packet[IP].src
-                        query["dest_ip"] = packet[IP].dst
-                    
-                    dns_queries.append(query)
+        if not self.packets:
+            return []
         
+        dns_queries = self._index.dns_queries
         if limit:
             dns_queries = dns_queries[:limit]
         
-        return dns_queries
+        return [dict(q) for q in dns_queries]
     
     def get_dns_responses(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
@@ -1136,39 +724,14 @@ class PcapAnalyzer:
         Returns:
             List of DNS response dictionaries
         """
-        dns_responses = []
-        
-        for packet in self.packets:
-            if DNS in packet and packet[DNS].qr == 1:  # Response
-                response = {
-                    "timestamp": float(packet.time),
-                    "answers": []
-                }
-                
-                if DNSQR in packet:
-                    response["query_name"] = packet[DNSQR].qname.decode('utf-8', errors='ignore')
-                
-                if IP in packet:
-                    response["source_ip"] = packet[IP].src
-                    response["dest_ip"] = packet[IP].dst
-                
-                # Extract answers
-                if packet[DNS].an:
-                    for i in range(packet[DNS].ancount):
-                        answer = packet[DNS].an[i]
-                        if hasattr(answer, 'rdata'):
-                            response["answers"].append({
-                                "name": answer.rrname.decode('utf-8', errors='ignore'),
-                                "type": answer.type,
-                                "data": str(answer.rdata)
-                            })
-                
-                dns_responses.append(response)
+        if not self.packets:
+            return []
         
+        dns_responses = self._index.dns_responses
         if limit:
             dns_responses = dns_responses[:limit]
         
-        return dns_responses
+        return [dict(r, answers=list(r["answers"])) for r in dns_responses]
     
     def filter_packets(
         self,
@@ -1191,6 +754,15 @@ class PcapAnalyzer:
         Returns:
             List of filtered packet summaries
         """
+        if self._index.table is not None:
+            # Vectorized match; only the returned packets are dissected.
+            # Address filters apply to IPv4 only, as below.
+            indices = self._index.table.filter_indices(
+                src_ip=src_ip, dst_ip=dst_ip, protocol=protocol, port=port,
+                ip_versions=(4,), limit=limit
+            )
+            return [self._packet_to_dict(self.packets[int(i)]) for i in indices]
+        
         filtered = []
         
         for packet in self.packets:
@@ -1477,6 +1049,7 @@ class PcapAnalyzer:
         if not self.packets or packet_index < 0 or packet_index >= len(self.packets):
             return None
         
+        # Seeks to the one record via the offset index
         packet = self.packets[packet_index]
         details = self._packet_to_dict(packet)
         
@@ -1508,10 +1081,9 @@ class PcapAnalyzer:
         # Add tunneling info if present
         if GRE in packet or GENEVE in packet:
             details["is_tunneled"] = True
-            tunnel_info = self.get_tunneling_info(limit=None)
-            matching = [t for t in tunnel_info if t["packet_index"] == packet_index]
-            if matching:
-                details["tunnel_info"] = matching[0]
+            tunnel_info = self._tunnel_info(packet_index, packet)
+            if tunnel_info:
+                details["tunnel_info"] = tunnel_info
         
         # Add full packet summary
         details["packet_summary"] = packet.summary()
@@ -1520,16 +1092,7 @@ class PcapAnalyzer:
     
     def _get_dscp_name(self, dscp_value: int) -> str:
         """Get human-readable name for DSCP value"""
-        dscp_names = {
-            0: 'BE (Best Effort)',
-            8: 'CS1', 10: 'AF11', 12: 'AF12', 14: 'AF13',
-            16: 'CS2', 18: 'AF21', 20: 'AF22', 22: 'AF23',
-            24: 'CS3', 26: 'AF31', 28: 'AF32', 30: 'AF33',
-            32: 'CS4', 34: 'AF41', 36: 'AF42', 38: 'AF43',
-            40: 'CS5', 46: 'EF (Expedited Forwarding)',
-            48: 'CS6', 56: 'CS7'
-        }
-        return dscp_names.get(dscp_value, f'DSCP-{dscp_value}')
+        return DSCP_NAMES.get(dscp_value, f'DSCP-{dscp_value}')
  
  
 def analyze_pcap_file(
@@ -1567,6 +1130,7 @@ def analyze_pcap_file(
             "message": "Install scapy with: pip install scapy"
         }
     
+    analyzer = None
     try:
         analyzer = PcapAnalyzer(file_path)
         
@@ -1699,6 +1263,9 @@ def analyze_pcap_file(
     except Exception as e:
         logger.error(f"Error analyzing pcap: {e}", exc_info=True)
         return {"error": "analysis_failed", "message": str(e)}
+    finally:
+        if analyzer is not None:
+            analyzer.close()
  
  
 def is_pcap_supported() -> bool:
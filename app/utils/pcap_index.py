@@ -0,0 +1,290 @@
+"""
+Persistent per-capture analysis index.
+
+``analyze_pcap`` is typically called many times against the same capture
+in one conversation, once per operation, and each call used to re-parse
+the whole file.  This module persists the result of the single streaming
+pass (see :mod:`app.utils.pcap_stream`) so follow-up operations only read
+a few small files:
+
+  * ``offsets.bin``     packet byte-offset table (little-endian uint64),
+                        so any packet can be read with one seek
+  * ``aggregates.json`` summary pieces, the flow table, TCP health and DNS
+  * ``packets.npy``     columnar packet table for vectorized filters and
+                        group-bys (see :mod:`app.utils.pcap_table`;
+                        only when NumPy is available)
+  * ``meta.json``       capture format, packet count and the pcapng
+                        section table; written last, so its presence
+                        marks a complete index
+
+The index is:
+  * project-scoped  (lives under ``{project_root}/.ziya/pcap_index/``)
+  * content-addressed by (abspath, mtime, size) so a rewritten capture
+    is re-indexed automatically
+  * built on first access and persisted across restarts
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.env_registry import ziya_env
+from app.utils.pcap_stream import CaptureAggregator, PcapFile, scan_capture
+from app.utils.pcap_table import NUMPY_AVAILABLE, PacketTable
+
+logger = logging.getLogger(__name__)
+
+# Cache directory name under the project root.
+CACHE_DIR_NAME = ".ziya/pcap_index"
+
+# Bump when the on-disk layout or aggregate contents change.
+INDEX_VERSION = 3
+
+# A per-process lock protecting index builds so concurrent callers don't
+# duplicate work on the same capture.
+_BUILD_LOCKS: Dict[str, threading.Lock] = {}
+_BUILD_LOCKS_MUTEX = threading.Lock()
+
+
+def _get_project_root() -> str:
+    """
+    Resolve the active project root without introducing an MCP runtime
+    dependency at import time.
+    """
+    try:
+        from app.context import get_project_root as _ctx_root
+        root = _ctx_root()
+        if root and os.path.isdir(root):
+            return root
+    except (ImportError, RuntimeError):
+        pass  # Context module unavailable — use env fallback
+    return ziya_env("ZIYA_USER_CODEBASE_DIR") or os.getcwd()
+
+
+def _cache_key_for(path: str) -> Tuple[str, Path]:
+    """
+    Compute the content-addressed cache directory for a capture.
+
+    The key incorporates the resolved path, mtime and size so any rewrite
+    of the capture invalidates the index automatically.
+    """
+    try:
+        abspath = str(Path(path).resolve())
+    except (OSError, ValueError):
+        abspath = os.path.abspath(path)
+    try:
+        st = os.stat(abspath)
+        signature = f"{abspath}|{int(st.st_mtime)}|{st.st_size}"
+    except OSError:
+        signature = abspath
+    digest = hashlib.sha1(signature.encode("utf-8")).hexdigest()[:16]
+    cache_root = Path(_get_project_root()) / CACHE_DIR_NAME
+    return digest, cache_root / digest
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+class CaptureIndex:
+    """
+    Offset table plus precomputed analyses for one capture.
+
+    Exposes the same result accessors as :class:`CaptureAggregator`, so
+    ``PcapAnalyzer`` doesn't care whether it was just built or loaded.
+    """
+
+    def __init__(self, path: str, meta: Dict[str, Any], offsets: array,
+                 aggregates: Dict[str, Any], cache_dir: Optional[Path] = None,
+                 table: Optional[PacketTable] = None):
+        self.path = path
+        self.meta = meta
+        self.offsets = offsets
+        self.cache_dir = cache_dir
+        # Columnar packet table, or None without NumPy
+        self.table = table
+        self._aggregates = aggregates
+
+    # --- builders / loaders ------------------------------------------------ #
+
+    @classmethod
+    def from_aggregator(cls, path: str, capture: PcapFile,
+                        aggregator: CaptureAggregator) -> "CaptureIndex":
+        meta = {
+            "path": os.path.abspath(path),
+            "format": capture.format,
+            "packet_count": aggregator.packet_count,
+            "sections": capture.sections,
+            "version": INDEX_VERSION,
+        }
+        aggregates = {
+            "protocols": dict(aggregator.protocols),
+            "tunneling": dict(aggregator.tunneling),
+            "unique_ips": aggregator.unique_ips(),
+            "time_range": aggregator.time_range(),
+            "top_talkers": aggregator.top_talkers(limit=len(aggregator.talkers)),
+            "ipv6_stats": aggregator.ipv6_stats(),
+            "dscp_distribution": aggregator.dscp_distribution(),
+            "flows": aggregator.flow_statistics(),
+            "tcp_health": aggregator.tcp_health(),
+            "dns_queries": aggregator.dns_queries,
+            "dns_responses": aggregator.dns_responses,
+            "dns_truncated": aggregator.dns_truncated,
+            "addresses": aggregator.addresses,
+            "flow_keys": aggregator.flow_keys(),
+        }
+        table = None
+        if NUMPY_AVAILABLE:
+            table = PacketTable.from_columns(aggregator.columns, aggregates["addresses"],
+                                             aggregates["flow_keys"])
+        return cls(path=path, meta=meta, offsets=aggregator.offsets, aggregates=aggregates, table=table)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CaptureIndex"]:
+        _, cache_dir = _cache_key_for(path)
+        meta_path = cache_dir / "meta.json"
+        if not meta_path.is_file():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("version") != INDEX_VERSION:
+                return None
+            aggregates = json.loads((cache_dir / "aggregates.json").read_text(encoding="utf-8"))
+            offsets = array("Q")
+            offsets.frombytes((cache_dir / "offsets.bin").read_bytes())
+            if sys.byteorder != "little":
+                offsets.byteswap()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable pcap index for {path}: {e}")
+            return None
+        if len(offsets) != meta.get("packet_count"):
+            return None
+        table = None
+        if NUMPY_AVAILABLE:
+            table = PacketTable.load(cache_dir, aggregates["addresses"], aggregates["flow_keys"])
+        return cls(path=path, meta=meta, offsets=offsets, aggregates=aggregates,
+                   cache_dir=cache_dir, table=table)
+
+    @classmethod
+    def build(cls, path: str, capture: Optional[PcapFile] = None) -> "CaptureIndex":
+        """
+        Index *path* with one streaming pass and persist the result.
+
+        *capture*, if given, is an open handle on the same file; it is used
+        for the pass and left open.  A cache directory that can't be
+        written only costs the persistence, not the analysis.
+        """
+        key, cache_dir = _cache_key_for(path)
+
+        # Serialise concurrent builds for the same key.
+        with _BUILD_LOCKS_MUTEX:
+            lock = _BUILD_LOCKS.setdefault(key, threading.Lock())
+        with lock:
+            # Another thread may have finished while we were waiting.
+            existing = cls.load(path)
+            if existing is not None:
+                return existing
+
+            if capture is None:
+                with PcapFile(path) as opened:
+                    index = cls.from_aggregator(path, opened, scan_capture(opened))
+            else:
+                index = cls.from_aggregator(path, capture, scan_capture(capture))
+
+            try:
+                index._persist(cache_dir)
+            except OSError as e:
+                logger.warning(f"Could not persist pcap index for {path}: {e}")
+            return index
+
+    @classmethod
+    def get_or_build(cls, path: str, capture: Optional[PcapFile] = None) -> "CaptureIndex":
+        """Load the persisted index for *path*, or build one."""
+        existing = cls.load(path)
+        if existing is not None:
+            return existing
+        return cls.build(path, capture)
+
+    def _persist(self, cache_dir: Path) -> None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        offsets = array("Q", self.offsets)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        _write_atomic(cache_dir / "offsets.bin", offsets.tobytes())
+        _write_atomic(cache_dir / "aggregates.json",
+                      json.dumps(self._aggregates, ensure_ascii=False).encode("utf-8"))
+        if self.table is not None:
+            self.table.save(cache_dir)
+        _write_atomic(cache_dir / "meta.json",
+                      json.dumps(self.meta, ensure_ascii=False, indent=2).encode("utf-8"))
+        self.cache_dir = cache_dir
+        logger.info(f"Persisted pcap index for {self.path}: {self.packet_count} packets")
+
+    # --- accessors --------------------------------------------------------- #
+
+    @property
+    def packet_count(self) -> int:
+        return int(self.meta.get("packet_count", 0))
+
+    @property
+    def sections(self) -> List[Any]:
+        return self.meta.get("sections", [])
+
+    @property
+    def protocols(self) -> Dict[str, int]:
+        return self._aggregates["protocols"]
+
+    @property
+    def tunneling(self) -> Dict[str, int]:
+        return self._aggregates["tunneling"]
+
+    @property
+    def dns_queries(self) -> List[Dict[str, Any]]:
+        return self._aggregates["dns_queries"]
+
+    @property
+    def dns_responses(self) -> List[Dict[str, Any]]:
+        return self._aggregates["dns_responses"]
+
+    def unique_ips(self) -> Dict[str, int]:
+        return dict(self._aggregates["unique_ips"])
+
+    def time_range(self) -> Optional[Dict[str, float]]:
+        time_range = self._aggregates["time_range"]
+        return dict(time_range) if time_range else None
+
+    def top_talkers(self, limit: int = 10) -> List[Dict[str, Any]]:
+        return [dict(t) for t in self._aggregates["top_talkers"][:limit]]
+
+    def ipv6_stats(self) -> Dict[str, Any]:
+        stats = dict(self._aggregates["ipv6_stats"])
+        stats["extension_headers"] = dict(stats["extension_headers"])
+        return stats
+
+    def dscp_distribution(self) -> Dict[str, int]:
+        return dict(self._aggregates["dscp_distribution"])
+
+    def flow_statistics(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        flows = self._aggregates["flows"]
+        if limit:
+            flows = flows[:limit]
+        # Callers are free to mutate what they get back
+        return copy.deepcopy(flows)
+
+    def tcp_health(self) -> Dict[str, Any]:
+        return copy.deepcopy(self._aggregates["tcp_health"])
@@ -20,12 +20,7 @@ try:
 except ImportError:
     SCAPY_AVAILABLE = False
 
-try:
-    import dpkt
-    import socket
-    DPKT_AVAILABLE = True
-except ImportError:
-    DPKT_AVAILABLE = False
+from app.utils.pcap_stream import PcapFile, decode_packet
 
 logger = logging.getLogger(__name__)
 
@@ -82,12 +77,14 @@ class PCAPReader:
     """High-performance PCAP file reader with multiple backend support."""
     
     def __init__(self, use_scapy: bool = True):
-        """Initialize PCAP reader with preferred backend."""
-        self.use_scapy = use_scapy and SCAPY_AVAILABLE
-        self.use_dpkt = not use_scapy and DPKT_AVAILABLE
+        """
+        Initialize PCAP reader with preferred backend.
         
-        if not (SCAPY_AVAILABLE or DPKT_AVAILABLE):
-            raise ImportError("Neither scapy nor dpkt is available. Install at least one PCAP library.")
+        The streaming backend needs no third-party library and is used
+        whenever scapy is unavailable or not requested.
+        """
+        self.use_scapy = use_scapy and SCAPY_AVAILABLE
+        self.use_streaming = not self.use_scapy
     
     def read_pcap(self, file_path: str, max_packets: Optional[int] = None) -> PCAPAnalysis:
         """
@@ -110,8 +107,8 @@ class PCAPReader:
         
         if self.use_scapy:
             analysis = self._read_with_scapy(file_path, max_packets)
-        elif self.use_dpkt:
-            analysis = self._read_with_dpkt(file_path, max_packets)
+        elif self.use_streaming:
+            analysis = self._read_streaming(file_path, max_packets)
         else:
             raise RuntimeError("No PCAP reading backend available")
         
@@ -179,7 +176,7 @@ class PCAPReader:
             summary=self._generate_summary(packet_infos, flows, protocols)
         )
     
-    def _extract_packet_info_scapy(self, pkt: Packet, index: int) -> PacketInfo:
+    def _extract_packet_info_scapy(self, pkt: 'Packet', index: int) -> PacketInfo:
         """Extract structured information from a Scapy packet."""
         timestamp = float(pkt.time) if hasattr(pkt, 'time') else time.time()
         
@@ -316,10 +313,113 @@ class PCAPReader:
         
         return sorted(network_flows, key=lambda f: f.start_time)
     
-    def _read_with_dpkt(self, file_path: str, max_packets: Optional[int]) -> PCAPAnalysis:
-        """Read PCAP using dpkt backend (fallback implementation)."""
-        # TODO: Implement dpkt-based reading for cases where Scapy isn't available
-        raise NotImplementedError("DPKT backend not yet implemented")
+    def _read_streaming(self, file_path: str, max_packets: Optional[int]) -> PCAPAnalysis:
+        """
+        Read PCAP one record at a time without dissecting into objects.
+        
+        Only running totals and per-flow counters are kept, so memory is
+        bounded by the number of flows rather than packets; flows are
+        returned without their per-packet lists.
+        """
+        protocols = {}
+        unique_ips = set()
+        ip_counts = {}
+        flows_dict = {}
+        packet_count = 0
+        total_bytes = 0
+        first_ts = last_ts = None
+        
+        try:
+            capture = PcapFile(file_path)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Failed to read PCAP: {e}")
+        
+        with capture:
+            for record in capture:
+                if max_packets is not None and packet_count >= max_packets:
+                    break
+                fields = decode_packet(record.data, record.linktype, record.timestamp)
+                packet_count += 1
+                total_bytes += fields.length
+                if first_ts is None:
+                    first_ts = fields.timestamp
+                last_ts = fields.timestamp
+                
+                src_ip = fields.src if fields.l3 in ('IPv4', 'IPv6') else ""
+                dst_ip = fields.dst if fields.l3 in ('IPv4', 'IPv6') else ""
+                if fields.l4:
+                    protocol = fields.l4
+                elif fields.l3 in ('IPv4', 'IPv6'):
+                    protocol = f"IP-{fields.ip_proto}"
+                else:
+                    protocol = "Unknown"
+                if fields.dns is not None:
+                    protocol = "DNS"
+                
+                protocols[protocol] = protocols.get(protocol, 0) + 1
+                if src_ip:
+                    unique_ips.add(src_ip)
+                    ip_counts[src_ip] = ip_counts.get(src_ip, 0) + 1
+                if dst_ip:
+                    unique_ips.add(dst_ip)
+                
+                # Same bidirectional keying as _generate_flows
+                if fields.sport and fields.dport:
+                    key1 = f"{src_ip}:{fields.sport}-{dst_ip}:{fields.dport}-{protocol}"
+                    key2 = f"{dst_ip}:{fields.dport}-{src_ip}:{fields.sport}-{protocol}"
+                else:
+                    key1 = f"{src_ip}-{dst_ip}-{protocol}"
+                    key2 = f"{dst_ip}-{src_ip}-{protocol}"
+                flow = flows_dict.get(key1) or flows_dict.get(key2)
+                if flow is None:
+                    flow = flows_dict[key1] = NetworkFlow(
+                        flow_id=key1,
+                        src_ip=src_ip,
+                        dst_ip=dst_ip,
+                        src_port=fields.sport,
+                        dst_port=fields.dport,
+                        protocol=protocol,
+                        packet_count=0,
+                        total_bytes=0,
+                        start_time=fields.timestamp,
+                        end_time=fields.timestamp,
+                        duration=0.0,
+                        packets=[]
+                    )
+                flow.packet_count += 1
+                flow.total_bytes += fields.length
+                flow.start_time = min(flow.start_time, fields.timestamp)
+                flow.end_time = max(flow.end_time, fields.timestamp)
+                flow.duration = flow.end_time - flow.start_time
+        
+        flows = sorted(flows_dict.values(), key=lambda f: f.start_time)
+        time_range = (first_ts, last_ts) if packet_count else (0.0, 0.0)
+        
+        summary = {}
+        if packet_count:
+            summary = {
+                'total_packets': packet_count,
+                'total_flows': len(flows),
+                'total_bytes': total_bytes,
+                'average_packet_size': round(total_bytes / packet_count, 2),
+                'protocols_detected': len(protocols),
+                'most_common_protocol': max(protocols.items(), key=lambda x: x[1])[0] if protocols else None,
+                'unique_conversations': len(flows),
+                'analysis_timestamp': time.time()
+            }
+        
+        return PCAPAnalysis(
+            filename="",  # Will be set by caller
+            file_size=0,  # Will be set by caller
+            packet_count=packet_count,
+            time_range=time_range,
+            duration=time_range[1] - time_range[0],
+            protocols=protocols,
+            unique_ips=list(unique_ips),
+            flows=flows,
+            top_talkers=sorted(ip_counts.items(), key=lambda x: x[1], reverse=True)[:10],
+            summary=summary
+        )
     
     def _generate_summary(self, packets: List[PacketInfo], flows: List[NetworkFlow], protocols: Dict[str, int]) -> Dict[str, Any]:
         """Generate analysis summary statistics."""
@@ -361,14 +461,11 @@ def validate_pcap_file(file_path: str) -> bool:
         if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
             return False
         
-        # Try to read first few packets
-        if SCAPY_AVAILABLE:
-            try:
-                rdpcap(file_path, count=1)
+        # Check the capture header parses
+        try:
+            with PcapFile(file_path):
                 return True
-            except (OSError, ValueError, ImportError):
-                return False
-        
-        return False
+        except (OSError, ValueError):
+            return False
     except Exception:
         return False
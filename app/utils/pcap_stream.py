@@ -0,0 +1,996 @@
+"""
+Streaming PCAP engine.
+
+``scapy.rdpcap`` materialises every packet of a capture as a fully dissected
+``Packet`` object, which makes multi-GB captures unusable and costs minutes
+per call on a few hundred MB.  This module reads captures one record at a
+time instead:
+
+  * :class:`PcapFile` walks libpcap and pcapng files record by record
+    (header parsing with ``struct`` only — no scapy/dpkt needed) and can
+    seek straight to a record by byte offset.
+  * :func:`decode_packet` pulls the handful of header fields the analyses
+    need (addresses, ports, TCP flags/seq/ack/window, DSCP, tunnelling
+    markers, DNS) out of the raw bytes without building layer objects.
+  * :class:`CaptureAggregator` consumes decoded packets in a single pass
+    and produces the summary, flow, TCP-health and DNS results, plus a
+    packet-offset index for random access and the per-packet header
+    columns (:class:`PacketColumns`) behind the packet table.
+
+Per-packet state is 41 bytes: an 8-byte record offset and 33 bytes of
+header columns, against several KB for a dissected scapy packet.
+Everything else is bounded by the number of distinct hosts/flows rather
+than the number of packets: the per-flow retransmission tracker keeps a
+bounded window of recent sequence numbers, only the 10 most recent issues
+per host are kept, and the DNS lists are capped.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import socket
+import struct
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------------- #
+# File formats
+# --------------------------------------------------------------------------- #
+
+_PCAP_MAGICS = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1_000_000),      # little-endian, microseconds
+    b"\xa1\xb2\xc3\xd4": (">", 1_000_000),      # big-endian, microseconds
+    b"\x4d\x3c\xb2\xa1": ("<", 1_000_000_000),  # little-endian, nanoseconds
+    b"\xa1\xb2\x3c\x4d": (">", 1_000_000_000),  # big-endian, nanoseconds
+}
+_PCAPNG_SHB = 0x0A0D0D0A
+_PCAPNG_IDB = 0x00000001
+_PCAPNG_PB = 0x00000002   # obsolete Packet Block
+_PCAPNG_SPB = 0x00000003
+_PCAPNG_EPB = 0x00000006
+
+# Link types understood by decode_packet (values from the tcpdump registry)
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+
+@dataclass
+class RawRecord:
+    """One captured packet as stored in the file."""
+    index: int
+    offset: int          # byte offset of the record (pcap header / pcapng block)
+    timestamp: float
+    caplen: int
+    wirelen: int
+    linktype: int
+    data: bytes
+
+
+class PcapFile:
+    """Sequential and random-access reader for libpcap and pcapng files."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        head = self._f.read(24)
+        if len(head) < 4:
+            self._f.close()
+            raise ValueError(f"Not a pcap file (too short): {path}")
+        if head[:4] in _PCAP_MAGICS:
+            if len(head) < 24:
+                self._f.close()
+                raise ValueError(f"Truncated pcap header: {path}")
+            self.format = "pcap"
+            self._endian, self._ts_divisor = _PCAP_MAGICS[head[:4]]
+            self.linktype = struct.unpack(self._endian + "I", head[20:24])[0] & 0x0FFFFFFF
+            self._data_start = 24
+        elif struct.unpack("<I", head[:4])[0] == _PCAPNG_SHB:
+            self.format = "pcapng"
+            self.linktype = None
+            self._data_start = 0
+            # (section start offset, byte order, [(linktype, ts_divisor), ...])
+            # in file order; random reads look up the section by offset.
+            self._sections: List[Tuple[int, str, List[Tuple[int, int]]]] = []
+        else:
+            self._f.close()
+            raise ValueError(f"Unrecognised capture format: {path}")
+
+    def close(self) -> None:
+        self._f.close()
+
+    @property
+    def sections(self) -> List[Tuple[int, str, List[Tuple[int, int]]]]:
+        """pcapng section/interface table, as needed by :meth:`read_at`."""
+        return list(getattr(self, "_sections", []))
+
+    @sections.setter
+    def sections(self, sections) -> None:
+        # Restored from a persisted index so random reads skip the full scan
+        self._sections = [
+            (int(start), endian, [(int(lt), int(div)) for lt, div in interfaces])
+            for start, endian, interfaces in sections
+        ]
+
+    def __enter__(self) -> "PcapFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ── sequential access ───────────────────────────────────────────
+
+    def __iter__(self) -> Iterator[RawRecord]:
+        if self.format == "pcap":
+            return self._iter_pcap()
+        return self._iter_pcapng()
+
+    def _iter_pcap(self) -> Iterator[RawRecord]:
+        f = self._f
+        f.seek(self._data_start)
+        hdr = struct.Struct(self._endian + "IIII")
+        divisor = self._ts_divisor
+        offset = self._data_start
+        for index in itertools.count():
+            raw = f.read(16)
+            if len(raw) < 16:
+                return
+            ts_sec, ts_frac, caplen, wirelen = hdr.unpack(raw)
+            data = f.read(caplen)
+            if len(data) < caplen:
+                logger.warning(f"Truncated final record in {self.path} at offset {offset}")
+                return
+            # Integer true division is correctly rounded
+            yield RawRecord(index, offset, (ts_sec * divisor + ts_frac) / divisor,
+                            caplen, wirelen, self.linktype, data)
+            offset += 16 + caplen
+
+    def _iter_pcapng(self) -> Iterator[RawRecord]:
+        f = self._f
+        f.seek(0)
+        offset = 0
+        index = 0
+        endian = "<"
+        interfaces: List[Tuple[int, int]] = []
+        self._sections = []
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                return
+            block_type = struct.unpack("<I", head[:4])[0]
+            if block_type == _PCAPNG_SHB:
+                bom = f.read(4)
+                if len(bom) < 4:
+                    return
+                endian = "<" if bom == b"\x4d\x3c\x2b\x1a" else ">"
+                block_len = struct.unpack(endian + "I", head[4:8])[0]
+                body = bom + f.read(block_len - 12)
+                interfaces = []
+                self._sections.append((offset, endian, interfaces))
+            else:
+                block_type, block_len = struct.unpack(endian + "II", head)
+                if block_len < 12:
+                    logger.warning(f"Corrupt pcapng block in {self.path} at offset {offset}")
+                    return
+                body = f.read(block_len - 8)
+            if len(body) < block_len - 8:
+                logger.warning(f"Truncated final block in {self.path} at offset {offset}")
+                return
+
+            if block_type == _PCAPNG_IDB:
+                interfaces.append(_parse_idb(body, endian))
+            elif block_type in (_PCAPNG_EPB, _PCAPNG_SPB, _PCAPNG_PB):
+                record = _parse_packet_block(block_type, body, endian, interfaces, index, offset)
+                if record is not None:
+                    yield record
+                    index += 1
+            offset += block_len
+
+    # ── random access ───────────────────────────────────────────────
+
+    def read_at(self, offset: int, index: int = -1) -> RawRecord:
+        """Read the single record that starts at byte *offset*."""
+        f = self._f
+        f.seek(offset)
+        if self.format == "pcap":
+            ts_sec, ts_frac, caplen, wirelen = struct.unpack(self._endian + "IIII", f.read(16))
+            divisor = self._ts_divisor
+            return RawRecord(index, offset, (ts_sec * divisor + ts_frac) / divisor,
+                             caplen, wirelen, self.linktype, f.read(caplen))
+
+        if not self._sections:
+            # Section/interface tables come from a sequential pass.
+            for _ in self:
+                pass
+        section = None
+        for start, endian, interfaces in self._sections:
+            if start > offset:
+                break
+            section = (endian, interfaces)
+        if section is None:
+            raise ValueError(f"No pcapng section precedes offset {offset}")
+        endian, interfaces = section
+        f.seek(offset)
+        block_type, block_len = struct.unpack(endian + "II", f.read(8))
+        record = _parse_packet_block(block_type, f.read(block_len - 8), endian, interfaces, index, offset)
+        if record is None:
+            raise ValueError(f"No packet block at offset {offset}")
+        return record
+
+
+def _parse_idb(body: bytes, endian: str) -> Tuple[int, int]:
+    linktype = struct.unpack(endian + "H", body[0:2])[0]
+    divisor = 1_000_000
+    pos = 8
+    end = len(body) - 4
+    while pos + 4 <= end:
+        code, length = struct.unpack(endian + "HH", body[pos:pos + 4])
+        if code == 0:
+            break
+        if code == 9 and length >= 1:  # if_tsresol
+            resol = body[pos + 4]
+            divisor = 2 ** (resol & 0x7F) if resol & 0x80 else 10 ** resol
+        pos += 4 + ((length + 3) & ~3)
+    return linktype, divisor
+
+
+def _parse_packet_block(block_type: int, body: bytes, endian: str,
+                        interfaces: List[Tuple[int, int]], index: int,
+                        offset: int) -> Optional[RawRecord]:
+    if block_type == _PCAPNG_EPB:
+        if_id, ts_hi, ts_lo, caplen, wirelen = struct.unpack(endian + "IIIII", body[:20])
+        data = body[20:20 + caplen]
+    elif block_type == _PCAPNG_PB:
+        if_id, _drops, ts_hi, ts_lo, caplen, wirelen = struct.unpack(endian + "HHIIII", body[:20])
+        data = body[20:20 + caplen]
+    elif block_type == _PCAPNG_SPB:
+        wirelen = struct.unpack(endian + "I", body[:4])[0]
+        if_id, ts_hi, ts_lo = 0, 0, 0
+        caplen = min(wirelen, len(body) - 8)
+        data = body[4:4 + caplen]
+    else:
+        return None
+    if if_id >= len(interfaces):
+        return None
+    linktype, divisor = interfaces[if_id]
+    return RawRecord(index, offset, ((ts_hi << 32) | ts_lo) / divisor,
+                     len(data), wirelen, linktype, data)
+
+
+# --------------------------------------------------------------------------- #
+# Header decoding
+# --------------------------------------------------------------------------- #
+
+# TCP flag letters in bit order, matching scapy's FlagValue string form.
+_TCP_FLAG_LETTERS = "FSRPAUECN"
+
+_IPV6_EXT_HEADERS = {0, 43, 60}   # hop-by-hop, routing, destination options
+_IPV6_FRAGMENT = 44
+
+_GENEVE_PORT = 6081
+_VXLAN_PORT = 4789
+_DNS_PORTS = {53, 5353}
+
+
+def tcp_flags_str(bits: int) -> str:
+    """Render TCP flag bits the way scapy prints them (e.g. ``'PA'``)."""
+    return "".join(c for i, c in enumerate(_TCP_FLAG_LETTERS) if bits & (1 << i))
+
+
+@dataclass
+class PacketFields:
+    """Header fields of one packet, decoded without building layer objects."""
+    length: int
+    timestamp: float
+    l3: Optional[str] = None            # 'IPv4', 'IPv6', 'ARP'
+    src: Optional[str] = None
+    dst: Optional[str] = None
+    ip_proto: Optional[int] = None      # IPv4 proto / first IPv6 next header
+    tos: Optional[int] = None           # IPv4 TOS or IPv6 traffic class
+    l4: Optional[str] = None            # 'TCP', 'UDP', 'ICMP'
+    sport: Optional[int] = None
+    dport: Optional[int] = None
+    tcp_flags: int = 0
+    seq: int = 0
+    ack: int = 0
+    window: Optional[int] = None
+    payload_len: int = 0
+    payload_offset: int = 0
+    gre: bool = False
+    gre_proto: Optional[int] = None
+    vxlan: bool = False
+    dns: Optional[Dict[str, Any]] = None
+
+
+def _ipv4_str(b: bytes) -> str:
+    return socket.inet_ntop(socket.AF_INET, b)
+
+
+def _ipv6_str(b: bytes) -> str:
+    return socket.inet_ntop(socket.AF_INET6, b)
+
+
+def decode_packet(data: bytes, linktype: int, timestamp: float = 0.0) -> PacketFields:
+    """Decode link, network and transport headers of one raw packet."""
+    pkt = PacketFields(length=len(data), timestamp=timestamp)
+    try:
+        ethertype, pos = _link_header(data, linktype)
+        if ethertype is not None:
+            _decode_l3(pkt, data, pos, ethertype, depth=0)
+    except (struct.error, IndexError, ValueError, OSError):
+        pass  # Truncated or malformed headers: keep what was decoded
+    return pkt
+
+
+def _ethernet_header(data: bytes, pos: int) -> Tuple[int, int]:
+    """Return (ethertype, offset of the network header) for a frame at `pos`."""
+    ethertype = struct.unpack("!H", data[pos + 12:pos + 14])[0]
+    pos += 14
+    while ethertype in (0x8100, 0x88A8, 0x9100):  # VLAN / QinQ tags
+        ethertype = struct.unpack("!H", data[pos + 2:pos + 4])[0]
+        pos += 4
+    return ethertype, pos
+
+
+def _link_header(data: bytes, linktype: int) -> Tuple[Optional[int], int]:
+    """Return (ethertype, offset of the network header)."""
+    if linktype == LINKTYPE_ETHERNET:
+        return _ethernet_header(data, 0)
+    if linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6, 12, 14):
+        version = data[0] >> 4
+        return {4: 0x0800, 6: 0x86DD}.get(version), 0
+    if linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        family = struct.unpack("<I" if linktype == LINKTYPE_NULL else "!I", data[:4])[0]
+        if family == 2:
+            return 0x0800, 4
+        if family in (10, 24, 28, 30):
+            return 0x86DD, 4
+        return None, 4
+    if linktype == LINKTYPE_LINUX_SLL:
+        return struct.unpack("!H", data[14:16])[0], 16
+    if linktype == LINKTYPE_LINUX_SLL2:
+        return struct.unpack("!H", data[0:2])[0], 20
+    return None, 0
+
+
+def _decode_l3(pkt: PacketFields, data: bytes, pos: int, ethertype: int, depth: int) -> None:
+    if ethertype == 0x0800:
+        ihl = (data[pos] & 0x0F) * 4
+        total_len = struct.unpack("!H", data[pos + 2:pos + 4])[0]
+        proto = data[pos + 9]
+        if pkt.l3 is None:
+            pkt.l3 = "IPv4"
+            pkt.tos = data[pos + 1]
+            pkt.ip_proto = proto
+            pkt.src = _ipv4_str(data[pos + 12:pos + 16])
+            pkt.dst = _ipv4_str(data[pos + 16:pos + 20])
+        end = min(len(data), pos + total_len) if total_len else len(data)
+        frag_offset = struct.unpack("!H", data[pos + 6:pos + 8])[0] & 0x1FFF
+        if frag_offset == 0:
+            _decode_l4(pkt, data, pos + ihl, end, proto, depth)
+    elif ethertype == 0x86DD:
+        payload_len = struct.unpack("!H", data[pos + 4:pos + 6])[0]
+        nh = data[pos + 6]
+        if pkt.l3 is None:
+            pkt.l3 = "IPv6"
+            pkt.tos = (struct.unpack("!I", data[pos:pos + 4])[0] >> 20) & 0xFF
+            pkt.ip_proto = nh
+            pkt.src = _ipv6_str(data[pos + 8:pos + 24])
+            pkt.dst = _ipv6_str(data[pos + 24:pos + 40])
+        start = pos + 40
+        end = min(len(data), start + payload_len) if payload_len else len(data)
+        # Walk extension headers to the transport header
+        while nh in _IPV6_EXT_HEADERS or nh == _IPV6_FRAGMENT:
+            if nh == _IPV6_FRAGMENT:
+                if struct.unpack("!H", data[start + 2:start + 4])[0] >> 3:
+                    return  # non-first fragment: no transport header
+                nh, start = data[start], start + 8
+            else:
+                nh, start = data[start], start + (data[start + 1] + 1) * 8
+        _decode_l4(pkt, data, start, end, nh, depth)
+    elif ethertype == 0x0806 and pkt.l3 is None:
+        pkt.l3 = "ARP"
+
+
+def _decode_l4(pkt: PacketFields, data: bytes, pos: int, end: int, proto: int, depth: int) -> None:
+    # A TCP segment inside a VXLAN tunnel wins over the outer UDP header,
+    # matching ``packet[TCP]`` under scapy.
+    if proto == 6 and pkt.l4 in (None, "UDP"):
+        sport, dport, seq, ack, off_flags, window = struct.unpack("!HHIIHH", data[pos:pos + 16])
+        hlen = (off_flags >> 12) * 4
+        pkt.l4 = "TCP"
+        pkt.sport, pkt.dport = sport, dport
+        pkt.seq, pkt.ack, pkt.window = seq, ack, window
+        pkt.tcp_flags = off_flags & 0x01FF
+        pkt.payload_offset = pos + hlen
+        pkt.payload_len = max(0, end - pkt.payload_offset)
+        if 53 in (sport, dport) and pkt.payload_len > 2:
+            # DNS over TCP carries a two-byte length prefix
+            pkt.dns = _decode_dns(data[pkt.payload_offset + 2:end])
+    elif proto == 17 and pkt.l4 is None:
+        sport, dport = struct.unpack("!HH", data[pos:pos + 4])
+        pkt.l4 = "UDP"
+        pkt.sport, pkt.dport = sport, dport
+        pkt.payload_offset = pos + 8
+        pkt.payload_len = max(0, end - pkt.payload_offset)
+        if (sport in _DNS_PORTS or dport in _DNS_PORTS) and pkt.payload_len >= 12:
+            pkt.dns = _decode_dns(data[pkt.payload_offset:end])
+        elif dport == _VXLAN_PORT and depth == 0:
+            # 8-byte VXLAN header, then the encapsulated Ethernet frame
+            pkt.vxlan = True
+            ethertype, inner = _ethernet_header(data, pkt.payload_offset + 8)
+            _decode_l3(pkt, data, inner, ethertype, depth + 1)
+    elif proto == 1 and pkt.l4 is None:
+        pkt.l4 = "ICMP"
+        pkt.payload_offset = pos
+        pkt.payload_len = max(0, end - pos)
+    elif proto == 47:
+        pkt.gre = True
+        flags, gre_proto = struct.unpack("!HH", data[pos:pos + 4])
+        if pkt.gre_proto is None:
+            pkt.gre_proto = gre_proto
+        # GRE carrying IP directly: decode the inner transport header too,
+        # as scapy does when it dissects the encapsulated packet.
+        if depth == 0 and gre_proto in (0x0800, 0x86DD):
+            hlen = 4 + 4 * sum(1 for bit in (0x8000, 0x2000, 0x1000) if flags & bit)
+            _decode_l3(pkt, data, pos + hlen, gre_proto, depth + 1)
+
+
+# ── DNS ────────────────────────────────────────────────────────────────
+
+_DNS_MAX_POINTER_HOPS = 32
+
+
+def _dns_name(msg: bytes, pos: int) -> Tuple[str, int]:
+    """Decode a (possibly compressed) DNS name; returns (name, position after it)."""
+    labels = []
+    end = None
+    hops = 0
+    while True:
+        length = msg[pos]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = pos + 2
+            pos = ((length & 0x3F) << 8) | msg[pos + 1]
+            hops += 1
+            if hops > _DNS_MAX_POINTER_HOPS:
+                raise ValueError("DNS name compression loop")
+            continue
+        if length == 0:
+            pos += 1
+            break
+        labels.append(msg[pos + 1:pos + 1 + length].decode("utf-8", errors="ignore"))
+        pos += 1 + length
+    return ".".join(labels) + ".", (end if end is not None else pos)
+
+
+def _dns_rdata(msg: bytes, rtype: int, pos: int, rdlen: int) -> str:
+    rdata = msg[pos:pos + rdlen]
+    if rtype == 1 and rdlen == 4:
+        return _ipv4_str(rdata)
+    if rtype == 28 and rdlen == 16:
+        return _ipv6_str(rdata)
+    if rtype in (2, 5, 12):  # NS, CNAME, PTR
+        return _dns_name(msg, pos)[0]
+    if rtype == 16:  # TXT
+        parts, i = [], 0
+        while i < len(rdata):
+            n = rdata[i]
+            parts.append(rdata[i + 1:i + 1 + n].decode("utf-8", errors="ignore"))
+            i += 1 + n
+        return " ".join(parts)
+    return rdata.hex()
+
+
+def _decode_dns(msg: bytes) -> Optional[Dict[str, Any]]:
+    """Decode the header, first question and answers of a DNS message."""
+    try:
+        _id, flags, qdcount, ancount = struct.unpack("!HHHH", msg[:8])
+        pos = 12
+        question = None
+        for i in range(qdcount):
+            name, pos = _dns_name(msg, pos)
+            qtype = struct.unpack("!H", msg[pos:pos + 2])[0]
+            pos += 4
+            if i == 0:
+                question = {"name": name, "type": qtype}
+        answers = []
+        for _ in range(ancount):
+            name, pos = _dns_name(msg, pos)
+            rtype, _rclass, _ttl, rdlen = struct.unpack("!HHIH", msg[pos:pos + 10])
+            pos += 10
+            answers.append({"name": name, "type": rtype, "data": _dns_rdata(msg, rtype, pos, rdlen)})
+            pos += rdlen
+        return {"qr": flags >> 15, "question": question, "answers": answers}
+    except (struct.error, IndexError, ValueError, UnicodeDecodeError):
+        return None
+
+
+# --------------------------------------------------------------------------- #
+# Single-pass aggregation
+# --------------------------------------------------------------------------- #
+
+_IPV4_PROTO_NAMES = {1: 'ICMP', 6: 'TCP', 17: 'UDP'}
+_IPV6_NH_NAMES = {
+    1: 'ICMPv6', 6: 'TCP', 17: 'UDP', 43: 'IPv6-Route', 44: 'IPv6-Frag',
+    58: 'ICMPv6', 59: 'IPv6-NoNxt', 60: 'IPv6-Opts',
+}
+_IPV6_EXT_STATS = {0: 'HopByHop', 60: 'DestOpts', 43: 'Routing', 44: 'Fragment'}
+
+DSCP_NAMES = {
+    0: 'BE (Best Effort)',
+    8: 'CS1', 10: 'AF11', 12: 'AF12', 14: 'AF13',
+    16: 'CS2', 18: 'AF21', 20: 'AF22', 22: 'AF23',
+    24: 'CS3', 26: 'AF31', 28: 'AF32', 30: 'AF33',
+    32: 'CS4', 34: 'AF41', 36: 'AF42', 38: 'AF43',
+    40: 'CS5', 46: 'EF (Expedited Forwarding)',
+    48: 'CS6', 56: 'CS7'
+}
+
+# Retransmission detection remembers this many recent data-segment
+# sequence numbers per flow; older segments fall out of the window.
+MAX_TRACKED_SEQS_PER_FLOW = 4096
+# Issues kept per host (the most recent by timestamp, as reported).
+MAX_ISSUES_PER_IP = 10
+# DNS queries/responses retained for the dns_* operations.
+MAX_DNS_RECORDS = 10_000
+
+
+def protocol_name(pkt: PacketFields) -> str:
+    """Protocol bucket for the summary's protocol histogram."""
+    if pkt.l3 == 'IPv4':
+        return _IPV4_PROTO_NAMES.get(pkt.ip_proto, f'Other({pkt.ip_proto})')
+    if pkt.l3 == 'ARP':
+        return 'ARP'
+    if pkt.l3 == 'IPv6':
+        return _IPV6_NH_NAMES.get(pkt.ip_proto, f'IPv6-Other({pkt.ip_proto})')
+    if pkt.gre:
+        return 'GRE'
+    return 'Other'
+
+
+def _new_health() -> Dict[str, Any]:
+    return {
+        'total_packets': 0,
+        'retransmissions': 0,
+        'resets': 0,
+        'fins': 0,
+        'zero_windows': 0,
+        'out_of_order': 0,
+        'connection_attempts': 0,
+        'failed_connections': 0,
+        'duplicate_acks': 0,
+    }
+
+
+# Transport codes used in the packet columns (IP protocol numbers)
+L4_CODES = {'ICMP': 1, 'TCP': 6, 'UDP': 17}
+
+
+class PacketColumns:
+    """
+    Per-packet header fields stored column-wise during the pass.
+
+    Addresses are interned to ints (ids into ``CaptureAggregator.addresses``)
+    so IPv4 and IPv6 share one compact column; -1 marks non-IP packets and
+    packets outside any flow.  33 bytes per packet, against several KB for
+    a dissected scapy packet.
+    """
+
+    FIELDS = (
+        ('ts', 'd'), ('src', 'i'), ('dst', 'i'), ('sport', 'H'), ('dport', 'H'),
+        ('l4', 'B'), ('ipver', 'B'), ('length', 'I'), ('flags', 'H'), ('dscp', 'B'),
+        ('flow', 'i'),
+    )
+
+    def __init__(self):
+        for name, code in self.FIELDS:
+            setattr(self, name, array(code))
+
+    def append(self, pkt: PacketFields, src: int, dst: int, flow: int) -> None:
+        self.ts.append(pkt.timestamp)
+        self.src.append(src)
+        self.dst.append(dst)
+        self.sport.append(pkt.sport or 0)
+        self.dport.append(pkt.dport or 0)
+        self.l4.append(L4_CODES.get(pkt.l4, 0))
+        self.ipver.append({'IPv4': 4, 'IPv6': 6}.get(pkt.l3, 0))
+        self.length.append(pkt.length)
+        self.flags.append(pkt.tcp_flags)
+        self.dscp.append((pkt.tos >> 2) & 0x3F if src >= 0 else 0)
+        self.flow.append(flow)
+
+
+@dataclass
+class _FlowTrack:
+    sequences: "OrderedDict[int, int]" = field(default_factory=OrderedDict)
+    last_seq: Optional[int] = None
+    last_ack: Optional[int] = None
+    ack_count: Dict[int, int] = field(default_factory=dict)
+
+
+class CaptureAggregator:
+    """Accumulates every streaming analysis over one pass of a capture."""
+
+    def __init__(self):
+        self.packet_count = 0
+        self.offsets = array('Q')
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.protocols: Dict[str, int] = {}
+        self.src_ips: set = set()
+        self.dst_ips: set = set()
+        self.talkers: Dict[str, List[int]] = {}   # ip -> [sent, received, bytes_sent, bytes_received]
+        self.address_ids: Dict[str, int] = {}     # ip -> id, in order of first appearance
+        self.columns = PacketColumns()
+        self.tunneling: Dict[str, int] = {}
+        self.ipv6_packets = 0
+        self.ipv6_ext: Dict[str, int] = {}
+        self.dscp: Dict[int, int] = {}
+        self.flows: Dict[tuple, Dict[str, Any]] = {}
+        self.health: Dict[str, Dict[str, Any]] = {}
+        self._issues: Dict[str, list] = {}
+        self._issue_seq = itertools.count()
+        self._tcp_flows: Dict[tuple, _FlowTrack] = {}
+        self._syns: Dict[tuple, Dict[str, Any]] = {}
+        self.dns_queries: List[Dict[str, Any]] = []
+        self.dns_responses: List[Dict[str, Any]] = []
+        self.dns_truncated = False
+
+    # ── per packet ──────────────────────────────────────────────────
+
+    def add(self, record: RawRecord, pkt: PacketFields) -> None:
+        """Fold one decoded packet into every aggregate."""
+        self.offsets.append(record.offset)
+        self.packet_count += 1
+        ts = pkt.timestamp
+        if self.first_ts is None or ts < self.first_ts:
+            self.first_ts = ts
+        if self.last_ts is None or ts > self.last_ts:
+            self.last_ts = ts
+
+        name = protocol_name(pkt)
+        self.protocols[name] = self.protocols.get(name, 0) + 1
+
+        src_id = dst_id = flow_id = -1
+        is_ip = pkt.l3 in ('IPv4', 'IPv6')
+        if is_ip:
+            self.src_ips.add(pkt.src)
+            self.dst_ips.add(pkt.dst)
+            for ip in (pkt.src, pkt.dst):
+                if ip not in self.talkers:
+                    self.talkers[ip] = [0, 0, 0, 0]
+                    self.address_ids[ip] = len(self.address_ids)
+            src_id = self.address_ids[pkt.src]
+            dst_id = self.address_ids[pkt.dst]
+            sent = self.talkers[pkt.src]
+            sent[0] += 1
+            sent[2] += pkt.length
+            received = self.talkers[pkt.dst]
+            received[1] += 1
+            received[3] += pkt.length
+            dscp = (pkt.tos >> 2) & 0x3F
+            self.dscp[dscp] = self.dscp.get(dscp, 0) + 1
+
+        if pkt.l3 == 'IPv6':
+            self.ipv6_packets += 1
+            ext = _IPV6_EXT_STATS.get(pkt.ip_proto)
+            if ext:
+                self.ipv6_ext[ext] = self.ipv6_ext.get(ext, 0) + 1
+
+        self._add_tunneling(pkt)
+        if is_ip and pkt.l4 in ('TCP', 'UDP') and pkt.sport and pkt.dport:
+            flow_id = self._add_flow(pkt)
+        self.columns.append(pkt, src_id, dst_id, flow_id)
+        if is_ip and pkt.l4 == 'TCP':
+            self._add_tcp_health(record.index, pkt)
+        if pkt.dns is not None:
+            self._add_dns(pkt)
+
+    def _bump(self, table: Dict[str, int], key: str) -> None:
+        table[key] = table.get(key, 0) + 1
+
+    def _add_tunneling(self, pkt: PacketFields) -> None:
+        if pkt.gre:
+            self._bump(self.tunneling, 'GRE')
+            if pkt.gre_proto == 0x88BE:
+                self._bump(self.tunneling, 'ERSPAN')
+        if pkt.l4 == 'UDP':
+            if pkt.dport == _GENEVE_PORT:
+                self._bump(self.tunneling, 'GENEVE')
+        if pkt.vxlan:
+            self._bump(self.tunneling, 'VXLAN')
+
+    def _add_flow(self, pkt: PacketFields) -> int:
+        key = tuple(sorted([(pkt.src, pkt.sport), (pkt.dst, pkt.dport)]))
+        ts = pkt.timestamp
+        flow = self.flows.get(key)
+        if flow is None:
+            flow = self.flows[key] = {
+                'endpoints': [
+                    {'ip': key[0][0], 'port': key[0][1]},
+                    {'ip': key[1][0], 'port': key[1][1]}
+                ],
+                'protocol': pkt.l4,
+                'packet_count': 0,
+                'bytes_sent': {key[0][0]: 0, key[1][0]: 0},
+                'packets_sent': {key[0][0]: 0, key[1][0]: 0},
+                'first_seen': ts,
+                'last_seen': ts,
+                '_id': len(self.flows),
+                '_interval_sum': 0.0,
+                '_interval_min': None,
+                '_interval_max': None,
+            }
+        else:
+            # Inter-arrival in capture order, as a running min/max/sum
+            interval = ts - flow['last_seen']
+            flow['_interval_sum'] += interval
+            if flow['_interval_min'] is None or interval < flow['_interval_min']:
+                flow['_interval_min'] = interval
+            if flow['_interval_max'] is None or interval > flow['_interval_max']:
+                flow['_interval_max'] = interval
+        flow['packet_count'] += 1
+        flow['last_seen'] = ts
+        flow['bytes_sent'][pkt.src] += pkt.length
+        flow['packets_sent'][pkt.src] += 1
+        return flow['_id']
+
+    def _add_issue(self, ip: str, issue: Dict[str, Any]) -> None:
+        heap = self._issues.setdefault(ip, [])
+        entry = (issue['timestamp'], next(self._issue_seq), issue)
+        if len(heap) < MAX_ISSUES_PER_IP:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def _add_tcp_health(self, index: int, pkt: PacketFields) -> None:
+        src_ip, dst_ip = pkt.src, pkt.dst
+        health = self.health.get(src_ip)
+        if health is None:
+            health = self.health[src_ip] = _new_health()
+        health['total_packets'] += 1
+
+        flags = pkt.tcp_flags
+        ts = pkt.timestamp
+        port = f"{pkt.sport}->{pkt.dport}"
+        flow_id = (src_ip, pkt.sport, dst_ip, pkt.dport)
+        track = self._tcp_flows.get(flow_id)
+        if track is None:
+            track = self._tcp_flows[flow_id] = _FlowTrack()
+
+        if flags & 0x04:  # RST
+            health['resets'] += 1
+            self._add_issue(src_ip, {'type': 'reset', 'packet_index': index,
+                                     'timestamp': ts, 'dst_ip': dst_ip, 'port': port})
+        if flags & 0x01:  # FIN
+            health['fins'] += 1
+        syn, ack_flag = flags & 0x02, flags & 0x10
+        if syn and not ack_flag:
+            health['connection_attempts'] += 1
+            self._syns[flow_id] = {'packet_index': index, 'timestamp': ts, 'responded': False}
+        if syn and ack_flag:
+            reverse = (dst_ip, pkt.dport, src_ip, pkt.sport)
+            if reverse in self._syns:
+                self._syns[reverse]['responded'] = True
+
+        if pkt.window == 0:
+            health['zero_windows'] += 1
+            self._add_issue(src_ip, {'type': 'zero_window', 'packet_index': index,
+                                     'timestamp': ts, 'dst_ip': dst_ip, 'port': port})
+
+        seq = pkt.seq
+        if pkt.payload_len > 0:
+            if seq in track.sequences:
+                health['retransmissions'] += 1
+                self._add_issue(src_ip, {'type': 'retransmission', 'packet_index': index,
+                                         'timestamp': ts, 'seq': seq, 'dst_ip': dst_ip, 'port': port})
+            else:
+                track.sequences[seq] = index
+                if len(track.sequences) > MAX_TRACKED_SEQS_PER_FLOW:
+                    track.sequences.popitem(last=False)
+            if track.last_seq is not None:
+                expected_next = track.last_seq + pkt.payload_len
+                if seq < expected_next and seq != track.last_seq:
+                    health['out_of_order'] += 1
+            track.last_seq = seq
+
+        if ack_flag and pkt.payload_len == 0:  # pure ACK
+            if pkt.ack == track.last_ack:
+                count = track.ack_count.get(pkt.ack, 0) + 1
+                track.ack_count[pkt.ack] = count
+                if count >= 3:
+                    health['duplicate_acks'] += 1
+            track.last_ack = pkt.ack
+
+    def _add_dns(self, pkt: PacketFields) -> None:
+        dns = pkt.dns
+        question = dns['question']
+        if dns['qr'] == 0:
+            if question is None:
+                return
+            if len(self.dns_queries) >= MAX_DNS_RECORDS:
+                self.dns_truncated = True
+                return
+            query = {
+                "query_name": question['name'],
+                "query_type": question['type'],
+                "timestamp": pkt.timestamp,
+            }
+            if pkt.l3 == 'IPv4':
+                query["source_ip"] = pkt.src
+                query["dest_ip"] = pkt.dst
+            self.dns_queries.append(query)
+        else:
+            if len(self.dns_responses) >= MAX_DNS_RECORDS:
+                self.dns_truncated = True
+                return
+            response = {"timestamp": pkt.timestamp, "answers": list(dns['answers'])}
+            if question is not None:
+                response["query_name"] = question['name']
+            if pkt.l3 == 'IPv4':
+                response["source_ip"] = pkt.src
+                response["dest_ip"] = pkt.dst
+            self.dns_responses.append(response)
+
+    # ── results ─────────────────────────────────────────────────────
+
+    @property
+    def addresses(self) -> List[str]:
+        """Address strings indexed by the ids used in the packet columns."""
+        return list(self.address_ids)
+
+    def flow_keys(self) -> List[list]:
+        """``[ip_a, port_a, ip_b, port_b, protocol]`` per flow id."""
+        return [[k[0][0], k[0][1], k[1][0], k[1][1], f['protocol']] for k, f in self.flows.items()]
+
+    def unique_ips(self) -> Dict[str, int]:
+        return {
+            "unique_sources": len(self.src_ips),
+            "unique_destinations": len(self.dst_ips),
+            "unique_total": len(self.src_ips | self.dst_ips)
+        }
+
+    def time_range(self) -> Optional[Dict[str, float]]:
+        if self.first_ts is None:
+            return None
+        return {
+            "start": self.first_ts,
+            "end": self.last_ts,
+            "duration_seconds": self.last_ts - self.first_ts
+        }
+
+    def top_talkers(self, limit: int = 10) -> List[Dict[str, Any]]:
+        ranked = sorted(self.talkers.items(), key=lambda x: x[1][0] + x[1][1], reverse=True)[:limit]
+        return [
+            {
+                "ip": ip,
+                "packets_sent": s[0],
+                "packets_received": s[1],
+                "bytes_sent": s[2],
+                "bytes_received": s[3],
+                "total_packets": s[0] + s[1]
+            }
+            for ip, s in ranked
+        ]
+
+    def ipv6_stats(self) -> Dict[str, Any]:
+        return {
+            "ipv6_packets": self.ipv6_packets,
+            "extension_headers": dict(self.ipv6_ext),
+            "hop_by_hop_options": self.ipv6_ext.get('HopByHop', 0),
+            "destination_options": self.ipv6_ext.get('DestOpts', 0)
+        }
+
+    def dscp_distribution(self) -> Dict[str, int]:
+        named: Dict[str, int] = {}
+        for value, count in self.dscp.items():
+            name = DSCP_NAMES.get(value, f'DSCP-{value}')
+            named[name] = named.get(name, 0) + count
+        return dict(sorted(named.items(), key=lambda x: x[1], reverse=True))
+
+    def flow_statistics(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        flow_list = []
+        for flow in self.flows.values():
+            out = {k: v for k, v in flow.items() if not k.startswith('_')}
+            out['bytes_sent'] = dict(flow['bytes_sent'])
+            out['packets_sent'] = dict(flow['packets_sent'])
+            duration = flow['last_seen'] - flow['first_seen']
+            out['duration_seconds'] = round(duration, 3)
+            if flow['packet_count'] > 1:
+                out['avg_interval_ms'] = round(flow['_interval_sum'] / (flow['packet_count'] - 1) * 1000, 2)
+                out['max_interval_ms'] = round(flow['_interval_max'] * 1000, 2)
+                out['min_interval_ms'] = round(flow['_interval_min'] * 1000, 2)
+            else:
+                out['avg_interval_ms'] = 0
+                out['max_interval_ms'] = 0
+                out['min_interval_ms'] = 0
+            if duration > 0:
+                out['throughput_bps'] = int(sum(flow['bytes_sent'].values()) * 8 / duration)
+            else:
+                out['throughput_bps'] = 0
+            flow_list.append(out)
+        flow_list.sort(key=lambda x: x['packet_count'], reverse=True)
+        if limit:
+            flow_list = flow_list[:limit]
+        return flow_list
+
+    def tcp_health(self) -> Dict[str, Any]:
+        ip_health = {ip: dict(metrics) for ip, metrics in self.health.items()}
+        issues = {ip: list(heap) for ip, heap in self._issues.items()}
+
+        for flow_id, syn in self._syns.items():
+            if syn['responded']:
+                continue
+            src_ip = flow_id[0]
+            if src_ip in ip_health:
+                ip_health[src_ip]['failed_connections'] += 1
+                entry = (syn['timestamp'], next(self._issue_seq), {
+                    'type': 'failed_connection',
+                    'packet_index': syn['packet_index'],
+                    'timestamp': syn['timestamp'],
+                    'dst_ip': flow_id[2],
+                    'port': f"{flow_id[1]}->{flow_id[3]}"
+                })
+                heap = issues.setdefault(src_ip, [])
+                if len(heap) < MAX_ISSUES_PER_IP:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+
+        problematic_ips = []
+        for ip, metrics in ip_health.items():
+            total_issues = (metrics['retransmissions'] +
+                            metrics['resets'] +
+                            metrics['zero_windows'] +
+                            metrics['failed_connections'])
+            issue_rate = total_issues / metrics['total_packets'] if metrics['total_packets'] > 0 else 0
+            metrics['issue_rate'] = round(issue_rate * 100, 2)
+            if issue_rate > 0.05 or metrics['resets'] > 0 or metrics['failed_connections'] > 0:
+                problematic_ips.append(ip)
+                metrics['health_status'] = 'poor'
+            elif issue_rate > 0.01:
+                metrics['health_status'] = 'fair'
+            else:
+                metrics['health_status'] = 'good'
+            metrics['issues'] = [e[2] for e in sorted(issues.get(ip, []))]
+
+        return {
+            'per_ip_health': ip_health,
+            'problematic_ips': problematic_ips,
+            'summary': {
+                'total_ips_analyzed': len(ip_health),
+                'ips_with_issues': len(problematic_ips),
+                'total_retransmissions': sum(m['retransmissions'] for m in ip_health.values()),
+                'total_resets': sum(m['resets'] for m in ip_health.values()),
+                'total_zero_windows': sum(m['zero_windows'] for m in ip_health.values()),
+                'total_failed_connections': sum(m['failed_connections'] for m in ip_health.values())
+            }
+        }
+
+
+def scan_capture(capture) -> CaptureAggregator:
+    """Stream a capture once, returning the populated aggregator (with offset index).
+
+    *capture* is a path or an open :class:`PcapFile`; an open file is left
+    open so it can serve random reads through the offset index afterwards.
+    """
+    if not isinstance(capture, PcapFile):
+        with PcapFile(capture) as opened:
+            return scan_capture(opened)
+    aggregator = CaptureAggregator()
+    for record in capture:
+        aggregator.add(record, decode_packet(record.data, record.linktype, record.timestamp))
+    logger.info(f"Indexed {aggregator.packet_count} packets from {capture.path}")
+    return aggregator
@@ -0,0 +1,245 @@
+"""
+Columnar packet table for vectorized pcap queries.
+
+The per-packet columns collected during the streaming pass (see
+:class:`app.utils.pcap_stream.PacketColumns`) are held as one NumPy
+structured array — timestamps, interned src/dst address ids, ports,
+transport, IP version, length, TCP flags, DSCP and flow id.  Filters,
+top-N, per-flow group-bys and inter-arrival statistics then run as array
+operations instead of Python loops over dissected scapy packets, and only
+the packets a query actually returns are dissected.
+
+The table persists next to the capture index as ``packets.npy`` and is
+memory-mapped on load, so even million-packet captures open instantly.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.utils.pcap_stream import L4_CODES, PacketColumns, tcp_flags_str
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+_NUMPY_TYPES = {'d': '<f8', 'i': '<i4', 'H': '<u2', 'B': 'u1', 'I': '<u4'}
+
+TABLE_FILE_NAME = "packets.npy"
+
+
+def _dtype():
+    return np.dtype([(name, _NUMPY_TYPES[code]) for name, code in PacketColumns.FIELDS])
+
+
+class PacketTable:
+    """Structured-array view of every packet in a capture."""
+
+    def __init__(self, rows, addresses: List[str], flow_keys: List[list]):
+        self.rows = rows
+        self.addresses = addresses
+        self.flow_keys = flow_keys
+        self._address_ids = {ip: i for i, ip in enumerate(addresses)}
+
+    # --- builders / loaders ------------------------------------------------ #
+
+    @classmethod
+    def from_columns(cls, columns: PacketColumns, addresses: List[str],
+                     flow_keys: List[list]) -> "PacketTable":
+        rows = np.empty(len(columns.ts), dtype=_dtype())
+        for name, _ in PacketColumns.FIELDS:
+            rows[name] = np.frombuffer(getattr(columns, name), dtype=getattr(columns, name).typecode)
+        return cls(rows, addresses, flow_keys)
+
+    @classmethod
+    def load(cls, cache_dir: Path, addresses: List[str], flow_keys: List[list]) -> Optional["PacketTable"]:
+        try:
+            rows = np.load(cache_dir / TABLE_FILE_NAME, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.debug(f"No packet table in {cache_dir}: {e}")
+            return None
+        if rows.dtype != _dtype():
+            return None
+        return cls(rows, addresses, flow_keys)
+
+    def save(self, cache_dir: Path) -> None:
+        path = cache_dir / TABLE_FILE_NAME
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, "wb") as f:
+            np.save(f, np.asarray(self.rows))
+        temp_path.replace(path)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # --- filtering --------------------------------------------------------- #
+
+    def _address_mask(self, column: str, ip: str):
+        """Rows whose *column* address is *ip* (never matches an unknown ip)."""
+        return self.rows[column] == self._address_ids.get(ip, -2)
+
+    def _protocol_mask(self, protocol: str):
+        code = L4_CODES.get(protocol.upper())
+        if code is None:
+            return None  # Only TCP/UDP/ICMP restrict, as in the scapy path
+        return self.rows['l4'] == code
+
+    def filter_indices(
+        self,
+        src_ip: Optional[str] = None,
+        dst_ip: Optional[str] = None,
+        protocol: Optional[str] = None,
+        port: Optional[int] = None,
+        tcp_flags: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        ip_versions=(4, 6),
+        limit: Optional[int] = None,
+    ):
+        """
+        Indices of packets matching every given criterion, in capture order.
+
+        Address filters only constrain packets whose IP version is in
+        *ip_versions* (other packets pass), and *tcp_flags* only constrains
+        TCP packets — matching the behaviour of the per-packet filters.
+        """
+        rows = self.rows
+        mask = np.ones(len(rows), dtype=bool)
+        if src_ip or dst_ip:
+            has_ip = np.isin(rows['ipver'], ip_versions)
+            if src_ip:
+                mask &= ~has_ip | self._address_mask('src', src_ip)
+            if dst_ip:
+                mask &= ~has_ip | self._address_mask('dst', dst_ip)
+        if protocol:
+            proto_mask = self._protocol_mask(protocol)
+            if proto_mask is not None:
+                mask &= proto_mask
+        if tcp_flags:
+            # Flags are 9 bits, so precompute which values contain the
+            # requested letters as scapy renders them.
+            matching = [v for v in range(1 << 9) if tcp_flags in tcp_flags_str(v)]
+            mask &= (rows['l4'] != L4_CODES['TCP']) | np.isin(rows['flags'], matching)
+        if port:
+            has_ports = np.isin(rows['l4'], (L4_CODES['TCP'], L4_CODES['UDP']))
+            mask &= has_ports & ((rows['sport'] == port) | (rows['dport'] == port))
+        if min_size:
+            mask &= rows['length'] >= min_size
+        if max_size:
+            mask &= rows['length'] <= max_size
+        indices = np.flatnonzero(mask)
+        if limit:
+            indices = indices[:limit]
+        return indices
+
+    # --- aggregations ------------------------------------------------------ #
+
+    def top_talkers(self, limit: int = 10) -> List[Dict[str, Any]]:
+        rows = self.rows
+        ip_rows = rows[rows['ipver'] > 0]
+        n = len(self.addresses)
+        length = ip_rows['length'].astype(np.int64)
+        sent = np.bincount(ip_rows['src'], minlength=n)
+        received = np.bincount(ip_rows['dst'], minlength=n)
+        bytes_sent = np.bincount(ip_rows['src'], weights=length, minlength=n)
+        bytes_received = np.bincount(ip_rows['dst'], weights=length, minlength=n)
+        total = sent + received
+        # Stable, so ties keep first-appearance order
+        ranked = np.argsort(-total, kind='stable')[:limit]
+        return [
+            {
+                "ip": self.addresses[i],
+                "packets_sent": int(sent[i]),
+                "packets_received": int(received[i]),
+                "bytes_sent": int(bytes_sent[i]),
+                "bytes_received": int(bytes_received[i]),
+                "total_packets": int(total[i])
+            }
+            for i in ranked
+        ]
+
+    def flow_statistics(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self.rows
+        flow_rows = np.flatnonzero(rows['flow'] >= 0)
+        if not len(flow_rows):
+            return []
+        flow_col = rows['flow'][flow_rows]
+        # Group packets by flow, keeping capture order within each flow
+        order = flow_rows[np.argsort(flow_col, kind='stable')]
+        flows = rows['flow'][order]
+        ts = rows['ts'][order]
+        length = rows['length'][order].astype(np.int64)
+        src = rows['src'][order]
+
+        n_flows = len(self.flow_keys)
+        starts = np.searchsorted(flows, np.arange(n_flows), side='left')
+        ends = np.searchsorted(flows, np.arange(n_flows), side='right')
+        counts = ends - starts
+
+        # Inter-arrival gaps; drop the gap that crosses a flow boundary
+        gaps = np.diff(ts)
+        same_flow = flows[1:] == flows[:-1]
+        gap_sum = np.zeros(n_flows)
+        gap_min = np.full(n_flows, np.inf)
+        gap_max = np.full(n_flows, -np.inf)
+        gap_flows = flows[1:][same_flow]
+        gap_values = gaps[same_flow]
+        np.add.at(gap_sum, gap_flows, gap_values)
+        np.minimum.at(gap_min, gap_flows, gap_values)
+        np.maximum.at(gap_max, gap_flows, gap_values)
+
+        endpoint_a = np.array([self._address_ids[k[0]] for k in self.flow_keys], dtype=np.int64)
+        from_a = src == endpoint_a[flows]
+        bytes_a = np.bincount(flows, weights=np.where(from_a, length, 0), minlength=n_flows)
+        bytes_b = np.bincount(flows, weights=np.where(from_a, 0, length), minlength=n_flows)
+        packets_a = np.bincount(flows, weights=from_a, minlength=n_flows)
+
+        flow_list = []
+        for fid, (ip_a, port_a, ip_b, port_b, protocol) in enumerate(self.flow_keys):
+            count = int(counts[fid])
+            first_seen = float(ts[starts[fid]])
+            last_seen = float(ts[ends[fid] - 1])
+            duration = last_seen - first_seen
+            if ip_a == ip_b:
+                bytes_sent = {ip_a: int(bytes_a[fid] + bytes_b[fid])}
+                packets_sent = {ip_a: count}
+            else:
+                bytes_sent = {ip_a: int(bytes_a[fid]), ip_b: int(bytes_b[fid])}
+                packets_sent = {ip_a: int(packets_a[fid]), ip_b: count - int(packets_a[fid])}
+            flow = {
+                'endpoints': [
+                    {'ip': ip_a, 'port': port_a},
+                    {'ip': ip_b, 'port': port_b}
+                ],
+                'protocol': protocol,
+                'packet_count': count,
+                'bytes_sent': bytes_sent,
+                'packets_sent': packets_sent,
+                'first_seen': first_seen,
+                'last_seen': last_seen,
+                'duration_seconds': round(duration, 3),
+            }
+            if count > 1:
+                flow['avg_interval_ms'] = round(float(gap_sum[fid]) / (count - 1) * 1000, 2)
+                flow['max_interval_ms'] = round(float(gap_max[fid]) * 1000, 2)
+                flow['min_interval_ms'] = round(float(gap_min[fid]) * 1000, 2)
+            else:
+                flow['avg_interval_ms'] = 0
+                flow['max_interval_ms'] = 0
+                flow['min_interval_ms'] = 0
+            if duration > 0:
+                flow['throughput_bps'] = int(sum(bytes_sent.values()) * 8 / duration)
+            else:
+                flow['throughput_bps'] = 0
+            flow_list.append(flow)
+
+        flow_list.sort(key=lambda x: x['packet_count'], reverse=True)
+        if limit:
+            flow_list = flow_list[:limit]
+        return flow_list
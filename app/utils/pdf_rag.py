@@ -14,9 +14,16 @@ The index is:
   * project-scoped  (lives under ``{project_root}/.ziya/pdf_index/``)
   * content-addressed by (abspath, mtime, size) so stale indices are
     automatically invalidated
-  * built lazily on first access and persisted across restarts
+  * built lazily on first access and persisted across restarts; full
+    builds extract pages on a process pool and checkpoint them to
+    ``pages.partial.jsonl`` so an interrupted build resumes
   * self-contained — BM25 is implemented inline, no new heavy deps
 
+Search reads two small binary side files instead of the whole page dump:
+``bm25.bin`` holds term → (page, tf) postings that are memory-mapped and
+ranked with a top-k heap, and ``pages.idx`` maps each page to its byte
+offset in ``pages.jsonl`` so only the hit pages are read for snippets.
+
 Small PDFs bypass this entirely: callers check
 ``should_use_pdf_rag(path)`` first and fall back to the existing
 ``extract_pdf_text`` when the document fits comfortably in context.
@@ -24,12 +31,17 @@ Small PDFs bypass this entirely: callers check
 
 from __future__ import annotations
 
+import bisect
 import hashlib
+import heapq
 import json
 import math
+import mmap
 import os
 import re
+import struct
 import threading
+from array import array
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
@@ -57,11 +69,23 @@ CACHE_DIR_NAME = ".ziya/pdf_index"
 _BM25_K1 = 1.5
 _BM25_B = 0.75
 
+# Full builds extract pages in chunks of this many pages, fanned out across
+# up to _MAX_EXTRACT_WORKERS processes (ZIYA_PDF_EXTRACT_WORKERS overrides).
+_EXTRACT_CHUNK_PAGES = 50
+_MAX_EXTRACT_WORKERS = 8
+
+# Extracted pages are appended here during a full build and renamed to
+# pages.jsonl once every page is in.
+_CHECKPOINT_FILE_NAME = "pages.partial.jsonl"
+
 # A per-process lock protecting index builds so concurrent callers don't
 # duplicate work on the same PDF.
 _BUILD_LOCKS: Dict[str, threading.Lock] = {}
 _BUILD_LOCKS_MUTEX = threading.Lock()
 
+# Background light-to-full promotions, by cache key (guarded by the mutex).
+_BACKGROUND_BUILDS: Dict[str, threading.Thread] = {}
+
 
 def _get_token_threshold() -> int:
     raw = ziya_env("ZIYA_PDF_RAG_TOKEN_THRESHOLD")
@@ -319,11 +343,129 @@ def _extract_page_ranges(path: str, ranges: List[Tuple[int, int]]) -> List[Dict[
         return []
 
 
-def _extract_pages_text(path: str, page_count_hint: int = 0) -> List[Dict[str, Any]]:
+def _get_extract_workers() -> int:
+    workers = ziya_env("ZIYA_PDF_EXTRACT_WORKERS")
+    if workers:
+        return max(1, workers)
+    return max(1, min(os.cpu_count() or 1, _MAX_EXTRACT_WORKERS))
+
+
+def _read_checkpoint(checkpoint: Path) -> List[Dict[str, Any]]:
+    """
+    Load the pages already extracted into *checkpoint*.
+
+    The checkpoint is written in page order, so it is valid up to the first
+    line that fails to parse — a crash mid-write leaves at most one torn
+    record, which is cut off so appends continue from a clean line.
+    """
+    pages: List[Dict[str, Any]] = []
+    if not checkpoint.is_file():
+        return pages
+    valid_bytes = 0
+    with checkpoint.open("rb") as fh:
+        for line in fh:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                rec = json.loads(line)
+            except Exception:
+                break
+            if rec.get("page") != len(pages) + 1:
+                break
+            pages.append(rec)
+            valid_bytes += len(line)
+    if valid_bytes != checkpoint.stat().st_size:
+        with checkpoint.open("r+b") as fh:
+            fh.truncate(valid_bytes)
+    return pages
+
+
+def _extract_chunks(path: str, chunks: List[Tuple[int, int]]):
+    """
+    Yield ``(chunk, pages)`` in chunk order, extracting on a process pool
+    when there is more than one chunk and more than one worker.
+    """
+    workers = min(_get_extract_workers(), len(chunks))
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, _extract_page_ranges(path, [chunk])
+        return
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    # Indexing runs on a background thread; a forked child could inherit
+    # a lock some other thread holds, so workers never come from fork.
+    mp_context = multiprocessing.get_context(
+        "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=mp_context)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Process pool unavailable for PDF extraction, running inline: {e}")
+        for chunk in chunks:
+            yield chunk, _extract_page_ranges(path, [chunk])
+        return
+    with executor:
+        futures = [executor.submit(_extract_page_ranges, path, [chunk]) for chunk in chunks]
+        try:
+            for chunk, future in zip(chunks, futures):
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    # A dead worker poisons the pool; finish this chunk here.
+                    logger.warning(f"PDF extraction worker failed on pages {chunk[0]}-{chunk[1]}: {e}")
+                    pages = _extract_page_ranges(path, [chunk])
+                yield chunk, pages
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _extract_pages_text(path: str, page_count_hint: int = 0,
+                        checkpoint: Optional[Path] = None) -> List[Dict[str, Any]]:
     """
     Extract text per page.  Returns a list of
     ``{page, text, token_count, has_images}`` dicts (1-based page numbers).
+
+    With a page count and a *checkpoint* file, pages are extracted in
+    fixed-size chunks across a process pool and appended to the checkpoint
+    in page order as each chunk completes; a build that is interrupted
+    resumes after the last checkpointed page.
     """
+    if checkpoint is not None and page_count_hint > 0:
+        return _extract_pages_resumable(path, page_count_hint, checkpoint)
+    return _extract_pages_sequential(path)
+
+
+def _extract_pages_resumable(path: str, page_count: int, checkpoint: Path) -> List[Dict[str, Any]]:
+    pages = _read_checkpoint(checkpoint)
+    if pages:
+        logger.info(f"Resuming PDF extraction for {path} at page {len(pages) + 1}/{page_count}")
+    start = len(pages) + 1
+    chunks = [(first, min(first + _EXTRACT_CHUNK_PAGES - 1, page_count))
+              for first in range(start, page_count + 1, _EXTRACT_CHUNK_PAGES)]
+    if not chunks:
+        return pages
+
+    with checkpoint.open("a", encoding="utf-8") as fh:
+        for n, ((first, last), chunk_pages) in enumerate(_extract_chunks(path, chunks), 1):
+            by_page = {p["page"]: p for p in chunk_pages}
+            if len(by_page) < last - first + 1:
+                # Keep page numbering dense: BM25 and read_pages index by it.
+                logger.warning(f"Could not extract pages {first}-{last} of {path} in full; "
+                               f"storing {last - first + 1 - len(by_page)} as empty")
+            for page_no in range(first, last + 1):
+                rec = by_page.get(page_no) or {
+                    "page": page_no, "text": "", "token_count": 0, "has_images": False,
+                }
+                fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                pages.append(rec)
+            fh.flush()
+            if n % 10 == 0:
+                logger.info(f"Extracted {last}/{page_count} pages of {path}")
+    return pages
+
+
+def _extract_pages_sequential(path: str) -> List[Dict[str, Any]]:
     pages: List[Dict[str, Any]] = []
 
     # pdfplumber gives richer per-page text and image metadata.
@@ -425,57 +567,255 @@ def _extract_image_captions(path: str, pages_text: List[str]) -> List[Dict[str,
 # Inline BM25
 # --------------------------------------------------------------------------- #
 
-def _build_bm25(documents: List[List[str]]) -> Dict[str, Any]:
+# bm25.bin layout (little-endian):
+#   header       magic, n_docs u32, n_terms u32, avgdl f64, n_postings u64
+#   doc_lengths  u32[n_docs]            (padded to 8 bytes)
+#   starts       u64[n_terms + 1]       postings run of term t is
+#                                       [starts[t], starts[t + 1])
+#   doc_ids      u32[n_postings]        page index (0-based), ascending per term
+#   tfs          u32[n_postings]        term frequency on that page
+#   lexicon      utf-8 terms, sorted, newline-separated; term id = position
+_BM25_MAGIC = b"ZBM25\x00\x01\x00"
+_BM25_HEADER = struct.Struct("<8sIIdQ")
+_BM25_FILE_NAME = "bm25.bin"
+
+# Loaded indexes by path, revalidated by (mtime_ns, size); a query against
+# an unchanged bm25.bin reuses the decoded lexicon instead of rebuilding it.
+_BM25_CACHE_MAX = 8
+_bm25_cache: Dict[str, Tuple[int, int, "_Bm25Index"]] = {}
+_bm25_cache_lock = threading.Lock()
+
+
+class _Bm25Index:
     """
-    Build a compact BM25 index over already-tokenised documents.
+    Postings-based BM25 index.
 
-    Stored as a plain JSON-serialisable dict so it survives the round-trip
-    to disk without pickle.
+    Scoring a query touches only the postings of its terms rather than
+    every page, and the on-disk form is memory-mapped so loading costs one
+    pass over the lexicon regardless of document size.
     """
-    n_docs = len(documents)
-    doc_lengths = [len(doc) for doc in documents]
-    avgdl = sum(doc_lengths) / n_docs if n_docs else 0.0
-    df: Dict[str, int] = {}
-    tf: List[Dict[str, int]] = []
-    for doc in documents:
-        seen = set()
-        freq: Dict[str, int] = {}
-        for term in doc:
-            freq[term] = freq.get(term, 0) + 1
-            seen.add(term)
-        for term in seen:
-            df[term] = df.get(term, 0) + 1
-        tf.append(freq)
-    idf = {term: math.log(1 + (n_docs - f + 0.5) / (f + 0.5)) for term, f in df.items()}
-    return {
-        "n_docs": n_docs,
-        "avgdl": avgdl,
-        "doc_lengths": doc_lengths,
-        "idf": idf,
-        "tf": tf,
-    }
-
-
-def _bm25_score(index: Dict[str, Any], query_tokens: List[str]) -> List[float]:
-    tf = index["tf"]
-    idf = index["idf"]
-    doc_lengths = index["doc_lengths"]
-    avgdl = index["avgdl"] or 1.0
-    scores = [0.0] * index["n_docs"]
-    for term in query_tokens:
-        term_idf = idf.get(term)
-        if term_idf is None:
-            continue
-        for i, freq_map in enumerate(tf):
-            f = freq_map.get(term, 0)
-            if f == 0:
+
+    def __init__(self, n_docs: int, avgdl: float, doc_lengths, terms: List[str],
+                 starts, doc_ids, tfs, backing: Any = None):
+        self.n_docs = n_docs
+        self.avgdl = avgdl
+        self.doc_lengths = doc_lengths
+        self.starts = starts
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self._term_ids = {term: i for i, term in enumerate(terms)}
+        self._terms = terms
+        # Keeps the mmap alive for the memoryviews above
+        self._backing = backing
+
+    @classmethod
+    def build(cls, documents: List[List[str]]) -> "_Bm25Index":
+        n_docs = len(documents)
+        doc_lengths = array("I", (len(doc) for doc in documents))
+        avgdl = sum(doc_lengths) / n_docs if n_docs else 0.0
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, doc in enumerate(documents):
+            freq: Dict[str, int] = {}
+            for term in doc:
+                freq[term] = freq.get(term, 0) + 1
+            for term, f in freq.items():
+                postings.setdefault(term, []).append((doc_id, f))
+        terms = sorted(postings)
+        starts = array("Q", [0])
+        doc_ids = array("I")
+        tfs = array("I")
+        for term in terms:
+            for doc_id, f in postings[term]:
+                doc_ids.append(doc_id)
+                tfs.append(f)
+            starts.append(len(doc_ids))
+        return cls(n_docs, avgdl, doc_lengths, terms, starts, doc_ids, tfs)
+
+    def write(self, path: Path) -> None:
+        """Persist atomically in the binary layout described above."""
+        parts = [
+            _BM25_HEADER.pack(_BM25_MAGIC, self.n_docs, len(self._terms), self.avgdl, len(self.doc_ids)),
+            array("I", self.doc_lengths).tobytes(),
+            b"\x00" * (4 * (self.n_docs % 2)),
+            array("Q", self.starts).tobytes(),
+            array("I", self.doc_ids).tobytes(),
+            array("I", self.tfs).tobytes(),
+            "\n".join(self._terms).encode("utf-8"),
+        ]
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp.open("wb") as fh:
+            for part in parts:
+                fh.write(part)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["_Bm25Index"]:
+        try:
+            with path.open("rb") as fh:
+                mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, n_docs, n_terms, avgdl, n_postings = _BM25_HEADER.unpack_from(mm, 0)
+            if magic != _BM25_MAGIC:
+                mm.close()
+                return None
+            view = memoryview(mm)
+            pos = _BM25_HEADER.size
+            doc_lengths = view[pos:pos + 4 * n_docs].cast("I")
+            pos += 4 * n_docs + 4 * (n_docs % 2)
+            starts = view[pos:pos + 8 * (n_terms + 1)].cast("Q")
+            pos += 8 * (n_terms + 1)
+            doc_ids = view[pos:pos + 4 * n_postings].cast("I")
+            pos += 4 * n_postings
+            tfs = view[pos:pos + 4 * n_postings].cast("I")
+            pos += 4 * n_postings
+            lexicon = bytes(view[pos:]).decode("utf-8")
+            terms = lexicon.split("\n") if n_terms else []
+            if len(terms) != n_terms:
+                raise ValueError("lexicon size mismatch")
+        except (struct.error, ValueError, TypeError) as e:
+            # Views may still reference the map; it is released with them.
+            logger.warning(f"Ignoring corrupt BM25 index {path}: {e}")
+            return None
+        return cls(n_docs, avgdl, doc_lengths, terms, starts, doc_ids, tfs, backing=mm)
+
+    def scores(self, query_tokens: List[str]) -> Dict[int, float]:
+        """Sparse BM25 scores: page index -> score, for pages matching any term."""
+        scores: Dict[int, float] = {}
+        avgdl = self.avgdl or 1.0
+        n_docs = self.n_docs
+        doc_lengths = self.doc_lengths
+        for term in query_tokens:
+            term_id = self._term_ids.get(term)
+            if term_id is None:
                 continue
-            dl = doc_lengths[i] or 1
-            denom = f + _BM25_K1 * (1 - _BM25_B + _BM25_B * dl / avgdl)
-            scores[i] += term_idf * (f * (_BM25_K1 + 1)) / denom
+            lo, hi = self.starts[term_id], self.starts[term_id + 1]
+            df = hi - lo
+            term_idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_id, f in zip(self.doc_ids[lo:hi], self.tfs[lo:hi]):
+                dl = doc_lengths[doc_id] or 1
+                denom = f + _BM25_K1 * (1 - _BM25_B + _BM25_B * dl / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + term_idf * (f * (_BM25_K1 + 1)) / denom
+        return scores
+
+    def top_k(self, query_tokens: List[str], k: int) -> List[Tuple[int, float]]:
+        """Best *k* (page index, score) pairs, highest first; ties by page order."""
+        scores = self.scores(query_tokens)
+        return heapq.nlargest(k, ((i, s) for i, s in scores.items() if s > 0),
+                              key=lambda x: (x[1], -x[0]))
+
+
+def _load_bm25_cached(path: Path) -> Optional[_Bm25Index]:
+    """``_Bm25Index.load`` through the per-path cache."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    key = str(path)
+    with _bm25_cache_lock:
+        cached = _bm25_cache.get(key)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            # Re-insert so eviction drops the least recently used index
+            _bm25_cache[key] = _bm25_cache.pop(key)
+            return cached[2]
+    index = _Bm25Index.load(path)
+    if index is not None:
+        with _bm25_cache_lock:
+            _bm25_cache.pop(key, None)
+            _bm25_cache[key] = (st.st_mtime_ns, st.st_size, index)
+            while len(_bm25_cache) > _BM25_CACHE_MAX:
+                del _bm25_cache[next(iter(_bm25_cache))]
+    return index
+
+
+def _build_bm25(documents: List[List[str]]) -> _Bm25Index:
+    """Build a BM25 postings index over already-tokenised documents."""
+    return _Bm25Index.build(documents)
+
+
+def _bm25_score(index: _Bm25Index, query_tokens: List[str]) -> List[float]:
+    """Dense per-document BM25 scores (0.0 for documents matching no term)."""
+    scores = [0.0] * index.n_docs
+    for doc_id, score in index.scores(query_tokens).items():
+        scores[doc_id] = score
     return scores
 
 
+# --------------------------------------------------------------------------- #
+# Page offset table
+# --------------------------------------------------------------------------- #
+
+# pages.idx: header (magic, pages.jsonl size, pages.jsonl mtime_ns, count)
+# followed by u64 (page, byte offset) pairs in file order.  The size/mtime
+# pair detects a pages.jsonl rewritten after the table was built.
+_PAGES_IDX_MAGIC = b"ZPGIDX\x00\x01"
+_PAGES_IDX_HEADER = struct.Struct("<8sQQQ")
+_PAGES_IDX_FILE_NAME = "pages.idx"
+
+
+def _load_page_offsets(cache_dir: Path) -> Dict[int, int]:
+    """
+    Return {page number: byte offset of its record in pages.jsonl}.
+
+    Loaded from pages.idx when it matches the current pages.jsonl, else
+    rebuilt with one scan of the file and persisted.
+    """
+    pages_file = cache_dir / "pages.jsonl"
+    idx_file = cache_dir / _PAGES_IDX_FILE_NAME
+    try:
+        st = pages_file.stat()
+    except OSError:
+        return {}
+    try:
+        raw = idx_file.read_bytes()
+        magic, size, mtime_ns, count = _PAGES_IDX_HEADER.unpack_from(raw, 0)
+        if magic == _PAGES_IDX_MAGIC and size == st.st_size and mtime_ns == st.st_mtime_ns:
+            pairs = array("Q")
+            pairs.frombytes(raw[_PAGES_IDX_HEADER.size:_PAGES_IDX_HEADER.size + 16 * count])
+            return dict(zip(pairs[0::2], pairs[1::2]))
+    except (OSError, struct.error, ValueError):
+        pass  # Missing or stale — rebuild below
+
+    offsets: Dict[int, int] = {}
+    with pages_file.open("rb") as fh:
+        pos = 0
+        for line in fh:
+            try:
+                page = int(json.loads(line).get("page", 0))
+            except Exception:
+                page = 0
+            if page > 0 and page not in offsets:
+                offsets[page] = pos
+            pos += len(line)
+    pairs = array("Q")
+    for page, pos in offsets.items():
+        pairs.extend((page, pos))
+    try:
+        tmp = idx_file.with_name(f"{idx_file.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(_PAGES_IDX_HEADER.pack(_PAGES_IDX_MAGIC, st.st_size, st.st_mtime_ns,
+                                               len(offsets)) + pairs.tobytes())
+        os.replace(tmp, idx_file)
+    except OSError as e:
+        logger.debug(f"Could not persist page offset table in {cache_dir}: {e}")
+    return offsets
+
+
+def _count_lines(path: Path) -> int:
+    with path.open("rb") as fh:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: fh.read(1 << 20), b""))
+
+
+def _write_text_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
 # --------------------------------------------------------------------------- #
 # PdfIndex
 # --------------------------------------------------------------------------- #
@@ -515,53 +855,72 @@ class PdfIndex:
         with lock:
             # Another thread may have finished while we were waiting.
             existing = cls.load(path)
-            if existing is not None:
+            if existing is not None and not existing.is_light:
                 return existing
+            return cls._build_full(path, cache_dir)
 
-            cache_dir.mkdir(parents=True, exist_ok=True)
+    @classmethod
+    def _build_full(cls, path: str, cache_dir: Path) -> Optional["PdfIndex"]:
+        """Extract every page and write the full index.  Caller holds the build lock.
+
+        Pages are checkpointed into pages.partial.jsonl as they are
+        extracted, so an interrupted build resumes where it stopped.  The
+        finished files replace any light index in place — pages.jsonl,
+        images.jsonl, then meta.json — so readers keep being served the
+        light index until the full one is complete.
+        """
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        checkpoint = cache_dir / _CHECKPOINT_FILE_NAME
 
-            outline, doc_meta, page_count_hint = _extract_native_outline(path)
-            pages = _extract_pages_text(path, page_count_hint=page_count_hint)
-            if not pages:
-                logger.error(f"Could not extract any pages from {path}")
-                return None
+        outline, doc_meta, page_count_hint = _extract_native_outline(path)
+        pages = _extract_pages_text(path, page_count_hint=page_count_hint, checkpoint=checkpoint)
+        if not pages:
+            logger.error(f"Could not extract any pages from {path}")
+            return None
 
-            pages_text = [p["text"] for p in pages]
-            figures, tables = _extract_heuristic_figures_tables(pages_text)
-            image_captions = _extract_image_captions(path, pages_text)
+        pages_text = [p["text"] for p in pages]
+        figures, tables = _extract_heuristic_figures_tables(pages_text)
+        image_captions = _extract_image_captions(path, pages_text)
 
-            total_tokens = sum(p["token_count"] for p in pages)
+        total_tokens = sum(p["token_count"] for p in pages)
 
-            # Persist pages.jsonl
-            with (cache_dir / "pages.jsonl").open("w", encoding="utf-8") as fh:
+        # Persist pages.jsonl — the checkpoint already holds exactly these
+        # records in order when extraction went through it.
+        pages_path = cache_dir / "pages.jsonl"
+        if not (checkpoint.is_file() and _count_lines(checkpoint) == len(pages)):
+            with checkpoint.open("w", encoding="utf-8") as fh:
                 for p in pages:
                     fh.write(json.dumps(p, ensure_ascii=False) + "\n")
-
-            # Persist images.jsonl
-            with (cache_dir / "images.jsonl").open("w", encoding="utf-8") as fh:
-                for img in image_captions:
-                    fh.write(json.dumps(img, ensure_ascii=False) + "\n")
-
-            meta = {
-                "path": os.path.abspath(path),
-                "page_count": len(pages),
-                "total_tokens": total_tokens,
-                "outline": outline,
-                "metadata": doc_meta,
-                "figures": figures,
-                "tables": tables,
-                "has_native_outline": bool(outline),
-                "image_count": len(image_captions),
-                "version": 1,
-            }
-            (cache_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
-
-            logger.info(
-                f"Built PDF index for {path}: {meta['page_count']} pages, "
-                f"{total_tokens} tokens, outline={'yes' if outline else 'no'}, "
-                f"images={meta['image_count']}"
-            )
-            return cls(path=path, cache_dir=cache_dir, meta=meta)
+        os.replace(checkpoint, pages_path)
+
+        # Persist images.jsonl
+        _write_text_atomic(cache_dir / "images.jsonl", "".join(
+            json.dumps(img, ensure_ascii=False) + "\n" for img in image_captions))
+
+        # Search side files built from a light index are stale now.
+        (cache_dir / _PAGES_IDX_FILE_NAME).unlink(missing_ok=True)
+        (cache_dir / _BM25_FILE_NAME).unlink(missing_ok=True)
+
+        meta = {
+            "path": os.path.abspath(path),
+            "page_count": len(pages),
+            "total_tokens": total_tokens,
+            "outline": outline,
+            "metadata": doc_meta,
+            "figures": figures,
+            "tables": tables,
+            "has_native_outline": bool(outline),
+            "image_count": len(image_captions),
+            "version": 1,
+        }
+        _write_text_atomic(cache_dir / "meta.json", json.dumps(meta, ensure_ascii=False, indent=2))
+
+        logger.info(
+            f"Built PDF index for {path}: {meta['page_count']} pages, "
+            f"{total_tokens} tokens, outline={'yes' if outline else 'no'}, "
+            f"images={meta['image_count']}"
+        )
+        return cls(path=path, cache_dir=cache_dir, meta=meta)
 
     @classmethod
     def build_light(cls, path: str) -> Optional["PdfIndex"]:
@@ -570,8 +929,9 @@ class PdfIndex:
         Cheap even for 5000-page PDFs — skips whole-document text extraction,
         figure/table scanning, and image-caption extraction.  Sufficient for
         the in-context stub and for pdf_outline.  pdf_read_pages extracts
-        additional pages on demand.  pdf_search promotes this to a full
-        index via ensure_full().
+        additional pages on demand.  The full index is then built on a
+        background thread (unless ZIYA_PDF_RAG_BACKGROUND_BUILD is off);
+        pdf_search waits for it via ensure_full().
         """
         if not os.path.isfile(path):
             logger.error(f"PDF not found for light indexing: {path}")
@@ -588,7 +948,7 @@ class PdfIndex:
             outline, doc_meta, page_count_hint = _extract_native_outline(path)
             if page_count_hint <= 0:
                 # Fall back to full extraction if we can't even get a page count.
-                return cls.build(path)
+                return cls._build_full(path, cache_dir)
 
             head = (1, min(STUB_HEAD_PAGES, page_count_hint))
             tail_start = max(page_count_hint - STUB_TAIL_PAGES + 1, STUB_HEAD_PAGES + 1)
@@ -620,8 +980,11 @@ class PdfIndex:
             logger.info(
                 f"Built LIGHT PDF index for {path}: {page_count_hint} pages "
                 f"({len(pages)} extracted), outline={'yes' if outline else 'no'} "
-                f"— full index deferred until pdf_search is called")
-            return cls(path=path, cache_dir=cache_dir, meta=meta)
+                f"— full index deferred")
+            index = cls(path=path, cache_dir=cache_dir, meta=meta)
+        if ziya_env("ZIYA_PDF_RAG_BACKGROUND_BUILD"):
+            index.start_background_build()
+        return index
 
     @classmethod
     def get_or_build(cls, path: str, full: bool = True) -> Optional["PdfIndex"]:
@@ -632,10 +995,13 @@ class PdfIndex:
 
         full=False: build a light index (outline + head/tail pages only).
         Dramatically faster for very large PDFs.  Suitable for stubs and
-        pdf_outline.  Promoted to full on pdf_search.
+        pdf_outline.  Promoted to full in the background, or on pdf_search.
         """
         existing = cls.load(path)
         if existing is not None:
+            # Picks up a full build that was interrupted in an earlier run.
+            if not full and existing.is_light and ziya_env("ZIYA_PDF_RAG_BACKGROUND_BUILD"):
+                existing.start_background_build()
             return existing
         return cls.build(path) if full else cls.build_light(path)
 
@@ -657,7 +1023,7 @@ class PdfIndex:
         """Promote a light index to a full one if it isn't already.
 
         Runs the expensive full-document extraction, figure/table detection,
-        and image-caption scanning, then rewrites pages.jsonl, images.jsonl,
+        and image-caption scanning, then replaces pages.jsonl, images.jsonl,
         and meta.json.  Called by pdf_search which genuinely needs every
         page tokenised.
         """
@@ -673,18 +1039,36 @@ class PdfIndex:
                 self.meta = reloaded.meta
                 return self
             logger.info(f"Promoting light PDF index to full for {self.path}")
-            # Clear old (light) pages file so full build overwrites cleanly.
-            try:
-                (self.cache_dir / "pages.jsonl").unlink(missing_ok=True)
-                (self.cache_dir / "images.jsonl").unlink(missing_ok=True)
-                (self.cache_dir / "meta.json").unlink(missing_ok=True)
-            except OSError as e:
-                logger.warning(f"Could not clear light index files: {e}")
-            rebuilt = PdfIndex.build(self.path)
+            rebuilt = PdfIndex._build_full(self.path, self.cache_dir)
             if rebuilt is not None:
                 self.meta = rebuilt.meta
             return self
 
+    def start_background_build(self) -> None:
+        """Promote a light index to full on a daemon thread.
+
+        The light index keeps serving stubs, outlines and page reads while
+        the build runs; pdf_search, which needs the full index, waits on the
+        build lock rather than starting a second extraction.
+        """
+        if not self.is_light:
+            return
+        key, _ = _cache_key_for(self.path)
+        with _BUILD_LOCKS_MUTEX:
+            running = _BACKGROUND_BUILDS.get(key)
+            if running is not None and running.is_alive():
+                return
+
+            def _run():
+                try:
+                    PdfIndex(path=self.path, cache_dir=self.cache_dir, meta=dict(self.meta)).ensure_full()
+                except Exception as e:
+                    logger.warning(f"Background PDF index build failed for {self.path}: {e}")
+
+            thread = threading.Thread(target=_run, name=f"pdf-index-{key[:8]}", daemon=True)
+            _BACKGROUND_BUILDS[key] = thread
+        thread.start()
+
     def read_pages(self, start_page: int, end_page: int) -> List[Dict[str, Any]]:
         """Return page records for [start_page, end_page] inclusive (1-based)."""
         if start_page < 1:
@@ -695,7 +1079,16 @@ class PdfIndex:
         pages_file = self.cache_dir / "pages.jsonl"
         if not pages_file.is_file():
             return out
-        with pages_file.open("r", encoding="utf-8") as fh:
+        # Seek to the first stored page in range instead of scanning from
+        # the top of the file.
+        offsets = _load_page_offsets(self.cache_dir)
+        stored = sorted(offsets)
+        first = bisect.bisect_left(stored, start_page)
+        with pages_file.open("rb") as fh:
+            if first < len(stored):
+                fh.seek(offsets[stored[first]])
+            else:
+                fh.seek(0, os.SEEK_END)
             for line in fh:
                 try:
                     rec = json.loads(line)
@@ -732,17 +1125,35 @@ class PdfIndex:
                 tokenised.append(_tokenise_for_bm25(rec.get("text", "")))
         return tokenised
 
-    def _load_or_build_bm25(self) -> Dict[str, Any]:
-        bm25_path = self.cache_dir / "bm25.json"
+    def _read_page_records(self, page_numbers) -> Dict[int, Dict[str, Any]]:
+        """Read only the given pages' records, via the page offset table."""
+        pages_file = self.cache_dir / "pages.jsonl"
+        offsets = _load_page_offsets(self.cache_dir)
+        records: Dict[int, Dict[str, Any]] = {}
+        with pages_file.open("rb") as fh:
+            for page_no in sorted(page_numbers):
+                pos = offsets.get(page_no)
+                if pos is None:
+                    continue
+                fh.seek(pos)
+                try:
+                    records[page_no] = json.loads(fh.readline())
+                except Exception:
+                    continue
+        return records
+
+    def _load_or_build_bm25(self) -> _Bm25Index:
+        bm25_path = self.cache_dir / _BM25_FILE_NAME
         if bm25_path.is_file():
-            try:
-                return json.loads(bm25_path.read_text(encoding="utf-8"))
-            except Exception:
-                pass
+            index = _load_bm25_cached(bm25_path)
+            if index is not None:
+                return index
         documents = self._load_pages_tokenised()
         index = _build_bm25(documents)
         try:
-            bm25_path.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+            index.write(bm25_path)
+            # Superseded by bm25.bin
+            (self.cache_dir / "bm25.json").unlink(missing_ok=True)
         except Exception as e:
             logger.warning(f"Failed to persist BM25 index for {self.path}: {e}")
         return index
@@ -755,32 +1166,24 @@ class PdfIndex:
         # BM25 needs every page tokenised — promote from light if necessary.
         self.ensure_full()
         index = self._load_or_build_bm25()
-        if index.get("n_docs", 0) == 0:
+        if index.n_docs == 0:
             return []
+        ranked: Optional[List[Tuple[int, float]]] = None
         if mode == "embedding":
             emb_scores = self._embedding_scores(query)
-            scores = emb_scores if emb_scores is not None else _bm25_score(index, query_tokens)
-        else:
-            scores = _bm25_score(index, query_tokens)
-        ranked = sorted(
-            [(i, s) for i, s in enumerate(scores) if s > 0],
-            key=lambda x: x[1],
-            reverse=True,
-        )[:top_k]
+            if emb_scores is not None:
+                ranked = heapq.nlargest(
+                    top_k, ((i, s) for i, s in enumerate(emb_scores) if s > 0),
+                    key=lambda x: (x[1], -x[0]),
+                )
+        if ranked is None:
+            ranked = index.top_k(query_tokens, top_k)
         if not ranked:
             return []
         results: List[Dict[str, Any]] = []
         # Also scan image captions for title matches.
         caption_hits = self._search_image_captions(query)
-        page_to_record: Dict[int, Dict[str, Any]] = {}
-        pages_file = self.cache_dir / "pages.jsonl"
-        with pages_file.open("r", encoding="utf-8") as fh:
-            for line in fh:
-                try:
-                    rec = json.loads(line)
-                    page_to_record[int(rec.get("page", 0))] = rec
-                except Exception:
-                    continue
+        page_to_record = self._read_page_records(doc_idx + 1 for doc_idx, _ in ranked)
         for doc_idx, score in ranked:
             page_no = doc_idx + 1
             rec = page_to_record.get(page_no, {})
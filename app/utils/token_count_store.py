@@ -0,0 +1,289 @@
+"""
+Persistent exact token counts keyed by content hash.
+
+Counting tokens is the expensive part of an accurate token count, and the
+same content is counted again after every restart and on every context-size
+check.  This store remembers ``sha256(content) -> token count`` per
+tokenizer family, so unchanged content is only ever tokenized once:
+
+    ~/.ziya/token_counts/<family>.bin
+        header  magic (8 bytes)
+        records sha256 digest (32 bytes), token count (u32), append-only
+
+The last record for a digest wins.  A torn tail from an interrupted append
+is ignored on load and truncated by the next compaction.
+
+Bulk counting (``count_texts``) tokenizes cache misses on a small process
+pool whose workers run at lowered priority, so a whole-project pass takes
+a bounded share of the CPU and never blocks request handling.
+"""
+
+import atexit
+import hashlib
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.utils.logging_utils import logger
+
+ENCODING_NAME = "cl100k_base"
+
+_MAGIC = b"ZTOKCNT1"
+_RECORD = struct.Struct("<32sI")
+
+# Pending records are appended once there are this many.
+_FLUSH_RECORDS = 512
+
+# Texts per pool task; small files dominate most trees.
+_BATCH_TEXTS = 64
+
+_MAX_TOKEN_WORKERS = 4
+
+
+def content_digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).digest()
+
+
+def tokenizer_family(encoding_name: str = ENCODING_NAME) -> str:
+    """Name of the tokenizer actually in use; counts from different ones never mix."""
+    from app.utils.tiktoken_compat import TIKTOKEN_AVAILABLE, tiktoken
+    if TIKTOKEN_AVAILABLE:
+        return f"tiktoken-{encoding_name}"
+    return type(tiktoken.get_encoding(encoding_name)).__name__.strip("_").lower()
+
+
+def _store_dir() -> Path:
+    home = Path(os.environ.get("ZIYA_HOME", Path.home() / ".ziya"))
+    return home / "token_counts"
+
+
+class TokenCountStore:
+    """Content-hash → token-count map for one tokenizer family."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._counts: Dict[bytes, int] = {}
+        self._pending: List[Tuple[bytes, int]] = []
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.warning(f"Token count store unreadable ({e}); starting empty")
+            return
+        if not data.startswith(_MAGIC):
+            logger.warning(f"Token count store {self.path} has an unknown format; starting empty")
+            return
+        body = memoryview(data)[len(_MAGIC):]
+        usable = len(body) - len(body) % _RECORD.size
+        records = 0
+        for digest, count in _RECORD.iter_unpack(body[:usable]):
+            self._counts[digest] = count
+            records += 1
+        # Duplicates come from concurrent servers counting the same content.
+        if usable != len(body) or records > 2 * len(self._counts) + _FLUSH_RECORDS:
+            self._compact()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def get(self, digest: bytes) -> Optional[int]:
+        return self._counts.get(digest)
+
+    def put(self, digest: bytes, count: int) -> None:
+        with self._lock:
+            if self._counts.get(digest) == count:
+                return
+            self._counts[digest] = count
+            self._pending.append((digest, count))
+            if len(self._pending) < _FLUSH_RECORDS:
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                new_file = not self.path.exists()
+                with open(self.path, "ab") as f:
+                    if new_file:
+                        f.write(_MAGIC)
+                    f.write(b"".join(_RECORD.pack(d, min(c, 0xFFFFFFFF)) for d, c in pending))
+            except OSError as e:
+                logger.warning(f"Failed to save token counts: {e}")
+
+    def _compact(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_MAGIC)
+                f.write(b"".join(_RECORD.pack(d, min(c, 0xFFFFFFFF))
+                                 for d, c in self._counts.items()))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.debug(f"Token count store compaction failed: {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+
+_stores: Dict[str, TokenCountStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_token_count_store(family: Optional[str] = None) -> TokenCountStore:
+    family = family or tokenizer_family()
+    with _stores_lock:
+        store = _stores.get(family)
+        if store is None:
+            store = _stores[family] = TokenCountStore(_store_dir() / f"{family}.bin")
+        return store
+
+
+@atexit.register
+def _flush_stores() -> None:
+    for store in list(_stores.values()):
+        store.flush()
+
+
+def _encode_count(encoding, text: str) -> int:
+    return len(encoding.encode(text))
+
+
+def count_tokens(text: str) -> int:
+    """Exact token count for `text`, tokenizing only content not seen before."""
+    store = get_token_count_store()
+    digest = content_digest(text)
+    count = store.get(digest)
+    if count is None:
+        from app.utils.tiktoken_compat import tiktoken
+        count = _encode_count(tiktoken.get_encoding(ENCODING_NAME), text)
+        store.put(digest, count)
+    return count
+
+
+# Per-process encoding, created by _init_token_worker in each pool process.
+_worker_encoding = None
+
+
+def _init_token_worker() -> None:
+    global _worker_encoding
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+    from app.utils.tiktoken_compat import tiktoken
+    _worker_encoding = tiktoken.get_encoding(ENCODING_NAME)
+
+
+def _count_batch_in_worker(texts: List[str]) -> List[int]:
+    return [_encode_count(_worker_encoding, t) for t in texts]
+
+
+def _get_token_workers() -> int:
+    from app.config.env_registry import ziya_env
+    workers = ziya_env("ZIYA_TOKEN_WORKERS") or 0
+    if workers > 0:
+        return workers
+    # A quarter of the machine: this runs alongside the server, not instead of it.
+    return max(1, min((os.cpu_count() or 1) // 4, _MAX_TOKEN_WORKERS))
+
+
+def count_texts(items: Iterable[Tuple[object, str]],
+                on_count: Callable[[object, int], None],
+                should_stop: Callable[[], bool] = lambda: False) -> int:
+    """Count tokens for many ``(key, text)`` pairs, calling ``on_count(key, n)``.
+
+    Store hits are reported immediately.  Misses are tokenized in batches on
+    a low-priority process pool (ZIYA_TOKEN_WORKERS, default a quarter of
+    the CPUs, max 4); with one worker, or if the pool can't run, they are
+    tokenized in this thread.  Returns the number of texts tokenized.
+    """
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    store = get_token_count_store()
+    workers = _get_token_workers()
+    executor = None
+    in_flight = {}
+    tokenized = 0
+
+    def finish(batch, counts):
+        nonlocal tokenized
+        for (key, digest, _), count in zip(batch, counts):
+            store.put(digest, count)
+            on_count(key, count)
+        tokenized += len(batch)
+
+    def run_local(batch):
+        from app.utils.tiktoken_compat import tiktoken
+        encoding = tiktoken.get_encoding(ENCODING_NAME)
+        finish(batch, [_encode_count(encoding, text) for _, _, text in batch])
+
+    def submit(batch, final=False):
+        nonlocal executor
+        # A lone short batch isn't worth starting worker processes for.
+        if executor is not None or (workers > 1 and not final):
+            try:
+                if executor is None:
+                    # Never fork from this background thread: a child forked
+                    # while another thread holds a lock can deadlock.
+                    mp_context = multiprocessing.get_context(
+                        "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+                    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_token_worker,
+                                                   mp_context=mp_context)
+                    logger.debug(f"Token counts: tokenizing on {workers} worker processes")
+                in_flight[executor.submit(_count_batch_in_worker, [t for _, _, t in batch])] = batch
+                return
+            except (OSError, RuntimeError, ValueError) as e:
+                logger.warning(f"Token count pool unavailable ({e}), counting in-process")
+        run_local(batch)
+
+    def drain(limit):
+        while len(in_flight) > limit:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                try:
+                    counts = future.result()
+                except Exception as e:
+                    # BrokenProcessPool and friends: finish this batch here
+                    logger.debug(f"Token count worker failed ({e}), counting in-process")
+                    run_local(batch)
+                    continue
+                finish(batch, counts)
+
+    batch = []
+    try:
+        for key, text in items:
+            if should_stop():
+                break
+            digest = content_digest(text)
+            count = store.get(digest)
+            if count is not None:
+                on_count(key, count)
+                continue
+            batch.append((key, digest, text))
+            if len(batch) >= _BATCH_TEXTS:
+                submit(batch)
+                batch = []
+                drain(workers * 2)
+        if batch and not should_stop():
+            submit(batch, final=True)
+        drain(0)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        store.flush()
+    return tokenized
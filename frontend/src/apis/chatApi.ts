@@ -761,6 +761,7 @@ export const sendPayload = async (
 
     const BROADCAST_INTERVAL_MS = 300;
     let toolInputsMap = new Map<string, any>(); // Store tool inputs by tool ID
+    const MAX_TOOL_PROGRESS_CHARS = 16000; // Tail of live tool output kept on screen
     // ── Batched streaming map update ──────────────────────────────────
     // Instead of calling setStreamedContentMap(prev => new Map(prev).set(…))
     // on every SSE chunk (which creates a new Map + triggers re-render each
@@ -1068,6 +1069,35 @@ export const sendPayload = async (
                         }
                     }
                     return;
+                } else if (jsonData.type === 'tool_progress') {
+                    // Live output of a still-running tool: show its tail inside
+                    // the tool's "Running..." block; tool_display replaces the
+                    // whole block with the final result.
+                    if (jsonData.is_internal === true) {
+                        return;
+                    }
+                    const toolId = jsonData.tool_id;
+                    const prefix = toolInputsMap.get(`${toolId}_prefix`);
+                    const markerIndex = currentContent.indexOf(`<!-- TOOL_MARKER:${toolId} -->`);
+                    const runningTail = '⏳ Running...\n````\n';
+                    const runningIndex = markerIndex === -1 ? -1 : currentContent.indexOf(runningTail, markerIndex);
+                    if (prefix && runningIndex !== -1) {
+                        let output = (toolInputsMap.get(`${toolId}_output`) || '') + (jsonData.output || '');
+                        if (output.length > MAX_TOOL_PROGRESS_CHARS) {
+                            output = output.slice(-MAX_TOOL_PROGRESS_CHARS);
+                            output = output.slice(output.indexOf('\n') + 1);
+                        }
+                        toolInputsMap.set(`${toolId}_output`, output);
+                        // A run of four backticks would close the tool fence early
+                        let shown = output.replace(/`{4,}/g, '```');
+                        if (shown && !shown.endsWith('\n')) {
+                            shown += '\n';
+                        }
+                        currentContent = currentContent.substring(0, markerIndex) + prefix + shown +
+                            currentContent.substring(runningIndex);
+                        flushStreamedContent();
+                    }
+                    return;
                 } else if (jsonData.tool_result) {
                     unwrappedData = jsonData.tool_result;
                     unwrappedData.type = 'tool_display';
@@ -2404,6 +2434,13 @@ export const sendPayload = async (
                         toolStartDisplay = `\n\n<!-- TOOL_MARKER:${unwrappedData.tool_id} -->\n${fence}tool:${toolName}|${displayHeader}|${syntax}\n⏳ Running...\n${fence}\n\n`;
                     }
 
+                    // Everything before "Running...", so tool_progress can
+                    // rebuild the block with live output in between
+                    if (unwrappedData.tool_id) {
+                        toolInputsMap.set(`${unwrappedData.tool_id}_prefix`,
+                            toolStartDisplay.substring(2, toolStartDisplay.indexOf('⏳ Running...')));
+                    }
+
                     console.log('🔧 TOOL_START formatted:', toolStartDisplay);
                     currentContent += toolStartDisplay;
                     flushStreamedContent();
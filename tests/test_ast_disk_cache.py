@@ -0,0 +1,164 @@
+"""
+Tests for the record-oriented AST disk cache (app/utils/ast_parser/disk_cache.py).
+"""
+
+import gzip
+import json
+import os
+
+import pytest
+
+from app.utils.ast_parser import disk_cache
+from app.utils.ast_parser.disk_cache import ASTDiskCache
+from app.utils.ast_parser.ziya_ast_enhancer import ZiyaASTEnhancer
+from app.utils.gitignore_parser import parse_gitignore_patterns
+
+
+@pytest.fixture
+def ziya_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZIYA_HOME", str(tmp_path / "home"))
+    return tmp_path / "home"
+
+
+def _ast(name):
+    return {"nodes": {name: {"name": name}}, "edges": []}
+
+
+def _source(tmp_path, name, body="x = 1\n"):
+    path = tmp_path / name
+    path.write_text(body)
+    st = os.stat(path)
+    return str(path), st.st_mtime, st.st_size
+
+
+class TestASTDiskCache:
+    def test_round_trip_across_reopen(self, ziya_home, tmp_path):
+        path, mtime, size = _source(tmp_path, "a.py")
+        cache = ASTDiskCache.open("/project")
+        cache.put(path, mtime, size, _ast("a"))
+        cache.close()
+
+        reopened = ASTDiskCache.open("/project")
+        assert len(reopened) == 1
+        assert reopened.is_fresh(path)
+        assert reopened.read(path) == _ast("a")
+
+    def test_changed_file_costs_one_record(self, ziya_home, tmp_path):
+        files = [_source(tmp_path, f"m{i}.py") for i in range(20)]
+        cache = ASTDiskCache.open("/project")
+        for path, mtime, size in files:
+            cache.put(path, mtime, size, _ast(path))
+        cache.close()
+        records = cache.directory / "records.dat"
+        index = cache.directory / "index.dat"
+        before = records.stat().st_size, index.stat().st_size
+
+        path, mtime, size = _source(tmp_path, "m3.py", "x = 2  # edited\n")
+        cache = ASTDiskCache.open("/project")
+        assert not cache.is_fresh(path)
+        cache.put(path, mtime, size, _ast("edited"))
+        cache.close()
+
+        grown = records.stat().st_size - before[0], index.stat().st_size - before[1]
+        assert 0 < grown[0] < before[0] / 10
+        assert grown[1] == disk_cache._ENTRY.size + len(path.encode())
+        assert ASTDiskCache.open("/project").read(path) == _ast("edited")
+
+    def test_retain_drops_missing_files(self, ziya_home, tmp_path):
+        cache = ASTDiskCache.open("/project")
+        for name in ("keep.py", "gone.py"):
+            cache.put(str(tmp_path / name), 1.0, 1, _ast(name))
+        cache.flush()
+        assert cache.retain([str(tmp_path / "keep.py")]) == 1
+        cache.close()
+        assert ASTDiskCache.open("/project").paths() == [str(tmp_path / "keep.py")]
+
+    def test_torn_index_tail_is_ignored(self, ziya_home, tmp_path):
+        cache = ASTDiskCache.open("/project")
+        cache.put("/project/a.py", 1.0, 1, _ast("a"))
+        cache.put("/project/b.py", 1.0, 1, _ast("b"))
+        cache.close()
+        index = cache.directory / "index.dat"
+        index.write_bytes(index.read_bytes()[:-3])
+
+        reopened = ASTDiskCache.open("/project")
+        assert reopened.paths() == ["/project/a.py"]
+        reopened.put("/project/c.py", 1.0, 1, _ast("c"))
+        reopened.close()
+        assert ASTDiskCache.open("/project").read("/project/c.py") == _ast("c")
+
+    def test_epoch_mismatch_discards_cache(self, ziya_home):
+        cache = ASTDiskCache.open("/project")
+        cache.put("/project/a.py", 1.0, 1, _ast("a"))
+        cache.close()
+        records = cache.directory / "records.dat"
+        data = bytearray(records.read_bytes())
+        data[8:16] = b"\x00" * 8
+        records.write_bytes(bytes(data))
+        assert len(ASTDiskCache.open("/project")) == 0
+
+    def test_corrupt_record_reads_as_miss(self, ziya_home):
+        cache = ASTDiskCache.open("/project")
+        cache.put("/project/a.py", 1.0, 1, _ast("a"))
+        cache.close()
+        records = cache.directory / "records.dat"
+        data = bytearray(records.read_bytes())
+        data[-1] ^= 0xFF
+        records.write_bytes(bytes(data))
+        assert ASTDiskCache.open("/project").read("/project/a.py") is None
+
+    def test_compaction_keeps_only_live_records(self, ziya_home):
+        cache = ASTDiskCache.open("/project")
+        for generation in range(5):
+            cache.put("/project/a.py", float(generation), 1, _ast(f"a{generation}"))
+            cache.flush()
+        cache.put("/project/b.py", 1.0, 1, _ast("b"))
+        cache.flush()
+        size_before = (cache.directory / "records.dat").stat().st_size
+        cache.compact()
+        cache.close()
+
+        assert (cache.directory / "records.dat").stat().st_size < size_before
+        reopened = ASTDiskCache.open("/project")
+        assert reopened.read("/project/a.py") == _ast("a4")
+        assert reopened.entry("/project/a.py").mtime == 4.0
+        assert reopened.read("/project/b.py") == _ast("b")
+
+    def test_compaction_keeps_records_appended_by_another_process(self, ziya_home):
+        ours = ASTDiskCache.open("/project")
+        theirs = ASTDiskCache.open("/project")
+        ours.put("/project/a.py", 1.0, 1, _ast("a"))
+        ours.flush()
+        theirs.put("/project/b.py", 1.0, 1, _ast("b"))
+        theirs.flush()
+        ours.compact()
+        ours.close()
+
+        reopened = ASTDiskCache.open("/project")
+        assert reopened.read("/project/a.py") == _ast("a")
+        assert reopened.read("/project/b.py") == _ast("b")
+
+    def test_legacy_blob_is_migrated(self, ziya_home):
+        legacy = disk_cache._legacy_cache_path("/project")
+        with gzip.open(legacy, "wt", encoding="utf-8") as f:
+            json.dump({"version": 1, "files": {
+                "/project/a.py": {"mtime": 1.0, "size": 1, "ast": _ast("a")},
+            }}, f)
+        cache = ASTDiskCache.open("/project")
+        assert cache.read("/project/a.py") == _ast("a")
+        assert not legacy.exists()
+
+
+class TestEnhancerUsesCache:
+    def test_warm_run_reads_from_cache(self, ziya_home, tmp_path, caplog):
+        codebase = tmp_path / "code"
+        codebase.mkdir()
+        for i in range(3):
+            (codebase / f"mod{i}.py").write_text(f"def f{i}():\n    return {i}\n")
+
+        ZiyaASTEnhancer()._process_directory(str(codebase), parse_gitignore_patterns([]), 5)
+        warm = ZiyaASTEnhancer()
+        with caplog.at_level("INFO", logger="app.utils.ast_parser.ziya_ast_enhancer"):
+            warm._process_directory(str(codebase), parse_gitignore_patterns([]), 5)
+        assert "(3 from cache)" in caplog.text
+        assert {n.name for n in warm.project_ast.nodes.values()} >= {"f0", "f1", "f2"}
@@ -12,6 +12,8 @@ skipped during indexing, producing an empty/useless AST for any non-HTML project
 
 import ast
 import os
+import threading
+import time
 import textwrap
 import tempfile
 import shutil
@@ -29,6 +31,7 @@ from app.utils.ast_parser.html_css_parser import HTMLCSSParser
 from app.utils.ast_parser.unified_ast import UnifiedAST, Node, SourceLocation, Edge
 from app.utils.ast_parser.query_engine import ASTQueryEngine
 from app.utils.ast_parser.ziya_ast_enhancer import ZiyaASTEnhancer
+from app.utils.gitignore_parser import parse_gitignore_patterns
 
 
 # ===================================================================
@@ -361,6 +364,65 @@ class TestUnifiedASTMerge:
         assert len(restored.edges) == len(sample_ast.edges)
 
 
+def _scan_location(unified_ast, file_path, line, column):
+    """Reference linear scan for get_node_by_location."""
+    candidates = []
+    for node in unified_ast.nodes.values():
+        loc = node.source_location
+        if (loc.file_path == file_path and loc.start_line <= line <= loc.end_line and
+                (loc.start_line != line or loc.start_column <= column) and
+                (loc.end_line != line or column <= loc.end_column)):
+            candidates.append(node)
+    if not candidates:
+        return None
+    return min(candidates, key=lambda n: (
+        n.source_location.end_line - n.source_location.start_line,
+        n.source_location.end_column - n.source_location.start_column,
+    ))
+
+
+class TestUnifiedASTLookups:
+    """Indexed lookups must agree with a scan over every node."""
+
+    def test_location_lookup_matches_scan(self, python_parser):
+        project = UnifiedAST()
+        for name, src in (("a.py", SAMPLE_PYTHON), ("b.py", SAMPLE_PYTHON_B)):
+            project.merge(python_parser.to_unified_ast(python_parser.parse(name, src), name))
+        for file_path in ("a.py", "b.py", "missing.py"):
+            for line in range(0, 25):
+                for column in (0, 1, 5, 12, 40):
+                    assert (project.get_node_by_location(file_path, line, column)
+                            is _scan_location(project, file_path, line, column))
+
+    def test_indices_follow_add_merge_and_remove(self):
+        a = UnifiedAST()
+        foo = a.add_node("function", "foo", SourceLocation("f.py", 1, 1, 3, 1))
+        assert [n.node_id for n in a.get_nodes_by_name("foo")] == [foo]
+
+        # Index now built; later changes are applied incrementally
+        bar = a.add_node("function", "bar", SourceLocation("f.py", 5, 1, 9, 1))
+        b = UnifiedAST()
+        baz = b.add_node("class", "baz", SourceLocation("g.py", 1, 1, 4, 1))
+        a.merge(b)
+        assert [n.node_id for n in a.get_nodes_by_type("function")] == [foo, bar]
+        assert [n.node_id for n in a.get_nodes_by_file("g.py")] == [baz]
+        assert a.get_node_by_location("f.py", 6, 1).node_id == bar
+
+        a.remove_nodes({bar})
+        assert a.get_nodes_by_name("bar") == []
+        assert a.get_node_by_location("f.py", 6, 1) is None
+        assert a.get_node_by_location("f.py", 2, 1).node_id == foo
+
+    def test_direct_node_writes_rebuild_indices(self):
+        a = UnifiedAST()
+        a.add_node("function", "foo", SourceLocation("f.py", 1, 1, 3, 1))
+        assert a.get_nodes_by_name("bar") == []
+        node = Node("n1", "function", "bar", SourceLocation("f.py", 5, 1, 6, 1))
+        a.nodes[node.node_id] = node
+        assert a.get_nodes_by_name("bar") == [node]
+        assert a.get_node_by_location("f.py", 5, 3) is node
+
+
 # ===================================================================
 # 6. ZiyaASTEnhancer end-to-end (filesystem)
 # ===================================================================
@@ -468,6 +530,151 @@ class TestEnhancerEndToEnd:
         )
 
 
+def _index_snapshot(engine):
+    """Index contents as comparable sets (bucket order is not significant)."""
+    def ids(index):
+        return {k: sorted(v) for k, v in index.items()}
+
+    def edges(index):
+        return {k: sorted((e.source_id, e.target_id, e.edge_type) for e in v) for k, v in index.items()}
+
+    return (ids(engine.name_index), ids(engine.type_index), ids(engine.file_index),
+            edges(engine.outgoing_edges), edges(engine.incoming_edges), edges(engine.edge_type_index))
+
+
+class TestLiveReindex:
+    """Single-file updates must leave the indices as a full rebuild would."""
+
+    def test_replace_file_matches_rebuild(self, python_parser):
+        project = UnifiedAST()
+        for name, src in (("a.py", SAMPLE_PYTHON), ("b.py", SAMPLE_PYTHON_B)):
+            project.merge(python_parser.to_unified_ast(python_parser.parse(name, src), name))
+        engine = ASTQueryEngine(project)
+
+        edited = "def divide(x: int, y: int) -> float:\n    return x / y\n"
+        engine.replace_file("b.py", python_parser.to_unified_ast(python_parser.parse("b.py", edited), "b.py"))
+
+        assert engine.find_definitions("multiply") == []
+        assert [n.name for n in engine.find_definitions("divide")] == ["divide"]
+        assert _index_snapshot(engine) == _index_snapshot(ASTQueryEngine(project))
+
+        engine.replace_file("a.py", None)
+        assert engine.find_definitions("Greeter") == []
+        assert "a.py" not in engine.file_index
+        assert _index_snapshot(engine) == _index_snapshot(ASTQueryEngine(project))
+
+    def test_enhancer_update_and_remove_file(self, tmp_codebase, tmp_path, monkeypatch):
+        monkeypatch.setenv("ZIYA_HOME", str(tmp_path / "home"))
+        enhancer = ZiyaASTEnhancer(ast_resolution="medium")
+        enhancer._process_directory(str(tmp_codebase), parse_gitignore_patterns([]), 5)
+        project = enhancer.query_engines["project"]
+        assert project.find_definitions("multiply")
+
+        target = tmp_codebase / "sample_b.py"
+        target.write_text("def power(x: int, n: int) -> int:\n    return x ** n\n")
+        assert enhancer.update_file(str(target))
+        assert project.find_definitions("multiply") == []
+        assert project.find_definitions("power")
+        assert "power" in enhancer.generate_ast_context()
+
+        target.unlink()
+        assert enhancer.update_file(str(target))
+        assert project.find_definitions("power") == []
+        assert str(target) not in enhancer.ast_cache
+        # Unrelated files are untouched
+        assert project.find_definitions("Greeter")
+
+    def test_readers_wait_for_live_update(self, monkeypatch):
+        from app.utils.ast_parser import integration
+
+        enhancer = ZiyaASTEnhancer(ast_resolution="medium")
+        monkeypatch.setattr(integration, "get_current_enhancer", lambda: enhancer)
+        contexts = []
+        reader = threading.Thread(target=lambda: contexts.append(integration.get_ast_context()))
+        with enhancer.update_lock:
+            reader.start()
+            reader.join(0.2)
+            assert reader.is_alive()
+        reader.join(5)
+        assert len(contexts) == 1
+
+    def test_queue_debounces_bursts(self, tmp_path, monkeypatch):
+        from app.utils.ast_parser import integration
+
+        calls = []
+        done = threading.Event()
+
+        class _Enhancer:
+            def update_file(self, path):
+                calls.append(path)
+                done.set()
+
+        root = str(tmp_path)
+        monkeypatch.setattr(integration, "_AST_UPDATE_DEBOUNCE", 0.05)
+        monkeypatch.setitem(integration._enhancers, root, _Enhancer())
+        for _ in range(5):
+            integration.queue_ast_update(os.path.join(root, "x.py"))
+        integration.queue_ast_update("/elsewhere/y.py")
+        assert done.wait(5)
+        time.sleep(0.2)
+        assert calls == [os.path.join(root, "x.py")]
+
+
+class TestParallelIndexing:
+    """Cold indexing on the process pool must match in-process indexing."""
+
+    @staticmethod
+    def _index(codebase, monkeypatch, tmp_path, workers):
+        monkeypatch.setenv("ZIYA_USER_CODEBASE_DIR", str(codebase))
+        monkeypatch.setenv("ZIYA_HOME", str(tmp_path / f"home-{workers}"))
+        monkeypatch.setenv("ZIYA_AST_WORKERS", str(workers))
+        progress = []
+        enhancer = ZiyaASTEnhancer(ast_resolution="medium")
+        enhancer._process_directory(str(codebase), parse_gitignore_patterns([]), 5,
+                                    lambda done, total, pct: progress.append((done, total)))
+        return enhancer, progress
+
+    def test_pool_results_merge_in_walk_order(self, tmp_path, monkeypatch):
+        codebase = tmp_path / "many"
+        codebase.mkdir()
+        for i in range(80):
+            (codebase / f"mod_{i:03d}.py").write_text(f"def func_{i}(x: int) -> int:\n    return x + {i}\n")
+
+        inline, _ = self._index(codebase, monkeypatch, tmp_path, workers=1)
+        pooled, progress = self._index(codebase, monkeypatch, tmp_path, workers=2)
+
+        assert list(pooled.ast_cache) == list(inline.ast_cache)
+        assert len(pooled.ast_cache) == 80
+        assert pooled.generate_ast_context() == inline.generate_ast_context()
+        assert progress[0] == (0, 80)
+        assert progress[-1] == (80, 80)
+        names = {n.name for n in pooled.project_ast.nodes.values()}
+        assert {"func_0", "func_79"} <= names
+
+    def test_bad_worker_setting_indexes_in_process(self, tmp_path, monkeypatch):
+        codebase = tmp_path / "many"
+        codebase.mkdir()
+        for i in range(70):
+            (codebase / f"mod_{i:03d}.py").write_text(f"def func_{i}():\n    return {i}\n")
+
+        enhancer, _ = self._index(codebase, monkeypatch, tmp_path, workers="auto")
+        assert len(enhancer.ast_cache) == 70
+
+    def test_failed_parse_stream_falls_back_in_process(self, tmp_path, monkeypatch):
+        codebase = tmp_path / "many"
+        codebase.mkdir()
+        for i in range(5):
+            (codebase / f"mod_{i}.py").write_text(f"def func_{i}():\n    return {i}\n")
+
+        def broken(self, file_paths):
+            yield None, None
+            raise RuntimeError("pool died")
+
+        monkeypatch.setattr(ZiyaASTEnhancer, "_parse_files", broken)
+        enhancer, _ = self._index(codebase, monkeypatch, tmp_path, workers=1)
+        assert len(enhancer.ast_cache) == 5
+
+
 # ===================================================================
 # 7. MCP tool layer (ast_tools.py)
 # ===================================================================
@@ -225,3 +225,175 @@ class TestEncryptedFiles:
         results = search_chats(ziya_home, "p1", "outlook")
         assert len(results) == 1
         assert results[0]["conversationId"] == chat.id
+
+
+# ── persistent inverted index ──────────────────────────────────────
+
+class TestSearchIndex:
+    @pytest.fixture(autouse=True)
+    def _fresh_indexes(self):
+        from app.storage import chat_search_index
+        chat_search_index.invalidate()
+        yield
+        chat_search_index.invalidate()
+
+    def _count_index_reads(self, monkeypatch):
+        from app.storage import chat_search_index
+        calls = []
+        real = chat_search_index._read_chat_data
+
+        def counting(path):
+            calls.append(path.stem)
+            return real(path)
+
+        monkeypatch.setattr(chat_search_index, "_read_chat_data", counting)
+        return calls
+
+    def test_index_persisted_and_reused(self, ziya_home, monkeypatch):
+        chats = _proj(ziya_home, "p1")
+        _write_chat(chats, "c1", title="x",
+                    messages=[{"id": "m1", "role": "human", "content": "outlook"}])
+        _write_chat(chats, "c2", title="x",
+                    messages=[{"id": "m1", "role": "human", "content": "unrelated"}])
+        assert len(search_chats(ziya_home, "p1", "outlook")) == 1
+        assert (chats / "_search_index.json").exists()
+
+        from app.storage import chat_search_index
+        chat_search_index.invalidate()
+        reads = self._count_index_reads(monkeypatch)
+        assert len(search_chats(ziya_home, "p1", "outlook")) == 1
+        assert reads == []
+
+    def test_only_candidate_chats_opened(self, ziya_home, monkeypatch):
+        from app.storage import chat_search
+        chats = _proj(ziya_home, "p1")
+        for i in range(5):
+            _write_chat(chats, f"c{i}", title="x",
+                        messages=[{"id": "m1", "role": "human", "content": f"filler {i}"}])
+        _write_chat(chats, "hit", title="x",
+                    messages=[{"id": "m1", "role": "human", "content": "outlook"}])
+        search_chats(ziya_home, "p1", "warmup")
+
+        opened = []
+        real = chat_search._read_chat_data
+        monkeypatch.setattr(chat_search, "_read_chat_data",
+                            lambda p: opened.append(p.stem) or real(p))
+        results = search_chats(ziya_home, "p1", "outlook")
+        assert [r["conversationId"] for r in results] == ["hit"]
+        assert opened == ["hit"]
+
+    def test_external_edit_revalidated_by_mtime_and_size(self, ziya_home):
+        chats = _proj(ziya_home, "p1")
+        _write_chat(chats, "c1", title="x",
+                    messages=[{"id": "m1", "role": "human", "content": "before"}])
+        assert search_chats(ziya_home, "p1", "outlook") == []
+        _write_chat(chats, "c1", title="x",
+                    messages=[{"id": "m1", "role": "human", "content": "now with outlook"}])
+        assert len(search_chats(ziya_home, "p1", "outlook")) == 1
+
+    def test_deleted_file_dropped(self, ziya_home):
+        chats = _proj(ziya_home, "p1")
+        _write_chat(chats, "c1", title="x",
+                    messages=[{"id": "m1", "role": "human", "content": "outlook"}])
+        assert len(search_chats(ziya_home, "p1", "outlook")) == 1
+        (chats / "c1.json").unlink()
+        assert search_chats(ziya_home, "p1", "outlook") == []
+
+    def test_storage_write_updates_resident_index_without_reread(self, ziya_home, monkeypatch):
+        from app.storage.chats import ChatStorage
+        from app.models.chat import ChatCreate
+        storage = ChatStorage(ziya_home / "projects" / "p1")
+        chat = storage.create(ChatCreate(title="Notes"))
+        assert search_chats(ziya_home, "p1", "outlook") == []
+
+        raw = storage._read_json(storage._chat_file(chat.id))
+        raw["messages"] = [{"id": "m1", "role": "human", "content": "outlook please"}]
+        storage._write_json(storage._chat_file(chat.id), raw)
+
+        reads = self._count_index_reads(monkeypatch)
+        results = search_chats(ziya_home, "p1", "outlook")
+        assert [r["conversationId"] for r in results] == [chat.id]
+        assert reads == []
+
+        storage.delete(chat.id)
+        assert search_chats(ziya_home, "p1", "outlook") == []
+
+    def test_title_only_hit_served_from_metadata(self, ziya_home, monkeypatch):
+        from app.storage import chat_search
+        chats = _proj(ziya_home, "p1")
+        _write_chat(chats, "c1", title="Outlook notes", lastAccessedAt=77,
+                    messages=[{"id": "m1", "role": "human", "content": "unrelated"}])
+        search_chats(ziya_home, "p1", "warmup")
+        monkeypatch.setattr(chat_search, "_read_chat_data",
+                            lambda p: pytest.fail("title hit opened the chat"))
+        r = search_chats(ziya_home, "p1", "outlook")[0]
+        assert r["conversationId"] == "c1"
+        assert r["matches"] == []
+        assert r["totalMatches"] == 1
+        assert r["lastAccessedAt"] == 77
+
+    def test_partial_words_and_multiword_queries(self, ziya_home):
+        chats = _proj(ziya_home, "p1")
+        _write_chat(chats, "c1", title="x",
+                    messages=[{"id": "m1", "role": "human", "content": "configure outlook-sync daily"},
+                              {"id": "m2", "role": "human", "content": "outlook only"}])
+        r = search_chats(ziya_home, "p1", "look-sy")
+        assert [m["messageIndex"] for m in r[0]["matches"]] == [0]
+        assert search_chats(ziya_home, "p1", "sync outlook") == []
+
+    def test_term_lookup_matches_vocabulary_scan(self, ziya_home):
+        from app.storage import chat_search_index
+        chats = _proj(ziya_home, "p1")
+        _write_chat(chats, "c1", title="x",
+                    messages=[{"id": "m1", "role": "human", "content": "outlook outline look at it"}])
+        _write_chat(chats, "c2", title="x",
+                    messages=[{"id": "m1", "role": "human", "content": "lookup tables"}])
+        search_chats(ziya_home, "p1", "warmup")
+        index = chat_search_index.get_index(chats)
+        for query_term in ("look", "out", "tab", "ou", "a", "lookup", "zzz", "outlookx"):
+            expected = sorted(t for t in index.postings if query_term in t)
+            assert sorted(index.matching_terms(query_term)) == expected
+
+        (chats / "c2.json").unlink()
+        search_chats(ziya_home, "p1", "warmup")
+        assert sorted(index.matching_terms("look")) == ["look", "outlook"]
+        assert "kup" not in index._gram_terms
+
+    def test_non_word_query_falls_back_to_scan(self, ziya_home):
+        chats = _proj(ziya_home, "p1")
+        _write_chat(chats, "c1", title="x",
+                    messages=[{"id": "m1", "role": "human", "content": "a -> b"}])
+        assert len(search_chats(ziya_home, "p1", "->")) == 1
+
+    def test_index_encrypted_with_conversation_policy(self, ziya_home, monkeypatch):
+        from app.storage import chat_search_index
+        from app.utils import encryption
+
+        class FakeEncryptor:
+            categories = []
+
+            def is_enabled(self, category=""):
+                self.categories.append(category)
+                return True
+
+            def encrypt(self, plaintext, category=""):
+                return encryption.MAGIC + plaintext[::-1]
+
+            def decrypt(self, envelope):
+                return envelope[len(encryption.MAGIC):][::-1]
+
+        fake = FakeEncryptor()
+        monkeypatch.setattr(encryption, "get_encryptor", lambda: fake)
+        chats = _proj(ziya_home, "p1")
+        _write_chat(chats, "c1", title="x",
+                    messages=[{"id": "m1", "role": "human", "content": "outlook"}])
+        assert len(search_chats(ziya_home, "p1", "outlook")) == 1
+
+        raw = (chats / "_search_index.json").read_bytes()
+        assert encryption.is_encrypted(raw)
+        assert b"outlook" not in raw
+        assert "conversation_data" in fake.categories
+
+        chat_search_index.invalidate()
+        index = chat_search_index.get_index(chats)
+        assert "outlook" in index.postings
@@ -0,0 +1,111 @@
+"""Tests for cached file reads and rendered segments used to build the codebase context."""
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.utils import context_assembly
+from app.utils.file_state_manager import FileState
+
+
+def _write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+    # Age the file past the racy window so its stat can be trusted.
+    old = os.stat(path).st_mtime_ns - 10_000_000_000
+    os.utime(path, ns=(old, old))
+
+
+def _state(path, lines, line_states=None):
+    return FileState(
+        path=path,
+        content_hash=str(hash(tuple(lines))),
+        line_states=dict(line_states or {}),
+        original_content=list(lines),
+        current_content=list(lines),
+        last_seen_content=list(lines),
+        last_context_submission_content=list(lines),
+    )
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    context_assembly.clear()
+    yield
+    context_assembly.clear()
+
+
+class TestReadFiles:
+
+    def test_unchanged_files_are_not_read_again(self, tmp_path):
+        paths = [str(tmp_path / f"m{i}.py") for i in range(5)]
+        for i, p in enumerate(paths):
+            _write(p, f"x = {i}\n")
+        first = context_assembly.read_files(paths)
+        assert first[paths[2]] == "x = 2\n"
+
+        with patch.object(context_assembly, "read_file_content") as read:
+            again = context_assembly.read_files(paths)
+        read.assert_not_called()
+        assert again == first
+
+    def test_changed_file_is_reread(self, tmp_path):
+        path = str(tmp_path / "a.py")
+        _write(path, "a = 1\n")
+        context_assembly.read_files([path])
+        _write(path, "a = 22\n")
+        assert context_assembly.read_files([path])[path] == "a = 22\n"
+
+    def test_recently_modified_file_is_not_trusted(self, tmp_path):
+        path = str(tmp_path / "hot.py")
+        with open(path, "w") as f:
+            f.write("v = 1\n")
+        context_assembly.read_files([path])
+        with patch.object(context_assembly, "read_file_content", return_value="v = 2\n") as read:
+            assert context_assembly.read_files([path])[path] == "v = 2\n"
+        read.assert_called_once()
+
+    def test_cache_is_bounded_by_size(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(context_assembly, "_MAX_CACHED_CHARS", 25)
+        paths = [str(tmp_path / f"m{i}.py") for i in range(4)]
+        for p in paths:
+            _write(p, "0123456789")
+        context_assembly.read_files(paths[:2])
+        context_assembly.read_files(paths[:1])  # m0 is now the most recent
+        context_assembly.read_files(paths[2:3])
+        assert list(context_assembly._contents) == [paths[0], paths[2]]
+        assert context_assembly._contents_chars == 20
+
+    def test_directories_and_missing_files(self, tmp_path):
+        missing = str(tmp_path / "missing.py")
+        result = context_assembly.read_files([str(tmp_path), missing])
+        assert result == {str(tmp_path): None, missing: None}
+
+
+class TestSegments:
+
+    def test_render_matches_annotated_escaped_lines(self):
+        state = _state("a.py", ["x = `1`", "", "y = 2"], {2: '+', 3: '*'})
+        assert context_assembly.render_segment("a.py", state) == (
+            "File: a.py\n[001 ] x = \\`1\\`\n[002+] \n[003*] y = 2\n\n"
+        )
+
+    def test_segment_reused_until_state_changes(self):
+        state = _state("a.py", ["a", "b"])
+        first = context_assembly.segment_for("c1", "a.py", state)
+        with patch.object(context_assembly, "render_segment") as render:
+            assert context_assembly.segment_for("c1", "a.py", state) is first
+        render.assert_not_called()
+
+        state.line_states[2] = '*'
+        assert "[002*] b" in context_assembly.segment_for("c1", "a.py", state)
+
+        state.current_content = ["a", "b", "c"]
+        state.content_hash = "changed"
+        assert context_assembly.segment_for("c1", "a.py", state).endswith("[003 ] c\n\n")
+
+    def test_retain_drops_deselected_files(self):
+        context_assembly.segment_for("c1", "a.py", _state("a.py", ["a"]))
+        context_assembly.segment_for("c1", "b.py", _state("b.py", ["b"]))
+        context_assembly.retain_segments("c1", ["b.py"])
+        assert list(context_assembly._segments["c1"]) == ["b.py"]
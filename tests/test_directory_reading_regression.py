@@ -35,6 +35,10 @@ class DirectoryReadingRegressionTest(unittest.TestCase):
     def setUpClass(cls):
         """Set up test environment with a known directory structure."""
         cls.test_dir = tempfile.mkdtemp(prefix='ziya_regression_test_')
+        # Keep folder snapshots and token counts out of the real ~/.ziya
+        cls.ziya_home = tempfile.mkdtemp(prefix='ziya_regression_home_')
+        cls._saved_ziya_home = os.environ.get('ZIYA_HOME')
+        os.environ['ZIYA_HOME'] = cls.ziya_home
         
         # Create test files with known content
         test_files = {
@@ -60,6 +64,13 @@ class DirectoryReadingRegressionTest(unittest.TestCase):
     def tearDownClass(cls):
         """Clean up test environment."""
         shutil.rmtree(cls.test_dir, ignore_errors=True)
+        from app.services import folder_snapshot
+        folder_snapshot.flush()
+        shutil.rmtree(cls.ziya_home, ignore_errors=True)
+        if cls._saved_ziya_home is None:
+            os.environ.pop('ZIYA_HOME', None)
+        else:
+            os.environ['ZIYA_HOME'] = cls._saved_ziya_home
     
     def test_directory_reading_finds_files(self):
         """Test that directory reading finds files (regression test for 0 files bug)."""
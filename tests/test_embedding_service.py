@@ -12,6 +12,7 @@ from app.services.embedding_service import (
     EmbeddingCache,
     NoopProvider,
     BedrockTitanProvider,
+    LocalHashingProvider,
     embed_and_cache,
     semantic_search,
     remove_embedding,
@@ -140,6 +141,92 @@ class TestEmbeddingCache:
         assert results[0][1] > 0.99
 
 
+class TestRowStore:
+    def test_capacity_doubles(self, tmp_cache):
+        for i in range(100):
+            tmp_cache.put(f"m_{i}", _random_vec())
+        assert tmp_cache._vectors.shape == (128, 8)
+        assert tmp_cache.count == 100
+
+    def test_flush_appends_only_new_records(self, tmp_cache):
+        tmp_cache.put("m_1", _random_vec())
+        tmp_cache.flush()
+        log_before = tmp_cache._log_file.read_text()
+
+        tmp_cache.put("m_1", _random_vec())  # in-place update, no new record
+        tmp_cache.put("m_2", _random_vec())
+        tmp_cache.remove("m_1")
+        tmp_cache.flush()
+
+        log_after = tmp_cache._log_file.read_text()
+        assert log_after.startswith(log_before)
+        assert log_after[len(log_before):].splitlines() == ['["m_2", 1]', '["m_1", null]']
+
+    def test_tombstones_survive_reload(self, tmp_path):
+        cache1 = EmbeddingCache(tmp_path, dim=8)
+        vec = _random_vec()
+        cache1.put("m_1", _random_vec())
+        cache1.put("m_2", vec)
+        cache1.remove("m_1")
+        cache1.flush()
+
+        cache2 = EmbeddingCache(tmp_path, dim=8)
+        assert cache2.count == 1
+        assert cache2.get("m_1") is None
+        assert [mid for mid, _ in cache2.search(vec, top_k=5)] == ["m_2"]
+
+    def test_torn_log_line_does_not_swallow_later_records(self, tmp_path):
+        cache1 = EmbeddingCache(tmp_path, dim=8)
+        cache1.put("m_1", _random_vec())
+        cache1.flush()
+        with open(cache1._log_file, "a", encoding="utf-8") as f:
+            f.write('["m_2", ')
+
+        cache2 = EmbeddingCache(tmp_path, dim=8)
+        cache2.put("m_3", _random_vec())
+        cache2.flush()
+
+        cache3 = EmbeddingCache(tmp_path, dim=8)
+        assert cache3.count == 2
+        assert cache3.get("m_1") is not None and cache3.get("m_3") is not None
+
+    def test_compaction_drops_dead_rows(self, tmp_path):
+        cache = EmbeddingCache(tmp_path, dim=8)
+        keep = _random_vec()
+        for i in range(200):
+            cache.put(f"m_{i}", _random_vec())
+        cache.put("keep", keep)
+        for i in range(200):
+            cache.remove(f"m_{i}")
+        cache.flush()
+
+        assert cache._ids == ["keep"]
+        assert len(list(tmp_path.glob("*.f32"))) == 1
+        reloaded = EmbeddingCache(tmp_path, dim=8)
+        np.testing.assert_array_almost_equal(reloaded.get("keep"), keep)
+
+    def test_legacy_npz_is_migrated(self, tmp_path):
+        vec = _random_vec()
+        np.savez(tmp_path / "embeddings.npz",
+                 ids=np.array(["m_1"], dtype=object), vectors=vec.reshape(1, -1))
+
+        cache = EmbeddingCache(tmp_path, dim=8)
+        np.testing.assert_array_almost_equal(cache.get("m_1"), vec)
+        assert not (tmp_path / "embeddings.npz").exists()
+        assert EmbeddingCache(tmp_path, dim=8).count == 1
+
+    def test_dim_mismatch_starts_fresh(self, tmp_path):
+        cache1 = EmbeddingCache(tmp_path, dim=8)
+        cache1.put("m_1", _random_vec())
+        cache1.flush()
+
+        cache2 = EmbeddingCache(tmp_path, dim=4)
+        assert cache2.count == 0
+        cache2.put("m_2", np.ones(4, dtype=np.float32) / 2)
+        cache2.flush()
+        assert EmbeddingCache(tmp_path, dim=4).count == 1
+
+
 class TestNoopProvider:
     def test_returns_none(self):
         provider = NoopProvider()
@@ -167,3 +254,108 @@ class TestBedrockProvider:
         provider = BedrockTitanProvider()
         assert provider.embed_text("") is None
         assert provider.embed_text("   ") is None
+
+    def test_throttled_call_is_retried(self, monkeypatch):
+        import app.services.embedding_service as es
+        monkeypatch.setattr(es.time, "sleep", lambda s: None)
+        mock_client = MagicMock()
+        mock_client.invoke_model.side_effect = [
+            Exception("ThrottlingException: Rate exceeded"),
+            {"body": MagicMock(read=lambda: b'{"embedding": [0.0, 1.0, 0.0]}')},
+        ]
+        provider = BedrockTitanProvider(dim=3)
+        provider._client = mock_client
+
+        vec = provider.embed_text("test text")
+        np.testing.assert_array_almost_equal(vec, [0.0, 1.0, 0.0])
+        assert mock_client.invoke_model.call_count == 2
+
+    def test_non_retryable_error_returns_none(self):
+        mock_client = MagicMock()
+        mock_client.invoke_model.side_effect = Exception("AccessDeniedException")
+        provider = BedrockTitanProvider(dim=3)
+        provider._client = mock_client
+
+        assert provider.embed_text("test text") is None
+        assert mock_client.invoke_model.call_count == 1
+
+    def test_embed_batch_concurrent_keeps_order(self):
+        import threading
+        import time as _time
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def invoke(text):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            _time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            vec = np.zeros(3, dtype=np.float32)
+            vec[int(text)] = 1.0
+            return vec
+
+        provider = BedrockTitanProvider(dim=3)
+        provider._invoke = invoke
+        vectors = provider.embed_batch(["0", "1", "2", "0", "1", "2"])
+
+        assert [int(np.argmax(v)) for v in vectors] == [0, 1, 2, 0, 1, 2]
+        assert 1 < peak[0] <= 4
+
+
+class TestLocalHashingProvider:
+    def test_deterministic_and_normalized(self):
+        a = LocalHashingProvider(dim=64).embed_text("docker build failed")
+        b = LocalHashingProvider(dim=64).embed_text("docker build failed")
+        np.testing.assert_array_equal(a, b)
+        assert abs(np.linalg.norm(a) - 1.0) < 1e-5
+
+    def test_related_text_scores_higher(self):
+        provider = LocalHashingProvider(dim=256)
+        query = provider.embed_text("docker build failed on the CI runner")
+        related = provider.embed_text("the CI runner failed building the docker image")
+        unrelated = provider.embed_text("favourite colour is blue")
+        assert query @ related > query @ unrelated
+
+    def test_empty_text_returns_none(self):
+        assert LocalHashingProvider(dim=8).embed_text("  ") is None
+
+
+class TestResolveProvider:
+    def test_local_choice(self, monkeypatch):
+        from app.services.embedding_service import _resolve_provider
+        monkeypatch.setenv("ZIYA_EMBEDDING_PROVIDER", "local")
+        assert isinstance(_resolve_provider(), LocalHashingProvider)
+
+    def test_auto_falls_back_to_keyword_only(self, monkeypatch):
+        from app.services.embedding_service import NoopProvider, _resolve_provider
+        monkeypatch.setenv("ZIYA_EMBEDDING_PROVIDER", "auto")
+        with patch.object(BedrockTitanProvider, "embed_text", return_value=None):
+            assert isinstance(_resolve_provider(), NoopProvider)
+
+
+class TestBackfill:
+    @pytest.mark.asyncio
+    async def test_backfill_embeds_in_batches_without_pacing_local(self, tmp_path, monkeypatch):
+        import app.services.embedding_service as es
+        provider = LocalHashingProvider(dim=8)
+        cache = EmbeddingCache(tmp_path, dim=8, name=provider.cache_name)
+        monkeypatch.setattr(es, "_provider", provider)
+        monkeypatch.setattr(es, "_cache", cache)
+        batches = []
+        real_batch = provider.embed_batch
+        monkeypatch.setattr(provider, "embed_batch", lambda texts: batches.append(len(texts)) or real_batch(texts))
+        sleeps = []
+
+        async def no_sleep(delay):
+            sleeps.append(delay)
+
+        monkeypatch.setattr("asyncio.sleep", no_sleep)
+        items = [(f"m_{i}", f"memory number {i}") for i in range(45)]
+
+        assert await es.backfill_embeddings(items) == 45
+        assert batches == [20, 20, 5]
+        assert sleeps == []
+        assert cache.count == 45
+        assert (tmp_path / "embeddings-local.ids").exists()
@@ -202,5 +202,215 @@ class TestFileStateManager:
         assert file_state_manager.conversation_states[conv_id]["test.py"].line_states[1] == '*'
 
 
+class TestSnapshotBlobStore:
+    """Snapshots persist as deduplicated blobs referenced from per-conversation shards."""
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        mgr = FileStateManager()
+        mgr.state_file = str(tmp_path / "file_states.json")
+        mgr.conversation_states = {}
+        mgr.conversation_diffs = {}
+        mgr._conversation_access_times = {}
+        return mgr
+
+    def _reload(self, manager):
+        mgr2 = FileStateManager()
+        mgr2.state_file = manager.state_file
+        mgr2.conversation_states = {}
+        mgr2.conversation_diffs = {}
+        mgr2._conversation_access_times = {}
+        mgr2._load_state()
+        return mgr2
+
+    def _blob_files(self, manager):
+        root = os.path.join(os.path.dirname(manager.state_file), "file_state_blobs")
+        return sorted(
+            os.path.join(d, f) for d, _, names in os.walk(root) for f in names
+        )
+
+    def test_shard_holds_keys_not_content(self, manager):
+        import json
+        manager.initialize_conversation("c1", {"a.py": "secret_line_1\nsecret_line_2"})
+        manager._save_state()
+        raw = open(os.path.join(manager.shard_dir, "c1.json"), "rb").read()
+        assert b"secret_line_1" not in raw
+        data = json.loads(raw)
+        assert data["version"] == 3
+        assert len(data["files"]["a.py"]["current_content"]) == 64
+
+    def test_identical_snapshots_are_stored_once(self, manager):
+        files = {"a.py": "x = 1\ny = 2", "b.py": "x = 1\ny = 2"}
+        manager.initialize_conversation("c1", files)
+        manager.initialize_conversation("c2", files)
+        manager._save_state()
+        # Four snapshots x two files x two conversations, one distinct content
+        assert len(self._blob_files(manager)) == 1
+
+    def test_round_trip(self, manager):
+        manager.initialize_conversation("c1", {"a.py": "one\ntwo"})
+        manager.update_file_state("c1", "a.py", "one\ntwo\nthree")
+        manager.record_applied_diff("c1", "a.py", "+three")
+        manager._save_state()
+
+        mgr2 = self._reload(manager)
+        state = mgr2.conversation_states["c1"]["a.py"]
+        original = manager.conversation_states["c1"]["a.py"]
+        assert state.original_content == ["one", "two"]
+        assert state.current_content == ["one", "two", "three"]
+        assert state.line_states == original.line_states
+        assert state.content_hash == original.content_hash
+        assert mgr2.conversation_diffs["c1"][0]["diff_content"] == "+three"
+
+    def test_tracked_file_is_persisted(self, manager):
+        state = manager.track_file("c1", "new.py", "a = 1\nb = 2")
+        assert manager.get_file_state("c1", "new.py") is state
+        manager._flush()
+        assert self._reload(manager).conversation_states["c1"]["new.py"].current_content == ["a = 1", "b = 2"]
+
+    def test_save_writes_only_new_blobs(self, manager):
+        manager.initialize_conversation("c1", {"a.py": "one"})
+        manager._save_state()
+        before = {p: os.stat(p).st_mtime_ns for p in self._blob_files(manager)}
+        manager._schedule_save("c1")
+        with patch("app.utils.file_state_blobs.blob_key", wraps=__import__(
+                "app.utils.file_state_blobs", fromlist=["blob_key"]).blob_key) as spy:
+            manager._save_state()
+            # Unchanged snapshot lists are recognised without re-hashing
+            assert spy.call_count == 0
+        after = {p: os.stat(p).st_mtime_ns for p in self._blob_files(manager)}
+        assert before == after
+
+    def test_unreferenced_blobs_are_swept(self, manager):
+        manager.initialize_conversation("c1", {"a.py": "old"})
+        manager._save_state()
+        manager.initialize_conversation("c1", {"a.py": "new"}, force_reset=True)
+        manager._save_state()
+        assert len(self._blob_files(manager)) == 2
+        # Make every unreferenced blob old enough to go
+        with patch("app.utils.file_state_blobs._TOUCH_INTERVAL_SECONDS", -2 * 3600):
+            manager._last_blob_sweep = 0.0
+            manager._save_state()
+        assert len(self._blob_files(manager)) == 1
+        assert self._reload(manager).conversation_states["c1"]["a.py"].original_content == ["new"]
+
+    def test_legacy_inline_format_is_migrated(self, manager):
+        import json
+        legacy = {"c1": {
+            "a.py": {
+                "path": "a.py", "content_hash": "h", "line_states": {"1": "+"},
+                "original_content": ["a"], "current_content": ["b"],
+                "last_seen_content": ["b"],
+            },
+            "_diff_history": [{"file_path": "a.py", "diff_content": "d"}],
+        }}
+        with open(manager.state_file, "w") as f:
+            json.dump(legacy, f)
+        mgr2 = self._reload(manager)
+        state = mgr2.conversation_states["c1"]["a.py"]
+        assert state.last_context_submission_content == ["b"]
+        assert state.line_states == {1: "+"}
+
+        # Migrated into a shard; the single state file is gone
+        assert not os.path.exists(manager.state_file)
+        mgr3 = self._reload(manager)
+        assert mgr3.conversation_states["c1"]["a.py"].current_content == ["b"]
+        assert mgr3.conversation_diffs["c1"][0]["diff_content"] == "d"
+
+
+class TestConversationShards:
+    """Per-conversation shards: dirty-only writes, write-behind, lazy loading."""
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        mgr = FileStateManager()
+        mgr.state_file = str(tmp_path / "file_states.json")
+        mgr.conversation_states = {}
+        mgr.conversation_diffs = {}
+        mgr._conversation_access_times = {}
+        return mgr
+
+    def _reload(self, manager):
+        mgr2 = FileStateManager()
+        mgr2.state_file = manager.state_file
+        mgr2.conversation_states = {}
+        mgr2.conversation_diffs = {}
+        mgr2._conversation_access_times = {}
+        mgr2._load_state()
+        return mgr2
+
+    def _shard(self, manager, conv_id):
+        return os.path.join(manager.shard_dir, conv_id + ".json")
+
+    def test_only_dirty_conversations_are_written(self, manager):
+        manager.initialize_conversation("c1", {"a.py": "one"})
+        manager.initialize_conversation("c2", {"a.py": "one"})
+        manager._save_state()
+        c2_mtime = os.stat(self._shard(manager, "c2")).st_mtime_ns
+
+        manager.update_file_state("c1", "a.py", "two")
+        with patch.object(manager, "_write_shard", wraps=manager._write_shard) as spy:
+            manager._save_state()
+        assert [call.args[0] for call in spy.call_args_list] == ["c1"]
+        assert os.stat(self._shard(manager, "c2")).st_mtime_ns == c2_mtime
+
+    def test_write_behind_coalesces_saves(self, manager):
+        import time
+        with patch("app.utils.file_state_manager._WRITE_BEHIND_DELAY_SECONDS", 0.05), \
+                patch.object(manager, "_write_shard", wraps=manager._write_shard) as spy:
+            manager.initialize_conversation("c1", {"a.py": "one"})
+            manager.update_file_state("c1", "a.py", "two")
+            manager.record_applied_diff("c1", "a.py", "+two")
+            assert not os.path.exists(self._shard(manager, "c1"))
+            deadline = time.time() + 5
+            while not os.path.exists(self._shard(manager, "c1")) and time.time() < deadline:
+                time.sleep(0.02)
+            time.sleep(0.1)
+        assert spy.call_count == 1
+        assert self._reload(manager).conversation_states["c1"]["a.py"].current_content == ["two"]
+
+    def test_shards_load_lazily(self, manager):
+        manager.initialize_conversation("c1", {"a.py": "one"})
+        manager.initialize_conversation("c2", {"b.py": "two"})
+        manager._save_state()
+
+        mgr2 = self._reload(manager)
+        assert len(mgr2.conversation_states) == 0
+        assert set(mgr2.conversation_states.on_disk) == {"c1", "c2"}
+
+        assert "c1" in mgr2.conversation_states
+        assert list(mgr2.conversation_states) == ["c1"]
+        assert mgr2.conversation_states.get("c2")["b.py"].current_content == ["two"]
+        assert "missing" not in mgr2.conversation_states
+
+    def test_unsafe_conversation_ids_round_trip(self, manager):
+        conv_id = "../odd/id%1"
+        manager.initialize_conversation(conv_id, {"a.py": "one"})
+        manager._save_state()
+        assert os.listdir(manager.shard_dir) == ["..%2Fodd%2Fid%251.json"]
+        assert conv_id in self._reload(manager).conversation_states
+
+    def test_eviction_removes_shard(self, manager):
+        import time
+        from app.utils.file_state_manager import _CONVERSATION_TTL_SECONDS
+        manager.initialize_conversation("old", {"a.py": "one"})
+        manager._save_state()
+        manager._conversation_access_times["old"] = time.time() - _CONVERSATION_TTL_SECONDS - 10
+        manager._save_state()
+        assert not os.path.exists(self._shard(manager, "old"))
+
+    def test_expired_shards_are_not_loaded(self, manager):
+        import time
+        from app.utils.file_state_manager import _CONVERSATION_TTL_SECONDS
+        manager.initialize_conversation("old", {"a.py": "one"})
+        manager._save_state()
+        stale = time.time() - _CONVERSATION_TTL_SECONDS - 10
+        os.utime(self._shard(manager, "old"), (stale, stale))
+
+        mgr2 = self._reload(manager)
+        assert "old" not in mgr2.conversation_states
+        assert not os.path.exists(self._shard(manager, "old"))
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -12,6 +12,7 @@ from unittest.mock import MagicMock, patch
 
 from app.utils.file_watcher import FileChangeHandler
 from app.utils.file_state_manager import FileStateManager
+from app.utils.gitignore_parser import parse_gitignore_patterns
 
 
 @pytest.fixture
@@ -100,7 +101,7 @@ class TestShouldIgnorePathWithParentBaseDir:
         # because get_ignored_patterns scans from root which lacks one)
         handler._ignored_patterns_loaded = True
         handler.ignored_patterns = []
-        handler.should_ignore_fn = lambda path: False
+        handler.should_ignore_fn = parse_gitignore_patterns([])
 
         abs_path = str(
             temp_project["project"] / "templates" / "static" / "js" / "app.js"
@@ -116,7 +117,7 @@ class TestShouldIgnorePathWithParentBaseDir:
         )
         handler._ignored_patterns_loaded = True
         handler.ignored_patterns = []
-        handler.should_ignore_fn = lambda path: False
+        handler.should_ignore_fn = parse_gitignore_patterns([])
 
         abs_path = str(temp_project["project"] / "build" / "output.bin")
         assert handler._should_ignore_path(abs_path) is True
@@ -129,7 +130,7 @@ class TestShouldIgnorePathWithParentBaseDir:
         )
         handler._ignored_patterns_loaded = True
         handler.ignored_patterns = []
-        handler.should_ignore_fn = lambda path: False
+        handler.should_ignore_fn = parse_gitignore_patterns([])
 
         abs_path = str(temp_project["project"] / "src" / "main.py")
         assert handler._should_ignore_path(abs_path) is False
@@ -142,7 +143,7 @@ class TestShouldIgnorePathWithParentBaseDir:
         )
         handler._ignored_patterns_loaded = True
         handler.ignored_patterns = []
-        handler.should_ignore_fn = lambda path: False
+        handler.should_ignore_fn = parse_gitignore_patterns([])
 
         abs_path = str(
             temp_project["project"] / "templates" / "static" / "js" / "app.js"
@@ -220,7 +221,7 @@ class TestNestedGitignoreFiles:
         )
         handler._ignored_patterns_loaded = True
         handler.ignored_patterns = []
-        handler.should_ignore_fn = lambda path: False
+        handler.should_ignore_fn = parse_gitignore_patterns([])
 
         # File under subdir/output/ should be ignored by subdir's .gitignore
         abs_path = str(output_dir / "result.txt")
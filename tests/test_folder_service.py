@@ -350,40 +350,73 @@ class TestPhase1PartialPublish:
             assert any(('lvl0' in snap or 'top.py' in snap) for snap in captured)
 
 
-class TestEstimationCancellation:
-    """Pins the cancel-check inside estimate_directory_count/quick_count
-    (directory_util.py:543). quick_count is a separate top-level function that
-    reads the scan cancel flag with no directory threaded in today; the
-    per-path (Piece 3) refactor must keep estimation short-circuiting to 0 when
-    the scanning directory is cancelled. Empirically verified: a normal
-    estimate returns >0, a cancelled one returns 0.
-    """
+class TestParallelScan:
+    """The worker-pool scanner produces the same tree at any pool size and
+    derives its progress estimate from the scan itself."""
 
     def setup_method(self):
         import app.utils.directory_util as du
+        du._scan_progress["active"] = False
         du._scan_progress["cancelled"] = False
+        du._scan_progress["partial_tree"] = None
 
-    def teardown_method(self):
-        import app.utils.directory_util as du
-        du._scan_progress["cancelled"] = False
+    def _make_tree(self, root):
+        for i in range(4):
+            p = root
+            for j in range(9):
+                p = os.path.join(p, f"b{i}_{j}")
+                os.makedirs(p, exist_ok=True)
+                with open(os.path.join(p, f"m{j}.py"), "w") as f:
+                    f.write("value = 1\n" * (j + 1))
+
+    def test_same_tree_for_any_worker_count(self, monkeypatch):
+        from app.utils.directory_util import get_folder_structure, get_ignored_patterns
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self._make_tree(tmp)
+            ignored = get_ignored_patterns(tmp)
+            monkeypatch.setenv("ZIYA_SCAN_WORKERS", "1")
+            serial = get_folder_structure(tmp, ignored, max_depth=15)
+            monkeypatch.setenv("ZIYA_SCAN_WORKERS", "8")
+            parallel = get_folder_structure(tmp, ignored, max_depth=15)
+
+        assert serial == parallel
+        assert len(serial) == 4
+
+    def test_concurrent_scans_of_one_tree_are_independent(self):
+        """One scan's visited set must not hide directories from another."""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.utils.directory_util import get_folder_structure, get_ignored_patterns
 
-    def test_estimation_short_circuits_when_cancelled(self):
-        import app.utils.directory_util as du
-        from app.utils.directory_util import (
-            estimate_directory_count, get_ignored_patterns,
-        )
         with tempfile.TemporaryDirectory() as tmp:
-            for i in range(5):
-                os.makedirs(os.path.join(tmp, f"d{i}", "sub"))
+            self._make_tree(tmp)
             ignored = get_ignored_patterns(tmp)
+            expected = get_folder_structure(tmp, ignored, max_depth=15)
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(
+                    lambda _: get_folder_structure(tmp, ignored, max_depth=15), range(4)))
 
-            du._scan_progress["cancelled"] = False
-            normal = estimate_directory_count(tmp, ignored)
-            assert normal > 0, "non-cancelled estimate should count directories"
+        assert all(r == expected for r in results)
 
-            du._scan_progress["cancelled"] = True
-            cancelled = estimate_directory_count(tmp, ignored)
-            assert cancelled == 0, "cancelled estimate must short-circuit to 0"
+    def test_deep_tokens_roll_up_and_estimate_comes_from_scan(self):
+        import app.utils.directory_util as du
+        from app.utils.directory_util import get_folder_structure, get_ignored_patterns
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self._make_tree(tmp)
+            ignored = get_ignored_patterns(tmp)
+            result = get_folder_structure(tmp, ignored, max_depth=15)
+            progress = du.get_scan_progress(tmp)
+
+        def file_total(node):
+            return sum(file_total(c) if 'children' in c else max(c['token_count'], 0)
+                       for c in node['children'].values())
+
+        top = result['b0_0']
+        assert top['token_count'] == file_total(top) > 0
+        # 1 root + 4 chains of 9 directories, all discovered by the scan
+        assert progress['estimated_total'] == 37
+        assert progress['progress']['directories'] == 37
 
 
 class TestScanStateCharacterization:
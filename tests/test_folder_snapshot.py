@@ -0,0 +1,172 @@
+"""Tests for persisted folder-tree snapshots and their revalidation."""
+import os
+
+import pytest
+
+from app.services import folder_snapshot
+from app.utils.directory_util import get_folder_structure, get_ignored_patterns
+
+
+def _write(path, text="x = 1\n"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _bump_mtime(path):
+    """Make a directory's mtime visibly move on coarse-grained filesystems."""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZIYA_HOME", str(tmp_path / "home"))
+    folder_snapshot._snapshots.clear()
+    folder_snapshot._dirty.clear()
+    root = tmp_path / "proj"
+    _write(str(root / "src" / "main.py"), "print('hello world')\n" * 20)
+    _write(str(root / "src" / "util" / "helpers.py"), "def f():\n    return 1\n" * 10)
+    _write(str(root / "old" / "gone.py"))
+    _write(str(root / "README.md"), "# readme\n" * 5)
+    root = str(root)
+    patterns = get_ignored_patterns(root)
+    yield root, patterns
+    folder_snapshot._snapshots.clear()
+    folder_snapshot._dirty.clear()
+
+
+def _scan_and_persist(root, patterns):
+    sink = folder_snapshot.new_stat_sink()
+    tree = get_folder_structure(root, patterns, 15, stat_sink=sink)
+    folder_snapshot.store(root, patterns, 15, tree, sink)
+    folder_snapshot.flush()
+    folder_snapshot._snapshots.clear()
+    return tree, sink
+
+
+class TestStatSink:
+
+    def test_records_dirs_and_files(self, project):
+        root, patterns = project
+        _, sink = _scan_and_persist(root, patterns)
+        assert '' in sink['dirs']
+        assert os.path.join('src', 'util') in sink['dirs']
+        assert sink['dirs'][''][1] == 0
+        assert sink['files'][os.path.join('src', 'main.py')] == os.path.getsize(
+            os.path.join(root, 'src', 'main.py'))
+        assert sink['complete'] is True
+
+
+class TestLoad:
+
+    def test_reload_from_disk_matches_scan(self, project):
+        root, patterns = project
+        tree, _ = _scan_and_persist(root, patterns)
+        snapshot = folder_snapshot.load(root, patterns, 15)
+        assert snapshot is not None
+        assert snapshot.tree == tree
+
+    def test_other_settings_ignore_snapshot(self, project):
+        root, patterns = project
+        _scan_and_persist(root, patterns)
+        assert folder_snapshot.load(root, patterns, 7) is None
+        assert folder_snapshot.load(root, patterns + [("extra", root)], 15) is None
+
+    def test_missing_snapshot(self, project):
+        root, patterns = project
+        assert folder_snapshot.load(root, patterns, 15) is None
+
+
+class TestRevalidate:
+
+    def test_unchanged_tree_is_kept(self, project):
+        root, patterns = project
+        tree, _ = _scan_and_persist(root, patterns)
+        snapshot = folder_snapshot.load(root, patterns, 15)
+        assert folder_snapshot.revalidate(snapshot)
+        assert snapshot.tree == tree
+
+    def test_picks_up_changes_made_while_down(self, project):
+        root, patterns = project
+        _scan_and_persist(root, patterns)
+
+        _write(os.path.join(root, "src", "new.py"), "y = 2\n" * 30)
+        _write(os.path.join(root, "fresh", "lib2", "mod.py"), "z = 3\n" * 30)
+        os.unlink(os.path.join(root, "old", "gone.py"))
+        os.rmdir(os.path.join(root, "old"))
+        _write(os.path.join(root, "src", "util", "helpers.py"), "def f():\n    return 1\n" * 500)
+        for d in ("", "src"):
+            _bump_mtime(os.path.join(root, d))
+
+        snapshot = folder_snapshot.load(root, patterns, 15)
+        assert folder_snapshot.revalidate(snapshot)
+
+        expected = get_folder_structure(root, patterns, 15)
+        assert snapshot.tree == expected
+        assert 'old' not in snapshot.tree
+        assert os.path.join('old', 'gone.py') not in snapshot.files
+        assert os.path.join("fresh", "lib2") in snapshot.dirs
+
+    def test_cancelled_pass_returns_false(self, project):
+        root, patterns = project
+        _scan_and_persist(root, patterns)
+        snapshot = folder_snapshot.load(root, patterns, 15)
+        assert folder_snapshot.revalidate(snapshot, progress={"cancelled": True}) is False
+
+
+class TestIncrementalUpdates:
+
+    def test_note_file_persists_hook_updates(self, project):
+        root, patterns = project
+        sink = folder_snapshot.new_stat_sink()
+        tree = get_folder_structure(root, patterns, 15, stat_sink=sink)
+        folder_snapshot.store(root, patterns, 15, tree, sink)
+
+        rel = os.path.join("src", "added.py")
+        _write(os.path.join(root, rel), "a = 1\n" * 40)
+        tree["src"]["children"]["added.py"] = {"token_count": 10}
+        folder_snapshot.note_file(root, rel, tree)
+        folder_snapshot.flush()
+
+        folder_snapshot._snapshots.clear()
+        snapshot = folder_snapshot.load(root, patterns, 15)
+        assert "added.py" in snapshot.tree["src"]["children"]
+        assert snapshot.files[rel] == os.path.getsize(os.path.join(root, rel))
+
+    def test_note_file_ignores_foreign_tree(self, project):
+        root, patterns = project
+        sink = folder_snapshot.new_stat_sink()
+        tree = get_folder_structure(root, patterns, 15, stat_sink=sink)
+        folder_snapshot.store(root, patterns, 15, tree, sink)
+        folder_snapshot.flush()
+
+        rel = os.path.join("src", "main.py")
+        before = folder_snapshot._snapshots[root].files[rel]
+        _write(os.path.join(root, rel), "changed\n" * 100)
+        folder_snapshot.note_file(root, rel, {"src": {}})
+        assert folder_snapshot._snapshots[root].files[rel] == before
+        assert root not in folder_snapshot._dirty
+
+
+class TestServedAfterRestart:
+
+    def test_snapshot_served_then_revalidated(self, project):
+        import app.services.folder_service as svc
+        import app.utils.directory_util as du
+        root, patterns = project
+        tree, _ = _scan_and_persist(root, patterns)
+        svc._folder_cache.clear()
+        svc._background_scan_threads.clear()
+        du._folder_cache.clear()
+        du._scan_progress_by_dir.clear()
+
+        result = svc.get_cached_folder_structure(root, patterns, 15)
+        assert result.get("_stale_and_scanning") is True
+        assert "src" in result
+
+        svc._background_scan_threads[root].join(timeout=5.0)
+        entry = svc._folder_cache[root]
+        assert entry['scan_complete'] is True
+        assert entry['data'] == tree
+        assert du._progress_slot(root)["active"] is False
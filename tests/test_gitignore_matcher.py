@@ -0,0 +1,66 @@
+"""
+Tests for the compiled gitignore matcher returned by parse_gitignore_patterns.
+
+Verifies that:
+1. Combining rules into per-base regexes keeps the per-rule results,
+   including last-match-wins negation across nested .gitignore files.
+2. filter_names checks a directory listing in one call.
+3. is_ignored_dir memoizes decisions per directory.
+"""
+
+import os
+import random
+
+from app.utils.gitignore_parser import (
+    GitignoreMatcher, _normalize_path, handle_negation, parse_gitignore_patterns,
+    rule_from_pattern,
+)
+
+ROOT = os.path.abspath(os.sep + "ws")
+
+
+def _rule_by_rule(patterns):
+    rules = [r for r in (rule_from_pattern(p, base_path=_normalize_path(d)) for p, d in patterns) if r]
+    return lambda path: handle_negation(path, rules)
+
+
+class TestGitignoreMatcher:
+
+    def test_matches_rule_by_rule_evaluation(self):
+        rng = random.Random(7)
+        dirs = [ROOT, f"{ROOT}/a", f"{ROOT}/a/b", f"{ROOT}/c"]
+        pats = ["*.pyc", "build/", "!keep.pyc", "node_modules", "/dist",
+                "a/b", "**/logs", "*", "!*.md", "!build/", "[ab]*.txt"]
+        names = ["x.pyc", "keep.pyc", "build", "node_modules", "dist",
+                 "logs", "readme.md", "a.txt", "a", "b", "c"]
+        for _ in range(200):
+            patterns = [(rng.choice(pats), rng.choice(dirs)) for _ in range(rng.randint(0, 6))]
+            expected = _rule_by_rule(patterns)
+            matcher = parse_gitignore_patterns(patterns)
+            for _ in range(20):
+                path = os.path.join(ROOT, *[rng.choice(names) for _ in range(rng.randint(0, 3))])
+                for candidate in (path, path + "/"):
+                    assert matcher(candidate) == expected(candidate), (patterns, candidate)
+
+    def test_nested_negation_overrides_parent_rule(self):
+        matcher = parse_gitignore_patterns([
+            ("*.log", ROOT),
+            ("!keep.log", f"{ROOT}/pkg"),
+        ])
+        assert isinstance(matcher, GitignoreMatcher)
+        assert matcher(f"{ROOT}/pkg/debug.log")
+        assert not matcher(f"{ROOT}/pkg/keep.log")
+        assert matcher(f"{ROOT}/other/keep.log")
+
+    def test_filter_names_applies_directory_only_negation(self):
+        matcher = parse_gitignore_patterns([("build*", ROOT), ("!build/", ROOT)])
+        names = ["build", "build.txt", "src"]
+        assert matcher.filter_names(ROOT, names, dirs=True) == ["build", "src"]
+        assert matcher.filter_names(ROOT, names) == ["src"]
+
+    def test_is_ignored_dir_is_memoized(self):
+        matcher = parse_gitignore_patterns([("node_modules/", ROOT)])
+        path = f"{ROOT}/web/node_modules"
+        assert matcher.is_ignored_dir(path)
+        assert matcher._dir_decisions[path] is True
+        assert not matcher.is_ignored_dir(f"{ROOT}/web/src")
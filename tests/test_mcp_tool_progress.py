@@ -0,0 +1,169 @@
+"""
+Tests for incremental tool output streamed while an MCP tool call runs.
+
+Verifies that:
+1. ToolOutputBuffer merges chunks and keeps only the newest output past
+   its bound.
+2. MCPClient attaches a progress token when a sink is set and routes the
+   matching notifications/progress to it.
+3. The shell server emits stdout/stderr chunks as progress notifications
+   ahead of the final response.
+4. execute_single_tool surfaces the chunks as tool_progress events.
+"""
+
+import asyncio
+import json
+import os
+import types
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.mcp.tool_progress import ToolOutputBuffer, tool_output_sink
+
+
+class TestToolOutputBuffer:
+
+    def test_drain_merges_adjacent_chunks(self):
+        buf = ToolOutputBuffer()
+        buf.feed("stdout", "a\n")
+        buf.feed("stdout", "b\n")
+        buf.feed("stderr", "warn\n")
+        buf.feed("stdout", "c\n")
+        assert buf.drain() == [("stdout", "a\nb\n"), ("stderr", "warn\n"), ("stdout", "c\n")]
+        assert buf.drain() == []
+
+    def test_keeps_newest_output_past_bound(self):
+        buf = ToolOutputBuffer(max_chars=10)
+        buf.feed("stdout", "0123456789")
+        buf.feed("stdout", "abcd")
+        notice, (stream, text) = buf.drain()
+        assert "4 characters of output skipped" in notice[1]
+        assert (stream, text) == ("stdout", "456789abcd")
+
+
+class _FakeStdout:
+    def __init__(self):
+        self.q: asyncio.Queue = asyncio.Queue()
+
+    async def readline(self) -> bytes:
+        return await self.q.get()
+
+
+class _FakeStdin:
+    def __init__(self, on_write):
+        self._on_write = on_write
+
+    def write(self, data: bytes):
+        self._on_write(json.loads(data.decode()))
+
+    async def drain(self):
+        await asyncio.sleep(0)
+
+
+def _line(message) -> bytes:
+    return (json.dumps(message) + "\n").encode()
+
+
+class TestClientRoutesProgress:
+
+    async def test_notifications_reach_sink_of_their_call(self):
+        from app.mcp.client import MCPClient
+
+        client = MCPClient({"name": "shell", "command": ["echo"]})
+        client.is_connected = True
+        stdout = _FakeStdout()
+        seen_requests = []
+
+        def server(req):
+            seen_requests.append(req)
+            token = req["params"]["_meta"]["progressToken"]
+            for stream, text in (("stdout", "building\n"), ("stderr", "warning\n")):
+                stdout.q.put_nowait(_line({
+                    "jsonrpc": "2.0", "method": "notifications/progress",
+                    "params": {"progressToken": token, "progress": 1,
+                               "message": text, "stream": stream}}))
+            stdout.q.put_nowait(_line({"jsonrpc": "2.0", "id": req["id"],
+                                       "result": {"content": [{"type": "text", "text": "done"}]}}))
+
+        client.process = types.SimpleNamespace(
+            returncode=None, stdout=stdout, stdin=_FakeStdin(server), stderr=None)
+
+        received = []
+        token = tool_output_sink.set(lambda stream, text: received.append((stream, text)))
+        try:
+            result = await client.call_tool("run_shell_command", {"command": "make"})
+        finally:
+            tool_output_sink.reset(token)
+
+        assert result["content"][0]["text"] == "done"
+        assert received == [("stdout", "building\n"), ("stderr", "warning\n")]
+        assert client._progress_sinks == {}
+        client._reader_task.cancel()
+
+    async def test_no_token_without_sink(self):
+        from app.mcp.client import MCPClient
+
+        client = MCPClient({"name": "shell", "command": ["echo"]})
+        client._send_request = AsyncMock(return_value={"content": [{"type": "text", "text": "ok"}]})
+        await client.call_tool("run_shell_command", {"command": "ls"})
+        assert "_meta" not in client._send_request.call_args.args[1]
+
+
+class TestShellServerEmitsProgress:
+
+    async def test_output_precedes_response(self, monkeypatch, capsys):
+        from app.mcp_servers.shell_server import ShellServer
+        monkeypatch.setenv("ZIYA_USER_CODEBASE_DIR", os.getcwd())
+        srv = ShellServer()
+
+        await srv._serve({
+            "jsonrpc": "2.0", "id": 7, "method": "tools/call",
+            "params": {"name": "run_shell_command",
+                       "arguments": {"command": "echo hello"},
+                       "_meta": {"progressToken": "tok"}}})
+
+        messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        progress = [m for m in messages if m.get("method") == "notifications/progress"]
+        assert progress and messages[-1]["id"] == 7
+        assert all(m["params"]["progressToken"] == "tok" for m in progress)
+        assert "".join(m["params"]["message"] for m in progress) == "hello\n"
+
+
+class TestExecuteSingleToolProgress:
+
+    async def test_yields_tool_progress_before_result(self):
+        from app.tool_execution import ToolExecContext, execute_single_tool
+
+        async def call_tool(name, args, server_name=None):
+            sink = tool_output_sink.get()
+            sink("stdout", "step 1\n")
+            await asyncio.sleep(0.2)
+            sink("stdout", "step 2\n")
+            return {"content": [{"type": "text", "text": "step 1\nstep 2\n"}]}
+
+        mock_mcp = MagicMock()
+        mock_mcp.call_tool = call_tool
+        executor = MagicMock()
+        executor._format_tool_result.return_value = "step 1\nstep 2\n"
+        ctx = ToolExecContext(
+            tool_id="toolu_1", tool_name="mcp_run_shell_command",
+            actual_tool_name="run_shell_command", args={"command": "make"},
+            all_tools=[], internal_tool_names=set(), mcp_manager=mock_mcp,
+            project_root=None, conversation_id=None, conversation=[],
+            recent_commands=[],
+            inter_tool_delay={"current": 0.0, "min": 0.0, "decay_factor": 0.9},
+            iteration_start_time=0.0, track_yield_fn=lambda x: x,
+            drain_feedback_fn=lambda: [], executor=executor,
+        )
+
+        with patch("app.mcp.signing.verify_tool_result", return_value=(True, None)), \
+             patch("app.utils.tool_audit_log.log_tool_execution"), \
+             patch("app.utils.tool_result_sanitizer.sanitize_for_context",
+                   side_effect=lambda t, **kw: t):
+            events = [e async for e in execute_single_tool(ctx)]
+
+        types_seen = [e["type"] for e in events]
+        progress = [e for e in events if e["type"] == "tool_progress"]
+        assert [e["output"] for e in progress] == ["step 1\n", "step 2\n"]
+        assert all(e["tool_id"] == "toolu_1" for e in progress)
+        assert types_seen.index("tool_progress") < types_seen.index("tool_display")
+        assert tool_output_sink.get() is None
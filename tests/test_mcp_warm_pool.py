@@ -0,0 +1,159 @@
+"""
+Tests for the warm pool of pre-spawned workspace-scoped MCP instances.
+
+Verifies that:
+1. A checkout hands out a ready instance and refills the pool.
+2. Instances spawned under a different env fingerprint are discarded.
+3. Idle instances are reaped after the TTL.
+4. MCPManager binds a pooled instance instead of spawning, and reports
+   pool metrics through get_server_status().
+5. The shell server accepts exactly one workspace binding.
+"""
+
+import asyncio
+import os
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.mcp.instance_pool import WarmInstancePool
+
+
+def _fake_client(fingerprint="env"):
+    client = MagicMock()
+    client.server_config = {"env": fingerprint}
+    client.is_connected = True
+    client._is_process_healthy.return_value = True
+    client.disconnect = AsyncMock()
+    client.bind_workspace = AsyncMock(return_value=True)
+    return client
+
+
+def _pool(size=2, idle_ttl=300, fingerprint="env"):
+    spawned = []
+
+    async def spawn():
+        client = _fake_client(fingerprint)
+        spawned.append(client)
+        return client
+
+    pool = WarmInstancePool("shell", size, idle_ttl, spawn, lambda config: config["env"])
+    return pool, spawned
+
+
+async def _settle(pool):
+    while pool._spawn_tasks:
+        await asyncio.gather(*pool._spawn_tasks)
+
+
+class TestWarmInstancePool:
+
+    async def test_checkout_hits_and_refills(self):
+        pool, spawned = _pool()
+        pool.fill()
+        await _settle(pool)
+        assert pool.stats()["idle"] == 2
+
+        client = await pool.checkout("env")
+        assert client is spawned[0]
+        await _settle(pool)
+        assert pool.stats() == {"size": 2, "idle": 2, "spawning": 0,
+                                "hits": 1, "misses": 0, "reaped": 0}
+
+    async def test_empty_pool_is_a_miss(self):
+        pool, _ = _pool()
+        assert await pool.checkout("env") is None
+        assert pool.misses == 1
+        await pool.drain()
+
+    async def test_stale_fingerprint_is_discarded(self):
+        pool, spawned = _pool(size=1, fingerprint="old-env")
+        pool.fill()
+        await _settle(pool)
+
+        assert await pool.checkout("new-env") is None
+        spawned[0].disconnect.assert_awaited_once()
+        await pool.drain()
+
+    async def test_reap_after_ttl(self):
+        pool, spawned = _pool(idle_ttl=60)
+        pool.fill()
+        await _settle(pool)
+
+        assert await pool.reap(time.time() + 30) == 0
+        assert await pool.reap(time.time() + 61) == 2
+        assert pool.stats()["idle"] == 0 and pool.reaped == 2
+        for client in spawned:
+            client.disconnect.assert_awaited_once()
+
+
+@pytest.fixture
+def mcp_manager():
+    with patch('app.mcp.manager.MCPClient'), \
+         patch('app.mcp.manager.get_dynamic_loader'):
+        from app.mcp.manager import MCPManager
+        manager = MCPManager()
+        manager.server_configs = {
+            "shell": {"command": "python", "args": [], "workspace_scoped": True,
+                      "prewarm": True, "builtin": True},
+        }
+        manager.is_initialized = True
+        return manager
+
+
+class TestManagerUsesWarmPool:
+
+    async def test_checkout_binds_instead_of_spawning(self, mcp_manager, tmp_path):
+        warm = _fake_client()
+        warm.server_config = mcp_manager._workspace_spawn_config("shell")
+        pool = WarmInstancePool("shell", 1, 300, AsyncMock(return_value=None),
+                                mcp_manager._spawn_fingerprint)
+        pool._idle.append((warm, mcp_manager._spawn_fingerprint(warm.server_config), time.time()))
+        mcp_manager._warm_pools["shell"] = pool
+        mcp_manager._spawn_workspace_client = AsyncMock()
+
+        client = await mcp_manager._get_or_create_workspace_client("shell", str(tmp_path), "conv-1")
+
+        assert client is warm
+        warm.bind_workspace.assert_awaited_once_with(str(tmp_path), f"shell@{tmp_path.name}")
+        mcp_manager._spawn_workspace_client.assert_not_awaited()
+        assert mcp_manager.workspace_scoped_clients["shell"][f"{tmp_path}::conv-1"] is warm
+        assert mcp_manager.get_server_status()["shell"]["warm_pool"]["hits"] == 1
+        await pool.drain()
+
+    async def test_refused_binding_falls_back_to_spawn(self, mcp_manager, tmp_path):
+        warm = _fake_client()
+        warm.server_config = mcp_manager._workspace_spawn_config("shell")
+        warm.bind_workspace = AsyncMock(return_value=False)
+        pool = WarmInstancePool("shell", 1, 300, AsyncMock(return_value=None),
+                                mcp_manager._spawn_fingerprint)
+        pool._idle.append((warm, mcp_manager._spawn_fingerprint(warm.server_config), time.time()))
+        mcp_manager._warm_pools["shell"] = pool
+        fresh = _fake_client()
+        mcp_manager._spawn_workspace_client = AsyncMock(return_value=fresh)
+
+        client = await mcp_manager._get_or_create_workspace_client("shell", str(tmp_path))
+
+        assert client is fresh
+        warm.disconnect.assert_awaited_once()
+        mcp_manager._spawn_workspace_client.assert_awaited_once_with("shell", str(tmp_path))
+        await pool.drain()
+
+
+class TestShellServerBinding:
+
+    async def test_bind_once(self, monkeypatch, tmp_path):
+        from app.mcp_servers.shell_server import ShellServer
+        monkeypatch.chdir(os.getcwd())
+        monkeypatch.setenv("ZIYA_USER_CODEBASE_DIR", os.getcwd())
+        srv = ShellServer()
+
+        response = await srv.handle_request(
+            {"id": 1, "method": "ziya/bindWorkspace", "params": {"path": str(tmp_path)}})
+        assert response["result"] == {"workspace": str(tmp_path)}
+        assert os.environ["ZIYA_USER_CODEBASE_DIR"] == str(tmp_path)
+
+        again = await srv.handle_request(
+            {"id": 2, "method": "ziya/bindWorkspace", "params": {"path": str(tmp_path)}})
+        assert "error" in again
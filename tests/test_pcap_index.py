@@ -0,0 +1,86 @@
+"""
+Tests for the persistent per-capture index (app/utils/pcap_index.py).
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.utils import pcap_index
+from app.utils.pcap_index import CaptureIndex, CACHE_DIR_NAME
+from app.utils.pcap_stream import PcapFile, scan_capture
+
+from tests.test_pcap_stream import _sample_packets, _write_pcap, _write_pcapng
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZIYA_USER_CODEBASE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture(params=["pcap", "pcapng"])
+def capture_path(request, project):
+    path = project / f"sample.{request.param}"
+    writer = _write_pcap if request.param == "pcap" else _write_pcapng
+    writer(str(path), _sample_packets())
+    return str(path)
+
+
+class TestCaptureIndex:
+    def test_build_persists_under_project(self, capture_path, project):
+        index = CaptureIndex.get_or_build(capture_path)
+        assert index.packet_count == 8
+        assert index.cache_dir.parent == project / CACHE_DIR_NAME
+        assert sorted(os.listdir(index.cache_dir)) == ["aggregates.json", "meta.json", "offsets.bin", "packets.npy"]
+
+    def test_second_call_does_not_rescan(self, capture_path):
+        built = CaptureIndex.get_or_build(capture_path)
+        with patch.object(pcap_index, "scan_capture", side_effect=AssertionError("rescanned")):
+            loaded = CaptureIndex.get_or_build(capture_path)
+        assert list(loaded.offsets) == list(built.offsets)
+        assert loaded.tcp_health() == built.tcp_health()
+        assert loaded.flow_statistics() == built.flow_statistics()
+        assert loaded.top_talkers(limit=2) == built.top_talkers(limit=2)
+        assert loaded.dns_queries == built.dns_queries
+        assert loaded.time_range() == built.time_range()
+
+    def test_loaded_results_match_fresh_scan(self, capture_path):
+        CaptureIndex.get_or_build(capture_path)
+        loaded = CaptureIndex.load(capture_path)
+        fresh = scan_capture(capture_path)
+        assert loaded.protocols == fresh.protocols
+        assert loaded.unique_ips() == fresh.unique_ips()
+        assert loaded.dscp_distribution() == fresh.dscp_distribution()
+        assert loaded.ipv6_stats() == fresh.ipv6_stats()
+        assert loaded.flow_statistics(limit=1) == fresh.flow_statistics(limit=1)
+
+    def test_random_access_from_loaded_index(self, capture_path):
+        CaptureIndex.get_or_build(capture_path)
+        loaded = CaptureIndex.load(capture_path)
+        with PcapFile(capture_path) as capture:
+            if capture.format == "pcapng":
+                capture.sections = loaded.sections
+            record = capture.read_at(loaded.offsets[4], 4)
+        assert record.data == _sample_packets()[4][1]
+
+    def test_rewritten_capture_is_reindexed(self, capture_path):
+        CaptureIndex.get_or_build(capture_path)
+        writer = _write_pcap if capture_path.endswith(".pcap") else _write_pcapng
+        writer(capture_path, _sample_packets()[:3])
+        assert CaptureIndex.load(capture_path) is None
+        assert CaptureIndex.get_or_build(capture_path).packet_count == 3
+
+    def test_results_are_copies(self, capture_path):
+        index = CaptureIndex.get_or_build(capture_path)
+        index.tcp_health()["per_ip_health"].clear()
+        index.flow_statistics()[0]["packet_count"] = -1
+        assert index.tcp_health()["per_ip_health"]
+        assert index.flow_statistics()[0]["packet_count"] == 4
+
+    def test_unwritable_cache_still_analyses(self, capture_path):
+        with patch.object(CaptureIndex, "_persist", side_effect=OSError("read-only")):
+            index = CaptureIndex.get_or_build(capture_path)
+        assert index.packet_count == 8
+        assert CaptureIndex.load(capture_path) is None
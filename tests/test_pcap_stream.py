@@ -0,0 +1,259 @@
+"""
+Tests for the streaming PCAP engine (app/utils/pcap_stream.py).
+
+Captures are built in-memory with struct so the tests need neither scapy
+nor any capture files on disk beyond tmp_path.
+"""
+
+import socket
+import struct
+
+import pytest
+
+from app.utils.pcap_stream import (
+    PcapFile, decode_packet, scan_capture, tcp_flags_str,
+    LINKTYPE_ETHERNET, MAX_ISSUES_PER_IP,
+)
+from app.utils.pcap_reader import PCAPReader
+
+
+# ── packet builders ──────────────────────────────────────────────────
+
+def _ipv4(src, dst, proto, payload, tos=0):
+    header = struct.pack("!BBHHHBBH4s4s", 0x45, tos, 20 + len(payload), 0, 0, 64, proto, 0,
+                         socket.inet_aton(src), socket.inet_aton(dst))
+    return header + payload
+
+
+def _ipv6(src, dst, nh, payload):
+    header = struct.pack("!IHBB16s16s", 6 << 28, len(payload), nh, 64,
+                         socket.inet_pton(socket.AF_INET6, src),
+                         socket.inet_pton(socket.AF_INET6, dst))
+    return header + payload
+
+
+def _tcp(sport, dport, seq=0, ack=0, flags="", window=1024, data=b""):
+    bits = sum(1 << "FSRPAUECN".index(c) for c in flags)
+    return struct.pack("!HHIIHHHH", sport, dport, seq, ack, (5 << 12) | bits, window, 0, 0) + data
+
+
+def _udp(sport, dport, data=b""):
+    return struct.pack("!HHHH", sport, dport, 8 + len(data), 0) + data
+
+
+def _ether(l3, ethertype=0x0800):
+    return b"\x00" * 12 + struct.pack("!H", ethertype) + l3
+
+
+def _dns_query(name, qtype=1):
+    labels = b"".join(bytes([len(p)]) + p.encode() for p in name.split(".")) + b"\x00"
+    return struct.pack("!HHHHHH", 1, 0x0100, 1, 0, 0, 0) + labels + struct.pack("!HH", qtype, 1)
+
+
+def _dns_response(name, address):
+    labels = b"".join(bytes([len(p)]) + p.encode() for p in name.split(".")) + b"\x00"
+    question = labels + struct.pack("!HH", 1, 1)
+    answer = b"\xc0\x0c" + struct.pack("!HHIH", 1, 1, 60, 4) + socket.inet_aton(address)
+    return struct.pack("!HHHHHH", 1, 0x8180, 1, 1, 0, 0) + question + answer
+
+
+def _write_pcap(path, packets, linktype=LINKTYPE_ETHERNET):
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, linktype))
+        for ts, data in packets:
+            f.write(struct.pack("<IIII", int(ts), int(round((ts % 1) * 1e6)), len(data), len(data)))
+            f.write(data)
+
+
+def _pad4(b):
+    return b + b"\x00" * (-len(b) % 4)
+
+
+def _write_pcapng(path, packets, linktype=LINKTYPE_ETHERNET):
+    def block(block_type, body):
+        body = _pad4(body)
+        length = 12 + len(body)
+        return struct.pack("<II", block_type, length) + body + struct.pack("<I", length)
+
+    with open(path, "wb") as f:
+        f.write(block(0x0A0D0D0A, struct.pack("<IHHq", 0x1A2B3C4D, 1, 0, -1)))
+        # if_tsresol = 9 (nanoseconds)
+        options = struct.pack("<HHB", 9, 1, 9) + b"\x00" * 3 + struct.pack("<HH", 0, 0)
+        f.write(block(0x00000001, struct.pack("<HHI", linktype, 0, 65535) + options))
+        for ts, data in packets:
+            ticks = int(round(ts * 1e9))
+            f.write(block(0x00000006, struct.pack("<IIIII", 0, ticks >> 32, ticks & 0xFFFFFFFF,
+                                                  len(data), len(data)) + _pad4(data)))
+
+
+def _sample_packets():
+    return [
+        (1.0, _ether(_ipv4("10.0.0.1", "10.0.0.2", 6, _tcp(1234, 80, seq=100, flags="S")))),
+        (1.1, _ether(_ipv4("10.0.0.2", "10.0.0.1", 6, _tcp(80, 1234, seq=500, ack=101, flags="SA")))),
+        (1.2, _ether(_ipv4("10.0.0.1", "10.0.0.2", 6, _tcp(1234, 80, seq=101, flags="PA", data=b"GET /")))),
+        (1.3, _ether(_ipv4("10.0.0.1", "10.0.0.2", 6, _tcp(1234, 80, seq=101, flags="PA", data=b"GET /")))),
+        (1.4, _ether(_ipv4("10.0.0.3", "10.0.0.53", 17, _udp(5000, 53, _dns_query("example.com")), tos=46 << 2))),
+        (1.5, _ether(_ipv4("10.0.0.53", "10.0.0.3", 17, _udp(53, 5000, _dns_response("example.com", "93.184.216.34"))))),
+        (1.6, _ether(_ipv6("fe80::1", "fe80::2", 17, _udp(4000, 4789)), ethertype=0x86DD)),
+        (1.7, _ether(_ipv4("10.0.0.4", "10.0.0.2", 6, _tcp(999, 22, flags="S")))),
+    ]
+
+
+@pytest.fixture(params=["pcap", "pcapng"])
+def capture_path(request, tmp_path):
+    path = tmp_path / f"sample.{request.param}"
+    writer = _write_pcap if request.param == "pcap" else _write_pcapng
+    writer(str(path), _sample_packets())
+    return str(path)
+
+
+class TestPcapFile:
+    def test_streams_every_record(self, capture_path):
+        with PcapFile(capture_path) as capture:
+            records = list(capture)
+        assert [r.index for r in records] == list(range(8))
+        assert records[0].timestamp == pytest.approx(1.0)
+        assert records[-1].timestamp == pytest.approx(1.7)
+        assert [r.data for r in records] == [d for _, d in _sample_packets()]
+
+    def test_read_at_offset(self, capture_path):
+        aggregate = scan_capture(capture_path)
+        with PcapFile(capture_path) as capture:
+            record = capture.read_at(aggregate.offsets[5], 5)
+        assert record.data == _sample_packets()[5][1]
+        assert record.timestamp == pytest.approx(1.5)
+
+    def test_rejects_non_capture(self, tmp_path):
+        path = tmp_path / "not.pcap"
+        path.write_bytes(b"hello world, not a capture")
+        with pytest.raises(ValueError):
+            PcapFile(str(path))
+
+    def test_truncated_record_stops_cleanly(self, tmp_path):
+        path = tmp_path / "cut.pcap"
+        _write_pcap(str(path), _sample_packets()[:2])
+        path.write_bytes(path.read_bytes()[:-5])
+        with PcapFile(str(path)) as capture:
+            assert len(list(capture)) == 1
+
+
+class TestDecode:
+    def test_tcp_fields(self):
+        pkt = decode_packet(_sample_packets()[2][1], LINKTYPE_ETHERNET, 1.2)
+        assert (pkt.l3, pkt.src, pkt.dst, pkt.l4) == ("IPv4", "10.0.0.1", "10.0.0.2", "TCP")
+        assert (pkt.sport, pkt.dport, pkt.seq, pkt.payload_len) == (1234, 80, 101, 5)
+        assert tcp_flags_str(pkt.tcp_flags) == "PA"
+
+    def test_dns_response(self):
+        pkt = decode_packet(_sample_packets()[5][1], LINKTYPE_ETHERNET)
+        assert pkt.dns["qr"] == 1
+        assert pkt.dns["question"]["name"] == "example.com."
+        assert pkt.dns["answers"] == [{"name": "example.com.", "type": 1, "data": "93.184.216.34"}]
+
+    def test_vlan_and_truncated(self):
+        inner = _ipv4("1.1.1.1", "2.2.2.2", 17, _udp(1, 2))
+        tagged = b"\x00" * 12 + struct.pack("!HHH", 0x8100, 7, 0x0800) + inner
+        assert decode_packet(tagged, LINKTYPE_ETHERNET).src == "1.1.1.1"
+        assert decode_packet(tagged[:20], LINKTYPE_ETHERNET).l3 is None
+
+    def test_vxlan_inner_tcp(self):
+        inner = _ether(_ipv4("192.168.0.1", "192.168.0.2", 6, _tcp(4321, 443, seq=7, flags="S")))
+        vxlan = struct.pack("!II", 0x08000000, 42 << 8) + inner
+        pkt = decode_packet(_ether(_ipv4("10.1.0.1", "10.1.0.2", 17, _udp(50000, 4789, vxlan))),
+                            LINKTYPE_ETHERNET)
+        # Outer addresses, inner transport header, as scapy reports them
+        assert (pkt.src, pkt.dst, pkt.ip_proto, pkt.vxlan) == ("10.1.0.1", "10.1.0.2", 17, True)
+        assert (pkt.l4, pkt.sport, pkt.dport, pkt.seq) == ("TCP", 4321, 443, 7)
+        assert tcp_flags_str(pkt.tcp_flags) == "S"
+
+
+class TestAggregation:
+    def test_summary_pieces(self, capture_path):
+        agg = scan_capture(capture_path)
+        assert agg.packet_count == 8
+        assert agg.protocols == {"TCP": 5, "UDP": 3}
+        assert agg.tunneling == {"VXLAN": 1}
+        assert agg.ipv6_stats()["ipv6_packets"] == 1
+        assert agg.time_range()["duration_seconds"] == pytest.approx(0.7)
+        assert agg.dscp_distribution()["EF (Expedited Forwarding)"] == 1
+
+    def test_top_talkers_counts_every_packet(self, capture_path):
+        talkers = {t["ip"]: t for t in scan_capture(capture_path).top_talkers()}
+        assert talkers["10.0.0.1"]["packets_sent"] == 3
+        assert talkers["10.0.0.1"]["packets_received"] == 1
+        assert talkers["10.0.0.2"]["packets_received"] == 4
+
+    def test_flows(self, capture_path):
+        flows = scan_capture(capture_path).flow_statistics()
+        web = flows[0]
+        assert web["packet_count"] == 4
+        assert web["protocol"] == "TCP"
+        assert web["avg_interval_ms"] == pytest.approx(100.0)
+        assert "_interval_sum" not in web
+
+    def test_tcp_health(self, capture_path):
+        health = scan_capture(capture_path).tcp_health()
+        client = health["per_ip_health"]["10.0.0.1"]
+        assert client["retransmissions"] == 1
+        assert client["connection_attempts"] == 1
+        assert client["failed_connections"] == 0
+        assert health["per_ip_health"]["10.0.0.4"]["failed_connections"] == 1
+        assert "10.0.0.4" in health["problematic_ips"]
+
+    def test_vxlan_tcp_feeds_tcp_statistics(self, tmp_path):
+        def tunneled(sport, dport, flags):
+            inner = _ether(_ipv4("192.168.0.1", "192.168.0.2", 6, _tcp(sport, dport, flags=flags)))
+            vxlan = struct.pack("!II", 0x08000000, 42 << 8) + inner
+            return _ether(_ipv4("10.1.0.1", "10.1.0.2", 17, _udp(50000, 4789, vxlan)))
+
+        path = tmp_path / "vxlan.pcap"
+        _write_pcap(str(path), [(1.0, tunneled(4321, 443, "S")), (1.1, tunneled(4321, 443, "R"))])
+        agg = scan_capture(str(path))
+        assert agg.protocols == {"UDP": 2}
+        assert agg.tunneling == {"VXLAN": 2}
+        assert agg.flow_statistics()[0]["protocol"] == "TCP"
+        metrics = agg.tcp_health()["per_ip_health"]["10.1.0.1"]
+        assert (metrics["connection_attempts"], metrics["resets"]) == (1, 1)
+
+    def test_issue_list_is_bounded(self, tmp_path):
+        packets = [
+            (float(i), _ether(_ipv4("10.0.0.9", "10.0.0.2", 6, _tcp(1, 2, flags="R"))))
+            for i in range(50)
+        ]
+        path = tmp_path / "resets.pcap"
+        _write_pcap(str(path), packets)
+        metrics = scan_capture(str(path)).tcp_health()["per_ip_health"]["10.0.0.9"]
+        assert metrics["resets"] == 50
+        assert len(metrics["issues"]) == MAX_ISSUES_PER_IP
+        assert metrics["issues"][-1]["packet_index"] == 49
+
+    def test_dns(self, capture_path):
+        agg = scan_capture(capture_path)
+        assert agg.dns_queries == [{
+            "query_name": "example.com.", "query_type": 1, "timestamp": pytest.approx(1.4),
+            "source_ip": "10.0.0.3", "dest_ip": "10.0.0.53",
+        }]
+        assert agg.dns_responses[0]["answers"][0]["data"] == "93.184.216.34"
+
+
+class TestStreamingReader:
+    def test_read_pcap_without_scapy(self, capture_path):
+        analysis = PCAPReader(use_scapy=False).read_pcap(capture_path)
+        assert analysis.packet_count == 8
+        assert analysis.protocols["DNS"] == 2
+        assert analysis.summary["total_packets"] == 8
+        assert all(flow.packets == [] for flow in analysis.flows)
+
+    def test_max_packets(self, capture_path):
+        assert PCAPReader(use_scapy=False).read_pcap(capture_path, max_packets=3).packet_count == 3
+
+
+class TestAnalyzer:
+    def test_packet_details_seeks_single_packet(self, capture_path, tmp_path, monkeypatch):
+        pytest.importorskip("scapy")
+        monkeypatch.setenv("ZIYA_USER_CODEBASE_DIR", str(tmp_path))
+        from app.utils.pcap_analyzer import analyze_pcap_file
+        details = analyze_pcap_file(capture_path, "packet_details", packet_index=2)
+        assert details["payload_length"] == 5
+        summary = analyze_pcap_file(capture_path, "summary")
+        assert summary["total_packets"] == 8
@@ -0,0 +1,84 @@
+"""
+Tests for the columnar packet table (app/utils/pcap_table.py).
+"""
+
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.utils.pcap_index import CaptureIndex
+from app.utils.pcap_stream import scan_capture
+from app.utils.pcap_table import PacketTable
+
+from tests.test_pcap_stream import (
+    _ether, _ipv4, _ipv6, _sample_packets, _tcp, _udp, _write_pcap,
+)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZIYA_USER_CODEBASE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _random_packets(count=400, seed=7):
+    rng = random.Random(seed)
+    hosts = ["10.1.0.%d" % i for i in range(1, 6)]
+    packets, ts = [], 50.0
+    for _ in range(count):
+        # Occasional backwards step, as in merged captures
+        ts += rng.random() * 0.01 - (0.02 if rng.random() < 0.05 else 0)
+        src, dst = rng.sample(hosts, 2) if rng.random() < 0.95 else (hosts[0], hosts[0])
+        if rng.random() < 0.7:
+            l4 = _tcp(rng.choice([80, 443]), rng.choice([1000, 2000]),
+                      flags=rng.choice(["S", "SA", "PA", "R", "FA"]), data=b"x" * rng.choice([0, 40]))
+            packets.append((ts, _ether(_ipv4(src, dst, 6, l4))))
+        else:
+            packets.append((ts, _ether(_ipv6("fe80::1", "fe80::2", 17, _udp(rng.choice([53, 99]), 7)),
+                                       ethertype=0x86DD)))
+    return packets
+
+
+def _table(aggregator):
+    return PacketTable.from_columns(aggregator.columns, aggregator.addresses, aggregator.flow_keys())
+
+
+@pytest.mark.parametrize("packets", [_sample_packets(), _random_packets()], ids=["sample", "random"])
+def test_aggregations_match_streaming_results(tmp_path, packets):
+    path = tmp_path / "c.pcap"
+    _write_pcap(str(path), packets)
+    aggregator = scan_capture(str(path))
+    table = _table(aggregator)
+    assert len(table) == aggregator.packet_count
+    assert table.top_talkers(limit=50) == aggregator.top_talkers(limit=50)
+    expected = aggregator.flow_statistics()
+    actual = table.flow_statistics()
+    assert [f["endpoints"] for f in actual] == [f["endpoints"] for f in expected]
+    for got, want in zip(actual, expected):
+        assert got == {k: pytest.approx(v) if isinstance(v, float) else v for k, v in want.items()}
+
+
+def test_filter_indices(tmp_path):
+    path = tmp_path / "c.pcap"
+    _write_pcap(str(path), _sample_packets())
+    table = _table(scan_capture(str(path)))
+    assert list(table.filter_indices(src_ip="10.0.0.1")) == [0, 2, 3]
+    # IPv6 packets pass an IPv4-only address filter
+    assert list(table.filter_indices(src_ip="10.0.0.1", ip_versions=(4,))) == [0, 2, 3, 6]
+    assert list(table.filter_indices(protocol="udp", port=53)) == [4, 5]
+    assert list(table.filter_indices(tcp_flags="S")) == [0, 1, 4, 5, 6, 7]  # non-TCP passes
+    assert list(table.filter_indices(protocol="tcp", tcp_flags="PA", min_size=55)) == [2, 3]
+    assert list(table.filter_indices(src_ip="192.0.2.1", ip_versions=(4,))) == [6]
+    assert list(table.filter_indices(protocol="tcp", limit=2)) == [0, 1]
+
+
+def test_table_persists_and_memory_maps(project):
+    path = project / "c.pcap"
+    _write_pcap(str(path), _random_packets(50))
+    built = CaptureIndex.get_or_build(str(path))
+    loaded = CaptureIndex.load(str(path))
+    assert isinstance(loaded.table.rows, np.memmap)
+    assert loaded.table.flow_statistics() == built.table.flow_statistics()
+    assert list(loaded.table.filter_indices(port=53)) == list(built.table.filter_indices(port=53))
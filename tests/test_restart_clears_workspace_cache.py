@@ -50,6 +50,7 @@ def manager(monkeypatch):
     mgr.clients = {}
     mgr.workspace_scoped_clients = {}
     mgr._workspace_instance_last_used = {}
+    mgr._warm_pools = {}
     mgr.server_configs = {
         "shell": {"command": "x", "args": [], "builtin": True, "workspace_scoped": True}
     }
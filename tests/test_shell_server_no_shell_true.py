@@ -8,6 +8,7 @@ instead of delegating to the system shell.
 import os
 import subprocess
 import sys
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 
@@ -172,29 +173,51 @@ class TestExecutePipeline(unittest.TestCase):
         self.assertIn("5", result.stdout.strip())
 
     def test_shell_false_used(self):
-        """Verify subprocess.run is called with shell=False."""
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = subprocess.CompletedProcess(
-                args=["echo", "test"], returncode=0, stdout="test\n", stderr=""
-            )
-            self.srv._execute_pipeline("echo test", 10, "/tmp")
+        """Verify every stage is spawned with shell=False."""
+        with patch("subprocess.Popen", wraps=subprocess.Popen) as mock_popen:
+            self.srv._execute_pipeline("echo test | cat", 10, "/tmp")
+            self.assertEqual(mock_popen.call_count, 2)
             # Every call must have shell=False
-            for call in mock_run.call_args_list:
+            for call in mock_popen.call_args_list:
                 _, kwargs = call
                 self.assertFalse(
                     kwargs.get("shell", False),
-                    f"subprocess.run called with shell=True: {call}"
+                    f"subprocess.Popen called with shell=True: {call}"
                 )
 
     def test_timeout_propagated(self):
-        """Timeout parameter is passed to subprocess.run."""
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = subprocess.CompletedProcess(
-                args=["echo", "hi"], returncode=0, stdout="hi\n", stderr=""
-            )
-            self.srv._execute_pipeline("echo hi", 42, "/tmp")
-            _, kwargs = mock_run.call_args
-            self.assertEqual(kwargs["timeout"], 42)
+        """The timeout bounds the whole pipeline and kills its stages."""
+        start = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            self.srv._execute_pipeline("sleep 30 | cat", 1, "/tmp")
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_pipeline_stages_run_concurrently(self):
+        """Stages stream through a pipe: head ends an unbounded producer."""
+        result = self.srv._execute_pipeline("yes | head -n 3", 10, "/tmp")
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, "y\ny\ny\n")
+
+    def test_large_pipeline_output_is_capped(self):
+        self.srv.max_output_bytes = 1000
+        result = self.srv._execute_pipeline("seq 1 100000 | cat", 10, "/tmp")
+        self.assertIn("[output truncated after 1000 bytes]", result.stdout)
+        self.assertLess(len(result.stdout), 1100)
+
+    def test_capped_output_keeps_exit_status(self):
+        """Output past the cap is discarded, not cut off with SIGPIPE."""
+        self.srv.max_output_bytes = 1000
+        result = self.srv._execute_pipeline("seq 1 100000 && echo done", 10, "/tmp")
+        self.assertEqual(result.returncode, 0)
+        self.assertIn("done", result.stdout)
+
+    def test_skipped_pipeline_runs_no_stage(self):
+        result = self.srv._execute_pipeline("false && echo no | cat ; echo yes", 10, "/tmp")
+        self.assertEqual(result.stdout, "yes\n")
+
+    def test_stages_stdout_in_sequence(self):
+        result = self.srv._execute_pipeline("echo a | cat ; echo b", 10, "/tmp")
+        self.assertEqual(result.stdout, "a\nb\n")
 
 
 class TestExpandSpecialParams(unittest.TestCase):
@@ -337,6 +360,34 @@ class TestHandleRequestSecure(unittest.TestCase):
                     f"handle_request used shell=True: {call}"
                 )
 
+    def test_requests_do_not_block_each_other(self):
+        """Command execution runs off the event loop."""
+        srv = ShellServer()
+
+        def slow_pipeline(command, timeout, cwd, on_output=None):
+            time.sleep(0.5)
+            return subprocess.CompletedProcess(args=command, returncode=0, stdout="ok\n", stderr="")
+
+        srv._execute_pipeline = slow_pipeline
+
+        def call(request_id):
+            return srv.handle_request({
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": "tools/call",
+                "params": {"name": "run_shell_command", "arguments": {"command": "echo hi"}}
+            })
+
+        import asyncio
+
+        async def both():
+            return await asyncio.gather(call(1), call(2))
+
+        start = time.monotonic()
+        responses = asyncio.run(both())
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual([r["id"] for r in responses], [1, 2])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -4,6 +4,8 @@ Tests for app.storage.chats and app.storage.base — file-based chat storage.
 Covers:
   - CRUD operations (create, read, update, delete)
   - list_summaries preserves _version
+  - list_summaries served from the per-project summary sidecar
+  - append-only chat log format (ZIYA_CHAT_LOG_FORMAT)
   - add_message appends and updates lastActiveAt
   - remove_context_from_all_chats / remove_skill_from_all_chats
   - Atomic write safety (tmp file cleanup on error)
@@ -203,6 +205,95 @@ class TestListSummaries:
         assert summary_dump.get("_version") == 1719900000000
 
 
+# ── Summary sidecar ────────────────────────────────────────────────
+
+class TestSummarySidecar:
+
+    @pytest.fixture(autouse=True)
+    def _cold_caches(self):
+        from app.storage import chat_summaries
+        from app.storage.chats import _summary_cache
+        _summary_cache.clear()
+        chat_summaries.invalidate()
+        yield
+        _summary_cache.clear()
+        chat_summaries.invalidate()
+
+    def _cold_start(self):
+        """Simulate a fresh process: drop every in-memory summary cache."""
+        from app.storage import chat_summaries
+        from app.storage.chats import _summary_cache
+        _summary_cache.clear()
+        chat_summaries.invalidate()
+
+    def test_write_updates_sidecar(self, storage, sample_chat):
+        msg = Message(id="m1", role="human", content="hello", timestamp=int(time.time() * 1000))
+        storage.add_message(sample_chat.id, msg)
+
+        from app.storage import chat_summaries
+        record = chat_summaries.get_manifest(storage.chats_dir).records[sample_chat.id]
+        assert record["title"] == "Test Chat"
+        assert record["messageCount"] == 1
+        chat_summaries.flush()
+        assert (storage.chats_dir / "_summaries.json").exists()
+
+    def test_writes_are_batched(self, storage, sample_chat, monkeypatch):
+        from app.storage import chat_summaries
+        chat_summaries.flush()
+        saves = []
+        real_save = chat_summaries.SummaryManifest.save
+        monkeypatch.setattr(chat_summaries.SummaryManifest, "save",
+                            lambda self: saves.append(self.path) or real_save(self))
+        for i in range(5):
+            storage.add_message(sample_chat.id, Message(id=f"m{i}", role="human", content="hi",
+                                                        timestamp=int(time.time() * 1000)))
+        assert saves == []
+        chat_summaries.flush()
+        assert len(saves) == 1
+        self._cold_start()
+        assert chat_summaries.get_manifest(storage.chats_dir).records[sample_chat.id]["messageCount"] == 5
+
+    def test_cold_list_served_without_reading_chats(self, storage, sample_chat, monkeypatch):
+        storage.add_message(sample_chat.id, Message(id="m1", role="human", content="hi",
+                                                    timestamp=int(time.time() * 1000)))
+        self._cold_start()
+        monkeypatch.setattr(storage, "_read_json",
+                            lambda path: pytest.fail(f"chat body read: {path}"))
+        summaries = storage.list_summaries()
+        assert [s.id for s in summaries] == [sample_chat.id]
+        assert summaries[0].messageCount == 1
+
+    def test_external_edit_invalidates_record(self, storage, sample_chat):
+        path = storage._chat_file(sample_chat.id)
+        raw = json.loads(path.read_text())
+        raw["title"] = "Edited elsewhere"
+        path.write_text(json.dumps(raw))
+        self._cold_start()
+        assert storage.list_summaries()[0].title == "Edited elsewhere"
+
+        # The re-read refreshed the sidecar for the next cold start.
+        from app.storage.chat_summaries import get_manifest
+        self._cold_start()
+        assert get_manifest(storage.chats_dir).records[sample_chat.id]["title"] == "Edited elsewhere"
+
+    def test_delete_removes_record(self, storage, sample_chat):
+        storage.delete(sample_chat.id)
+        from app.storage.chat_summaries import get_manifest
+        self._cold_start()
+        assert sample_chat.id not in get_manifest(storage.chats_dir).records
+        assert storage.list_summaries() == []
+
+    def test_sidecar_is_columnar(self, storage, sample_chat):
+        from app.storage import chat_summaries
+        chat_summaries.flush()
+        data = json.loads((storage.chats_dir / "_summaries.json").read_bytes())
+        assert data["columns"]["id"] == [sample_chat.id]
+        assert data["columns"]["title"] == ["Test Chat"]
+
+    def test_sidecar_not_listed_as_chat(self, storage, sample_chat):
+        assert [c.id for c in storage.list()] == [sample_chat.id]
+
+
 # ── Update ─────────────────────────────────────────────────────────
 
 class TestUpdate:
@@ -332,3 +423,121 @@ class TestBaseStorageEdgeCases:
         target = tmp_path / "clean.json"
         storage._write_json(target, {"clean": True})
         assert not (tmp_path / "clean.tmp").exists()
+
+
+# ── Append-only log format ─────────────────────────────────────────
+
+class TestChatLogFormat:
+
+    @pytest.fixture(autouse=True)
+    def _log_format(self, monkeypatch):
+        monkeypatch.setenv("ZIYA_CHAT_LOG_FORMAT", "1")
+
+    def _msg(self, i, content=None):
+        return Message(id=f"m{i}", role="human", content=content or f"message {i}",
+                       timestamp=int(time.time() * 1000))
+
+    def test_round_trip(self, storage, sample_chat):
+        from app.storage.chat_log import LOG_MAGIC
+        storage.add_message(sample_chat.id, self._msg(0))
+        storage.add_message(sample_chat.id, self._msg(1))
+        assert storage._chat_file(sample_chat.id).read_bytes().startswith(LOG_MAGIC)
+
+        loaded = storage.get(sample_chat.id)
+        assert loaded.title == "Test Chat"
+        assert [m.content for m in loaded.messages] == ["message 0", "message 1"]
+
+    def test_append_writes_only_new_records(self, storage, sample_chat):
+        for i in range(20):
+            storage.add_message(sample_chat.id, self._msg(i, "x" * 2000))
+        path = storage._chat_file(sample_chat.id)
+        before = path.stat().st_size
+        storage.add_message(sample_chat.id, self._msg(99, "short"))
+        growth = path.stat().st_size - before
+        assert 0 < growth < 2000
+
+    def test_cold_process_replay(self, storage, sample_chat):
+        from app.storage import chat_log
+        storage.add_message(sample_chat.id, self._msg(0))
+        chat_log._states.clear()
+        storage.add_message(sample_chat.id, self._msg(1))
+        chat_log._states.clear()
+        assert len(storage.get(sample_chat.id).messages) == 2
+
+    def test_edit_and_truncate(self, storage, sample_chat):
+        for i in range(3):
+            storage.add_message(sample_chat.id, self._msg(i))
+        path = storage._chat_file(sample_chat.id)
+        raw = storage._read_json(path)
+        raw["messages"][1]["content"] = "edited"
+        raw["messages"] = raw["messages"][:2]
+        storage._write_json(path, raw)
+
+        from app.storage import chat_log
+        chat_log._states.clear()
+        assert [m.content for m in storage.get(sample_chat.id).messages] == ["message 0", "edited"]
+
+    def test_legacy_json_migrated_on_write(self, storage):
+        from app.storage.chat_log import LOG_MAGIC
+        chat_id = "legacy"
+        path = storage._chat_file(chat_id)
+        path.write_text(json.dumps({
+            "id": chat_id, "title": "Old", "messages": [],
+            "createdAt": 1, "lastActiveAt": int(time.time() * 1000),
+        }))
+        assert storage.get(chat_id).title == "Old"
+        assert not path.read_bytes().startswith(LOG_MAGIC)
+
+        storage.add_message(chat_id, self._msg(0))
+        assert path.read_bytes().startswith(LOG_MAGIC)
+        assert len(storage.get(chat_id).messages) == 1
+
+    def test_compaction_bounds_dead_records(self, storage, sample_chat):
+        from app.storage import chat_log
+        for i in range(3 * chat_log.COMPACT_SLACK):
+            storage.update(sample_chat.id, ChatUpdate(title=f"title {i}"))
+        state = chat_log._states[str(storage._chat_file(sample_chat.id))]
+        assert state.n_records <= 2 + chat_log.COMPACT_SLACK
+        assert storage.get(sample_chat.id).title == f"title {3 * chat_log.COMPACT_SLACK - 1}"
+
+    def test_torn_trailing_record_ignored(self, storage, sample_chat):
+        storage.add_message(sample_chat.id, self._msg(0))
+        path = storage._chat_file(sample_chat.id)
+        with open(path, "ab") as f:
+            f.write(b'{"i": 1, "m": {"id": "m1"')
+        from app.storage import chat_log
+        chat_log._states.clear()
+        assert len(storage.get(sample_chat.id).messages) == 1
+        storage.add_message(sample_chat.id, self._msg(1))
+        chat_log._states.clear()
+        assert len(storage.get(sample_chat.id).messages) == 2
+
+    def test_disabling_migrates_back_to_json(self, storage, sample_chat, monkeypatch):
+        storage.add_message(sample_chat.id, self._msg(0))
+        monkeypatch.delenv("ZIYA_CHAT_LOG_FORMAT")
+        storage.add_message(sample_chat.id, self._msg(1))
+        path = storage._chat_file(sample_chat.id)
+        assert len(json.loads(path.read_text())["messages"]) == 2
+
+    def test_listing_and_search_read_logs(self, tmp_path):
+        from app.storage import chat_summaries
+        from app.storage.chats import _summary_cache
+        from app.storage.chat_search import search_chats
+        storage = ChatStorage(tmp_path / "projects" / "p1")
+        chat = storage.create(ChatCreate(title="Logged"))
+        storage.add_message(chat.id, self._msg(0, "find the outlook config"))
+        _summary_cache.clear()
+        chat_summaries.invalidate()
+        (storage.chats_dir / "_summaries.json").unlink()
+        assert storage.list_summaries()[0].messageCount == 1
+        results = search_chats(tmp_path, "p1", "outlook")
+        assert [r["conversationId"] for r in results] == [chat.id]
+
+    def test_eval_sampler_reads_logs(self, tmp_path, monkeypatch):
+        from app.memory.eval import iter_random_conversations
+        monkeypatch.setattr(Path, "home", lambda: tmp_path)
+        storage = ChatStorage(tmp_path / ".ziya" / "projects" / "p1")
+        chat = storage.create(ChatCreate(title="Logged"))
+        storage.add_message(chat.id, self._msg(0))
+        records = iter_random_conversations(5, seed=1, min_size_bytes=0)
+        assert [(r.chat_id, len(r.messages)) for r in records] == [(chat.id, 1)]
@@ -336,3 +336,43 @@ class TestReadCache:
         results = storage.list_memories()
         assert len(results) == 2
         assert storage._memories_cache is not None
+
+
+class TestKeywordIndex:
+
+    def test_writes_update_index_without_rebuild(self, storage, monkeypatch):
+        from app.storage import memory as memory_module
+        storage.save(Memory(id="a", content="telemetry downlink budget"))
+        assert [m.id for m in storage.search("downlink")] == ["a"]
+
+        builds = []
+        real_build = memory_module._KeywordIndex.build
+        monkeypatch.setattr(memory_module._KeywordIndex, "build",
+                            classmethod(lambda cls, *a: builds.append(a) or real_build(*a)))
+        storage.save(Memory(id="b", content="uplink budget"))
+        storage.save_many([Memory(id="c", content="downlink margin")])
+        storage.delete("a")
+
+        assert [m.id for m in storage.search("downlink")] == ["c"]
+        assert sorted(m.id for m in storage.search("budget")) == ["b"]
+        assert builds == []
+
+    def test_persisted_index_reused(self, storage, monkeypatch):
+        from app.storage import memory as memory_module
+        storage.save(Memory(id="a", content="telemetry downlink budget"))
+        storage.search("downlink")
+        assert storage._keyword_index_file.exists()
+
+        monkeypatch.setattr(memory_module, "_tokenize", lambda text: pytest.fail("re-tokenized"))
+        fresh = MemoryStorage(memory_dir=storage._dir)
+        assert fresh._get_keyword_index(fresh._load_memories()).docs.keys() == {"a"}
+
+    def test_external_write_invalidates_index(self, storage):
+        storage.save(Memory(id="a", content="telemetry downlink budget"))
+        storage.search("downlink")
+        data = json.loads(storage._memories_file.read_text())
+        data[0]["content"] = "antenna pointing"
+        storage._memories_file.write_text(json.dumps(data))
+
+        assert storage.search("downlink") == []
+        assert [m.id for m in storage.search("antenna")] == ["a"]
@@ -0,0 +1,173 @@
+"""Tests for the persistent content-hash token count store."""
+import concurrent.futures
+import os
+import threading
+
+import pytest
+
+from app.utils import token_count_store as tcs
+
+
+@pytest.fixture
+def store_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZIYA_HOME", str(tmp_path))
+    monkeypatch.setenv("ZIYA_TOKEN_WORKERS", "1")
+    tcs._stores.clear()
+    yield tmp_path
+    tcs._stores.clear()
+
+
+def _reopen():
+    tcs._stores.clear()
+    return tcs.get_token_count_store()
+
+
+class TestTokenCountStore:
+
+    def test_counts_survive_restart(self, store_home):
+        first = tcs.count_tokens("def main():\n    return 42\n")
+        tcs.get_token_count_store().flush()
+        store = _reopen()
+        assert store.get(tcs.content_digest("def main():\n    return 42\n")) == first
+
+    def test_torn_tail_is_dropped(self, store_home):
+        store = tcs.get_token_count_store()
+        store.put(tcs.content_digest("a"), 1)
+        store.put(tcs.content_digest("b"), 2)
+        store.flush()
+        with open(store.path, "ab") as f:
+            f.write(b"\x01\x02\x03")
+
+        store = _reopen()
+        assert len(store) == 2
+        assert (os.path.getsize(store.path) - len(tcs._MAGIC)) % tcs._RECORD.size == 0
+
+    def test_unknown_format_starts_empty(self, store_home):
+        store = tcs.get_token_count_store()
+        store.path.parent.mkdir(parents=True, exist_ok=True)
+        store.path.write_bytes(b"not a store")
+        assert len(_reopen()) == 0
+
+
+class TestCountTexts:
+
+    def test_hits_are_not_tokenized_again(self, store_home):
+        texts = [(f"f{i}.py", f"value_{i} = {i}\n" * (i + 1)) for i in range(100)]
+        seen = {}
+        assert tcs.count_texts(texts, seen.__setitem__) == 100
+
+        again = {}
+        assert tcs.count_texts(texts, again.__setitem__) == 0
+        assert again == seen
+        assert seen["f3.py"] == tcs.count_tokens(texts[3][1])
+
+    def test_pool_counts_match_in_process(self, store_home, monkeypatch):
+        texts = [(f"f{i}.py", f"name_{i} = '{i}' * {i}\n" * (i % 7 + 1)) for i in range(150)]
+        inline = {}
+        tcs.count_texts(texts, inline.__setitem__)
+
+        monkeypatch.setenv("ZIYA_HOME", str(store_home / "pooled"))
+        monkeypatch.setenv("ZIYA_TOKEN_WORKERS", "2")
+        tcs._stores.clear()
+        started = []
+        real_pool = concurrent.futures.ProcessPoolExecutor
+
+        def pool(*args, **kwargs):
+            started.append(kwargs.get("mp_context"))
+            return real_pool(*args, **kwargs)
+
+        monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", pool)
+        pooled = {}
+        assert tcs.count_texts(texts, pooled.__setitem__) == 150
+        assert pooled == inline
+        assert len(started) == 1 and started[0].get_start_method() != "fork"
+
+    def test_bad_worker_setting_uses_default(self, store_home, monkeypatch):
+        monkeypatch.setenv("ZIYA_TOKEN_WORKERS", "auto")
+        assert tcs._get_token_workers() >= 1
+
+    def test_stops_when_asked(self, store_home):
+        read = []
+
+        def texts():
+            for i in range(10):
+                read.append(i)
+                yield str(i), f"text {i}"
+
+        seen = {}
+        tcs.count_texts(texts(), seen.__setitem__, should_stop=lambda: len(read) > 3)
+        # Nothing is read past the stop; uncounted misses are dropped.
+        assert read == [0, 1, 2, 3]
+        assert set(seen) <= {"0", "1", "2"}
+
+
+class TestBackgroundCalculation:
+
+    def test_oversized_text_is_not_read(self, store_home, tmp_path, monkeypatch):
+        from app.utils import directory_util as du
+        project = tmp_path / "proj"
+        project.mkdir()
+        (project / "small.py").write_text("x = 1\n")
+        (project / "huge.log").write_text("line\n" * (du.MAX_ACCURATE_TEXT_BYTES // 5 + 1))
+
+        read = []
+        real_read = du.read_file_content
+        monkeypatch.setattr(du, "read_file_content", lambda p: read.append(p) or real_read(p))
+        monkeypatch.setattr(du, "_accurate_token_cache_dir", None)
+        du.start_background_token_calculation(str(project), [], 5)
+        thread = du._background_thread
+        if thread is not None:
+            thread.join(timeout=10)
+
+        assert [os.path.basename(p) for p in read] == ["small.py"]
+        assert set(du._accurate_token_cache) == {"small.py"}
+
+    def test_pass_drops_files_it_did_not_visit(self, store_home, tmp_path, monkeypatch):
+        from app.utils import directory_util as du
+        project = tmp_path / "proj"
+        project.mkdir()
+        (project / "kept.py").write_text("x = 1\n")
+        monkeypatch.setattr(du, "_accurate_token_cache_dir", str(project))
+        monkeypatch.setattr(du, "_accurate_token_cache", {"kept.py": 99, "deleted.py": 5})
+        du.start_background_token_calculation(str(project), [], 5)
+        thread = du._background_thread
+        if thread is not None:
+            thread.join(timeout=10)
+
+        assert set(du._accurate_token_cache) == {"kept.py"}
+
+    def test_new_project_cancels_running_pass(self, store_home, tmp_path, monkeypatch):
+        from app.utils import directory_util as du
+        first, second = tmp_path / "first", tmp_path / "second"
+        for project in (first, second):
+            project.mkdir()
+        for i in range(5):
+            (first / f"a{i}.py").write_text(f"a = {i}\n")
+        (second / "b.py").write_text("b = 1\n")
+
+        blocked, release = threading.Event(), threading.Event()
+        first_reads = []
+        real_read = du.read_file_content
+
+        def read(path):
+            if path.startswith(str(first)):
+                first_reads.append(path)
+                blocked.set()
+                release.wait(10)
+            return real_read(path)
+
+        monkeypatch.setattr(du, "read_file_content", read)
+        monkeypatch.setattr(du, "_accurate_token_cache_dir", None)
+        du.start_background_token_calculation(str(first), [], 5)
+        first_thread = du._background_thread
+        assert blocked.wait(10)
+        du.start_background_token_calculation(str(second), [], 5)
+        second_thread = du._background_thread
+        release.set()
+        for thread in (first_thread, second_thread):
+            thread.join(timeout=10)
+
+        assert second_thread is not first_thread
+        assert len(first_reads) < 5
+        assert du._accurate_token_cache_dir == str(second)
+        assert set(du._accurate_token_cache) == {"b.py"}
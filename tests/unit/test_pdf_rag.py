@@ -58,6 +58,31 @@ def _make_empty_pdf(path: Path, page_count: int = 3) -> None:
     path.write_bytes(body)
 
 
+def _make_text_pdf(path: Path, page_texts) -> None:
+    """Write a real PDF with one line of Helvetica text per page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects)))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (n, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
 # --------------------------------------------------------------------------- #
 # Core module tests
 # --------------------------------------------------------------------------- #
@@ -100,6 +125,54 @@ class PdfRagCoreTests(unittest.TestCase):
         scores = self.pdf_rag._bm25_score(idx, tokenise("nonexistentterm"))
         self.assertEqual(scores, [0.0])
 
+    def test_bm25_postings_round_trip_through_disk(self):
+        tokenise = self.pdf_rag._tokenise_for_bm25
+        docs = [
+            tokenise("alpha beta beta gamma"),
+            tokenise("beta delta"),
+            tokenise(""),
+            tokenise("gamma gamma epsilon alpha"),
+        ]
+        idx = self.pdf_rag._build_bm25(docs)
+        path = self.tmp / self.pdf_rag._BM25_FILE_NAME
+        idx.write(path)
+        loaded = self.pdf_rag._Bm25Index.load(path)
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.n_docs, 4)
+        query = tokenise("alpha gamma beta missing")
+        self.assertEqual(self.pdf_rag._bm25_score(loaded, query),
+                         self.pdf_rag._bm25_score(idx, query))
+
+    def test_bm25_load_is_cached_until_file_changes(self):
+        tokenise = self.pdf_rag._tokenise_for_bm25
+        path = self.tmp / self.pdf_rag._BM25_FILE_NAME
+        self.pdf_rag._build_bm25([tokenise("alpha beta")]).write(path)
+        first = self.pdf_rag._load_bm25_cached(path)
+        with mock.patch.object(self.pdf_rag._Bm25Index, "load") as load:
+            self.assertIs(self.pdf_rag._load_bm25_cached(path), first)
+        load.assert_not_called()
+
+        self.pdf_rag._build_bm25([tokenise("alpha"), tokenise("gamma delta")]).write(path)
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000_000))
+        self.assertEqual(self.pdf_rag._load_bm25_cached(path).n_docs, 2)
+
+    def test_bm25_corrupt_postings_file_is_ignored(self):
+        path = self.tmp / self.pdf_rag._BM25_FILE_NAME
+        path.write_bytes(b"not a bm25 index")
+        self.assertIsNone(self.pdf_rag._Bm25Index.load(path))
+
+    def test_bm25_top_k_orders_by_score_then_page(self):
+        tokenise = self.pdf_rag._tokenise_for_bm25
+        idx = self.pdf_rag._build_bm25([
+            tokenise("widget"),
+            tokenise("nothing here"),
+            tokenise("widget widget widget"),
+            tokenise("widget"),
+        ])
+        ranked = idx.top_k(tokenise("widget"), 2)
+        self.assertEqual([doc for doc, _ in ranked], [2, 0])
+        self.assertEqual(idx.top_k(tokenise("absent"), 5), [])
+
     def test_tokeniser_splits_hyphens_and_periods(self):
         """
         Hyphens and periods act as token separators so that a query for
@@ -252,6 +325,36 @@ class PdfRagCoreTests(unittest.TestCase):
         self.assertTrue(hits, "expected at least one hit for the unique term")
         self.assertEqual(hits[0]["page"], 3)
 
+    def test_search_reads_only_hit_pages(self):
+        pdf = self.tmp / "sparse.pdf"
+        _make_empty_pdf(pdf)
+        texts = [f"filler page {i}" for i in range(1, 41)]
+        texts[29] = "the rare-sentinel appears once"
+        idx = self._build_with_mocked_extraction(pdf, texts)
+        idx.search("filler", top_k=1)  # builds bm25.bin and pages.idx
+        self.assertTrue((idx.cache_dir / self.pdf_rag._BM25_FILE_NAME).is_file())
+        self.assertTrue((idx.cache_dir / self.pdf_rag._PAGES_IDX_FILE_NAME).is_file())
+
+        real_loads = self.pdf_rag.json.loads
+        with mock.patch.object(self.pdf_rag.json, "loads", side_effect=real_loads) as loads:
+            hits = idx.search("sentinel", top_k=3)
+        self.assertEqual([h["page"] for h in hits], [30])
+        self.assertIn("sentinel", hits[0]["snippet"])
+        # meta.json plus the one hit page, not all 40 pages.
+        self.assertLessEqual(loads.call_count, 3)
+
+    def test_stale_page_offsets_are_rebuilt(self):
+        pdf = self.tmp / "stale.pdf"
+        _make_empty_pdf(pdf)
+        idx = self._build_with_mocked_extraction(pdf, ["one", "two", "three"])
+        self.assertEqual([r["page"] for r in idx.read_pages(2, 3)], [2, 3])
+        # Rewrite pages.jsonl with different line lengths behind the index.
+        pages_file = idx.cache_dir / "pages.jsonl"
+        lines = pages_file.read_text(encoding="utf-8").splitlines()
+        pages_file.write_text("\n".join([lines[0].replace("one", "one " * 50)] + lines[1:]) + "\n",
+                              encoding="utf-8")
+        self.assertEqual([r["text"] for r in idx.read_pages(2, 3)], ["two", "three"])
+
     def test_search_empty_query_returns_empty_list(self):
         pdf = self.tmp / "empty-query.pdf"
         _make_empty_pdf(pdf)
@@ -276,6 +379,61 @@ class PdfRagCoreTests(unittest.TestCase):
         self.assertTrue(hits)
         self.assertEqual(hits[0]["page"], 1)
 
+    # --- Page extraction --------------------------------------------------- #
+
+    def test_parallel_extraction_matches_page_order(self):
+        pdf = self.tmp / "parallel.pdf"
+        texts = [f"text of page {i}" for i in range(1, 12)]
+        _make_text_pdf(pdf, texts)
+        checkpoint = self.tmp / "pages.partial.jsonl"
+        with mock.patch.dict(os.environ, {"ZIYA_PDF_EXTRACT_WORKERS": "3"}), \
+             mock.patch.object(self.pdf_rag, "_EXTRACT_CHUNK_PAGES", 4):
+            pages = self.pdf_rag._extract_pages_text(str(pdf), len(texts), checkpoint=checkpoint)
+        self.assertEqual([p["page"] for p in pages], list(range(1, 12)))
+        self.assertEqual([p["text"] for p in pages], texts)
+        self.assertEqual(len(checkpoint.read_text(encoding="utf-8").splitlines()), 11)
+
+    def test_interrupted_extraction_resumes_from_checkpoint(self):
+        checkpoint = self.tmp / "pages.partial.jsonl"
+        calls = []
+
+        def fake_ranges(path, ranges):
+            (first, last), = ranges
+            calls.append(first)
+            if first == 7 and len(calls) == 3:
+                raise RuntimeError("simulated crash")
+            return _fake_pages([f"p{i}" for i in range(1, last + 1)])[first - 1:]
+
+        with mock.patch.dict(os.environ, {"ZIYA_PDF_EXTRACT_WORKERS": "1"}), \
+             mock.patch.object(self.pdf_rag, "_EXTRACT_CHUNK_PAGES", 3), \
+             mock.patch.object(self.pdf_rag, "_extract_page_ranges", side_effect=fake_ranges):
+            with self.assertRaises(RuntimeError):
+                self.pdf_rag._extract_pages_text("doc.pdf", 10, checkpoint=checkpoint)
+            # Simulate a torn final write as well.
+            with checkpoint.open("a", encoding="utf-8") as fh:
+                fh.write('{"page": 7, "te')
+            calls.clear()
+            pages = self.pdf_rag._extract_pages_text("doc.pdf", 10, checkpoint=checkpoint)
+        self.assertEqual(calls, [7, 10])
+        self.assertEqual([p["text"] for p in pages], [f"p{i}" for i in range(1, 11)])
+        self.assertEqual(len(checkpoint.read_text(encoding="utf-8").splitlines()), 10)
+
+    def test_light_index_promoted_in_background(self):
+        pdf = self.tmp / "background.pdf"
+        texts = [f"background page {i}" for i in range(1, 9)]
+        _make_text_pdf(pdf, texts)
+        with mock.patch.dict(os.environ, {"ZIYA_PDF_EXTRACT_WORKERS": "1"}):
+            light = self.pdf_rag.PdfIndex.build_light(str(pdf))
+            self.assertTrue(light.is_light)
+            self.assertIn("background page 1", light.build_stub())
+            key, _ = self.pdf_rag._cache_key_for(str(pdf))
+            self.pdf_rag._BACKGROUND_BUILDS[key].join(timeout=60)
+        full = self.pdf_rag.PdfIndex.load(str(pdf))
+        self.assertFalse(full.is_light)
+        self.assertEqual(full.page_count, 8)
+        self.assertFalse((full.cache_dir / self.pdf_rag._CHECKPOINT_FILE_NAME).exists())
+        self.assertEqual([h["page"] for h in full.search("page 5")][:1], [5])
+
     # --- should_use_pdf_rag ------------------------------------------------ #
 
     def test_should_use_pdf_rag_when_index_exists(self):